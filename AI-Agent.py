@@ -1,4 +1,5 @@
 import os
+import threading
 import time
 from dotenv import load_dotenv
 from phi.agent import Agent
@@ -6,20 +7,57 @@ from phi.model.groq import Groq
 # Import Custom Email Tools
 from Tools.SendEmail_tool import CustomEmailTool 
 from Tools.FetchUnreadMail_tool import FetchUnreadEmailTool  
+from Tools.imap_sync import SyncCheckpoint
 from Tools.zoom_tool import CustomZoomTool
 from Tools.calcom_tool import CalCom 
+from Tools.email_pipeline import EmailPipeline
+from Tools.email_triage import EmailTriage
+from Tools.processing_ledger import COMPLETED, TRIAGED, ProcessingLedger
+from Tools.outbound_spool import DeliveryWorker, OutboundSpool
+from Tools.meeting_tool import MeetingConfirmationTool
+from Tools.reply_templates import ReplyRenderer
+from Tools.llm_cache import CachedOpenAIChat, ResponseCache, tool_schemas
+from Tools.tenants import Tenant, TenantRuntime, load_tenant_configs
+from Tools.prompt_builder import PromptBuilder
+from Tools.work_coordinator import CoordinatedWorker, WorkCoordinator
+from Tools.poll_scheduler import AdaptivePollScheduler, backoff_delay
+from Tools.telemetry import Telemetry, record_retry
 
 # Load environment variables
 load_dotenv()
 
 UserName = os.getenv("UserName")
 EMAIL_LANGUAGE = os.getenv("EMAIL_LANGUAGE")
+# "full" or "condensed" agent instructions (see AGENT_INSTRUCTIONS_CONDENSED)
+AGENT_INSTRUCTION_SET = os.getenv("AGENT_INSTRUCTION_SET", "full")
+
+# JSON/YAML file with one account per tenant; when set, every tenant is served by this process
+TENANTS_CONFIG = os.getenv("TENANTS_CONFIG")
+
+# SQLite work queue shared by several processes serving the same mailbox; when set, this
+# process is one of them (one leases the mailbox and fetches, all handle conversations)
+COORDINATOR_PATH = os.getenv("COORDINATOR_PATH")
+
+# Port of the Prometheus metrics endpoint (/metrics); spans go to TRACE_PATH (OTLP/JSON lines)
+METRICS_PORT = os.getenv("METRICS_PORT")
+
+# Concurrency of the email processing pipeline
+PIPELINE_WORKERS = int(os.getenv("PIPELINE_WORKERS", 1))
+MAX_IN_FLIGHT_LLM_CALLS = int(os.getenv("MAX_IN_FLIGHT_LLM_CALLS", PIPELINE_WORKERS))
+
+# Durable record of what was already done for each email (keyed by Message-ID), so a
+# retry after a crash never creates a second meeting, booking or reply
+ledger = ProcessingLedger()
+
+# Replies are queued on disk and delivered in the background, with retries
+outbound_spool = OutboundSpool()
 
 # Instantiate Zoom Tool
 zoom_tool = CustomZoomTool(
     account_id=os.getenv("ZOOM_ACCOUNT_ID"),
     client_id=os.getenv("ZOOM_CLIENT_ID"),
     client_secret=os.getenv("ZOOM_CLIENT_SECRET"),
+    ledger=ledger,
 )
 
 
@@ -28,7 +66,10 @@ SendEmail_tool = CustomEmailTool(
     smtp_server=os.getenv("SMTP_SERVER"),
     sender_email=os.getenv("EMAIL_ADDRESS"),
     sender_passkey=os.getenv("EMAIL_PASSWORD"),
+    ledger=ledger,
+    spool=outbound_spool,
 )
+delivery_worker = DeliveryWorker(outbound_spool, SendEmail_tool.smtp.send)
 
 # Instantiate FetchUnreadMail Tool
 FetchUnreadEmail_tool = FetchUnreadEmailTool(
@@ -38,66 +79,63 @@ FetchUnreadEmail_tool = FetchUnreadEmailTool(
     email_password=os.getenv("EMAIL_PASSWORD"),
 )
 
+# Local pre-agent filter for newsletters, notifications and non-meeting mail
+triage = EmailTriage()
+
 # Instantiate CalCom Tool
 calcom_tool = CalCom(
     api_key=os.getenv("CALCOM_API_KEY"),
     event_type_id=int(os.getenv("CALCOM_EVENT_TYPE_ID", "0")),
     user_timezone=os.getenv("CALCOM_USER_TIMEZONE", "Asia/Tokyo"),
+    ledger=ledger,
 )
 
-# Use OpenAI ChatGPT API
-from typing import List, Dict
-import openai
-
-class OpenAIChatModel:
-    def __init__(self, api_key: str, model: str = "gpt-4"):
-        self.api_key = api_key
-        self.model = model
-        openai.api_key = self.api_key
-
-    def __call__(self, prompt: str) -> str:
-        response = openai.ChatCompletion.create(
-            model=self.model,
-            messages=[
-                {"role": "system", "content": "You are a meeting assistant."},
-                {"role": "user", "content": prompt},
-            ],
-        )
-        return response.choices[0].message["content"]
+# Confirmation and decline emails rendered from templates in the sender's language
+reply_renderer = ReplyRenderer(sender_name=UserName, default_language=EMAIL_LANGUAGE)
 
-# Create Agent with all tools
-agent = Agent(
-    name="My Meeting Agent",
-    agent_id="meeting-agent",
-    chat_model=OpenAIChatModel(api_key=os.getenv("OPENAI_API_KEY"), model="gpt-4"),
-    tools=[
-        zoom_tool,
-        calcom_tool,
-        SendEmail_tool,  # Register SendEmail Tool
-        FetchUnreadEmail_tool,  # Register FetchUnreadMail Tool
-    ],
-    instructions=[
+# Re-check, Zoom meeting, booking and confirmation email as a single tool call
+meeting_tool = MeetingConfirmationTool(zoom_tool, calcom_tool, SendEmail_tool, ledger=ledger, renderer=reply_renderer)
+
+# Spans and per-stage latency metrics for every tool call and model request
+telemetry = Telemetry()
+
+
+def instrument_toolkits(fetcher, mailer, zoom, calcom, meeting):
+    telemetry.instrument(fetcher, "imap", exclude=("wait_for_new_emails",))
+    telemetry.instrument(mailer, "smtp")
+    telemetry.instrument(zoom, "zoom")
+    telemetry.instrument(calcom, "calcom")
+    telemetry.instrument(meeting, "meeting")
+
+
+instrument_toolkits(FetchUnreadEmail_tool, SendEmail_tool, zoom_tool, calcom_tool, meeting_tool)
+
+from typing import List, Optional
+
+# Model responses by request content, so reprocessing an email does not pay for the same call twice
+llm_cache = ResponseCache()
+
+# Instructions shared by every agent instance. They form the start of the system prompt and
+# must not contain anything that changes between emails (see Tools/prompt_builder.py).
+AGENT_INSTRUCTIONS = [
         "You are responsible for handling meeting requests, scheduling, and notifications. Follow these steps:",
 
-        "Step 1: Use 'calcom_tool' to find available slots for the requested date range.",
+        "Step 1: Use 'calcom_tool' check_availability with the requested meeting time. It already applies the weekend, Japan national holiday and business-hour rules.",
+
 
+        "Case 1: If check_availability returns 'Not available'",
+        "   Step 2: Call 'meeting_tool' decline_meeting once with the requested time. It writes and sends the apology with the reason and the three alternative time slots in the sender's language.",
+        "   Step 3: Only add a 'note' (one short sentence in the sender's language) if the email asks something the standard reply does not answer.",
 
-        "Case 1: If the requested meeting time is not available, If a meeting request falls on a weekend, a Japan national holiday, or during restricted weekday hours (before 9 AM, between 1 PM and 2 PM, or after 6 PM)",
-        "   Step 2: Extract the first available slot from the response.",
-        "   Step 3: generate an email with politely decline the email request with proper reason and appolise.",
-        "   Step 4: Send an email to the sender, providing a clear reason and expressing regret in a well-mannered tone.",
-        "   Step 5: Include three alternative time slots in the reply to the email.",
+        "Case 2: If check_availability returns 'Available'",
+        "   Step 2: Call 'meeting_tool' accept_meeting once with the slot, duration and topic. It schedules the Zoom meeting, creates the Cal.com booking with the Zoom link and sends the confirmation email in the sender's language.",
+        "           Do not call zoom_tool, calcom_tool create_booking or SendEmail_tool for a confirmation yourself, and do not write the confirmation email.",
+        "   Step 3: If accept_meeting returns status 'not_available', the slot was taken in the meantime: continue with Case 1.",
+        "   Step 4: If it returns status 'failed', nothing was booked unless a booking is listed; inform the user politely.",
 
-        "Case 2: If the requested meeting time is available",
-        "   Step 1: Use 'zoom_tool' to schedule a Zoom meeting for the booked time.",
-        "   Step 2: Extract the Zoom link from the response.",
-        "   Step 3: Use 'calcom_tool' to create a booking with the extracted slot, Zoom link, attendee name, and email address.",
-        "           **Note:** Ensure to include zoom link while using calcom_tool.",
-        "   Step 4: Use 'SendEmail_tool' to send a confirmation email to the sender.",
-        "   Step 5: Replace placeholders like [start_time] and [join_url] with actual values from tool responses.",
-        "   Step 6: Before sending the email, always use 'email_metadata'.",
-        "   Step 7: Follow the email text language from the metadata and ensure placeholders like '[Your Zoom Meeting URL]' or '[Meeting Time]' are replaced with actual details from tool responses.",
-        "   Step 8: Use a beautiful format for the email body using markdown or other formats supported across devices and email applications.",
+        "Other emails (rescheduling, questions about an existing meeting, custom confirmations):",
+        "   - Write the email yourself. For a confirmation with your own text, use 'meeting_tool' confirm_meeting and write [start_time] for the meeting time, [join_url] for the Zoom link and [meeting_id] for the meeting ID; they are filled in automatically.",
+        "   - Use a beautiful format for the email body using markdown or other formats supported across devices and email applications.",
 
         "Important Guidelines:",
         "   - If you get an email from hello@cal.com or cal.com or any email like noreply@... just ignore those emails.",
@@ -105,8 +143,28 @@ agent = Agent(
         "   - If any step fails (e.g., no available slots or booking creation error), inform the user politely.",
         "   - Use clear, professional, and polite language in all communications.",
         "   - When scheduling a meeting, confirm the proposed time and date with the user if there is any uncertainty.",
-        "use this email_template""""
+        "   - Use the email template below.",
+
+"IMPORTANT: Before sending email Always replace the placeholders like [相手の名前] with SenderName [私の名前] or [Your Name] with 'Your name' given at the end.",
+"IMPORTANT: Do not ask for permission like 'Shall I proceed to send this email?', because the agent is responsible for sending emails user will not be able to respond to this question.",
+"IMPORTANT: Always reply with the same language as the email received.",
+]
+
+# The same rules in about half the tokens (AGENT_INSTRUCTION_SET=condensed)
+AGENT_INSTRUCTIONS_CONDENSED = [
+    "You handle meeting requests by email. Never ask for permission; nobody can answer.",
+    "1. Call calcom_tool check_availability with the requested time (weekend, holiday and business-hour rules are applied).",
+    "2. Not available: call meeting_tool decline_meeting once with the requested time; it writes and sends the reply.",
+    "3. Available: call meeting_tool accept_meeting once with the slot, duration and topic; it books and sends the confirmation. Never call zoom_tool, create_booking or SendEmail_tool for a confirmation.",
+    "   status 'not_available': continue as in 2. status 'failed': inform the sender politely. Add a 'note' only for questions the standard reply does not answer.",
+    "Other replies: write them yourself; for custom confirmations use confirm_meeting with [start_time], [join_url] and [meeting_id].",
+    "Ignore mail from cal.com and noreply addresses.",
+    "Reply in the sender's language, clearly formatted, following the email template; replace [相手の名前] with the sender's name and [私の名前] or [Your Name] with 'Your name' given at the end.",
+]
+
+INSTRUCTION_SETS = {"full": AGENT_INSTRUCTIONS, "condensed": AGENT_INSTRUCTIONS_CONDENSED}
 
+EMAIL_TEMPLATE = """
 [相手の名前] 様
 
 お世話になっております。[私の名前] です。
@@ -118,69 +176,284 @@ agent = Agent(
 何卒よろしくお願い申し上げます。
 
 [私の名前]
-""",
+"""
 
-f"IMPORTANT: Before sending email Always replace the placeholders like [相手の名前] with SenderName [私の名前] or [Your Name] with {UserName} from the env.",
-"IMPORTANT: Do not ask for permission like 'Shall I proceed to send this email?', because the agent is responsible for sending emails user will not be able to respond to this question.",
-"IMPORTANT: Always reply with the same language as the email received.",
-    ],
-    markdown=True,
-    show_tool_calls=False,
-    debug_mode=False,
+# Tools registered on every agent, in the order phi sends them to the model
+AGENT_TOOLS = [
+    zoom_tool,
+    calcom_tool,
+    meeting_tool,
+    SendEmail_tool,  # Register SendEmail Tool
+    FetchUnreadEmail_tool,  # Register FetchUnreadMail Tool
+]
+
+# Stable system prompt (instructions, template, user name); the emails go into the user message
+prompt_builder = PromptBuilder(
+    INSTRUCTION_SETS[AGENT_INSTRUCTION_SET],
+    template=EMAIL_TEMPLATE,
+    settings={"Your name": UserName or ""},
+    tools=tool_schemas(AGENT_TOOLS),
 )
 
 
-def fetch_unread_emails_with_retry(retries=3, delay=5):
-    for attempt in range(retries):
-        try:
-            unread_emails = FetchUnreadEmail_tool.fetch_unread_emails()
-            if unread_emails in ["No unread emails found.", "Error fetching unread emails: 'utf-8' codec can't decode byte 0xe3 in position 0: invalid continuation byte"]:
-                print("No unread emails found.")
-                return []
-            else:
+# Create Agent with all tools
+def create_agent(tools: Optional[List] = None, builder: Optional[PromptBuilder] = None) -> Agent:
+    """Build a meeting agent. Pipeline workers each get their own so conversations never share state."""
+    tools = tools or AGENT_TOOLS
+    builder = builder or prompt_builder
+    return Agent(
+        name="My Meeting Agent",
+        agent_id="meeting-agent",
+        # Every model request of a run goes through the response cache and is traced
+        model=CachedOpenAIChat(id="gpt-4", api_key=os.getenv("OPENAI_API_KEY"), cache=llm_cache, telemetry=telemetry),
+        tools=tools,
+        system_prompt=builder.system_prompt(),
+        markdown=True,
+        show_tool_calls=False,
+        debug_mode=False,
+    )
+
+
+agent = create_agent()
+
+
+def fetch_unread_emails_with_retry(retries=3, base_delay=5, max_delay=60):
+    with telemetry.span("imap.fetch_unread_emails_with_retry", "imap"):
+        for attempt in range(retries):
+            try:
+                unread_emails = FetchUnreadEmail_tool.fetch_unread_emails()
+                if unread_emails == "No unread emails found.":
+                    print("No unread emails found.")
+                    return []
+                if isinstance(unread_emails, str):
+                    # The tool reports failures as a message; retry them like exceptions
+                    raise RuntimeError(unread_emails)
                 return unread_emails
-        except Exception as e:
-            print(f"Error fetching unread emails: {e}")
-            if attempt < retries - 1:
-                print(f"Retrying in {delay} seconds...")
-                time.sleep(delay)
-            else:
-                print("Max retries reached. Exiting.")
-                return []
+            except Exception as e:
+                print(f"Error fetching unread emails: {e}")
+                if attempt < retries - 1:
+                    # Jittered exponential backoff, so workers failing together do not retry together
+                    delay = backoff_delay(attempt, base_delay, max_delay)
+                    record_retry()
+                    print(f"Retrying in {delay:.1f} seconds...")
+                    time.sleep(delay)
+                else:
+                    print("Max retries reached. Exiting.")
+                    return []
             
 
-# Loop to check emails every 30 seconds
+# Each pipeline worker thread lazily creates its own agent
+_worker = threading.local()
+
+
+def handle_email(emails):
+    if not hasattr(_worker, "agent"):
+        _worker.agent = create_agent()
+    prompt = prompt_builder.user_prompt(emails)
+    # Pass the prompt to the agent
+    print(f"Generated prompt: {prompt}")  # Debug statement
+    message_ids = [email[7] for email in emails]
+    # One trace per conversation: model requests and tool calls of this run are its children
+    with telemetry.span("email.handle", "email", message_ids=message_ids):
+        try:
+            # Side effects of this run are recorded against the set of emails it answers
+            with ledger.activate(message_ids), reply_renderer.activate(emails):
+                _worker.agent.print_response(prompt)
+            print("Prompt successfully passed to agent.")
+        except Exception as e:
+            print(f"Error passing prompt to agent: {e}")
+            raise
+        ledger.record(message_ids, COMPLETED)
+        # Only now are the emails marked as read; failed emails are fetched again next cycle
+        for email in emails:
+            FetchUnreadEmail_tool.mark_processed(email[4])
+
+
+def route_emails(unread_emails, fetcher, submit, message_id=lambda email: email[7]):
+    """Group emails by conversation, skip handled and non-meeting ones, and submit the rest for an agent run."""
+    threads = {}
+    for email in unread_emails:
+        threads.setdefault(email[6], []).append(email)
+    for thread_emails in threads.values():
+        if all(ledger.has(message_id(email), COMPLETED) for email in thread_emails):
+            # Handled before a crash or restart, but never marked as read
+            for email in thread_emails:
+                fetcher.mark_processed(email[4])
+            continue
+        decisions = [triage.classify_email(email) for email in thread_emails]
+        for email, decision in zip(thread_emails, decisions):
+            ledger.record(message_id(email), TRIAGED, decision._asdict())
+        if not any(decision.process for decision in decisions):
+            # Not a meeting request: mark it handled without an agent run
+            for email, decision in zip(thread_emails, decisions):
+                print(f"Skipping email {email[4]} from {email[1]}: {decision.reason}")
+                ledger.record(message_id(email), COMPLETED)
+                fetcher.mark_processed(email[4])
+            continue
+        # The whole conversation goes to the agent, short follow-ups included.
+        # Emails still queued or in progress from an earlier cycle are skipped.
+        submit(thread_emails)
+
+
+# Loop to check emails as soon as the server reports them (IMAP IDLE), or on an adaptive
+# schedule: every few seconds while mail is arriving, up to every few minutes when quiet.
+# Emails are handed to a worker pool; the new emails of one conversation (thread) are handled
+# together in a single agent run, and runs for the same conversation never overlap.
+# Ordering is per conversation, not per sender: two conversations with the same sender
+# may be handled at the same time.
 def process_emails():
-    while True:
+    pipeline = EmailPipeline(
+        handle_email,
+        workers=PIPELINE_WORKERS,
+        max_in_flight=MAX_IN_FLIGHT_LLM_CALLS,
+        # Lanes are conversations (thread id), so a sender's follow-up waits for the run it follows up on
+        key=lambda email: email[6],
+        coalesce=True,
+    )
+    scheduler = AdaptivePollScheduler()
+    highest_uid = 0
+    delivery_worker.start()
+    try:
+        while True:
+            print("Checking for unread emails...")
+            cycle_started = time.time()
+
+            # Fetch unread emails
+            unread_emails = fetch_unread_emails_with_retry()
+
+            # Emails still queued from an earlier cycle are fetched again; only higher UIDs are new
+            uids = [int(email[4]) for email in unread_emails]
+            scheduler.observe(sum(uid > highest_uid for uid in uids))
+            highest_uid = max([highest_uid, *uids])
+
+            # Check if the returned result is a non-empty list of emails
+            if not unread_emails:
+               print("No unread emails found.")
+            else:
+                print(f"Unread emails: {unread_emails}")
+                route_emails(unread_emails, FetchUnreadEmail_tool, pipeline.submit_all)
+            FetchUnreadEmail_tool.wait_for_new_emails(timeout=scheduler.timeout(cycle_started))
+    except KeyboardInterrupt:
+        print(f"Shutting down, waiting for {pipeline.pending()} in-flight emails...")
+        pipeline.shutdown(drain=True)
+        print(f"Delivering queued emails: {outbound_spool.stats()}")
+        delivery_worker.stop(drain=True)
+        FetchUnreadEmail_tool.session.stop()
+        telemetry.close()
+
+
+# Per-tenant prompt builders (the user name differs, the instructions and tools do not)
+_tenant_builders = {}
+
+
+def handle_tenant_email(tenant: Tenant, emails):
+    """`handle_email` for one conversation of a tenant, with that tenant's toolkits."""
+    if not hasattr(_worker, "tenant_agents"):
+        _worker.tenant_agents = {}
+    agents = _worker.tenant_agents
+    if tenant.name not in agents:
+        builder = _tenant_builders.get(tenant.name)
+        if builder is None:
+            builder = _tenant_builders[tenant.name] = PromptBuilder(
+                INSTRUCTION_SETS[AGENT_INSTRUCTION_SET],
+                template=EMAIL_TEMPLATE,
+                settings={"Your name": tenant.config.user_name},
+                tools=tool_schemas(tenant.toolkits),
+            )
+        agents[tenant.name] = create_agent(tenant.toolkits, builder)
+    prompt = PromptBuilder.user_prompt(emails)
+    message_ids = [tenant.message_id(email) for email in emails]
+    with telemetry.span("email.handle", "email", message_ids=message_ids, tenant=tenant.name):
+        with ledger.activate(message_ids), tenant.renderer.activate(emails):
+            agents[tenant.name].print_response(prompt)
+        ledger.record(message_ids, COMPLETED)
+        for email in emails:
+            tenant.fetcher.mark_processed(email[4])
+
+
+# Serve every account listed in TENANTS_CONFIG from this process: mailboxes are checked on a
+# schedule and conversations share one worker pool, fairly and within each tenant's limits.
+def process_tenants(path: str):
+    runtime = TenantRuntime(
+        load_tenant_configs(path),
+        handle_tenant_email,
+        route=lambda runtime, tenant, emails: route_emails(
+            emails, tenant.fetcher, lambda batch: runtime.submit(tenant, batch), message_id=tenant.message_id
+        ),
+        ledger=ledger,
+        spool=outbound_spool,
+    )
+    for tenant in runtime.tenants.values():
+        instrument_toolkits(tenant.fetcher, tenant.mailer, tenant.zoom, tenant.calcom, tenant.meeting_tool)
+    # One delivery worker for every tenant; each message goes out through its sender's SMTP pool
+    tenant_delivery = DeliveryWorker(outbound_spool, runtime.send).start()
+    print(f"Serving {len(runtime.tenants)} tenants")
+    try:
+        runtime.run_forever()
+    except KeyboardInterrupt:
+        print(f"Shutting down, waiting for {runtime.scheduler.pending()} in-flight emails...")
+        runtime.stop(drain=True)
+        tenant_delivery.stop(drain=True)
+        telemetry.close()
+
+
+def handle_claimed_email(emails):
+    """`handle_email` for a conversation claimed from the work coordinator."""
+    if all(ledger.has(email[7], COMPLETED) for email in emails):
+        # Handled by a worker that died before reporting it; only the IMAP flag is missing
+        for email in emails:
+            FetchUnreadEmail_tool.mark_processed(email[4])
+        return
+    handle_email(emails)
+
+
+# Serve the mailbox together with other processes sharing COORDINATOR_PATH: the process holding
+# the mailbox lease fetches and queues new conversations, and every process claims them, so each
+# email is handled by one worker only. A crashed worker's leases expire and others take over.
+def process_distributed(path: str):
+    coordinator = WorkCoordinator(path).start()
+    session = FetchUnreadEmail_tool.session
+    mailbox = f"mailbox:{session.email_address}@{session.host}/{session.mailbox}"
+    # The sync checkpoint is shared through the coordinator and only advanced by the mailbox lease holder
+    FetchUnreadEmail_tool.checkpoint = SyncCheckpoint(None, mailbox, store=coordinator)
+
+    def poll():
         print("Checking for unread emails...")
-        
-        # Fetch unread emails
         unread_emails = fetch_unread_emails_with_retry()
-        
-        # Check if the returned result is a valid list of dictionaries
-        if (unread_emails == "No unread emails found.") or (unread_emails == "Error fetching unread emails: 'utf-8' codec can't decode byte 0xe3 in position 0: invalid continuation byte"):
-           print("No unread emails found.")
-        else:
-            print(f"Unread emails: {unread_emails}")
-            for email in unread_emails:
-                prompt = (
-                    f"The following email was received:\n\n"
-                    f"**Sender Name:** {email[0]}\n"
-                    f"**Sender Email:** {email[1]}\n"
-                    f"**Subject:** {email[2]}\n"
-                    f"**Body:** {email[3]}\n\n"
-                    "Does this email relate to a meeting, scheduling, or a request for an online discussion? "
-                    "If so, proceed with the request as per the instructions provided."
-                )
-                # Pass the prompt to the agent
-                print(f"Generated prompt: {prompt}")  # Debug statement
-                try:
-                    agent.print_response(prompt)
-                    print("Prompt successfully passed to agent.")
-                except Exception as e:
-                    print(f"Error passing prompt to agent: {e}")
-        time.sleep(30)
+        known = coordinator.known([email[7] for email in unread_emails])
+        # Emails queued by an earlier poll stay with the coordinator, unless handled and not yet marked as read
+        new_emails = [email for email in unread_emails if email[7] not in known or ledger.has(email[7], COMPLETED)]
+        if new_emails:
+            route_emails(new_emails, FetchUnreadEmail_tool, lambda batch: coordinator.enqueue(batch, batch[0][6]))
+
+    worker = CoordinatedWorker(
+        coordinator,
+        mailbox,
+        poll,
+        handle_claimed_email,
+        workers=PIPELINE_WORKERS,
+        wait_for_mail=FetchUnreadEmail_tool.wait_for_new_emails,
+    )
+    delivery_worker.start()
+    print(f"Worker {coordinator.worker_id} joined {path}")
+    try:
+        worker.run_forever()
+    except KeyboardInterrupt:
+        print("Shutting down, finishing claimed emails...")
+        worker.stop(drain=True)
+        coordinator.close()
+        print(f"Delivering queued emails: {outbound_spool.stats()}")
+        delivery_worker.stop(drain=True)
+        session.stop()
+        telemetry.close()
 
 
 if __name__ == "__main__":
-    process_emails()
\ No newline at end of file
+    if METRICS_PORT:
+        telemetry.serve(int(METRICS_PORT))
+    if TENANTS_CONFIG:
+        process_tenants(TENANTS_CONFIG)
+    elif COORDINATOR_PATH:
+        process_distributed(COORDINATOR_PATH)
+    else:
+        process_emails()
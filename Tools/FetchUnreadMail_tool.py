@@ -3,14 +3,29 @@ from phi.tools import Toolkit
 from phi.utils.log import logger
 from dotenv import load_dotenv
 import os
-from email.header import decode_header
+from email.utils import parseaddr
+import asyncio
 import imaplib
-import re
 import email
 
+from Tools.body_normalizer import BodyNormalizer
+from Tools.email_triage import TRIAGE_HEADERS
+from Tools.imap_parser import decode_part, describe_part, find_body, find_text_part, parse_fetch_response, uid_chunks
+from Tools.mime_text import StreamingTextExtractor, decode_mime_header, html_to_text
+from Tools.imap_session import IMAPSession
+from Tools.imap_sync import SyncCheckpoint, parse_status
+from Tools.thread_index import ThreadIndex, parse_message_ids
+
 # Load environment variables
 load_dotenv()
 
+# Only these headers are downloaded; the body is fetched part-by-part afterwards
+HEADER_FIELDS = " ".join(("FROM", "SUBJECT", "MESSAGE-ID", "IN-REPLY-TO", "REFERENCES") + TRIAGE_HEADERS)
+
+# Messages without a usable BODYSTRUCTURE are read in windows of this size, up to a limit
+STREAM_WINDOW = 64 * 1024
+MAX_STREAM_BYTES = 1024 * 1024
+
 
 class FetchUnreadEmailTool(Toolkit):
     def __init__(
@@ -19,12 +34,42 @@ class FetchUnreadEmailTool(Toolkit):
         email_password: Optional[str] = None,
         imap_server: Optional[str] = None,
         imap_port: Optional[int] = None,
+        session: Optional[IMAPSession] = None,
+        fetch_batch_size: Optional[int] = None,
+        sync_state_path: Optional[str] = None,
+        max_body_bytes: Optional[int] = None,
+        body_token_budget: Optional[int] = None,
+        thread_index_path: Optional[str] = None,
     ):
         super().__init__(name="unread_email_tool")
         self.email_address: Optional[str] = email_address or os.getenv("EMAIL_ADDRESS")
         self.email_password: Optional[str] = email_password or os.getenv("EMAIL_PASSWORD")
         self.imap_server: Optional[str] = imap_server or os.getenv("IMAP_SERVER", "imap.gmail.com")
         self.imap_port: Optional[int] = imap_port or int(os.getenv("IMAP_PORT", 993))
+        self.fetch_batch_size: int = fetch_batch_size or int(os.getenv("IMAP_FETCH_BATCH_SIZE", 100))
+        # Upper bound on the body bytes downloaded (and passed to the agent) per email
+        self.max_body_bytes: int = max_body_bytes or int(os.getenv("EMAIL_MAX_BODY_BYTES", 64 * 1024))
+        # Quoted history, signatures and disclaimers are stripped before bodies reach the prompt
+        self.normalizer: BodyNormalizer = BodyNormalizer(body_token_budget)
+
+        # Long-lived IMAP connection reused across fetch cycles
+        self.session: IMAPSession = session or IMAPSession(
+            host=self.imap_server,
+            port=self.imap_port,
+            email_address=self.email_address,
+            email_password=self.email_password,
+        )
+
+        # Local checkpoint so each cycle only asks the server for new UIDs
+        self.checkpoint: SyncCheckpoint = SyncCheckpoint(
+            path=sync_state_path or os.getenv("IMAP_SYNC_STATE_PATH", ".imap_sync_state.json"),
+            key=f"{self.session.email_address}@{self.session.host}/{self.session.mailbox}",
+        )
+
+        # Local conversation index so follow-ups in one thread can be handled together
+        self.threads: ThreadIndex = ThreadIndex(
+            path=thread_index_path or os.getenv("EMAIL_THREAD_INDEX_PATH", ".email_threads.json"),
+        )
 
         # Register the tool
         self.register(self.fetch_unread_emails)
@@ -37,80 +82,186 @@ class FetchUnreadEmailTool(Toolkit):
     def fetch_unread_emails(self) -> str:
         """
         Fetch unread emails from the mailbox and return them as a formatted string.
+        Messages are not marked as read until `mark_processed` is called with their UID.
         """
-        unread_emails = []
         try:
-            # Connect to the IMAP server
-            with imaplib.IMAP4_SSL(self.imap_server, self.imap_port) as mail:
-                mail.login(self.email_address, self.email_password)
-                mail.select("inbox")
-
-                # Search for unread emails
-                status, messages = mail.search(None, "UNSEEN")
-                if status != "OK":
-                    return "Failed to fetch unread emails."
-
-                # Fetch each unread email
-                for num in messages[0].split():
-                    status, msg_data = mail.fetch(num, "(RFC822)")
-                    if status != "OK":
-                        continue
-                    
-                    
-                    for response_part in msg_data:
-                        if isinstance(response_part, tuple):
-                            msg = email.message_from_bytes(response_part[1])
-                            email_from = decode_header(msg["From"])[0][0]
-                            email_subject = decode_header(msg["Subject"])[0][0]
-                            if isinstance(email_from, bytes):
-                                email_from = email_from.decode()
-                            if isinstance(email_subject, bytes):
-                                email_subject = email_subject.decode()
-
-                            # Extracting the name and email using regex
-                            match = re.match(r"(.*) <(.*)>", email_from)
-                            SenderName = match.group(1) if match else None
-                            SenderEmail = match.group(2) if match else None
-
-                            email_body = ""
-                            if msg.is_multipart():
-                                for part in msg.walk():
-                                    if part.get_content_type() == "text/plain":
-                                        email_body = part.get_payload(decode=True).decode()
-                                        break
-                            else:
-                                email_body = msg.get_payload(decode=True).decode()
-
-                            unread_emails.append([SenderName, SenderEmail,email_subject,email_body])
+            unread_emails = self.session.run(self._fetch_unread)
         except Exception as e:
             logger.error(f"Error fetching unread emails: {e}")
             return f"Error fetching unread emails: {e}"
 
         return unread_emails if unread_emails else "No unread emails found."
 
+    async def afetch_unread_emails(self) -> str:
+        """Async variant of `fetch_unread_emails`.
+
+        All fetches share one IMAP connection whose commands are serialized, so the
+        blocking call runs in a worker thread instead of holding up the event loop.
+        """
+        return await asyncio.to_thread(self.fetch_unread_emails)
+
+    def _fetch_unread(self, mail: imaplib.IMAP4) -> list:
+        """Fetch unread emails over an already authenticated and selected connection."""
+        unread_emails = []
+
+        # Skip the search entirely when UIDNEXT (and HIGHESTMODSEQ) did not move
+        items = "(UIDNEXT UIDVALIDITY HIGHESTMODSEQ)" if "CONDSTORE" in mail.capabilities else "(UIDNEXT UIDVALIDITY)"
+        status, data = mail.status(self.session.mailbox, items)
+        if status != "OK":
+            return "Failed to fetch unread emails."
+        mailbox_status = parse_status(data)
+        # Another process may have advanced a shared checkpoint while it held the mailbox
+        self.checkpoint.refresh()
+        if self.checkpoint.is_unchanged(mailbox_status):
+            return unread_emails
+        self.checkpoint.begin_cycle(mailbox_status)
+
+        # Search for unread emails above the checkpoint
+        status, messages = mail.uid("SEARCH", None, f"UID {self.checkpoint.last_uid + 1}:* UNSEEN")
+        if status != "OK":
+            return "Failed to fetch unread emails."
+        # "N:*" always matches the highest UID, even when it is below N
+        uids = [uid for uid in messages[0].split() if int(uid) > self.checkpoint.last_uid]
+
+        # Fetch unread emails in chunks, one command per chunk
+        for uid_set in uid_chunks(uids, self.fetch_batch_size):
+            unread_emails.extend(self._fetch_batch(mail, uid_set))
+
+        self.threads.save()
+        self.checkpoint.end_cycle(mailbox_status, {int(uid) for uid in uids})
+        return unread_emails
+
+    def mark_processed(self, uid: str) -> None:
+        """
+        Flag a message as seen once the agent has finished with it and advance the sync checkpoint.
+        """
+        self.session.run(lambda mail: mail.uid("STORE", uid, "+FLAGS", "(\\Seen)"))
+        self.checkpoint.acknowledge(int(uid))
+
+    def _fetch_batch(self, mail: imaplib.IMAP4, uid_set: bytes) -> list:
+        """Fetch headers and BODYSTRUCTURE for a UID set, then only the text part of each message."""
+        status, data = mail.uid("FETCH", uid_set, f"(UID BODYSTRUCTURE BODY.PEEK[HEADER.FIELDS ({HEADER_FIELDS})])")
+        if status != "OK":
+            return []
+        messages = parse_fetch_response(data)
+
+        # Group messages by the section holding their text so each group is a single FETCH
+        parts = {}
+        sections = {}
+        unstructured = []
+        for uid, attributes in messages.items():
+            if not attributes.get("BODYSTRUCTURE"):
+                unstructured.append(uid)
+                continue
+            part = self._select_text_part(attributes["BODYSTRUCTURE"])
+            if part:
+                parts[uid] = part
+                sections.setdefault(part[0], []).append(uid)
+
+        bodies = {}
+        for section, section_uids in sections.items():
+            # Partial fetch: the server sends at most max_body_bytes of the part
+            status, data = mail.uid(
+                "FETCH", b",".join(section_uids), f"(UID BODY.PEEK[{section}]<0.{self.max_body_bytes}>)"
+            )
+            if status != "OK":
+                continue
+            for uid, attributes in parse_fetch_response(data).items():
+                bodies[uid] = find_body(attributes, section)
+
+        unread_emails = []
+        for uid, attributes in messages.items():
+            msg = email.message_from_bytes(find_body(attributes, "HEADER.FIELDS") or b"")
+            # Every encoded word is decoded with its own charset (ISO-2022-JP subjects are common)
+            SenderName, SenderEmail = parseaddr(decode_mime_header(msg["From"]))
+            SenderName, SenderEmail = SenderName or None, SenderEmail or None
+            email_subject = decode_mime_header(msg["Subject"])
+
+            email_body = ""
+            if bodies.get(uid) is not None:
+                _, encoding, charset, is_html = parts[uid]
+                truncated = len(bodies[uid]) >= self.max_body_bytes
+                email_body = decode_part(bodies[uid], encoding, charset, truncated)
+                if is_html:
+                    email_body = html_to_text(email_body)
+            elif uid in unstructured:
+                email_body = self._stream_text(mail, uid)
+            email_body = self.normalizer.normalize(email_body)
+
+            # Bulk-mail headers used by the pre-agent triage stage
+            headers = {name: str(msg[name]) for name in TRIAGE_HEADERS if msg[name] is not None}
+
+            # Messages without a Message-ID get a stable synthetic one
+            message_ids = parse_message_ids(msg["Message-ID"])
+            message_id = message_ids[0] if message_ids else f"<{self.checkpoint.uidvalidity}.{uid.decode()}@{self.session.host}>"
+            thread_id = self.threads.add(message_id, msg["In-Reply-To"], msg["References"], email_subject, SenderEmail)
+
+            unread_emails.append([SenderName, SenderEmail, email_subject, email_body, uid.decode(), headers, thread_id, message_id])
+        return unread_emails
+
+    @staticmethod
+    def _select_text_part(bodystructure) -> Optional[tuple]:
+        """Pick the first text/plain part, else the first text/html part, else a single text part.
+
+        Returns:
+            Optional[tuple]: (part number, transfer encoding, charset, is_html) or None
+        """
+        if not bodystructure:
+            return None
+        part = find_text_part(bodystructure)
+        if part is not None:
+            return part + (False,)
+        part = find_text_part(bodystructure, subtype="html")
+        if part is not None:
+            return part + (True,)
+        if not isinstance(bodystructure[0], list) and bytes(bodystructure[0] or b"").lower() == b"text":
+            return describe_part(bodystructure, "1") + (False,)
+        return None
+
+    def _stream_text(self, mail: imaplib.IMAP4, uid: bytes) -> str:
+        """Read a message in partial-fetch windows through the streaming parser until its first text part."""
+        extractor = StreamingTextExtractor(self.max_body_bytes)
+        offset = 0
+        while offset < MAX_STREAM_BYTES:
+            status, data = mail.uid("FETCH", uid, f"(UID BODY.PEEK[]<{offset}.{STREAM_WINDOW}>)")
+            if status != "OK":
+                break
+            chunk = find_body(parse_fetch_response(data).get(uid, {}), "") or b""
+            if extractor.feed(chunk) or len(chunk) < STREAM_WINDOW:
+                break
+            offset += len(chunk)
+        return extractor.close() or ""
+
+    def wait_for_new_emails(self, timeout: float = 30) -> bool:
+        """
+        Block until the server pushes new mail (IMAP IDLE) or the timeout expires.
+        """
+        return self.session.wait_for_new_mail(timeout)
+
+
+# Standalone demo agent; built only when the module is run directly, not on import
+if __name__ == "__main__":
+    from phi.agent import Agent
+    from phi.model.groq import Groq
+
+    unread_email_tool = FetchUnreadEmailTool()
+
+    agent = Agent(
+        name="Unread Email Checker",
+        agent_id="unread-email-checker",
+        model=Groq(id="llama-3.3-70b-versatile"),
+        tools=[unread_email_tool],
+        markdown=True,
+        show_tool_calls=False,
+        debug_mode=False,  # Enable debugging
+        instructions=[
+            "You are an expert at fetching unread emails.",
+            "When the user asks to fetch unread emails, call the `fetch_unread_emails` function exactly once.",
+            # "Return the result as-is without any further processing or re-calling the function.",
+            "If there are no unread emails, simply return 'No unread emails found.'",
+            "return in table format 'Sender Name', 'Sender Email', 'subject', 'body'"
+        ],
+    )
 
-# Integration with Agent
-from phi.agent import Agent
-from phi.model.groq import Groq
-
-unread_email_tool = FetchUnreadEmailTool()
-
-agent = Agent(
-    name="Unread Email Checker",
-    agent_id="unread-email-checker",
-    model=Groq(id="llama-3.3-70b-versatile"),
-    tools=[unread_email_tool],
-    markdown=True,
-    show_tool_calls=False,
-    debug_mode=False,  # Enable debugging
-    instructions=[
-        "You are an expert at fetching unread emails.",
-        "When the user asks to fetch unread emails, call the `fetch_unread_emails` function exactly once.",
-        # "Return the result as-is without any further processing or re-calling the function.",
-        "If there are no unread emails, simply return 'No unread emails found.'",
-        "return in table format 'Sender Name', 'Sender Email', 'subject', 'body'"
-    ],
-)
-
-# Example Usage
-# agent.print_response("fetch unread emails")
+    # Example Usage
+    # agent.print_response("fetch unread emails")
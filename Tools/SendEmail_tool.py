@@ -2,10 +2,14 @@ from typing import Optional, List
 from phi.tools import Toolkit
 from phi.utils.log import logger
 from dotenv import load_dotenv
+import asyncio
 import os
 from email.message import EmailMessage
-import smtplib
-import ssl
+
+from Tools.async_utils import run_sync
+from Tools.outbound_spool import OutboundSpool
+from Tools.processing_ledger import REPLIED, ProcessingLedger, run_once
+from Tools.smtp_pool import SMTPPool
 
 # Load environment variables
 load_dotenv()
@@ -18,6 +22,13 @@ class CustomEmailTool(Toolkit):
         sender_passkey: Optional[str] = None,
         smtp_server: Optional[str] = None,
         smtp_port: Optional[int] = None,
+        ledger: Optional[ProcessingLedger] = None,
+        pool_size: Optional[int] = None,
+        timeout: Optional[float] = None,
+        tls: Optional[str] = None,
+        verify_cert: Optional[bool] = None,
+        ca_file: Optional[str] = None,
+        spool: Optional[OutboundSpool] = None,
     ):
         super().__init__(name="email_tools")
         self.sender_name: Optional[str] = sender_name or os.getenv("UserName")
@@ -25,13 +36,29 @@ class CustomEmailTool(Toolkit):
         self.sender_passkey: Optional[str] = sender_passkey or os.getenv("EMAIL_PASSWORD")
         self.smtp_server: Optional[str] = smtp_server or os.getenv("SMTP_SERVER", "smtp.gmail.com")
         self.smtp_port: Optional[int] = smtp_port or int(os.getenv("SMTP_PORT", 465)) 
+        # A reply already sent for the email being processed is not sent twice
+        self.ledger = ledger
+        # Authenticated connections are kept open and reused across sends
+        self.smtp = SMTPPool(
+            self.smtp_server,
+            self.smtp_port,
+            username=self.sender_email,
+            password=self.sender_passkey,
+            pool_size=pool_size,
+            timeout=timeout,
+            tls=tls,
+            verify_cert=verify_cert,
+            ca_file=ca_file,
+        )
+        # With a spool, send_email only queues the message and a DeliveryWorker sends it
+        self.spool = spool
         self.register(self.send_email)
 
         # Debugging logs for environment variables
         logger.debug(f"Sender Name: {self.sender_name}")
         logger.debug(f"Sender Email: {self.sender_email}")
         logger.debug(f"SMTP Server: {self.smtp_server}")
-        logger.debug(f"SMTP Port: {self.smtp_port}")
+        logger.debug(f"SMTP Port: {self.smtp_port} ({self.smtp.tls})")
 
     def send_email(self, *, to: List[str], subject: str, body: str) -> str:
         """Emails the user with the given subject and body.
@@ -39,8 +66,64 @@ class CustomEmailTool(Toolkit):
         :param to: List of recipient email addresses.
         :param subject: The subject of the email.
         :param body: The body of the email.
-        :return: "success" if the email was sent successfully, "error: [error message]" otherwise.
+        :return: "email sent successfully" (or "email queued for delivery: <Message-ID>" when delivery is spooled), "error: [error message]" otherwise.
         """
+        def operation() -> str:
+            if self.spool:
+                return self.queue_email(to=to, subject=subject, body=body)
+            return run_sync(self.asend_email(to=to, subject=subject, body=body))
+
+        return run_once(
+            self.ledger,
+            REPLIED,
+            operation,
+            succeeded=lambda result: not result.startswith("error:"),
+        )
+
+    def queue_email(self, *, to: List[str], subject: str, body: str) -> str:
+        """Store the email in the outbound spool and return without waiting for the SMTP server."""
+        error = self._validate(to)
+        if error:
+            return error
+        if not self.spool:
+            return "error: No outbound spool configured"
+        try:
+            message_id = self.spool.enqueue(self._build_message(to, subject, body))
+        except Exception as e:
+            logger.error(f"Error queueing email: {e}")
+            return f"error: {e}"
+        logger.info(f"Queued Email to {', '.join(to)} ({message_id})")
+        return f"email queued for delivery: {message_id}"
+
+    async def asend_email(self, *, to: List[str], subject: str, body: str) -> str:
+        """Async variant of `send_email`."""
+        error = self._validate(to)
+        if error:
+            return error
+        logger.info(f"Sending Email to {', '.join(to)}")
+        try:
+            await self.smtp.send(self._build_message(to, subject, body))
+        except Exception as e:
+            logger.error(f"Error sending email: {e}")
+            return f"error: {e}"
+        return "email sent successfully"
+
+    def send_many(self, messages: List[dict]) -> List[str]:
+        """Send several emails over the pooled connections.
+
+        Args:
+            messages: Keyword arguments of `send_email` (to, subject, body) for each email
+
+        Returns:
+            The `send_email` result for each message, in order
+        """
+        return run_sync(self.asend_many(messages))
+
+    async def asend_many(self, messages: List[dict]) -> List[str]:
+        """Async variant of `send_many`; at most `SMTP_POOL_SIZE` messages are in flight."""
+        return list(await asyncio.gather(*(self.asend_email(**message) for message in messages)))
+
+    def _validate(self, to: List[str]) -> Optional[str]:
         if not to:
             return "error: No recipient email provided"
         if not self.sender_name:
@@ -49,26 +132,15 @@ class CustomEmailTool(Toolkit):
             return "error: No sender email provided"
         if not self.sender_passkey:
             return "error: No sender passkey provided"
+        return None
 
+    def _build_message(self, to: List[str], subject: str, body: str) -> EmailMessage:
         msg = EmailMessage()
         msg["Subject"] = subject
         msg["From"] = f"{self.sender_name} <{self.sender_email}>"
         msg["To"] = ", ".join(to)
         msg.set_content(body)
-        
-        logger.info(f"Sending Email to {', '.join(to)}")
-        try:
-            context = ssl.create_default_context()
-            context.check_hostname = False
-            context.verify_mode = ssl.CERT_NONE
-            with smtplib.SMTP(self.smtp_server, self.smtp_port) as smtp:
-                smtp.starttls(context=context)
-                smtp.login(self.sender_email, self.sender_passkey)
-                smtp.send_message(msg)
-        except Exception as e:
-            logger.error(f"Error sending email: {e}")
-            return f"error: {e}"
-        return "email sent successfully"
+        return msg
 
 
 # Integration with Agent
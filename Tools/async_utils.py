@@ -0,0 +1,83 @@
+import asyncio
+import concurrent.futures
+import contextvars
+import threading
+import weakref
+from typing import Awaitable, Callable, Generic, Optional, TypeVar
+
+T = TypeVar("T")
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+
+
+def tool_event_loop() -> asyncio.AbstractEventLoop:
+    """Return the shared background event loop used by the synchronous tool wrappers."""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="tool-event-loop", daemon=True).start()
+        return _loop
+
+
+def run_sync(coroutine: Awaitable[T]) -> T:
+    """Run a coroutine to completion from synchronous code.
+
+    The coroutine is executed on the shared tool event loop, so clients created for
+    that loop (and their connection pools) are reused across synchronous calls. It runs
+    in a copy of the caller's context, so context variables (e.g. the current tracing
+    span) carry over.
+
+    Args:
+        coroutine: Awaitable returned by one of the async toolkit methods
+
+    Returns:
+        The coroutine's result
+    """
+    loop = tool_event_loop()
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is loop:
+        raise RuntimeError("run_sync() called from the tool event loop; await the coroutine instead")
+    future: "concurrent.futures.Future[T]" = concurrent.futures.Future()
+
+    def start() -> None:
+        # A task created here copies the context this callback runs in
+        try:
+            task = asyncio.ensure_future(coroutine)
+        except BaseException as e:
+            future.set_exception(e)
+            return
+        task.add_done_callback(lambda done: _copy_result(done, future))
+
+    loop.call_soon_threadsafe(start, context=contextvars.copy_context())
+    return future.result()
+
+
+def _copy_result(task: "asyncio.Future[T]", future: "concurrent.futures.Future[T]") -> None:
+    if task.cancelled():
+        future.cancel()
+    elif task.exception() is not None:
+        future.set_exception(task.exception())
+    else:
+        future.set_result(task.result())
+
+
+class LoopLocal(Generic[T]):
+    """Lazily creates one object per running event loop (e.g. an HTTP client bound to that loop)."""
+
+    def __init__(self, factory: Callable[[], T]):
+        self.factory = factory
+        self._values: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, T]" = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def get(self) -> T:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            value = self._values.get(loop)
+            if value is None:
+                value = self._values[loop] = self.factory()
+            return value
@@ -0,0 +1,178 @@
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import pytz
+
+# Allowed meeting windows in local time: 9 AM-1 PM and 2 PM-6 PM
+DEFAULT_WINDOWS: Tuple[Tuple[time, time], ...] = ((time(9, 0), time(13, 0)), (time(14, 0), time(18, 0)))
+WEEKDAYS = frozenset(range(5))
+
+
+def _nth_monday(year: int, month: int, n: int) -> date:
+    first = date(year, month, 1)
+    return first + timedelta(days=(7 - first.weekday()) % 7 + 7 * (n - 1))
+
+
+def _equinox_day(year: int, base: float) -> int:
+    # Standard approximation of the announced equinox dates, valid for 1980-2099
+    return int(base + 0.242194 * (year - 1980) - int((year - 1980) / 4))
+
+
+@lru_cache(maxsize=None)
+def japan_holidays(year: int) -> Dict[date, str]:
+    """Japanese national holidays of a year (rules in force since 2020, plus the 2019 one-offs).
+
+    Includes substitute holidays (振替休日) for holidays falling on a Sunday and
+    citizens' holidays (国民の休日) sandwiched between two holidays.
+    """
+    days: Dict[date, str] = {
+        date(year, 1, 1): "New Year's Day",
+        _nth_monday(year, 1, 2): "Coming of Age Day",
+        date(year, 2, 11): "National Foundation Day",
+        date(year, 3, _equinox_day(year, 20.8431)): "Vernal Equinox Day",
+        date(year, 4, 29): "Showa Day",
+        date(year, 5, 3): "Constitution Memorial Day",
+        date(year, 5, 4): "Greenery Day",
+        date(year, 5, 5): "Children's Day",
+        _nth_monday(year, 9, 3): "Respect for the Aged Day",
+        date(year, 9, _equinox_day(year, 23.2488)): "Autumnal Equinox Day",
+        date(year, 11, 3): "Culture Day",
+        date(year, 11, 23): "Labor Thanksgiving Day",
+    }
+    if year >= 2020:
+        days[date(year, 2, 23)] = "Emperor's Birthday"
+    elif year <= 2018:
+        days[date(year, 12, 23)] = "Emperor's Birthday"
+    # Olympic years moved Marine Day, Mountain Day and Sports Day
+    marine, mountain, sports = {
+        2020: (date(2020, 7, 23), date(2020, 8, 10), date(2020, 7, 24)),
+        2021: (date(2021, 7, 22), date(2021, 8, 8), date(2021, 7, 23)),
+    }.get(year, (_nth_monday(year, 7, 3), date(year, 8, 11), _nth_monday(year, 10, 2)))
+    days[marine] = "Marine Day"
+    days[mountain] = "Mountain Day"
+    days[sports] = "Sports Day"
+    if year == 2019:
+        days[date(2019, 5, 1)] = "Enthronement Day"
+        days[date(2019, 10, 22)] = "Enthronement Ceremony Day"
+
+    # Citizens' holiday: a non-Sunday weekday between two holidays
+    for day in sorted(days):
+        between = day + timedelta(days=1)
+        if between not in days and between + timedelta(days=1) in days and between.weekday() != 6:
+            days[between] = "Citizens' Holiday"
+    # Substitute holiday: the next non-holiday after a holiday on Sunday
+    for day in sorted(days):
+        if day.weekday() == 6:
+            substitute = day + timedelta(days=1)
+            while substitute in days:
+                substitute += timedelta(days=1)
+            days[substitute] = "Substitute Holiday"
+    return days
+
+
+def japan_holiday(day: date) -> Optional[str]:
+    """Name of the Japanese national holiday on `day`, or None."""
+    return japan_holidays(day.year).get(day)
+
+
+def merge_slots(starts: Iterable[datetime], duration: timedelta) -> List[Tuple[datetime, datetime]]:
+    """Merge sorted slot starts into (first start, last start + duration) ranges.
+
+    Consecutive slots belong to the same range when the next one starts before (or
+    exactly when) the previous meeting would end, and on the same calendar day.
+    """
+    ranges: List[Tuple[datetime, datetime]] = []
+    for start in starts:
+        if ranges and start <= ranges[-1][1] and start.date() == ranges[-1][0].date():
+            ranges[-1] = (ranges[-1][0], max(ranges[-1][1], start + duration))
+        else:
+            ranges.append((start, start + duration))
+    return ranges
+
+
+class BusinessRules:
+    """Deterministic meeting-time rules: weekdays only, no holidays, within local business windows.
+
+    A meeting is allowed when its whole interval [start, start + duration] lies inside one
+    of the local-time windows of an allowed, non-holiday day. The windows, weekday set and
+    holiday calendar are resolved once per local date, so filtering months of slots is cheap.
+    """
+
+    def __init__(
+        self,
+        timezone: str = "Asia/Tokyo",
+        duration: timedelta = timedelta(minutes=30),
+        windows: Sequence[Tuple[time, time]] = DEFAULT_WINDOWS,
+        weekdays: Iterable[int] = WEEKDAYS,
+        holiday: Callable[[date], Optional[str]] = japan_holiday,
+    ):
+        """Initialize the rules.
+
+        Args:
+            timezone: IANA timezone the windows are expressed in
+            duration: Meeting length checked against the windows
+            windows: Allowed (start, end) local times per day
+            weekdays: Allowed weekdays (Monday is 0)
+            holiday: Returns a holiday name for a date, or None
+        """
+        self.tz = pytz.timezone(timezone)
+        self.duration = duration
+        self.weekdays = frozenset(weekdays)
+        self.holiday = holiday
+        self._windows = [(self._minutes(start), self._minutes(end)) for start, end in windows]
+        self._hours = ", ".join(f"{start:%H:%M}-{end:%H:%M}" for start, end in windows)
+        self._days: Dict[date, Optional[str]] = {}
+
+    @staticmethod
+    def _minutes(t: time) -> int:
+        return t.hour * 60 + t.minute
+
+    def _day_violation(self, day: date) -> Optional[str]:
+        if day not in self._days:
+            if day.weekday() not in self.weekdays:
+                reason = "falls on a weekend" if day.weekday() >= 5 else "falls on a non-working day"
+            else:
+                name = self.holiday(day)
+                reason = f"falls on a Japan national holiday ({name})" if name else None
+            self._days[day] = reason
+        return self._days[day]
+
+    def to_local(self, start: datetime) -> datetime:
+        """Convert an aware (or local naive) datetime to the rules' timezone."""
+        if start.tzinfo is None:
+            return self.tz.localize(start)
+        if getattr(start.tzinfo, "zone", None) == self.tz.zone:
+            # Already converted (pytz attaches a per-offset tzinfo of the same zone)
+            return start
+        return start.astimezone(self.tz)
+
+    def violation(self, start: datetime) -> Optional[str]:
+        """Why a meeting starting at `start` is not allowed, or None if it is."""
+        local = self.to_local(start)
+        reason = self._day_violation(local.date())
+        if reason:
+            return reason
+        begin = local.hour * 60 + local.minute + local.second / 60
+        end = begin + self.duration.total_seconds() / 60
+        if any(lo <= begin and end <= hi for lo, hi in self._windows):
+            return None
+        return f"is outside business hours ({self._hours})"
+
+    def is_allowed(self, start: datetime) -> bool:
+        return self.violation(start) is None
+
+    def filter(self, starts: Iterable[datetime]) -> Iterator[datetime]:
+        """Yield the starts that satisfy every rule, in input order."""
+        return (start for start in starts if self.violation(start) is None)
+
+    def first_valid(self, starts: Iterable[datetime], count: int, after: Optional[datetime] = None) -> List[datetime]:
+        """The first `count` allowed starts (strictly after `after`, if given)."""
+        valid: List[datetime] = []
+        for start in starts:
+            if (after is not None and start <= after) or self.violation(start) is not None:
+                continue
+            valid.append(start)
+            if len(valid) >= count:
+                break
+        return valid
@@ -0,0 +1,182 @@
+import math
+import os
+import re
+from typing import List, Optional
+
+# Lines that introduce quoted history; everything from the first one on is dropped
+QUOTE_HEADER_PATTERNS = (
+    r"^On\b.{0,300}\bwrote:$",
+    r"^.{0,200}(書きました|のメール)[:：]$",
+    r"^\d{4}[年/]\d{1,2}[月/]\d{1,2}日?.{0,200}<[^>\s]+@[^>\s]+>[:：]?$",
+    r"^-{2,}\s*(Original Message|元のメッセージ|元のメール)\s*-{2,}$",
+    r"^_{10,}$",
+)
+# A forwarded message is the content being handed over, so it is never treated as quoted history
+FORWARD_MARKER = re.compile(r"^-*\s*(Forwarded message|Begin forwarded message|転送メッセージ|転送されたメッセージ)\b.*", re.IGNORECASE)
+# Outlook-style header block: "From:" / "差出人:" followed by Sent/Date/To within a few lines
+HEADER_BLOCK_START = re.compile(r"^(From|差出人|送信者)\s*[:：]", re.IGNORECASE)
+HEADER_BLOCK_FIELD = re.compile(r"^(Sent|Date|To|Subject|送信日時|日時|宛先|件名)\s*[:：]", re.IGNORECASE)
+# Signature delimiters and mobile client footers; everything after them is dropped
+SIGNATURE_PATTERNS = (
+    r"^--\s?$",
+    r"^(Sent from my \w+|Sent from (Mail|Outlook|Yahoo Mail)\b.*|Get Outlook for \w+.*)$",
+    r"^(iPhone|iPad|Android|スマートフォン)から送信.*$",
+)
+# A ruled line ("━━━━", "-----", "＝＝＝") ending the message is a signature box if what follows looks like contact details
+SEPARATOR_LINE = re.compile(r"^[\-─━=＝_*＊~〜・]{8,}$")
+CONTACT_DETAILS = re.compile(r"(TEL|Tel|Phone|FAX|Mobile|〒|https?://|[\w.+-]+@[\w-]+\.[\w.]+|\+?\d[\d\- ()]{7,}\d)")
+MAX_SIGNATURE_LINES = 15
+# Paragraphs that are legal boilerplate
+DISCLAIMER_PATTERNS = (
+    r"\bconfidential\b.{0,400}\b(intended|recipient|addressee)",
+    r"\b(intended|addressee).{0,400}\bconfidential\b",
+    r"\bif you (have )?received this (e-?mail|message|communication) in error\b",
+    r"(本メール|このメール|本電子メール).{0,200}(機密|秘密|守秘|誤って|誤送信|削除)",
+)
+# Interleaved quotes (answered inline) keep this many lines as context
+QUOTE_CONTEXT_LINES = 2
+TRUNCATION_MARKER = "\n[... {0} more tokens truncated]"
+_SENTENCE = re.compile(r"[^.!?。！？\n]*(?:[.!?。！？]+\s*|\n|$)")
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough GPT token count: ~4 ASCII characters per token, one token per other character."""
+    non_ascii = sum(1 for char in text if ord(char) > 127)
+    return math.ceil((len(text) - non_ascii) / 4) + non_ascii
+
+
+class BodyNormalizer:
+    """Shrinks email bodies before they are embedded in the agent prompt.
+
+    Quoted history ("> " lines, "On ... wrote:", "-----Original Message-----",
+    Outlook / Japanese "差出人:" header blocks), signatures, mobile footers and legal
+    disclaimers are removed and whitespace is collapsed. The result is then cut to
+    `token_budget` at a paragraph or sentence boundary.
+    """
+
+    def __init__(self, token_budget: Optional[int] = None):
+        """Initialize the normalizer.
+
+        Args:
+            token_budget: Maximum estimated tokens of a body (EMAIL_BODY_TOKEN_BUDGET, default 1000, 0 disables)
+        """
+        self.token_budget = token_budget if token_budget is not None else int(os.getenv("EMAIL_BODY_TOKEN_BUDGET", 1000))
+        self._quote_headers = [re.compile(pattern, re.IGNORECASE) for pattern in QUOTE_HEADER_PATTERNS]
+        self._signatures = [re.compile(pattern, re.IGNORECASE) for pattern in SIGNATURE_PATTERNS]
+        self._disclaimers = [re.compile(pattern, re.IGNORECASE | re.DOTALL) for pattern in DISCLAIMER_PATTERNS]
+
+    def normalize(self, body: Optional[str]) -> str:
+        """Strip quoted history, signatures and disclaimers, collapse whitespace and apply the token budget."""
+        if not body:
+            return ""
+        lines = [line.replace("　", " ").rstrip() for line in body.replace("\r\n", "\n").replace("\r", "\n").split("\n")]
+        stripped = self._strip_signature(self._strip_quotes(lines))
+        text = self._collapse("\n".join(stripped))
+        text = self._strip_disclaimers(text)
+        if not text:
+            # Nothing but quoted text (e.g. a bare forward): keep the original content
+            text = self._collapse("\n".join(lines))
+        return self.truncate(text)
+
+    def _strip_quotes(self, lines: List[str]) -> List[str]:
+        for index, line in enumerate(lines):
+            candidate = line.strip()
+            if FORWARD_MARKER.match(candidate):
+                break
+            # Clients wrap long attribution lines: "On Mon, ... <a@b.com>" / "wrote:"
+            joined = f"{candidate} {lines[index + 1].strip()}" if index + 1 < len(lines) else candidate
+            if any(p.match(candidate) or p.match(joined) for p in self._quote_headers) or self._is_header_block(lines, index):
+                lines = lines[:index]
+                break
+
+        kept: List[str] = []
+        index = 0
+        while index < len(lines):
+            if not lines[index].lstrip().startswith(">"):
+                kept.append(lines[index])
+                index += 1
+                continue
+            end = index
+            while end < len(lines) and (lines[end].lstrip().startswith(">") or not lines[end].strip()):
+                end += 1
+            if end < len(lines):
+                # New text follows, so the quote is being answered inline: keep a little context
+                block = [line for line in lines[index:end] if line.strip()]
+                kept.extend(block[:QUOTE_CONTEXT_LINES])
+                if len(block) > QUOTE_CONTEXT_LINES:
+                    kept.append("> ...")
+                kept.append("")
+            index = end
+        return kept
+
+    @staticmethod
+    def _is_header_block(lines: List[str], index: int) -> bool:
+        if not HEADER_BLOCK_START.match(lines[index].strip()):
+            return False
+        following = [line.strip() for line in lines[index + 1:index + 5] if line.strip()]
+        return sum(1 for line in following if HEADER_BLOCK_FIELD.match(line)) >= 2
+
+    def _strip_signature(self, lines: List[str]) -> List[str]:
+        for index, line in enumerate(lines):
+            if any(p.match(line.strip()) for p in self._signatures):
+                return lines[:index]
+        for index in range(len(lines) - 1, max(-1, len(lines) - MAX_SIGNATURE_LINES - 2), -1):
+            if SEPARATOR_LINE.match(lines[index].strip()) and CONTACT_DETAILS.search("\n".join(lines[index + 1:])):
+                # Signature boxes are often framed by two rules; drop the upper one too
+                start = index
+                for upper in range(index - 1, max(-1, index - MAX_SIGNATURE_LINES - 1), -1):
+                    if SEPARATOR_LINE.match(lines[upper].strip()):
+                        start = upper
+                        break
+                return lines[:start]
+        return lines
+
+    def _strip_disclaimers(self, text: str) -> str:
+        paragraphs = [p for p in text.split("\n\n") if not any(d.search(p) for d in self._disclaimers)]
+        return "\n\n".join(paragraphs).strip()
+
+    @staticmethod
+    def _collapse(text: str) -> str:
+        text = re.sub(r"[ \t]+", " ", text)
+        text = re.sub(r" *\n *", "\n", text)
+        return re.sub(r"\n{3,}", "\n\n", text).strip()
+
+    def truncate(self, text: str) -> str:
+        """Cut `text` to the token budget, ending on a paragraph or sentence boundary where possible."""
+        total = estimate_tokens(text)
+        if self.token_budget <= 0 or total <= self.token_budget:
+            return text
+        budget = self.token_budget - estimate_tokens(TRUNCATION_MARKER.format(total))
+        kept: List[str] = []
+        used = 0
+        for paragraph in text.split("\n\n"):
+            cost = estimate_tokens(paragraph) + 1
+            if used + cost <= budget:
+                kept.append(paragraph)
+                used += cost
+                continue
+            # Fill the rest of the budget with whole sentences of the paragraph that does not fit
+            sentences = []
+            for sentence in filter(None, _SENTENCE.findall(paragraph)):
+                cost = estimate_tokens(sentence) + 1
+                if used + cost > budget:
+                    break
+                sentences.append(sentence)
+                used += cost
+            if sentences:
+                kept.append("".join(sentences).rstrip())
+            elif not kept:
+                # A single huge sentence: hard cut by characters
+                kept.append(self._cut(paragraph, budget))
+            break
+        result = "\n\n".join(kept)
+        return result + TRUNCATION_MARKER.format(total - estimate_tokens(result))
+
+    @staticmethod
+    def _cut(text: str, budget: int) -> str:
+        used = 0
+        for index, char in enumerate(text):
+            used += 1 if ord(char) > 127 else 0.25
+            if used > budget:
+                return text[:index]
+        return text
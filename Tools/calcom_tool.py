@@ -1,20 +1,28 @@
-from datetime import datetime
+import asyncio
+import json
+from datetime import date, datetime, timedelta
 from dotenv import load_dotenv
-from typing import Optional, Dict
+from typing import Optional, Dict, List, Tuple
 from phi.tools import Toolkit
 from phi.utils.log import logger
 import os
 from pydantic import PydanticUserError, validate_call
 
+from Tools.async_utils import run_sync
+from Tools.availability_rules import BusinessRules, merge_slots
+from Tools.http_client import HTTPClient
+from Tools.processing_ledger import BOOKED, CANCELLED, RESCHEDULED, ProcessingLedger, run_once
+from Tools.slot_cache import SlotCache
+
 # Load environment variables
 load_dotenv()
 
 
 try:
-    import requests
+    import httpx
     import pytz
 except ImportError:
-    raise ImportError("requests and pytz not installed. Please install using pip install requests pytz")
+    raise ImportError("httpx and pytz not installed. Please install using pip install httpx pytz")
 
 
 class CalCom(Toolkit):
@@ -28,6 +36,16 @@ class CalCom(Toolkit):
         get_upcoming_bookings: bool = True,
         reschedule_booking: bool = True,
         cancel_booking: bool = True,
+        check_availability: bool = True,
+        meeting_minutes: Optional[int] = None,
+        search_days: int = 14,
+        base_url: Optional[str] = None,
+        pool_size: Optional[int] = None,
+        timeout: Optional[float] = None,
+        max_retries: Optional[int] = None,
+        slot_cache_ttl: Optional[float] = None,
+        ledger: Optional[ProcessingLedger] = None,
+        http: Optional[HTTPClient] = None,
     ):
         """Initialize the Cal.com toolkit.
 
@@ -35,13 +53,22 @@ class CalCom(Toolkit):
             api_key: Cal.com API key
             event_type_id: Default event type ID for bookings
             user_timezone: User's timezone in IANA format (e.g., 'Asia/Tokyo')
+            meeting_minutes: Meeting length checked against business hours (CALCOM_MEETING_MINUTES, default 30)
+            search_days: How many days ahead `check_availability` looks for alternatives
+            base_url: Cal.com API base URL (CALCOM_API_URL, default https://api.cal.com/v2)
+            pool_size: Maximum pooled keep-alive connections (HTTP_POOL_SIZE)
+            timeout: HTTP timeout in seconds (HTTP_TIMEOUT)
+            max_retries: Retries on 429/5xx and connection errors (HTTP_MAX_RETRIES)
+            slot_cache_ttl: Seconds fetched availability is reused (CALCOM_SLOT_CACHE_TTL, default 300, 0 disables)
+            ledger: Processing ledger that keeps bookings for the email being processed from being repeated
+            http: HTTP client to use instead of a new one (e.g. shared by several accounts)
         """
         super().__init__(name="calcom")
 
         # Get credentials from environment if not provided
         self.api_key = api_key or os.getenv("CALCOM_API_KEY")
         event_type_str = os.getenv("CALCOM_EVENT_TYPE_ID")
-        self.event_type_id = event_type_id or int(event_type_str) if event_type_str is not None else 0
+        self.event_type_id = event_type_id or (int(event_type_str) if event_type_str is not None else 0)
 
         if not self.api_key:
             logger.error("CALCOM_API_KEY not set. Please set the CALCOM_API_KEY environment variable.")
@@ -49,6 +76,24 @@ class CalCom(Toolkit):
             logger.error("CALCOM_EVENT_TYPE_ID not set. Please set the CALCOM_EVENT_TYPE_ID environment variable.")
 
         self.user_timezone = user_timezone or "Asia/Tokyo"
+        self.base_url = (base_url or os.getenv("CALCOM_API_URL", "https://api.cal.com/v2")).rstrip("/")
+
+        # Pooled keep-alive client shared by every call (the sync methods run on the shared tool loop)
+        self.http = http or HTTPClient(pool_size=pool_size, timeout=timeout, max_retries=max_retries)
+
+        # Available slots per (event type, UTC day); days are invalidated when a booking changes
+        if slot_cache_ttl is None:
+            slot_cache_ttl = float(os.getenv("CALCOM_SLOT_CACHE_TTL", 300))
+        self.slot_cache = SlotCache(ttl=slot_cache_ttl)
+        self._booking_days: Dict[str, date] = {}
+
+        # Weekend, Japan holiday and business-hour rules, applied in code rather than by the model
+        minutes = meeting_minutes or int(os.getenv("CALCOM_MEETING_MINUTES", 30))
+        self.rules = BusinessRules(self.user_timezone, duration=timedelta(minutes=minutes))
+        self.search_days = search_days
+
+        # Bookings already made for the email being processed are replayed, not repeated
+        self.ledger = ledger
 
         # Register all methods
         if get_available_slots:
@@ -61,6 +106,8 @@ class CalCom(Toolkit):
             self.register(self.reschedule_booking)
         if cancel_booking:
             self.register(self.cancel_booking)
+        if check_availability:
+            self.register(self.check_availability)
 
     def _convert_to_user_timezone(self, utc_time: str) -> str:
         """Convert UTC time to user's timezone.
@@ -72,10 +119,8 @@ class CalCom(Toolkit):
         Returns:
             str: Formatted time in user's timezone
         """
-        utc_dt = datetime.fromisoformat(utc_time.replace("Z", "+00:00"))
-        user_tz = pytz.timezone(self.user_timezone)
-        user_dt = utc_dt.astimezone(user_tz)
-        return user_dt.strftime("%Y-%m-%d %H:%M %Z")
+        # The rules hold the resolved pytz timezone, so it isn't looked up again per slot
+        return self._parse_utc(utc_time).astimezone(self.rules.tz).strftime("%Y-%m-%d %H:%M %Z")
 
     def _get_headers(self, api_version: str = "2024-08-13") -> Dict[str, str]:
         """Get headers for Cal.com API requests.
@@ -92,44 +137,181 @@ class CalCom(Toolkit):
             "Content-Type": "application/json",
         }
 
+    @staticmethod
+    def _utc_day(utc_time: str) -> date:
+        return datetime.fromisoformat(utc_time.replace("Z", "+00:00")).astimezone(pytz.utc).date()
+
+    def _remember_booking(self, booking: dict) -> None:
+        self._booking_days[booking["uid"]] = self._utc_day(booking["start"])
+
+    def _invalidate_booking(self, old_uid: Optional[str] = None, new_booking: Optional[dict] = None) -> None:
+        """Drop cached availability for the days a booking change touched."""
+        days = []
+        if old_uid is not None:
+            old_day = self._booking_days.pop(old_uid, None)
+            if old_day is None:
+                # We don't know which day was freed up, so nothing cached can be trusted
+                self.slot_cache.invalidate(self.event_type_id)
+            else:
+                days.append(old_day)
+        if new_booking is not None:
+            self._remember_booking(new_booking)
+            days.append(self._booking_days[new_booking["uid"]])
+        self.slot_cache.invalidate(self.event_type_id, days)
+
+    async def _fetch_slots(self, first: date, last: date, generations: Dict[date, Tuple[int, int]]) -> List[datetime]:
+        """Fetch the slot starts for whole UTC days from Cal.com, converted to the user's timezone."""
+        url = f"{self.base_url}/slots/available"
+        querystring = {
+            "startTime": f"{first.isoformat()}T00:00:00Z",
+            "endTime": f"{last.isoformat()}T23:59:59Z",
+            "eventTypeId": self.event_type_id,
+        }
+        response = await self.http.get(url, headers=self._get_headers(), params=querystring)
+        if response.status_code != 200:
+            raise httpx.HTTPStatusError(f"Failed to fetch slots: {response.text}", request=response.request, response=response)
+        slots = response.json()["data"]["slots"]
+        # Parsed and converted once here; cache hits reuse the datetimes as-is
+        fetched = [self._parse_utc(slot["time"]).astimezone(self.rules.tz) for times in slots.values() for slot in times]
+        self.slot_cache.store(self.event_type_id, first, last, fetched, generations)
+        return fetched
+
+    async def _aslot_times(self, start: date, end: date) -> List[datetime]:
+        """Sorted slot starts (in the user's timezone) between two UTC days, cached where possible."""
+        # Serve cached days and fetch only the missing ranges (concurrently)
+        cached, missing, generations = self.slot_cache.lookup(self.event_type_id, start, end)
+        slot_times = [slot for times in cached.values() for slot in times]
+        for fetched in await asyncio.gather(*(self._fetch_slots(first, last, generations) for first, last in missing)):
+            slot_times.extend(fetched)
+        return sorted(slot_times)
+
+    @staticmethod
+    def _parse_utc(utc_time: str) -> datetime:
+        return datetime.fromisoformat(utc_time.replace("Z", "+00:00"))
+
+    def _format_local(self, dt: datetime) -> str:
+        return self.rules.to_local(dt).strftime("%Y-%m-%d %H:%M %Z")
+
     def get_available_slots(
         self,
         start_date: str,
         end_date: str,
+        limit: int = 0,
+        after: Optional[str] = None,
+        compact: bool = True,
     ) -> str:
         """Get available time slots for booking.
 
+        By default the result is compact JSON: contiguous slots are merged into ranges per day
+        in the user's timezone, e.g. {"timezone": "Asia/Tokyo", "meeting_minutes": 30,
+        "days": {"2025-01-10": ["09:00-13:00", "14:00-18:00"]}}. When `limit` cuts the result
+        short, "next_after" holds the value to pass as `after` for the next page.
+
         Args:
             start_date: Start date in YYYY-MM-DD format
             end_date: End date in YYYY-MM-DD format
-            user_timezone: User's timezone
-            event_type_id: Optional specific event type ID
+            limit: Maximum number of slots to return (0 for all)
+            after: Only return slots starting after this ISO 8601 time
+            compact: Return grouped JSON ranges instead of a list of every slot
 
         Returns:
             str: Available slots or error message
         """
+        return run_sync(self.aget_available_slots(start_date, end_date, limit, after, compact))
+
+    async def aget_available_slots(
+        self,
+        start_date: str,
+        end_date: str,
+        limit: int = 0,
+        after: Optional[str] = None,
+        compact: bool = True,
+    ) -> str:
+        """Async variant of `get_available_slots`."""
         try:
-            url = "https://api.cal.com/v2/slots/available"
-            querystring = {
-                "startTime": f"{start_date}T00:00:00Z",
-                "endTime": f"{end_date}T23:59:59Z",
-                "eventTypeId": self.event_type_id,
+            try:
+                starts = await self._aslot_times(date.fromisoformat(start_date), date.fromisoformat(end_date))
+            except httpx.HTTPStatusError as e:
+                return str(e)
+
+            cursor = self.rules.to_local(self._parse_utc(after)) if after else None
+            starts = [start for start in starts if (cursor is None or start > cursor) and self.rules.is_allowed(start)]
+            truncated = 0 < limit < len(starts)
+            if truncated:
+                starts = starts[:limit]
+
+            if not compact:
+                return f"Available slots: {', '.join(start.strftime('%Y-%m-%d %H:%M %Z') for start in starts)}"
+            days: Dict[str, List[str]] = {}
+            for first, end in merge_slots(starts, self.rules.duration):
+                days.setdefault(first.strftime("%Y-%m-%d"), []).append(f"{first:%H:%M}-{end:%H:%M}")
+            result = {
+                "timezone": self.user_timezone,
+                "meeting_minutes": int(self.rules.duration.total_seconds() // 60),
+                "days": days,
             }
-
-            response = requests.get(url, headers=self._get_headers(), params=querystring)
-            if response.status_code == 200:
-                slots = response.json()["data"]["slots"]
-                available_slots = []
-                for date, times in slots.items():
-                    for slot in times:
-                        user_time = self._convert_to_user_timezone(slot["time"])
-                        available_slots.append(user_time)
-                return f"Available slots: {', '.join(available_slots)}"
-            return f"Failed to fetch slots: {response.text}"
+            if truncated:
+                result["next_after"] = starts[-1].isoformat()
+            return json.dumps(result, ensure_ascii=False, separators=(",", ":"))
         except Exception as e:
             logger.error(f"Error fetching available slots: {e}")
             return f"Error: {str(e)}"
 
+    def check_availability(self, start_time: str, alternatives: int = 3) -> str:
+        """Check whether a requested meeting time can be booked.
+
+        Applies the weekend, Japan national holiday and business-hour rules (9 AM-1 PM,
+        2 PM-6 PM) and the Cal.com availability, and returns the first valid alternative
+        slots if the time cannot be booked.
+
+        Args:
+            start_time: Requested start time in ISO 8601 format (without an offset the user's timezone is assumed)
+            alternatives: Number of alternative slots to return
+
+        Returns:
+            str: "Available: ..." or "Not available: <reason>. Next available slots: ..."
+        """
+        return run_sync(self.acheck_availability(start_time, alternatives))
+
+    async def acheck_availability(self, start_time: str, alternatives: int = 3) -> str:
+        """Async variant of `check_availability`."""
+        try:
+            try:
+                requested, reason, options = await self.aassess(start_time, alternatives)
+            except httpx.HTTPStatusError as e:
+                return str(e)
+
+            if reason is None:
+                return f"Available: {self._format_local(requested)}"
+            message = f"Not available: {self._format_local(requested)} {reason}."
+            if not options:
+                return f"{message} No alternative slots in the next {self.search_days} days."
+            return f"{message} Next available slots: {', '.join(self._format_local(start) for start in options)}"
+        except Exception as e:
+            logger.error(f"Error checking availability: {e}")
+            return f"Error: {str(e)}"
+
+    async def aassess(self, start_time: str, alternatives: int = 3) -> Tuple[datetime, Optional[str], List[datetime]]:
+        """Structured result of `check_availability`.
+
+        Returns:
+            tuple: The requested local start time, why it cannot be booked (None if it can)
+            and the first valid alternatives after it (empty if it can be booked)
+
+        Raises:
+            httpx.HTTPStatusError: If Cal.com rejects the slots request
+        """
+        requested = self.rules.to_local(self._parse_utc(start_time))
+        first_day = requested.astimezone(pytz.utc).date()
+        starts = await self._aslot_times(first_day, first_day + timedelta(days=self.search_days))
+
+        reason = self.rules.violation(requested)
+        if reason is None:
+            if requested in starts:
+                return requested, None, []
+            reason = "is already booked or not offered"
+        return requested, reason, self.rules.first_valid(starts, alternatives, after=requested)
+
     def create_booking(
         self,
         start_time: str,
@@ -148,8 +330,17 @@ class CalCom(Toolkit):
         Returns:
             str: Booking confirmation or error message
         """
+        return run_once(
+            self.ledger,
+            BOOKED,
+            lambda: run_sync(self.acreate_booking(start_time, name, email, meeting_URL)),
+            succeeded=lambda result: result.startswith("Booking created"),
+        )
+
+    async def acreate_booking(self, start_time: str, name: str, email: str, meeting_URL: str) -> str:
+        """Async variant of `create_booking`."""
         try:
-            url = "https://api.cal.com/v2/bookings"
+            url = f"{self.base_url}/bookings"
             start_time = datetime.fromisoformat(start_time).astimezone(pytz.utc).isoformat(timespec="seconds")
             payload = {
                 "start": start_time,
@@ -158,9 +349,10 @@ class CalCom(Toolkit):
                 "location": meeting_URL,
             }
 
-            response = requests.post(url, json=payload, headers=self._get_headers())
+            response = await self.http.post(url, json=payload, headers=self._get_headers())
             if response.status_code == 201:
                 booking_data = response.json()["data"]
+                self._invalidate_booking(new_booking=booking_data)
                 user_time = self._convert_to_user_timezone(booking_data["start"])
                 return f"Booking created successfully for {user_time}. Booking uid: {booking_data['uid']}"
             return f"Failed to create booking: {response.text}"
@@ -177,11 +369,15 @@ class CalCom(Toolkit):
         Returns:
             str: List of upcoming bookings or error message
         """
+        return run_sync(self.aget_upcoming_bookings(email))
+
+    async def aget_upcoming_bookings(self, email: str) -> str:
+        """Async variant of `get_upcoming_bookings`."""
         try:
-            url = "https://api.cal.com/v2/bookings"
+            url = f"{self.base_url}/bookings"
             querystring = {"status": "upcoming", "attendeeEmail": email}
 
-            response = requests.get(url, headers=self._get_headers(), params=querystring)
+            response = await self.http.get(url, headers=self._get_headers(), params=querystring)
             if response.status_code == 200:
                 bookings = response.json()["data"]
                 if not bookings:
@@ -189,6 +385,7 @@ class CalCom(Toolkit):
 
                 booking_info = []
                 for booking in bookings:
+                    self._remember_booking(booking)
                     user_time = self._convert_to_user_timezone(booking["start"])
                     booking_info.append(
                         f"uid: {booking['uid']}, Title: {booking['title']}, Time: {user_time}, Status: {booking['status']}"
@@ -216,14 +413,24 @@ class CalCom(Toolkit):
         Returns:
             str: Rescheduling confirmation or error message
         """
+        return run_once(
+            self.ledger,
+            RESCHEDULED,
+            lambda: run_sync(self.areschedule_booking(booking_uid, new_start_time, reason)),
+            succeeded=lambda result: result.startswith("Booking rescheduled"),
+        )
+
+    async def areschedule_booking(self, booking_uid: str, new_start_time: str, reason: str) -> str:
+        """Async variant of `reschedule_booking`."""
         try:
-            url = f"https://api.cal.com/v2/bookings/{booking_uid}/reschedule"
+            url = f"{self.base_url}/bookings/{booking_uid}/reschedule"
             new_start_time = datetime.fromisoformat(new_start_time).astimezone(pytz.utc).isoformat(timespec="seconds")
             payload = {"start": new_start_time, "reschedulingReason": reason}
 
-            response = requests.post(url, json=payload, headers=self._get_headers())
+            response = await self.http.post(url, json=payload, headers=self._get_headers())
             if response.status_code == 201:
                 booking_data = response.json()["data"]
+                self._invalidate_booking(old_uid=booking_uid, new_booking=booking_data)
                 user_time = self._convert_to_user_timezone(booking_data["start"])
                 return f"Booking rescheduled to {user_time}. New booking uid: {booking_data['uid']}"
             return f"Failed to reschedule booking: {response.text}"
@@ -241,12 +448,22 @@ class CalCom(Toolkit):
         Returns:
             str: Cancellation confirmation or error message
         """
+        return run_once(
+            self.ledger,
+            CANCELLED,
+            lambda: run_sync(self.acancel_booking(booking_uid, reason)),
+            succeeded=lambda result: result == "Booking cancelled successfully.",
+        )
+
+    async def acancel_booking(self, booking_uid: str, reason: str) -> str:
+        """Async variant of `cancel_booking`."""
         try:
-            url = f"https://api.cal.com/v2/bookings/{booking_uid}/cancel"
+            url = f"{self.base_url}/bookings/{booking_uid}/cancel"
             payload = {"cancellationReason": reason}
 
-            response = requests.post(url, json=payload, headers=self._get_headers())
+            response = await self.http.post(url, json=payload, headers=self._get_headers())
             if response.status_code == 200:
+                self._invalidate_booking(old_uid=booking_uid)
                 return "Booking cancelled successfully."
             return f"Failed to cancel booking: {response.text}"
         except Exception as e:
@@ -0,0 +1,141 @@
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, Hashable, Iterable, List, Optional, Set
+
+from phi.utils.log import logger
+
+
+class EmailPipeline:
+    """Bounded worker pool that processes fetched emails concurrently.
+
+    Emails that share a key (the sender address by default) form a lane and are handled
+    strictly in submission order; different lanes run in parallel on up to `workers`
+    threads. `max_in_flight` additionally caps how many handlers (i.e. LLM conversations)
+    run at once, and an email whose id is already queued or running is not submitted twice.
+    With `coalesce`, the handler instead receives a list of every email waiting in the
+    lane, so a burst of messages sharing a key (e.g. one conversation) costs one call.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[Any], None],
+        workers: int = 4,
+        max_in_flight: Optional[int] = None,
+        key: Callable[[Any], Hashable] = lambda email: email[1],
+        item_id: Callable[[Any], Hashable] = lambda email: email[4],
+        coalesce: bool = False,
+    ):
+        """Initialize the pipeline.
+
+        Args:
+            handler: Called once per email from a worker thread
+            workers: Number of worker threads
+            max_in_flight: Maximum concurrent handler calls (defaults to `workers`)
+            key: Returns the ordering key of an email (emails with equal keys never overlap)
+            item_id: Returns a unique id used to drop duplicate submissions
+            coalesce: Pass the handler all queued emails of a lane at once (as a list)
+        """
+        self.handler = handler
+        self.workers = workers
+        self.key = key
+        self.item_id = item_id
+        self.coalesce = coalesce
+        self.processed = 0
+        self.failed = 0
+
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="email-worker")
+        self._in_flight = threading.BoundedSemaphore(max_in_flight or workers)
+        self._lanes: Dict[Hashable, Deque[Any]] = {}
+        self._queued: Set[Hashable] = set()
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._closed = False
+
+    def submit(self, email: Any) -> bool:
+        """Queue an email for processing.
+
+        Returns:
+            bool: False if the email is already queued/running or the pipeline is shut down
+        """
+        return self.submit_all([email]) == 1
+
+    def submit_all(self, emails: Iterable[Any]) -> int:
+        """Queue several emails at once; lanes only start after all of them are queued.
+
+        Returns:
+            int: Number of emails queued (duplicates and emails after shutdown are dropped)
+        """
+        started: List[Hashable] = []
+        queued = 0
+        with self._lock:
+            if self._closed:
+                return 0
+            for email in emails:
+                key, item_id = self.key(email), self.item_id(email)
+                if item_id in self._queued:
+                    continue
+                self._queued.add(item_id)
+                lane = self._lanes.get(key)
+                if lane is None:
+                    # A lane exists while it is queued or running; only new lanes need a worker
+                    lane = self._lanes[key] = deque()
+                    started.append(key)
+                lane.append(email)
+                queued += 1
+        for key in started:
+            self._executor.submit(self._run_lane, key)
+        return queued
+
+    def pending(self) -> int:
+        """Number of emails queued or being processed."""
+        with self._lock:
+            return len(self._queued)
+
+    def drain(self, timeout: Optional[float] = None) -> bool:
+        """Block until every submitted email has been processed.
+
+        Returns:
+            bool: True if the pipeline drained before the timeout
+        """
+        with self._idle:
+            return self._idle.wait_for(lambda: not self._queued, timeout=timeout)
+
+    def shutdown(self, drain: bool = True, timeout: Optional[float] = None) -> None:
+        """Stop accepting emails and, by default, finish everything already queued."""
+        with self._lock:
+            self._closed = True
+            if not drain:
+                for lane in self._lanes.values():
+                    for email in lane:
+                        self._queued.discard(self.item_id(email))
+                    lane.clear()
+        if drain:
+            self.drain(timeout)
+        self._executor.shutdown(wait=drain)
+
+    def _run_lane(self, key: Hashable) -> None:
+        while True:
+            with self._lock:
+                lane = self._lanes[key]
+                if not lane:
+                    del self._lanes[key]
+                    self._idle.notify_all()
+                    return
+                batch = list(lane) if self.coalesce else [lane.popleft()]
+                if self.coalesce:
+                    lane.clear()
+            succeeded = False
+            try:
+                with self._in_flight:
+                    self.handler(batch if self.coalesce else batch[0])
+                succeeded = True
+            except Exception as e:
+                logger.error(f"Error processing email {', '.join(str(self.item_id(email)) for email in batch)}: {e}")
+            with self._lock:
+                if succeeded:
+                    self.processed += len(batch)
+                else:
+                    self.failed += len(batch)
+                for email in batch:
+                    self._queued.discard(self.item_id(email))
@@ -0,0 +1,150 @@
+import math
+import os
+import re
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+# Senders whose mail never needs the agent (automated notifications)
+IGNORED_SENDER_PATTERNS = (
+    r"^(no-?reply|do-?not-?reply|noreply-[\w.-]+|mailer-daemon|postmaster|bounces?|notifications?)@",
+    r"@(\w+\.)*cal\.com$",
+)
+
+# Header names the triage rules look at (fetched alongside From/Subject)
+TRIAGE_HEADERS = ("LIST-UNSUBSCRIBE", "LIST-ID", "AUTO-SUBMITTED", "PRECEDENCE")
+
+# Weighted meeting-intent features. English entries are word uni/bigrams; Japanese entries
+# are matched as substrings (the character n-grams a tokenizer-free classifier can use).
+ENGLISH_FEATURES: Dict[str, float] = {
+    "meeting": 2.0, "meet": 1.5, "schedule": 1.5, "scheduling": 1.5, "reschedule": 2.0,
+    "appointment": 2.0, "call": 1.0, "zoom": 1.5, "teams": 0.8, "interview": 1.5,
+    "availability": 2.0, "available": 1.2, "free": 0.5, "slot": 1.2, "slots": 1.2,
+    "calendar": 1.0, "discuss": 1.0, "discussion": 1.0, "catch up": 1.5, "sync": 0.8,
+    "book a": 1.5, "set up": 1.0, "hop on": 1.5, "chat": 0.8, "demo": 1.0, "consultation": 1.5,
+    "this week": 0.8, "next week": 1.0, "tomorrow": 0.8, "monday": 0.6, "tuesday": 0.6,
+    "wednesday": 0.6, "thursday": 0.6, "friday": 0.6, "what time": 1.0, "works for": 1.2,
+    "you free": 2.0, "could we": 0.8, "can we": 0.8, "let's": 0.5, "online": 0.5,
+    "talk": 1.0, "intro": 0.8, "session": 0.8, "morning": 0.6, "afternoon": 0.8, "minutes": 0.6,
+    "have time": 1.2, "a moment": 0.8, "go over": 1.0, "walk through": 1.0, "open to": 0.8,
+    # Negative evidence: bulk, transactional and automated mail
+    "unsubscribe": -3.0, "newsletter": -2.5, "receipt": -2.0, "invoice": -1.5, "order": -1.0,
+    "shipped": -2.0, "delivery": -1.0, "password": -2.0, "verify": -1.5, "verification": -1.5,
+    "sale": -1.5, "discount": -2.0, "promotion": -2.0, "offer": -1.0, "webinar": -1.0,
+    "subscription": -1.5, "statement": -1.0, "payment": -1.0, "security alert": -2.5,
+}
+JAPANESE_FEATURES: Dict[str, float] = {
+    "打ち合わせ": 2.5, "打合せ": 2.5, "ミーティング": 2.5, "会議": 2.0, "面談": 2.5, "面接": 2.0,
+    "日程": 2.0, "ご都合": 2.0, "都合": 1.0, "お時間": 1.5, "調整": 1.5, "候補": 1.2, "予約": 1.2,
+    "オンライン": 0.8, "ズーム": 1.5, "相談": 1.0, "お伺い": 1.0, "ご挨拶": 0.8,
+    "いかがでしょうか": 1.0, "よろしいでしょうか": 0.8, "空いて": 1.5, "来週": 1.0, "今週": 0.8,
+    "明日": 0.8, "曜日": 0.8, "時から": 1.2, "時頃": 1.0, "午前": 0.6, "午後": 0.6,
+    "配信停止": -3.0, "メールマガジン": -2.5, "メルマガ": -2.5, "セール": -2.0, "キャンペーン": -2.0,
+    "領収": -2.0, "請求": -1.5, "ご注文": -2.0, "発送": -2.0, "パスワード": -2.0, "認証コード": -2.5,
+    "ポイント": -1.0, "お知らせ": -0.8, "このメールは送信専用": -3.0,
+}
+# Clock times ("3pm", "10:30", "15時") are good evidence of a proposed meeting time
+TIME_PATTERN = re.compile(r"\b\d{1,2}(:\d{2})?\s?(am|pm)\b|\b\d{1,2}:\d{2}\b|\d{1,2}時", re.IGNORECASE)
+TIME_WEIGHT = 1.2
+BIAS = -2.5
+# Only the start of the body is scored; meeting requests state their intent early
+MAX_SCORED_CHARS = 4000
+
+_WORD_RE = re.compile(r"[a-z']+")
+
+
+class TriageDecision(NamedTuple):
+    process: bool
+    score: float
+    reason: str
+
+
+class EmailTriage:
+    """Fast local filter run before the agent.
+
+    Header rules drop automated and bulk mail outright (noreply / cal.com senders,
+    Auto-Submitted, List-Unsubscribe, List-Id, Precedence: bulk). Everything else is
+    scored by a weighted keyword / n-gram model for meeting intent in English and
+    Japanese; emails scoring below `threshold` never reach the LLM. The default threshold
+    leans towards recall, since a missed meeting request costs more than an extra agent run.
+    """
+
+    def __init__(
+        self,
+        threshold: Optional[float] = None,
+        ignored_senders: Iterable[str] = IGNORED_SENDER_PATTERNS,
+    ):
+        """Initialize the triage stage.
+
+        Args:
+            threshold: Minimum meeting-intent probability to run the agent (TRIAGE_THRESHOLD, default 0.4)
+            ignored_senders: Regexes matched against the lower-cased sender address
+        """
+        self.threshold = threshold if threshold is not None else float(os.getenv("TRIAGE_THRESHOLD", 0.4))
+        self._ignored = [re.compile(pattern) for pattern in ignored_senders]
+        self._english_unigrams = {k: v for k, v in ENGLISH_FEATURES.items() if " " not in k}
+        self._english_bigrams = {k: v for k, v in ENGLISH_FEATURES.items() if " " in k}
+        self.processed = 0
+        self.skipped = 0
+
+    def header_rule(self, sender: Optional[str], headers: Optional[Dict[str, str]] = None) -> Optional[str]:
+        """Name of the header rule that marks the email as automated, or None."""
+        address = (sender or "").strip().lower()
+        if any(pattern.search(address) for pattern in self._ignored):
+            return f"ignored sender {address}"
+        headers = {k.upper(): v for k, v in (headers or {}).items()}
+        auto_submitted = headers.get("AUTO-SUBMITTED", "").strip().lower()
+        if auto_submitted and auto_submitted != "no":
+            return f"Auto-Submitted: {auto_submitted}"
+        if headers.get("LIST-UNSUBSCRIBE") or headers.get("LIST-ID"):
+            return "mailing list"
+        if headers.get("PRECEDENCE", "").strip().lower() in ("bulk", "list", "junk"):
+            return f"Precedence: {headers['PRECEDENCE'].strip().lower()}"
+        return None
+
+    def features(self, subject: Optional[str], body: Optional[str]) -> List[Tuple[str, float]]:
+        """Matched (feature, weight) pairs; each feature counts once."""
+        text = f"{subject or ''}\n{(body or '')[:MAX_SCORED_CHARS]}".lower()
+        words = _WORD_RE.findall(text)
+        matched = {word: self._english_unigrams[word] for word in set(words) if word in self._english_unigrams}
+        for first, second in zip(words, words[1:]):
+            bigram = f"{first} {second}"
+            if bigram in self._english_bigrams:
+                matched[bigram] = self._english_bigrams[bigram]
+        for feature, weight in JAPANESE_FEATURES.items():
+            if feature in text:
+                matched[feature] = weight
+        if TIME_PATTERN.search(text):
+            matched["<time>"] = TIME_WEIGHT
+        return sorted(matched.items(), key=lambda item: -abs(item[1]))
+
+    def score(self, subject: Optional[str], body: Optional[str]) -> float:
+        """Meeting-intent probability in [0, 1]."""
+        z = BIAS + sum(weight for _, weight in self.features(subject, body))
+        return 1 / (1 + math.exp(-z))
+
+    def classify(
+        self,
+        sender: Optional[str],
+        subject: Optional[str],
+        body: Optional[str],
+        headers: Optional[Dict[str, str]] = None,
+    ) -> TriageDecision:
+        """Decide whether an email should be handed to the agent."""
+        rule = self.header_rule(sender, headers)
+        if rule:
+            decision = TriageDecision(False, 0.0, rule)
+        else:
+            probability = self.score(subject, body)
+            if probability >= self.threshold:
+                decision = TriageDecision(True, probability, "meeting intent")
+            else:
+                decision = TriageDecision(False, probability, f"meeting intent {probability:.2f} below {self.threshold:.2f}")
+        if decision.process:
+            self.processed += 1
+        else:
+            self.skipped += 1
+        return decision
+
+    def classify_email(self, email: list) -> TriageDecision:
+        """Classify a fetched email ([SenderName, SenderEmail, subject, body, uid, headers, thread_id, message_id])."""
+        headers = email[5] if len(email) > 5 else None
+        return self.classify(email[1], email[2], email[3], headers)
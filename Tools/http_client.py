@@ -0,0 +1,127 @@
+import asyncio
+import os
+import random
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Optional
+
+import httpx
+from phi.utils.log import logger
+
+from Tools.async_utils import LoopLocal
+from Tools.telemetry import record_retry
+
+# Status codes worth retrying; 5xx are only retried for idempotent methods
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+# A request sent with this header may be replayed whatever its method
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+
+
+def retry_after_seconds(response: httpx.Response) -> Optional[float]:
+    """Parse a Retry-After header given either as seconds or as an HTTP date."""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class HTTPClient:
+    """Pooled, keep-alive HTTP client with timeouts and retry-with-backoff.
+
+    One `httpx.AsyncClient` (and connection pool) is kept per event loop; the synchronous
+    toolkit methods all run on the shared tool loop, so every thread reuses the same pool.
+    Requests answered with 429 (or 5xx for idempotent methods) and failures to connect are
+    retried with exponential backoff and jitter, honoring Retry-After when present. A
+    connection dropped after the request was sent is only retried for idempotent methods
+    or requests carrying an `Idempotency-Key` header: the server may already have created
+    the booking or meeting.
+    """
+
+    def __init__(
+        self,
+        pool_size: Optional[int] = None,
+        timeout: Optional[float] = None,
+        max_retries: Optional[int] = None,
+        backoff: float = 0.5,
+        max_backoff: float = 30.0,
+        transport_factory: Optional[Callable[[], httpx.AsyncBaseTransport]] = None,
+    ):
+        """Initialize the client.
+
+        Args:
+            pool_size: Maximum open connections per host pool (HTTP_POOL_SIZE, default 10)
+            timeout: Connect/read/write/pool timeout in seconds (HTTP_TIMEOUT, default 30)
+            max_retries: Retries after the first attempt (HTTP_MAX_RETRIES, default 3)
+            backoff: First retry delay in seconds
+            max_backoff: Upper bound for a single retry delay in seconds
+            transport_factory: Optional custom transport (e.g. for tests)
+        """
+        self.pool_size = pool_size or int(os.getenv("HTTP_POOL_SIZE", 10))
+        self.timeout = timeout or float(os.getenv("HTTP_TIMEOUT", 30))
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv("HTTP_MAX_RETRIES", 3))
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.transport_factory = transport_factory
+        self.retries = 0
+        self._clients: LoopLocal[httpx.AsyncClient] = LoopLocal(self._create_client)
+
+    def _create_client(self) -> httpx.AsyncClient:
+        limits = httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size)
+        transport = self.transport_factory() if self.transport_factory else None
+        return httpx.AsyncClient(limits=limits, timeout=httpx.Timeout(self.timeout), transport=transport)
+
+    async def request(self, method: str, url: str, **kwargs: Any) -> httpx.Response:
+        """Send a request, retrying throttled/failed attempts.
+
+        Returns:
+            httpx.Response: The last response received (may still be an error status)
+        """
+        method = method.upper()
+        client = self._clients.get()
+        idempotent = method in IDEMPOTENT_METHODS or any(
+            key.lower() == IDEMPOTENCY_HEADER.lower() for key in kwargs.get("headers") or {}
+        )
+        attempt = 0
+        while True:
+            try:
+                response = await client.request(method, url, **kwargs)
+            except (httpx.ConnectError, httpx.ConnectTimeout, httpx.RemoteProtocolError) as e:
+                # Connect failures never reached the server; a dropped connection may have been processed
+                if attempt >= self.max_retries or (isinstance(e, httpx.RemoteProtocolError) and not idempotent):
+                    raise
+                delay = self._delay(attempt)
+                logger.warning(f"{method} {url} failed ({e}), retrying in {delay:.1f}s")
+            else:
+                retryable = response.status_code == 429 or (
+                    response.status_code in RETRY_STATUS_CODES and idempotent
+                )
+                if not retryable or attempt >= self.max_retries:
+                    return response
+                retry_after = retry_after_seconds(response)
+                delay = min(retry_after, self.max_backoff) if retry_after is not None else self._delay(attempt)
+                logger.warning(f"{method} {url} returned {response.status_code}, retrying in {delay:.1f}s")
+            attempt += 1
+            self.retries += 1
+            record_retry()
+            await asyncio.sleep(delay)
+
+    async def get(self, url: str, **kwargs: Any) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs: Any) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+    async def delete(self, url: str, **kwargs: Any) -> httpx.Response:
+        return await self.request("DELETE", url, **kwargs)
+
+    def _delay(self, attempt: int) -> float:
+        delay = min(self.backoff * (2 ** attempt), self.max_backoff)
+        return delay * random.uniform(0.5, 1.0)
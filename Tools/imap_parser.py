@@ -0,0 +1,188 @@
+import re
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+from Tools.mime_text import decode_text, decode_transfer
+
+_LITERAL_RE = re.compile(rb"\{(\d+)\}$")
+_ATOM_END = b" ()\r\n"
+
+FetchSegment = Union[bytes, Tuple[bytes, bytes]]
+
+
+def uid_chunks(uids: Sequence[bytes], size: int) -> Iterator[bytes]:
+    """Yield comma-joined UID sets of at most `size` UIDs each."""
+    for start in range(0, len(uids), size):
+        yield b",".join(uids[start:start + size])
+
+
+# Parenthesis tokens produced while scanning a FETCH response
+_OPEN = object()
+_CLOSE = object()
+
+
+class _Atom(bytes):
+    """Unquoted atom, kept distinct from quoted strings and literals."""
+
+
+def _tokens(segments: Sequence[FetchSegment]) -> Iterator[Any]:
+    """Tokenize imaplib FETCH output, inlining `{n}` literals as bytes tokens."""
+    for segment in segments:
+        if isinstance(segment, tuple):
+            text, literal = segment
+            match = _LITERAL_RE.search(text)
+            if match:
+                text = text[:match.start()]
+        else:
+            text, literal = segment, None
+        yield from _scan(text)
+        if literal is not None:
+            yield literal
+
+
+def _scan(text: bytes) -> Iterator[Any]:
+    i, n = 0, len(text)
+    while i < n:
+        char = text[i:i + 1]
+        if char in (b" ", b"\r", b"\n"):
+            i += 1
+        elif char == b"(":
+            yield _OPEN
+            i += 1
+        elif char == b")":
+            yield _CLOSE
+            i += 1
+        elif char == b'"':
+            j = i + 1
+            value = bytearray()
+            while j < n and text[j:j + 1] != b'"':
+                if text[j:j + 1] == b"\\":
+                    j += 1
+                value += text[j:j + 1]
+                j += 1
+            yield bytes(value)
+            i = j + 1
+        else:
+            # Section specs such as BODY[HEADER.FIELDS (FROM)] contain spaces and parens
+            j, depth = i, 0
+            while j < n and (depth or text[j:j + 1] not in _ATOM_END):
+                if text[j:j + 1] == b"[":
+                    depth += 1
+                elif text[j:j + 1] == b"]":
+                    depth -= 1
+                j += 1
+            atom = text[i:j]
+            yield None if atom.upper() == b"NIL" else _Atom(atom)
+            i = j
+
+
+def _parse_list(tokens: Iterator[Any]) -> List[Any]:
+    items: List[Any] = []
+    for token in tokens:
+        if token is _CLOSE:
+            return items
+        items.append(_parse_list(tokens) if token is _OPEN else token)
+    return items
+
+
+def parse_fetch_response(segments: Sequence[FetchSegment]) -> Dict[bytes, Dict[str, Any]]:
+    """Parse the data returned by `imaplib.IMAP4.uid("FETCH", ...)`.
+
+    Args:
+        segments: Raw imaplib response data (mix of bytes and (prefix, literal) tuples)
+
+    Returns:
+        Dict[bytes, Dict[str, Any]]: Fetch attributes keyed by UID; attribute names are
+        upper-cased strings (e.g. "BODYSTRUCTURE", "BODY[1]") and values are bytes or nested lists
+    """
+    messages: Dict[bytes, Dict[str, Any]] = {}
+    tokens = _tokens([s for s in segments if s])
+    for token in tokens:
+        if token is not _OPEN:
+            continue  # message sequence number
+        values = _parse_list(tokens)
+        attributes = {
+            bytes(values[i]).decode("ascii", "replace").upper(): values[i + 1]
+            for i in range(0, len(values) - 1, 2)
+        }
+        uid = attributes.get("UID")
+        if uid is not None:
+            messages[bytes(uid)] = attributes
+    return messages
+
+
+def find_body(attributes: Dict[str, Any], section: str) -> Optional[bytes]:
+    """Return the value of `BODY[section]` regardless of how the server spelled it."""
+    prefix = f"BODY[{section}"
+    for key, value in attributes.items():
+        if key.startswith(prefix) and key[len(prefix):len(prefix) + 1] in ("]", " "):
+            return value
+    return None
+
+
+def _params(value: Any) -> Dict[str, str]:
+    if not isinstance(value, list):
+        return {}
+    return {
+        bytes(value[i]).decode("ascii", "replace").lower(): bytes(value[i + 1] or b"").decode("ascii", "replace")
+        for i in range(0, len(value) - 1, 2)
+    }
+
+
+def find_text_part(
+    bodystructure: List[Any], subtype: str = "plain"
+) -> Optional[Tuple[str, str, Optional[str]]]:
+    """Locate the first `text/<subtype>` leaf of a BODYSTRUCTURE that is not an attachment.
+
+    Args:
+        bodystructure: Parsed BODYSTRUCTURE list
+        subtype: Text subtype to look for
+
+    Returns:
+        Optional[Tuple[str, str, Optional[str]]]: (part number, transfer encoding, charset) or None
+    """
+
+    def walk(node: List[Any], part: str) -> Optional[Tuple[str, str, Optional[str]]]:
+        if node and isinstance(node[0], list):
+            children = [child for child in node if _is_body(child)]
+            for index, child in enumerate(children, 1):
+                found = walk(child, f"{part}.{index}" if part else str(index))
+                if found:
+                    return found
+            return None
+        if len(node) < 7:
+            return None
+        main_type = bytes(node[0] or b"").decode("ascii", "replace").lower()
+        sub_type = bytes(node[1] or b"").decode("ascii", "replace").lower()
+        if main_type != "text" or sub_type != subtype or _is_attachment(node):
+            return None
+        return describe_part(node, part or "1")
+
+    return walk(bodystructure, "")
+
+
+def describe_part(node: List[Any], part: str) -> Tuple[str, str, Optional[str]]:
+    """Return (part number, transfer encoding, charset) for a single-part BODYSTRUCTURE node."""
+    encoding = bytes(node[5] or b"7BIT").decode("ascii", "replace").upper() if len(node) > 5 else "7BIT"
+    charset = _params(node[2]).get("charset") if len(node) > 2 else None
+    return part, encoding, charset
+
+
+def _is_body(node: Any) -> bool:
+    # Multipart extension data (e.g. the boundary parameter list) follows the child bodies
+    return isinstance(node, list) and bool(node) and (isinstance(node[0], list) or len(node) >= 7)
+
+
+def _is_attachment(node: List[Any]) -> bool:
+    # Single-part text extension data: md5, (disposition params), language, location
+    for item in node[8:]:
+        if isinstance(item, list) and item and isinstance(item[0], bytes):
+            return bytes(item[0]).lower() == b"attachment"
+    return False
+
+
+def decode_part(payload: bytes, encoding: str, charset: Optional[str], truncated: bool = False) -> str:
+    """Undo the Content-Transfer-Encoding of a fetched body part and decode it to text.
+
+    `truncated` marks a partial fetch (`BODY[section]<0.n>`) that may end mid-sequence.
+    """
+    return decode_text(decode_transfer(payload, encoding, truncated), charset, truncated)
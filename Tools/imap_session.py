@@ -0,0 +1,271 @@
+import imaplib
+import select
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional, TypeVar
+
+from phi.utils.log import logger
+
+from Tools.telemetry import record_retry
+
+T = TypeVar("T")
+
+
+class IMAPSession:
+    """Long-lived, authenticated IMAP connection with IDLE support.
+
+    The session keeps one connection open between fetch cycles, so each cycle
+    skips the TLS handshake, LOGIN and SELECT round trips. `wait_for_new_mail`
+    uses IMAP IDLE (RFC 2177) when the server advertises it and falls back to
+    NOOP polling otherwise. Dropped connections are re-established transparently
+    with exponential backoff. The session is thread-safe: a thread that needs the
+    connection while another is IDLE-ing wakes it up, runs, and IDLE resumes afterwards.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        email_address: Optional[str],
+        email_password: Optional[str],
+        mailbox: str = "inbox",
+        use_ssl: bool = True,
+        idle_timeout: float = 29 * 60,
+        keepalive_interval: float = 5 * 60,
+        initial_backoff: float = 1.0,
+        max_backoff: float = 300.0,
+    ):
+        """Initialize the IMAP session.
+
+        Args:
+            host: IMAP server hostname
+            port: IMAP server port
+            email_address: Login user
+            email_password: Login password
+            mailbox: Mailbox to SELECT after login
+            use_ssl: Use IMAP4_SSL (True) or plain IMAP4 (False, local test servers)
+            idle_timeout: Maximum seconds a single IDLE command is kept open (RFC 2177 recommends < 30 min)
+            keepalive_interval: Seconds between NOOPs when the connection is otherwise idle
+            initial_backoff: First reconnect delay in seconds
+            max_backoff: Upper bound for the reconnect delay in seconds
+        """
+        self.host = host
+        self.port = port
+        self.email_address = email_address
+        self.email_password = email_password
+        self.mailbox = mailbox
+        self.use_ssl = use_ssl
+        self.idle_timeout = idle_timeout
+        self.keepalive_interval = keepalive_interval
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+
+        self.connection: Optional[imaplib.IMAP4] = None
+        self.reconnects = 0
+        self._backoff = initial_backoff
+        self._last_activity = 0.0
+        self._lock = threading.RLock()
+        self._stopped = threading.Event()
+        # Lets other threads interrupt a blocking IDLE when they need the connection
+        self._waiters = 0
+        self._waiters_changed = threading.Condition()
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_r.setblocking(False)
+
+    def connect(self) -> imaplib.IMAP4:
+        """Open, authenticate and SELECT a fresh connection."""
+        self.close()
+        if self.use_ssl:
+            connection = imaplib.IMAP4_SSL(self.host, self.port)
+        else:
+            connection = imaplib.IMAP4(self.host, self.port)
+        try:
+            connection.login(self.email_address, self.email_password)
+            status, _ = connection.select(self.mailbox)
+            if status != "OK":
+                raise imaplib.IMAP4.error(f"Failed to select mailbox {self.mailbox}")
+        except Exception:
+            self._shutdown_connection(connection)
+            raise
+        self.connection = connection
+        self._last_activity = time.monotonic()
+        logger.debug(f"IMAP session connected to {self.host}:{self.port}")
+        return connection
+
+    def ensure_connected(self) -> imaplib.IMAP4:
+        """Return the live connection, reconnecting or sending a NOOP keepalive when needed."""
+        with self._lock:
+            if self.connection is None:
+                return self.connect()
+            if time.monotonic() - self._last_activity >= self.keepalive_interval:
+                try:
+                    self.connection.noop()
+                    self._last_activity = time.monotonic()
+                except (imaplib.IMAP4.abort, OSError) as e:
+                    logger.warning(f"IMAP keepalive failed, reconnecting: {e}")
+                    return self.connect()
+            return self.connection
+
+    def run(self, operation: Callable[[imaplib.IMAP4], T], retries: int = 3) -> T:
+        """Run `operation` against the live connection, reconnecting with backoff if it drops.
+
+        Args:
+            operation: Callable receiving the connected `imaplib.IMAP4` instance
+            retries: Number of reconnect attempts before the error is re-raised
+
+        Returns:
+            Whatever `operation` returns
+        """
+        attempt = 0
+        while True:
+            with self._claim():
+                try:
+                    result = operation(self.ensure_connected())
+                    self._last_activity = time.monotonic()
+                    self._backoff = self.initial_backoff
+                    return result
+                except (imaplib.IMAP4.abort, OSError) as e:
+                    self.close()
+                    attempt += 1
+                    if attempt > retries or self._stopped.is_set():
+                        raise
+                    logger.warning(f"IMAP connection lost ({e}), reconnecting in {self._backoff:.1f}s")
+            self._sleep_backoff()
+
+    def wait_for_new_mail(self, timeout: float) -> bool:
+        """Block until the server reports new mail or `timeout` seconds pass.
+
+        Args:
+            timeout: Maximum number of seconds to wait
+
+        Returns:
+            bool: True if the server pushed an EXISTS/RECENT notification, False on timeout
+        """
+        deadline = time.monotonic() + timeout
+        while not self._stopped.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            # Let threads that interrupted the previous IDLE use the connection first
+            with self._waiters_changed:
+                self._waiters_changed.wait_for(lambda: self._waiters == 0, timeout=remaining)
+            try:
+                with self._lock:
+                    connection = self.ensure_connected()
+                    supports_idle = "IDLE" in connection.capabilities
+                    if supports_idle and self._idle(connection, min(remaining, self.idle_timeout)):
+                        return True
+                if not supports_idle and self._poll(remaining):
+                    return True
+            except (imaplib.IMAP4.abort, imaplib.IMAP4.error, OSError) as e:
+                self.close()
+                logger.warning(f"IMAP wait interrupted ({e}), reconnecting in {self._backoff:.1f}s")
+                self._sleep_backoff()
+        return False
+
+    def stop(self) -> None:
+        """Interrupt any pending wait and close the connection."""
+        self._stopped.set()
+        self._wake()
+        self.close()
+
+    def close(self) -> None:
+        """Log out and drop the current connection, if any."""
+        with self._lock:
+            connection, self.connection = self.connection, None
+        if connection is not None:
+            self._shutdown_connection(connection)
+
+    def _idle(self, connection: imaplib.IMAP4, timeout: float) -> bool:
+        """Issue IDLE and wait for an untagged EXISTS/RECENT response."""
+        connection.untagged_responses.pop("EXISTS", None)
+        connection.untagged_responses.pop("RECENT", None)
+
+        tag = connection._new_tag()
+        connection.send(tag + b" IDLE\r\n")
+        while connection._get_response() is not None:
+            if connection.tagged_commands.get(tag) is not None:
+                typ, data = connection.tagged_commands.pop(tag)
+                raise imaplib.IMAP4.error(f"IDLE rejected: {typ} {data}")
+
+        # Data buffered in the file object alongside the continuation is not visible to
+        # select(); it is picked up when DONE completes, so waits are sliced to bound latency.
+        deadline = time.monotonic() + timeout
+        notified = False
+        while not notified and not self._stopped.is_set() and not self._waiters:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            pending = getattr(connection.sock, "pending", lambda: 0)()
+            if not pending:
+                readable, _, _ = select.select([connection.sock, self._wake_r], [], [], min(remaining, 1.0))
+                if self._wake_r in readable:
+                    self._drain_wake()
+                    continue
+                if not readable:
+                    continue
+            connection._get_response()
+            notified = "EXISTS" in connection.untagged_responses or "RECENT" in connection.untagged_responses
+
+        connection.send(b"DONE\r\n")
+        connection._command_complete("IDLE", tag)
+        self._last_activity = time.monotonic()
+        return notified or "EXISTS" in connection.untagged_responses
+
+    def _poll(self, timeout: float) -> bool:
+        """NOOP-based fallback for servers without IDLE; sleeps without holding the connection."""
+        self._stopped.wait(min(timeout, self.keepalive_interval))
+
+        def noop(connection: imaplib.IMAP4) -> bool:
+            connection.untagged_responses.pop("EXISTS", None)
+            connection.noop()
+            return "EXISTS" in connection.untagged_responses
+
+        return self.run(noop, retries=0)
+
+    @contextmanager
+    def _claim(self) -> Iterator[None]:
+        """Acquire the connection lock, interrupting an IDLE in progress if necessary."""
+        if not self._lock.acquire(blocking=False):
+            with self._waiters_changed:
+                self._waiters += 1
+            self._wake()
+            self._lock.acquire()
+            with self._waiters_changed:
+                self._waiters -= 1
+                self._waiters_changed.notify_all()
+        try:
+            yield
+        finally:
+            self._lock.release()
+
+    def _wake(self) -> None:
+        try:
+            self._wake_w.send(b"\0")
+        except OSError:
+            pass
+
+    def _drain_wake(self) -> None:
+        try:
+            while self._wake_r.recv(64):
+                pass
+        except (BlockingIOError, OSError):
+            pass
+
+    def _sleep_backoff(self) -> None:
+        self._stopped.wait(self._backoff)
+        self._backoff = min(self._backoff * 2, self.max_backoff)
+        self.reconnects += 1
+        record_retry()
+
+    @staticmethod
+    def _shutdown_connection(connection: imaplib.IMAP4) -> None:
+        try:
+            connection.logout()
+        except Exception:
+            try:
+                connection.shutdown()
+            except Exception:
+                pass
@@ -0,0 +1,152 @@
+import json
+import os
+import re
+import threading
+from typing import Any, Dict, Optional, Set
+
+from phi.utils.log import logger
+
+_STATUS_ITEM_RE = re.compile(rb"(UIDNEXT|UIDVALIDITY|HIGHESTMODSEQ) (\d+)", re.IGNORECASE)
+
+# Serializes the read-modify-write of checkpoint files shared by several mailboxes of this process
+_FILE_LOCK = threading.Lock()
+
+
+def parse_status(data: list) -> Dict[str, int]:
+    """Parse the data of an IMAP STATUS response into {"UIDNEXT": ..., "UIDVALIDITY": ..., ...}."""
+    items: Dict[str, int] = {}
+    for line in data:
+        if isinstance(line, bytes):
+            for name, value in _STATUS_ITEM_RE.findall(line):
+                items[name.decode().upper()] = int(value)
+    return items
+
+
+class SyncCheckpoint:
+    """Mailbox sync state persisted as JSON, or in a shared `store`.
+
+    Tracks, per account and mailbox, the UIDVALIDITY the UIDs belong to, the highest
+    UID below which every message has been processed, and the last HIGHESTMODSEQ
+    (CONDSTORE servers only). UIDs handed out but not yet acknowledged are kept in
+    memory so a failed message is fetched again on the next cycle.
+
+    The JSON file belongs to one process. Processes sharing a mailbox keep its
+    checkpoint in a `store` (the `WorkCoordinator`), which only accepts writes from
+    the holder of the mailbox lease; `refresh` picks up the progress of an earlier one.
+    """
+
+    def __init__(self, path: Optional[str], key: str, store: Optional[Any] = None):
+        """Initialize the checkpoint.
+
+        Args:
+            path: JSON file holding the checkpoints of every account (unused with a `store`)
+            key: Identifier of this account/mailbox within the file or store
+            store: Shared storage with `read_checkpoint(key)` and `write_checkpoint(key, state)`,
+                the latter returning the stored state or None if the write was refused
+        """
+        self.path = path
+        self.key = key
+        self.store = store
+        self.uidvalidity: Optional[int] = None
+        self.last_uid: int = 0
+        self.highestmodseq: Optional[int] = None
+        self.uidnext: Optional[int] = None
+        self.pending: Set[int] = set()
+        self._scanned_through: int = 0
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self) -> None:
+        """Read this mailbox's checkpoint from disk (or the store), if present."""
+        state = self.store.read_checkpoint(self.key) if self.store is not None else self._read_all().get(self.key, {})
+        self.uidvalidity = state.get("uidvalidity")
+        self.last_uid = state.get("last_uid", 0)
+        self.highestmodseq = state.get("highestmodseq")
+        self.uidnext = state.get("uidnext")
+
+    def refresh(self) -> None:
+        """Reload a shared checkpoint, which other processes may have advanced."""
+        if self.store is not None:
+            with self._lock:
+                self.load()
+
+    def save(self) -> None:
+        """Atomically write this mailbox's checkpoint back to disk (or the store)."""
+        state = {
+            "uidvalidity": self.uidvalidity,
+            "last_uid": self.last_uid,
+            "highestmodseq": self.highestmodseq,
+            "uidnext": self.uidnext,
+        }
+        if self.store is not None:
+            stored = self.store.write_checkpoint(self.key, state)
+            if stored is None:
+                logger.debug(f"Not holding the lease on {self.key}, sync checkpoint not written")
+            elif stored["uidvalidity"] == self.uidvalidity:
+                # Never behind what is stored
+                self.last_uid = stored["last_uid"]
+            return
+        with _FILE_LOCK:
+            states = self._read_all()
+            states[self.key] = state
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(states, f, indent=2)
+            os.replace(tmp_path, self.path)
+
+    def is_unchanged(self, status: Dict[str, int]) -> bool:
+        """True if the STATUS response proves no new mail arrived since the last cycle."""
+        if status.get("UIDVALIDITY") != self.uidvalidity or self.uidnext is None:
+            return False
+        if status.get("UIDNEXT") != self.uidnext or self.last_uid < self.uidnext - 1:
+            return False
+        if "HIGHESTMODSEQ" in status and status["HIGHESTMODSEQ"] != self.highestmodseq:
+            return False
+        return True
+
+    def begin_cycle(self, status: Dict[str, int]) -> None:
+        """Reset the checkpoint if UIDVALIDITY changed (UIDs are no longer meaningful)."""
+        uidvalidity = status.get("UIDVALIDITY")
+        if uidvalidity is not None and uidvalidity != self.uidvalidity:
+            if self.uidvalidity is not None:
+                logger.warning(f"UIDVALIDITY changed ({self.uidvalidity} -> {uidvalidity}), resyncing mailbox")
+            self.uidvalidity = uidvalidity
+            self.last_uid = 0
+            self.pending.clear()
+
+    def end_cycle(self, status: Dict[str, int], fetched: Set[int]) -> None:
+        """Record the UIDs handed out in this cycle and persist the new checkpoint."""
+        with self._lock:
+            # Anything still unseen above the checkpoint was fetched again, so this is the full pending set
+            self.pending = set(fetched)
+            self.uidnext = status.get("UIDNEXT")
+            self.highestmodseq = status.get("HIGHESTMODSEQ")
+            # Every UID below UIDNEXT (and every fetched UID) has now been looked at
+            self._scanned_through = max([(self.uidnext or 1) - 1, self.last_uid, *fetched])
+            self._advance()
+
+    def acknowledge(self, uid: int) -> None:
+        """Mark a UID as fully processed and move the checkpoint forward if possible."""
+        with self._lock:
+            self.pending.discard(uid)
+            self._advance()
+
+    def _advance(self) -> None:
+        # The checkpoint never moves past a UID that is still waiting to be processed
+        if self.pending:
+            self.last_uid = max(self.last_uid, min(self.pending) - 1)
+        else:
+            self.last_uid = max(self.last_uid, self._scanned_through)
+        self.save()
+
+    def _read_all(self) -> Dict[str, dict]:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable sync checkpoint {self.path}: {e}")
+            return {}
@@ -0,0 +1,224 @@
+import concurrent.futures
+import hashlib
+import inspect
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from openai.types.chat import ChatCompletion
+from phi.model.message import Message
+from phi.model.openai import OpenAIChat
+
+from Tools.telemetry import Telemetry, current_span
+
+
+def cache_key(model: str, messages: List[Dict[str, Any]], tools: Optional[List[Dict[str, Any]]] = None, **params: Any) -> str:
+    """Content address of a chat request: model, messages, tool schemas and sampling parameters."""
+    tools_hash = hashlib.sha256(_canonical(tools or []).encode()).hexdigest()
+    request = {"model": model, "messages": messages, "tools": tools_hash, "params": params}
+    return hashlib.sha256(_canonical(request).encode()).hexdigest()
+
+
+def tool_schemas(toolkits: List[Any]) -> List[Dict[str, Any]]:
+    """Name, signature and docstring of every function registered on the given phi toolkits."""
+    return [
+        {"name": name, "signature": str(inspect.signature(function.entrypoint)), "doc": inspect.getdoc(function.entrypoint)}
+        for toolkit in toolkits
+        for name, function in toolkit.functions.items()
+    ]
+
+
+class ResponseCache:
+    """Persistent cache of model responses keyed by `cache_key` (SQLite).
+
+    Reprocessing an email (after a crash or a duplicate delivery) sends the same
+    request again; its response is served from the cache for `ttl` seconds instead
+    of paying for another model call. At most `max_entries` responses are kept,
+    evicting the least recently used. Identical requests made concurrently from
+    several threads share one upstream call.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        ttl: Optional[float] = None,
+        max_entries: Optional[int] = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        """Initialize the cache.
+
+        Args:
+            path: SQLite database file (LLM_CACHE_PATH, default .llm_cache.sqlite3)
+            ttl: Seconds a response is reused (LLM_CACHE_TTL, default 86400, 0 disables caching)
+            max_entries: Responses kept before the least recently used are evicted (LLM_CACHE_MAX_ENTRIES, default 1000)
+            clock: Wall-clock time source (entries outlive the process)
+        """
+        self.path = path or os.getenv("LLM_CACHE_PATH", ".llm_cache.sqlite3")
+        self.ttl = ttl if ttl is not None else float(os.getenv("LLM_CACHE_TTL", 86400))
+        self.max_entries = max_entries or int(os.getenv("LLM_CACHE_MAX_ENTRIES", 1000))
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, concurrent.futures.Future] = {}
+        self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " response TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " last_used REAL NOT NULL"
+            ")"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_lru ON responses (last_used)")
+
+    def get(self, key: str) -> Optional[str]:
+        """Cached response for `key`, or None if missing or expired."""
+        with self._lock:
+            return self._lookup(key)
+
+    def put(self, key: str, response: str) -> None:
+        """Store a response, evicting the least recently used entries beyond `max_entries`."""
+        if self.ttl <= 0:
+            return
+        now = self.clock()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, response, created_at, last_used) VALUES (?, ?, ?, ?)",
+                (key, response, now, now),
+            )
+            evicted = self._db.execute(
+                "DELETE FROM responses WHERE key IN"
+                " (SELECT key FROM responses ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            ).rowcount
+            self.evictions += max(evicted, 0)
+
+    def get_or_call(self, key: str, call: Callable[[], str], cacheable: Optional[Callable[[str], bool]] = None) -> str:
+        """Return the cached response, or make the call once for all concurrent callers and cache it.
+
+        Errors are not cached; every caller waiting on the failed call receives the exception.
+        Responses rejected by `cacheable` are only shared with the callers already waiting.
+        """
+        with self._lock:
+            cached = self._lookup(key)
+            if cached is not None:
+                self.hits += 1
+                return cached
+            inflight = self._inflight.get(key)
+            leader = inflight is None
+            if leader:
+                inflight = self._inflight[key] = concurrent.futures.Future()
+                self.misses += 1
+            else:
+                self.coalesced += 1
+        if not leader:
+            return inflight.result()
+        try:
+            response = call()
+            # Stored before the call stops being in flight, so no caller can miss both
+            if cacheable is None or cacheable(response):
+                self.put(key, response)
+        except BaseException as e:
+            inflight.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+        inflight.set_result(response)
+        return response
+
+    def clear(self) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM responses")
+
+    def stats(self) -> Dict[str, float]:
+        """Hit/miss counters; coalesced requests waited for an identical in-flight call."""
+        with self._lock:
+            entries = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            total = self.hits + self.misses + self.coalesced
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "hit_rate": (self.hits + self.coalesced) / total if total else 0.0,
+                "evictions": self.evictions,
+                "entries": entries,
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def _lookup(self, key: str) -> Optional[str]:
+        # Caller holds the lock
+        if self.ttl <= 0:
+            return None
+        now = self.clock()
+        row = self._db.execute("SELECT response, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        if now - row[1] >= self.ttl:
+            self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            return None
+        self._db.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+        return row[0]
+
+
+class CachedOpenAIChat(OpenAIChat):
+    """`OpenAIChat` whose chat completions are served from a `ResponseCache` when possible.
+
+    Every model request of an agent run (the first turn and each turn after a tool call)
+    goes through `invoke`; its key covers the model, the formatted messages and the
+    request parameters, tool definitions included. Completions that call tools are not
+    cached: the same email text arriving again under a new Message-ID would replay the
+    booking and the reply, which the ledger (keyed by Message-ID) does not prevent.
+    Streaming and structured-output requests are not cached either.
+
+    With `telemetry`, each request is an `llm.chat` span; requests that reached the API
+    record the tokens used, cache hits are marked `cached`.
+    """
+
+    cache: Optional[ResponseCache] = None
+    telemetry: Optional[Telemetry] = None
+
+    def invoke(self, messages: List[Message]) -> ChatCompletion:
+        if self.telemetry is None:
+            return self._cached_invoke(messages)
+        # Marked as uncached by _upstream when the request is actually sent
+        with self.telemetry.span("llm.chat", "llm", model=self.id, cached=True):
+            return self._cached_invoke(messages)
+
+    def _cached_invoke(self, messages: List[Message]) -> ChatCompletion:
+        if self.cache is None or self.structured_outputs:
+            return self._upstream(messages)
+        key = cache_key(self.id, [self.format_message(message) for message in messages], **self.request_kwargs)
+        response = self.cache.get_or_call(key, lambda: self._upstream(messages).model_dump_json(), cacheable=_without_tool_calls)
+        return ChatCompletion.model_validate_json(response)
+
+    def _upstream(self, messages: List[Message]) -> ChatCompletion:
+        response = super().invoke(messages)
+        span = current_span() if self.telemetry is not None else None
+        if span is not None:
+            span.set("cached", False)
+            if response.usage is not None:
+                span.set("tokens", response.usage.total_tokens)
+                span.set("prompt_tokens", response.usage.prompt_tokens)
+                span.set("completion_tokens", response.usage.completion_tokens)
+        return response
+
+
+def _without_tool_calls(response: str) -> bool:
+    completion = ChatCompletion.model_validate_json(response)
+    return not any(choice.message.tool_calls for choice in completion.choices)
+
+
+def _canonical(value: Any) -> str:
+    return json.dumps(value, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
@@ -0,0 +1,288 @@
+import asyncio
+import json
+from typing import Any, List, Optional, Sequence
+
+from phi.tools import Toolkit
+from phi.utils.log import logger
+
+from Tools.async_utils import run_sync
+from Tools.calcom_tool import CalCom
+from Tools.processing_ledger import BOOKED, REPLIED, ZOOM_CREATED, ProcessingLedger
+from Tools.reply_templates import ReplyRenderer
+from Tools.SendEmail_tool import CustomEmailTool
+from Tools.zoom_tool import CustomZoomTool
+
+# Placeholders in the confirmation email that are filled in from the created meeting
+PLACEHOLDERS = ("[join_url]", "[start_time]", "[meeting_id]")
+
+
+class MeetingConfirmationTool(Toolkit):
+    """Confirms a requested meeting in one tool call instead of one LLM turn per step.
+
+    `confirm_meeting` re-validates the slot, creates the Zoom meeting, books it on
+    Cal.com with the Zoom link and sends the confirmation email as one deterministic
+    pipeline. The availability check and the Zoom meeting run concurrently; the meeting
+    is deleted again if the slot turned out to be taken or the booking fails. Each step
+    is recorded in the processing ledger, so a retried run resumes where it stopped.
+
+    With a `renderer`, `accept_meeting` and `decline_meeting` also write the reply
+    themselves from a template in the sender's language, so the model only picks the
+    case instead of generating the email.
+    """
+
+    def __init__(
+        self,
+        zoom: CustomZoomTool,
+        calcom: CalCom,
+        mailer: CustomEmailTool,
+        ledger: Optional[ProcessingLedger] = None,
+        renderer: Optional[ReplyRenderer] = None,
+        name: str = "meeting_tool",
+    ):
+        """Initialize the toolkit.
+
+        Args:
+            zoom: Toolkit used to create (and roll back) the Zoom meeting
+            calcom: Toolkit used to re-check the slot and create the booking
+            mailer: Toolkit used to send (or queue) the confirmation email
+            ledger: Processing ledger shared with the other toolkits
+            renderer: Templates for `accept_meeting` / `decline_meeting` (not registered without one)
+        """
+        super().__init__(name=name)
+        self.zoom = zoom
+        self.calcom = calcom
+        self.mailer = mailer
+        self.ledger = ledger
+        self.renderer = renderer
+        self.register(self.confirm_meeting)
+        if renderer is not None:
+            self.register(self.accept_meeting)
+            self.register(self.decline_meeting)
+
+    def confirm_meeting(
+        self,
+        start_time: str,
+        duration: int,
+        topic: str,
+        attendee_name: str,
+        attendee_email: str,
+        email_subject: str,
+        email_body: str,
+    ) -> str:
+        """Book a requested meeting and send the confirmation email in one step.
+
+        Re-checks the slot, schedules the Zoom meeting, creates the Cal.com booking with the
+        Zoom link and emails the attendee. Write the email body with the placeholders
+        [join_url], [start_time] and [meeting_id]; they are replaced with the real values.
+
+        Args:
+            start_time: Start time in ISO 8601 format (without an offset the user's timezone is assumed)
+            duration: Meeting length in minutes
+            topic: Meeting title
+            attendee_name: Name of the person who requested the meeting
+            attendee_email: Email address of the person who requested the meeting
+            email_subject: Subject of the confirmation email
+            email_body: Body of the confirmation email, with the placeholders above
+
+        Returns:
+            str: JSON with "status" ("confirmed", "not_available" or "failed") and the meeting,
+            booking and email results, or the availability message and alternatives
+        """
+        message_ids = self.ledger.active_ids() if self.ledger else []
+        return run_sync(
+            self.aconfirm_meeting(
+                start_time, duration, topic, attendee_name, attendee_email, email_subject, email_body, message_ids
+            )
+        )
+
+    async def aconfirm_meeting(
+        self,
+        start_time: str,
+        duration: int,
+        topic: str,
+        attendee_name: str,
+        attendee_email: str,
+        email_subject: str,
+        email_body: str,
+        message_ids: Optional[List[str]] = None,
+    ) -> str:
+        """Async variant of `confirm_meeting`; `message_ids` attributes the side effects in the ledger."""
+        ids = message_ids or []
+        local = self.calcom.rules.to_local(self.calcom._parse_utc(start_time))
+        start = local.isoformat(timespec="seconds")
+
+        # The slot check and the Zoom meeting are independent; the meeting is rolled back if needed
+        availability, meeting = await asyncio.gather(
+            self.calcom.acheck_availability(start),
+            self._once(
+                ids,
+                ZOOM_CREATED,
+                lambda: self.zoom.aschedule_meeting(topic, local.strftime("%Y-%m-%dT%H:%M:%S"), duration, self.calcom.user_timezone),
+                lambda result: '"join_url"' in result,
+            ),
+        )
+        meeting_info = _json(meeting)
+        booked = self.ledger.pending(ids, BOOKED) if self.ledger else None
+
+        if not availability.startswith("Available") and not booked:
+            rolled_back = await self._rollback(ids, meeting_info)
+            return _result("not_available", availability=availability, meeting_rolled_back=rolled_back)
+        if "join_url" not in meeting_info:
+            return _result("failed", stage="zoom", error=meeting_info.get("error", meeting))
+
+        booking = await self._once(
+            ids,
+            BOOKED,
+            lambda: self.calcom.acreate_booking(start, attendee_name, attendee_email, meeting_info["join_url"]),
+            lambda result: result.startswith("Booking created"),
+        )
+        if not booking.startswith("Booking created"):
+            rolled_back = await self._rollback(ids, meeting_info)
+            return _result("failed", stage="booking", error=booking, meeting_rolled_back=rolled_back)
+
+        values = {
+            "[join_url]": meeting_info["join_url"],
+            "[start_time]": self.calcom._format_local(local),
+            "[meeting_id]": str(meeting_info.get("meeting_id", "")),
+        }
+        for placeholder in PLACEHOLDERS:
+            email_body = email_body.replace(placeholder, values[placeholder])
+            email_subject = email_subject.replace(placeholder, values[placeholder])
+        email = await self._once(
+            ids,
+            REPLIED,
+            lambda: self._send(attendee_email, email_subject, email_body),
+            lambda result: not result.startswith("error:"),
+        )
+        status = "failed" if email.startswith("error:") else "confirmed"
+        return _result(
+            status,
+            stage="email" if status == "failed" else None,
+            start_time=values["[start_time]"],
+            join_url=meeting_info["join_url"],
+            meeting_id=meeting_info.get("meeting_id"),
+            booking=booking,
+            email=email,
+        )
+
+    def accept_meeting(self, start_time: str, duration: int, topic: str, note: str = "") -> str:
+        """Confirm the meeting requested in the email being answered; the reply is written for you.
+
+        Does everything confirm_meeting does, with a confirmation email in the sender's
+        language that already contains the time, Zoom link and meeting ID.
+
+        Args:
+            start_time: Start time in ISO 8601 format (without an offset the user's timezone is assumed)
+            duration: Meeting length in minutes
+            topic: Meeting title
+            note: Optional short sentence added to the email, in the sender's language
+
+        Returns:
+            str: JSON with "status" ("confirmed", "not_available" or "failed"), as for confirm_meeting
+        """
+        message_ids = self.ledger.active_ids() if self.ledger else []
+        return run_sync(self.aaccept_meeting(start_time, duration, topic, note, self.renderer.active_email(), message_ids))
+
+    async def aaccept_meeting(
+        self,
+        start_time: str,
+        duration: int,
+        topic: str,
+        note: str = "",
+        email: Optional[Sequence[Any]] = None,
+        message_ids: Optional[List[str]] = None,
+    ) -> str:
+        """Async variant of `accept_meeting`; `email` is the email being answered."""
+        if email is None:
+            return _result("failed", stage="reply", error="No email is being answered; use confirm_meeting.")
+        name = email[0] or email[1]
+        local = self.calcom.rules.to_local(self.calcom._parse_utc(start_time))
+        subject, body = self.renderer.confirmation(name, topic, local, duration, note, self.renderer.language_of(email))
+        return await self.aconfirm_meeting(start_time, duration, topic, name, email[1], subject, body, message_ids)
+
+    def decline_meeting(self, start_time: str, note: str = "") -> str:
+        """Decline the meeting requested in the email being answered; the reply is written for you.
+
+        Looks up why the time cannot be booked and the next three valid slots, and emails
+        the sender an apology with the reason and the alternatives in their language.
+
+        Args:
+            start_time: Requested start time in ISO 8601 format (without an offset the user's timezone is assumed)
+            note: Optional short sentence added to the email, in the sender's language
+
+        Returns:
+            str: JSON with "status" ("declined", "available" if the time can be booked after all, or "failed"),
+            the reason, the alternatives and the email result
+        """
+        message_ids = self.ledger.active_ids() if self.ledger else []
+        return run_sync(self.adecline_meeting(start_time, note, self.renderer.active_email(), message_ids))
+
+    async def adecline_meeting(
+        self,
+        start_time: str,
+        note: str = "",
+        email: Optional[Sequence[Any]] = None,
+        message_ids: Optional[List[str]] = None,
+    ) -> str:
+        """Async variant of `decline_meeting`; `email` is the email being answered."""
+        ids = message_ids or []
+        if email is None:
+            return _result("failed", stage="reply", error="No email is being answered; write the reply yourself.")
+        try:
+            requested, reason, options = await self.calcom.aassess(start_time)
+        except Exception as e:
+            logger.error(f"Error checking availability: {e}")
+            return _result("failed", stage="availability", error=str(e))
+        if reason is None:
+            return _result("available", start_time=self.calcom._format_local(requested))
+
+        subject, body = self.renderer.decline(
+            email[0] or email[1], email[2], requested, reason, options, note, self.renderer.language_of(email)
+        )
+        sent = await self._once(
+            ids,
+            REPLIED,
+            lambda: self._send(email[1], subject, body),
+            lambda result: not result.startswith("error:"),
+        )
+        return _result(
+            "failed" if sent.startswith("error:") else "declined",
+            reason=reason,
+            alternatives=[self.calcom._format_local(start) for start in options],
+            email=sent,
+        )
+
+    async def _once(self, ids, stage, operation, succeeded):
+        if self.ledger is None:
+            return await operation()
+        return await self.ledger.aonce(ids, stage, operation, succeeded)
+
+    async def _send(self, to: str, subject: str, body: str) -> str:
+        if self.mailer.spool:
+            return self.mailer.queue_email(to=[to], subject=subject, body=body)
+        return await self.mailer.asend_email(to=[to], subject=subject, body=body)
+
+    async def _rollback(self, ids, meeting_info: dict) -> bool:
+        """Delete the Zoom meeting created for a confirmation that did not go through."""
+        if "meeting_id" not in meeting_info:
+            return False
+        deleted = _json(await self.zoom.adelete_meeting(str(meeting_info["meeting_id"]), schedule_for_reminder=False))
+        if "error" in deleted:
+            logger.error(f"Could not roll back Zoom meeting {meeting_info['meeting_id']}: {deleted['error']}")
+            return False
+        if self.ledger and ids:
+            self.ledger.forget(ids, ZOOM_CREATED)
+        logger.info(f"Rolled back Zoom meeting {meeting_info['meeting_id']}")
+        return True
+
+
+def _json(text: str) -> dict:
+    try:
+        value = json.loads(text)
+    except (TypeError, ValueError):
+        return {"error": text}
+    return value if isinstance(value, dict) else {"error": text}
+
+
+def _result(status: str, **fields) -> str:
+    return json.dumps({"status": status, **{k: v for k, v in fields.items() if v is not None}}, ensure_ascii=False, indent=2)
@@ -0,0 +1,298 @@
+import base64
+import binascii
+import quopri
+import re
+from email.header import decode_header
+from email.parser import BytesHeaderParser
+from html import unescape
+from html.parser import HTMLParser
+from typing import Iterable, List, Optional, Tuple, Union
+
+# Declared charsets mapped to the codec that decodes what mailers actually send
+CHARSET_ALIASES = {
+    "shift_jis": "cp932",
+    "shift-jis": "cp932",
+    "sjis": "cp932",
+    "x-sjis": "cp932",
+    "windows-31j": "cp932",
+    "iso-2022-jp": "iso2022_jp_ext",
+    "csiso2022jp": "iso2022_jp_ext",
+    "euc-jp": "euc_jis_2004",
+    "x-euc-jp": "euc_jis_2004",
+    "ks_c_5601-1987": "cp949",
+    "gb2312": "gb18030",
+    "gbk": "gb18030",
+    "us-ascii": "utf-8",
+    "ascii": "utf-8",
+}
+# Tried in order when the declared charset is missing or wrong (common for Japanese mail)
+FALLBACK_CHARSETS = ("utf-8", "iso2022_jp_ext", "cp932", "euc_jis_2004")
+# A truncated body can end in the middle of a multi-byte character
+_MAX_CHAR_BYTES = 4
+
+
+def _codec(charset: Optional[str]) -> Optional[str]:
+    if not charset:
+        return None
+    charset = charset.strip().strip('"').lower()
+    return CHARSET_ALIASES.get(charset, charset)
+
+
+def decode_text(data: bytes, charset: Optional[str] = None, truncated: bool = False) -> str:
+    """Decode bytes with the declared charset, falling back to detection.
+
+    Args:
+        data: Raw text bytes (transfer encoding already removed)
+        charset: Charset declared by the message, if any
+        truncated: The data was cut at a byte limit, so a partial trailing character is dropped
+
+    Returns:
+        str: Decoded text (undecodable bytes replaced as a last resort)
+    """
+    declared = _codec(charset)
+    candidates: List[str] = []
+    if declared:
+        candidates.append(declared)
+    if b"\x1b$" in data or b"\x1b(" in data:
+        # ISO-2022-JP escape sequences are unambiguous
+        candidates.append("iso2022_jp_ext")
+    candidates.extend(c for c in FALLBACK_CHARSETS if c not in candidates)
+
+    for codec in candidates:
+        for cut in range(_MAX_CHAR_BYTES if truncated else 1):
+            try:
+                return data[:len(data) - cut].decode(codec)
+            except LookupError:
+                break
+            except UnicodeDecodeError:
+                continue
+    try:
+        return data.decode(declared or "utf-8", errors="replace")
+    except LookupError:
+        return data.decode("utf-8", errors="replace")
+
+
+def decode_mime_header(value: Optional[str]) -> str:
+    """Decode every RFC 2047 encoded word of a header value (not just the first chunk)."""
+    if value is None:
+        return ""
+    try:
+        chunks = decode_header(str(value))
+    except (binascii.Error, ValueError):
+        return str(value)
+    decoded = []
+    for chunk, charset in chunks:
+        decoded.append(decode_text(chunk, charset) if isinstance(chunk, bytes) else chunk)
+    return "".join(decoded).strip()
+
+
+def decode_transfer(payload: bytes, encoding: Optional[str], truncated: bool = False) -> bytes:
+    """Undo a Content-Transfer-Encoding, tolerating payloads cut at a byte limit."""
+    encoding = (encoding or "7BIT").upper()
+    if encoding == "BASE64":
+        compact = re.sub(rb"[^A-Za-z0-9+/=]", b"", payload)
+        if truncated:
+            compact = compact[:len(compact) - len(compact) % 4]
+        try:
+            return base64.b64decode(compact + b"=" * (-len(compact) % 4))
+        except binascii.Error:
+            return b""
+    if encoding == "QUOTED-PRINTABLE":
+        if truncated:
+            # Drop a soft line break or escape sequence cut in half
+            payload = re.sub(rb"=[0-9A-Fa-f]?$", b"", payload)
+        return quopri.decodestring(payload)
+    return payload
+
+
+class _TextExtractor(HTMLParser):
+    _BLOCK_TAGS = {"p", "div", "br", "li", "tr", "h1", "h2", "h3", "h4", "h5", "h6", "blockquote", "table", "hr"}
+    _SKIP_TAGS = {"script", "style", "head", "title"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts: List[str] = []
+        self._skipping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self._SKIP_TAGS:
+            self._skipping += 1
+        elif tag in self._BLOCK_TAGS:
+            self.parts.append("\n")
+        elif tag == "td":
+            self.parts.append(" ")
+
+    def handle_endtag(self, tag):
+        if tag in self._SKIP_TAGS:
+            self._skipping = max(0, self._skipping - 1)
+        elif tag in self._BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def handle_data(self, data):
+        if not self._skipping:
+            self.parts.append(data)
+
+
+def html_to_text(html: str) -> str:
+    """Convert an HTML body to readable plain text (block elements become line breaks)."""
+    parser = _TextExtractor()
+    try:
+        parser.feed(html)
+        parser.close()
+    except Exception:
+        # Malformed markup: fall back to stripping tags
+        return unescape(re.sub(r"<[^>]+>", " ", html)).strip()
+    text = "".join(parser.parts).replace("\xa0", " ")
+    text = re.sub(r"[ \t]+", " ", text)
+    text = re.sub(r" *\n *", "\n", text)
+    return re.sub(r"\n{3,}", "\n\n", text).strip()
+
+
+class StreamingTextExtractor:
+    """Incremental MIME reader that stops at the first usable text part.
+
+    Bytes are fed line by line; only the headers of each entity and the body of the
+    chosen text part are kept, so attachments are skipped without being buffered or
+    decoded. The first non-attachment text/plain part ends the read; the first text/html
+    part is kept as a fallback. At most `max_body_bytes` of a part's body are collected.
+    """
+
+    def __init__(self, max_body_bytes: int = 64 * 1024):
+        self.max_body_bytes = max_body_bytes
+        self.done = False
+        self.bytes_read = 0
+        self._pending = b""
+        self._boundaries: List[bytes] = []
+        self._in_headers = True
+        self._header_lines: List[bytes] = []
+        self._target: Optional[str] = None  # "plain", "html" or None (skip)
+        self._body: List[bytes] = []
+        self._body_size = 0
+        self._truncated = False
+        self._part: Optional[Tuple[str, Optional[str]]] = None  # (encoding, charset)
+        self._plain: Optional[Tuple[bytes, str, Optional[str], bool]] = None
+        self._html: Optional[Tuple[bytes, str, Optional[str], bool]] = None
+
+    def feed(self, data: bytes) -> bool:
+        """Consume more of the message.
+
+        Returns:
+            bool: True once a text/plain part has been read (the rest can be skipped)
+        """
+        if self.done:
+            return True
+        self.bytes_read += len(data)
+        lines = (self._pending + data).split(b"\n")
+        self._pending = lines.pop()
+        for line in lines:
+            self._line(line + b"\n")
+            if self.done:
+                break
+        return self.done
+
+    def close(self) -> Optional[str]:
+        """Finish reading and return the extracted text (None if the message has no text part)."""
+        if not self.done:
+            if self._pending:
+                self._line(self._pending)
+                self._pending = b""
+            self._end_part()
+        if self._plain is not None:
+            payload, encoding, charset, truncated = self._plain
+            return decode_text(decode_transfer(payload, encoding, truncated), charset, truncated)
+        if self._html is not None:
+            payload, encoding, charset, truncated = self._html
+            return html_to_text(decode_text(decode_transfer(payload, encoding, truncated), charset, truncated))
+        return None
+
+    def _line(self, line: bytes) -> None:
+        if self._in_headers:
+            if line.strip():
+                self._header_lines.append(line)
+                return
+            self._begin_part(b"".join(self._header_lines))
+            self._header_lines = []
+            self._in_headers = False
+            return
+
+        if line.startswith(b"--") and self._boundaries:
+            marker = line.rstrip()
+            for depth in range(len(self._boundaries) - 1, -1, -1):
+                boundary = self._boundaries[depth]
+                if marker == b"--" + boundary:
+                    self._end_part()
+                    del self._boundaries[depth + 1:]
+                    self._in_headers = True
+                    return
+                if marker == b"--" + boundary + b"--":
+                    self._end_part()
+                    del self._boundaries[depth:]
+                    return
+
+        if self._target is None or self._truncated:
+            return
+        remaining = self.max_body_bytes - self._body_size
+        if len(line) > remaining:
+            line = line[:remaining]
+            self._truncated = True
+        self._body.append(line)
+        self._body_size += len(line)
+        if self._truncated and self._target == "plain":
+            self._end_part()
+
+    def _begin_part(self, header_block: bytes) -> None:
+        headers = BytesHeaderParser().parsebytes(header_block)
+        content_type = headers.get_content_type()
+        self._target = None
+        if headers.get_content_maintype() == "multipart":
+            boundary = headers.get_param("boundary")
+            if boundary:
+                self._boundaries.append(str(boundary).encode("ascii", "replace"))
+            return
+        disposition = (headers.get("Content-Disposition") or "").split(";")[0].strip().lower()
+        if disposition == "attachment":
+            return
+        if content_type == "text/plain" or (content_type == "text/html" and self._html is None):
+            self._target = content_type.split("/")[1]
+            self._part = (headers.get("Content-Transfer-Encoding", "7BIT").strip(), headers.get_content_charset())
+
+    def _end_part(self) -> None:
+        if self._target is not None and self._part is not None:
+            body = b"".join(self._body)
+            # The line break before a boundary belongs to the boundary
+            if not self._truncated and body.endswith(b"\n"):
+                body = body[:-2] if body.endswith(b"\r\n") else body[:-1]
+            result = (body, self._part[0], self._part[1], self._truncated)
+            if self._target == "plain":
+                self._plain = result
+                self.done = True
+            else:
+                self._html = result
+        self._target = None
+        self._part = None
+        self._body = []
+        self._body_size = 0
+        self._truncated = False
+
+
+def extract_text(message: Union[bytes, Iterable[bytes]], max_body_bytes: int = 64 * 1024, chunk_size: int = 64 * 1024) -> Optional[str]:
+    """Extract the first text part of a raw message, reading no further than necessary.
+
+    Args:
+        message: Raw RFC 822 bytes, or an iterable of byte chunks (e.g. from a socket or file)
+        max_body_bytes: Maximum body bytes of the text part to keep
+        chunk_size: Feed size used when `message` is a single bytes object
+
+    Returns:
+        Optional[str]: The decoded text/plain body, else the text/html body converted to text
+    """
+    extractor = StreamingTextExtractor(max_body_bytes)
+    if isinstance(message, (bytes, bytearray, memoryview)):
+        view = memoryview(message)
+        chunks: Iterable[bytes] = (bytes(view[i:i + chunk_size]) for i in range(0, len(view), chunk_size))
+    else:
+        chunks = message
+    for chunk in chunks:
+        if extractor.feed(chunk):
+            break
+    return extractor.close()
@@ -0,0 +1,330 @@
+import asyncio
+import json
+import os
+import random
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from email import message_from_bytes, policy
+from email.message import EmailMessage
+from email.utils import make_msgid
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import aiosmtplib
+from phi.utils.log import logger
+
+from Tools.async_utils import run_sync
+
+# Delivery states of a spooled message
+QUEUED = "queued"
+SENDING = "sending"
+SENT = "sent"
+DEAD = "dead"
+
+# Number of recent deliveries the latency percentiles are computed over
+LATENCY_WINDOW = 1000
+
+
+def is_permanent_failure(error: BaseException) -> bool:
+    """True for SMTP rejections that retrying cannot fix (5xx replies, every recipient refused with 5xx)."""
+    if isinstance(error, aiosmtplib.SMTPRecipientsRefused):
+        return all(refused.code >= 500 for refused in error.recipients)
+    if isinstance(error, aiosmtplib.SMTPResponseException):
+        return error.code >= 500
+    return False
+
+
+class OutboundSpool:
+    """Durable queue of outgoing emails (SQLite), delivered in the background by `DeliveryWorker`.
+
+    `enqueue` stores the complete message and returns its Message-ID immediately, so an
+    agent run never waits for the SMTP server. Failed deliveries are retried with
+    exponential backoff and jitter; permanent rejections and messages that exhausted
+    `max_attempts` are kept as dead letters.
+
+    Several processes may share one spool file. A claim records its `owner` and lasts
+    `lease_seconds`; a message whose claim expired (its process died while sending) is
+    claimed again by any worker, so delivery is at-least-once, while messages another
+    live process is sending are left alone.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        max_attempts: Optional[int] = None,
+        base_delay: Optional[float] = None,
+        max_delay: float = 3600.0,
+        owner: Optional[str] = None,
+        lease_seconds: Optional[float] = None,
+    ):
+        """Initialize the spool.
+
+        Args:
+            path: SQLite database file (OUTBOUND_SPOOL_PATH, default .outbound_spool.sqlite3)
+            max_attempts: Delivery attempts before a message is dead-lettered (OUTBOUND_MAX_ATTEMPTS, default 8)
+            base_delay: Seconds before the first retry, doubled for each further attempt (OUTBOUND_RETRY_DELAY, default 30)
+            max_delay: Upper bound of the retry delay in seconds
+            owner: Unique name of this process in claims (default host:pid:random)
+            lease_seconds: How long a claimed message may be sending before others may claim it (OUTBOUND_LEASE_SECONDS, default 300)
+        """
+        self.path = path or os.getenv("OUTBOUND_SPOOL_PATH", ".outbound_spool.sqlite3")
+        self.max_attempts = max_attempts or int(os.getenv("OUTBOUND_MAX_ATTEMPTS", 8))
+        self.base_delay = base_delay if base_delay is not None else float(os.getenv("OUTBOUND_RETRY_DELAY", 30))
+        self.max_delay = max_delay
+        self.owner = owner or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.lease_seconds = lease_seconds or float(os.getenv("OUTBOUND_LEASE_SECONDS", 300))
+        # Set whenever a message becomes due, so the worker does not wait for its next poll
+        self.pending = threading.Event()
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS outbox ("
+            " message_id TEXT PRIMARY KEY,"
+            " message BLOB NOT NULL,"
+            " recipients TEXT NOT NULL,"
+            " status TEXT NOT NULL,"
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " next_attempt_at REAL NOT NULL,"
+            " enqueued_at REAL NOT NULL,"
+            " sent_at REAL,"
+            " last_error TEXT,"
+            " owner TEXT,"
+            " lease_until REAL"
+            ")"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS outbox_due ON outbox (status, next_attempt_at)")
+
+    def enqueue(self, message: EmailMessage) -> str:
+        """Store a message for delivery (a Message-ID is added if missing) and return its Message-ID."""
+        if not message["Message-ID"]:
+            sender = message["From"] or ""
+            message["Message-ID"] = make_msgid(domain=sender.rpartition("@")[2].strip(">") or None)
+        message_id = message["Message-ID"]
+        recipients = [address.strip() for field in ("To", "Cc", "Bcc") for address in (message.get_all(field) or [])]
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR IGNORE INTO outbox (message_id, message, recipients, status, next_attempt_at, enqueued_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (message_id, message.as_bytes(), json.dumps(recipients), QUEUED, now, now),
+            )
+        self.pending.set()
+        return message_id
+
+    def claim(self, limit: int) -> List[Tuple[str, EmailMessage]]:
+        """Mark up to `limit` due messages (or expired claims) as sending by this owner and return them, oldest first."""
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._db.execute(
+                    "SELECT message_id, message FROM outbox"
+                    " WHERE (status = ? AND next_attempt_at <= ?) OR (status = ? AND (lease_until IS NULL OR lease_until < ?))"
+                    " ORDER BY next_attempt_at LIMIT ?",
+                    (QUEUED, now, SENDING, now, limit),
+                ).fetchall()
+                self._db.executemany(
+                    "UPDATE outbox SET status = ?, attempts = attempts + 1, owner = ?, lease_until = ? WHERE message_id = ?",
+                    [(SENDING, self.owner, now + self.lease_seconds, message_id) for message_id, _ in rows],
+                )
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+        return [(message_id, message_from_bytes(raw, policy=policy.default)) for message_id, raw in rows]
+
+    def mark_sent(self, message_id: str) -> None:
+        with self._lock:
+            self._db.execute(
+                "UPDATE outbox SET status = ?, sent_at = ?, last_error = NULL WHERE message_id = ?",
+                (SENT, time.time(), message_id),
+            )
+
+    def mark_failed(self, message_id: str, error: str, permanent: bool = False) -> bool:
+        """Schedule a retry with backoff, or dead-letter the message.
+
+        Returns:
+            bool: True if the message was dead-lettered
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT attempts FROM outbox WHERE message_id = ? AND status = ? AND owner = ?", (message_id, SENDING, self.owner)
+            ).fetchone()
+            if row is None:
+                # The claim expired and another worker took the message over
+                return False
+            attempts = row[0]
+            dead = permanent or attempts >= self.max_attempts
+            delay = min(self.max_delay, self.base_delay * 2 ** (attempts - 1)) * random.uniform(0.5, 1.0)
+            self._db.execute(
+                "UPDATE outbox SET status = ?, next_attempt_at = ?, last_error = ?, owner = NULL, lease_until = NULL"
+                " WHERE message_id = ? AND owner = ?",
+                (DEAD if dead else QUEUED, time.time() + delay, error, message_id, self.owner),
+            )
+        return dead
+
+    def recover(self) -> int:
+        """Queue messages whose claim expired (their process died while sending) again; returns how many.
+
+        Claims of processes still within their lease are left alone.
+        """
+        with self._lock:
+            count = self._db.execute(
+                "UPDATE outbox SET status = ?, owner = NULL, lease_until = NULL"
+                " WHERE status = ? AND (lease_until IS NULL OR lease_until < ?)",
+                (QUEUED, SENDING, time.time()),
+            ).rowcount
+        if count:
+            self.pending.set()
+        return count
+
+    def next_due(self) -> Optional[float]:
+        """Time (epoch seconds) the next queued message becomes due, or None if the queue is empty."""
+        with self._lock:
+            row = self._db.execute("SELECT MIN(next_attempt_at) FROM outbox WHERE status = ?", (QUEUED,)).fetchone()
+        return row[0]
+
+    def dead_letters(self, limit: int = 100) -> List[Dict[str, Any]]:
+        """Most recent dead-lettered messages with their recipients, attempts and last error."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT message_id, recipients, attempts, last_error FROM outbox WHERE status = ?"
+                " ORDER BY next_attempt_at DESC LIMIT ?",
+                (DEAD, limit),
+            ).fetchall()
+        return [
+            {"message_id": message_id, "recipients": json.loads(recipients), "attempts": attempts, "error": error}
+            for message_id, recipients, attempts, error in rows
+        ]
+
+    def retry_dead(self, message_id: str) -> bool:
+        """Queue a dead-lettered message again (e.g. after fixing the address)."""
+        with self._lock:
+            count = self._db.execute(
+                "UPDATE outbox SET status = ?, attempts = 0, next_attempt_at = ? WHERE message_id = ? AND status = ?",
+                (QUEUED, time.time(), message_id, DEAD),
+            ).rowcount
+        if count:
+            self.pending.set()
+        return bool(count)
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth per state, age of the oldest queued message and delivery latency percentiles (seconds)."""
+        now = time.time()
+        with self._lock:
+            counts = dict(self._db.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status").fetchall())
+            oldest = self._db.execute("SELECT MIN(enqueued_at) FROM outbox WHERE status IN (?, ?)", (QUEUED, SENDING)).fetchone()[0]
+            latencies = sorted(
+                latency
+                for (latency,) in self._db.execute(
+                    "SELECT sent_at - enqueued_at FROM outbox WHERE status = ? ORDER BY sent_at DESC LIMIT ?",
+                    (SENT, LATENCY_WINDOW),
+                )
+            )
+        return {
+            "depth": counts.get(QUEUED, 0) + counts.get(SENDING, 0),
+            **{state: counts.get(state, 0) for state in (QUEUED, SENDING, SENT, DEAD)},
+            "oldest_queued_age": now - oldest if oldest else 0.0,
+            "latency_p50": _percentile(latencies, 0.50),
+            "latency_p95": _percentile(latencies, 0.95),
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+class DeliveryWorker:
+    """Background thread that delivers spooled messages through `send` (e.g. `SMTPPool.send`).
+
+    Due messages are claimed in batches of `batch_size` and sent concurrently on the shared
+    tool event loop; the worker sleeps until a message is enqueued or the next retry is due
+    (at most `poll_interval` seconds).
+    """
+
+    def __init__(
+        self,
+        spool: OutboundSpool,
+        send: Callable[[EmailMessage], Awaitable[None]],
+        batch_size: Optional[int] = None,
+        poll_interval: float = 5.0,
+    ):
+        """Initialize the worker.
+
+        Args:
+            spool: Spool to deliver from
+            send: Coroutine function that delivers one message or raises
+            batch_size: Messages claimed and sent concurrently per round (OUTBOUND_BATCH_SIZE, default 10)
+            poll_interval: Maximum seconds between checks for due retries
+        """
+        self.spool = spool
+        self.send = send
+        self.batch_size = batch_size or int(os.getenv("OUTBOUND_BATCH_SIZE", 10))
+        self.poll_interval = poll_interval
+        self.delivered = 0
+        self.retried = 0
+        self.dead_lettered = 0
+        self._stopping = threading.Event()
+        self._drain = False
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "DeliveryWorker":
+        recovered = self.spool.recover()
+        if recovered:
+            logger.info(f"Requeued {recovered} messages interrupted by a previous shutdown")
+        self._thread = threading.Thread(target=self._run, name="outbound-delivery", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, drain: bool = True, timeout: Optional[float] = None) -> None:
+        """Stop the worker; with `drain`, first deliver every message that is already due.
+
+        Messages waiting for a retry stay in the spool and are picked up after the next start.
+        """
+        self._drain = drain
+        self._stopping.set()
+        self.spool.pending.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def _run(self) -> None:
+        while True:
+            if self._stopping.is_set() and not self._drain:
+                return
+            batch = self.spool.claim(self.batch_size)
+            if batch:
+                run_sync(self._deliver_all(batch))
+                continue
+            if self._stopping.is_set():
+                return
+            next_due = self.spool.next_due()
+            wait = self.poll_interval if next_due is None else min(self.poll_interval, max(0.0, next_due - time.time()))
+            self.spool.pending.wait(wait)
+            self.spool.pending.clear()
+
+    async def _deliver_all(self, batch: List[Tuple[str, EmailMessage]]) -> None:
+        await asyncio.gather(*(self._deliver(message_id, message) for message_id, message in batch))
+
+    async def _deliver(self, message_id: str, message: EmailMessage) -> None:
+        try:
+            await self.send(message)
+        except Exception as e:
+            if self.spool.mark_failed(message_id, f"{type(e).__name__}: {e}", permanent=is_permanent_failure(e)):
+                self.dead_lettered += 1
+                logger.error(f"Giving up on email {message_id} to {message['To']}: {e}")
+            else:
+                self.retried += 1
+                logger.warning(f"Delivery of email {message_id} failed, will retry: {e}")
+            return
+        self.spool.mark_sent(message_id)
+        self.delivered += 1
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(fraction * len(values)))]
@@ -0,0 +1,134 @@
+import math
+import os
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from datetime import time as clock_time
+from typing import Callable, Dict, Optional
+
+from Tools.availability_rules import BusinessRules
+
+# Local hours during which mail is expected (the business profile); weekends and holidays are off hours
+BUSINESS_WINDOW = (clock_time(9, 0), clock_time(18, 0))
+
+
+def backoff_delay(attempt: int, base: float, cap: float, rng: Callable[[float, float], float] = random.uniform) -> float:
+    """Exponential backoff with jitter: between half and all of min(cap, base * 2**attempt) seconds.
+
+    Args:
+        attempt: Number of failures so far, minus one (0 for the first retry)
+        base: Delay of the first retry before jitter
+        cap: Upper bound for the delay
+    """
+    return min(cap, base * 2 ** attempt) * rng(0.5, 1.0)
+
+
+class _RateProfile:
+    """Long-run arrival rate of one profile period (business or off hours), as arrivals per observed second."""
+
+    def __init__(self, window: float):
+        self.window = window
+        self.arrivals = 0.0
+        self.seconds = 0.0
+
+    def observe(self, arrivals: int, elapsed: float) -> None:
+        decay = math.exp(-elapsed / self.window)
+        self.arrivals = self.arrivals * decay + arrivals
+        self.seconds = self.seconds * decay + elapsed
+
+    @property
+    def rate(self) -> float:
+        return self.arrivals / self.seconds if self.seconds else 0.0
+
+
+class AdaptivePollScheduler:
+    """Decides when to check the mailbox next, from the rate at which mail has been arriving.
+
+    The interval is chosen so about `target_arrivals` emails arrive between two checks:
+    short while mail is coming in, long when the mailbox is quiet, and always within
+    [`min_interval`, `max_interval`]. The rate is the larger of a recent estimate
+    (exponentially decaying over `window` seconds) and the long-run rate of the current
+    profile period, business hours in `timezone` or off hours, so the first check of the
+    morning is not paced by the quiet night. Checks are spaced from the start of one cycle
+    to the start of the next, so time spent processing does not make them drift.
+    """
+
+    def __init__(
+        self,
+        min_interval: Optional[float] = None,
+        max_interval: Optional[float] = None,
+        target_arrivals: float = 0.25,
+        window: float = 900.0,
+        profile_window: float = 3 * 86400.0,
+        timezone: Optional[str] = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        """Initialize the scheduler.
+
+        Args:
+            min_interval: Shortest time between checks (POLL_MIN_INTERVAL, default 5 seconds)
+            max_interval: Longest time between checks (POLL_MAX_INTERVAL, default 300 seconds)
+            target_arrivals: Emails expected between two checks
+            window: Time constant of the recent arrival rate, in seconds
+            profile_window: Time constant of the business/off-hours rates, in seconds
+            timezone: IANA timezone of the business hours (CALCOM_USER_TIMEZONE, default Asia/Tokyo)
+            clock: Returns the current time in epoch seconds
+        """
+        self.min_interval = min_interval or float(os.getenv("POLL_MIN_INTERVAL", 5))
+        self.max_interval = max_interval or float(os.getenv("POLL_MAX_INTERVAL", 300))
+        self.target_arrivals = target_arrivals
+        self.window = window
+        self.clock = clock
+        self.rules = BusinessRules(
+            timezone=timezone or os.getenv("CALCOM_USER_TIMEZONE", "Asia/Tokyo"),
+            duration=timedelta(0),
+            windows=(BUSINESS_WINDOW,),
+        )
+        self.checks = 0
+        self._recent_rate = 0.0
+        self._profiles = {True: _RateProfile(profile_window), False: _RateProfile(profile_window)}
+        self._last_check: Optional[float] = None
+
+    def business_hours(self, now: Optional[float] = None) -> bool:
+        """True if `now` (epoch seconds) falls in local business hours on a working day."""
+        moment = datetime.fromtimestamp(self.clock() if now is None else now, tz=timezone.utc)
+        return self.rules.is_allowed(moment)
+
+    def observe(self, arrivals: int, now: Optional[float] = None) -> None:
+        """Record a completed check that found `arrivals` new emails."""
+        now = self.clock() if now is None else now
+        self.checks += 1
+        if self._last_check is not None:
+            elapsed = max(0.0, now - self._last_check)
+            self._recent_rate = self._recent_rate * math.exp(-elapsed / self.window) + arrivals / self.window
+            self._profiles[self.business_hours(now)].observe(arrivals, elapsed)
+        self._last_check = now
+
+    def rate(self, now: Optional[float] = None) -> float:
+        """Estimated arrivals per second at `now`."""
+        now = self.clock() if now is None else now
+        recent = self._recent_rate
+        if self._last_check is not None:
+            recent *= math.exp(-max(0.0, now - self._last_check) / self.window)
+        return max(recent, self._profiles[self.business_hours(now)].rate)
+
+    def interval(self, now: Optional[float] = None) -> float:
+        """Seconds between checks at the current arrival rate."""
+        rate = self.rate(now)
+        if rate <= 0:
+            return self.max_interval
+        return min(self.max_interval, max(self.min_interval, self.target_arrivals / rate))
+
+    def timeout(self, cycle_started: float) -> float:
+        """Seconds to wait after a cycle that started at `cycle_started` (epoch seconds) before the next check."""
+        now = self.clock()
+        return max(0.0, cycle_started + self.interval(now) - now)
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "checks": self.checks,
+            "interval": self.interval(),
+            "recent_rate_per_hour": self._recent_rate * 3600,
+            "business_rate_per_hour": self._profiles[True].rate * 3600,
+            "off_hours_rate_per_hour": self._profiles[False].rate * 3600,
+        }
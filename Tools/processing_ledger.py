@@ -0,0 +1,230 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, TypeVar, Union
+
+T = TypeVar("T")
+
+# Pipeline stages recorded per Message-ID
+TRIAGED = "triaged"
+ZOOM_CREATED = "zoom_created"
+BOOKED = "booked"
+RESCHEDULED = "rescheduled"
+CANCELLED = "cancelled"
+REPLIED = "replied"
+COMPLETED = "completed"
+
+_MISSING = object()
+_active = threading.local()
+
+
+class ProcessingLedger:
+    """Durable record of the side effects already performed for each email (SQLite).
+
+    Per-email stages (triaged, completed) are stored once per Message-ID with `record`.
+    Side effects (zoom_created, booked, replied, ...) belong to an agent run: while a run
+    is active (`activate`), tools wrap them in `once`, which records each result under the
+    run key (the set of emails answered together, see `run_key`), the stage and its
+    sequence number within the run. A retry of the same run after a crash replays the
+    recorded results in order instead of calling the API again, while a run that adds a
+    new email to a conversation, or a second send in the same run, performs its own side
+    effects. Results are only recorded once the side effect succeeded; a crash between
+    the API call returning and the record being written can still repeat that one call.
+    """
+
+    def __init__(self, path: Optional[str] = None, synchronous: str = "NORMAL"):
+        """Initialize the ledger.
+
+        Args:
+            path: SQLite database file (PROCESSING_LEDGER_PATH, default .processing_ledger.sqlite3)
+            synchronous: SQLite synchronous mode; NORMAL (with WAL) survives process crashes, FULL also power loss
+        """
+        self.path = path or os.getenv("PROCESSING_LEDGER_PATH", ".processing_ledger.sqlite3")
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(f"PRAGMA synchronous={synchronous}")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS ledger ("
+            " message_id TEXT NOT NULL,"
+            " stage TEXT NOT NULL,"
+            " seq INTEGER NOT NULL DEFAULT 0,"
+            " result TEXT,"
+            " recorded_at REAL NOT NULL,"
+            " PRIMARY KEY (message_id, stage, seq)"
+            ") WITHOUT ROWID"
+        )
+        # Next sequence number per (run key, stage) of the runs active in this process
+        self._sequences: Dict[Tuple[str, str], int] = {}
+
+    def record(self, message_ids: Union[str, Iterable[str]], stage: str, result: Any = None) -> None:
+        """Record a completed stage for one or more emails (the first recorded result wins)."""
+        ids = _as_list(message_ids)
+        payload = json.dumps(result)
+        now = time.time()
+        with self._lock:
+            # One transaction (and one fsync) per call, however many emails share the stage
+            self._db.execute("BEGIN")
+            try:
+                self._db.executemany(
+                    "INSERT OR IGNORE INTO ledger (message_id, stage, result, recorded_at) VALUES (?, ?, ?, ?)",
+                    [(message_id, stage, payload, now) for message_id in ids],
+                )
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+
+    def get(self, message_id: str, stage: str, default: Any = None) -> Any:
+        """Result recorded for `stage` of one email, or `default`."""
+        return self._lookup(message_id, stage, 0, default)
+
+    def has(self, message_id: str, stage: str) -> bool:
+        """True if the email has completed `stage`."""
+        return self.get(message_id, stage, _MISSING) is not _MISSING
+
+    def _lookup(self, key: str, stage: str, seq: int, default: Any) -> Any:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT result FROM ledger WHERE message_id = ? AND stage = ? AND seq = ?", (key, stage, seq)
+            ).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def _next_seq(self, key: str, stage: str) -> int:
+        with self._lock:
+            seq = self._sequences.get((key, stage), 0)
+            self._sequences[(key, stage)] = seq + 1
+        return seq
+
+    def stages(self, message_id: str) -> Dict[str, Any]:
+        """Every stage recorded for an email, in order, with its result."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT stage, result FROM ledger WHERE message_id = ? ORDER BY recorded_at", (message_id,)
+            ).fetchall()
+        return {stage: json.loads(result) for stage, result in rows}
+
+    @contextmanager
+    def activate(self, message_ids: Union[str, Iterable[str]]) -> Iterator[None]:
+        """Attribute side effects made by this thread to the given emails (one agent run).
+
+        Sequence numbers start over, so a retried run replays its side effects from the first.
+        """
+        ids = _as_list(message_ids)
+        previous = getattr(_active, "scope", None)
+        self._reset(ids)
+        _active.scope = (self, ids)
+        try:
+            yield
+        finally:
+            _active.scope = previous
+            self._reset(ids)
+
+    def _reset(self, message_ids: List[str]) -> None:
+        if not message_ids:
+            return
+        key = run_key(message_ids)
+        with self._lock:
+            for sequence in [sequence for sequence in self._sequences if sequence[0] == key]:
+                del self._sequences[sequence]
+
+    def active_ids(self) -> List[str]:
+        """Message-IDs this thread's side effects are attributed to (empty outside `activate`)."""
+        scope = getattr(_active, "scope", None)
+        return list(scope[1]) if scope is not None and scope[0] is self else []
+
+    def pending(self, message_ids: List[str], stage: str, default: Any = None) -> Any:
+        """Result the run's next `once` for `stage` would replay, or `default` if it would run."""
+        if not message_ids:
+            return default
+        key = run_key(message_ids)
+        with self._lock:
+            seq = self._sequences.get((key, stage), 0)
+        return self._lookup(key, stage, seq, default)
+
+    def forget(self, message_ids: List[str], stage: str) -> None:
+        """Remove the result of the run's last `once` for `stage`, e.g. after its side effect was rolled back."""
+        if not message_ids:
+            return
+        key = run_key(message_ids)
+        with self._lock:
+            seq = self._sequences.get((key, stage), 0) - 1
+            self._db.execute("DELETE FROM ledger WHERE message_id = ? AND stage = ? AND seq = ?", (key, stage, seq))
+
+    def once(self, stage: str, operation: Callable[[], T], succeeded: Callable[[T], bool] = lambda result: True) -> T:
+        """Run the run's next `stage` side effect, or replay its recorded result after a retry.
+
+        Outside `activate` (or for another ledger's scope) the operation simply runs.
+        """
+        scope = getattr(_active, "scope", None)
+        if scope is None or scope[0] is not self or not scope[1]:
+            return operation()
+        key = run_key(scope[1])
+        seq = self._next_seq(key, stage)
+        recorded = self._lookup(key, stage, seq, _MISSING)
+        if recorded is not _MISSING:
+            return recorded
+        result = operation()
+        if succeeded(result):
+            self._record_effect(key, stage, seq, result)
+        return result
+
+    async def aonce(
+        self,
+        message_ids: List[str],
+        stage: str,
+        operation: Callable[[], Awaitable[T]],
+        succeeded: Callable[[T], bool] = lambda result: True,
+    ) -> T:
+        """Async variant of `once` for coroutines running on another thread (pass `active_ids()` along)."""
+        if not message_ids:
+            return await operation()
+        key = run_key(message_ids)
+        seq = self._next_seq(key, stage)
+        recorded = self._lookup(key, stage, seq, _MISSING)
+        if recorded is not _MISSING:
+            return recorded
+        result = await operation()
+        if succeeded(result):
+            self._record_effect(key, stage, seq, result)
+        return result
+
+    def _record_effect(self, key: str, stage: str, seq: int, result: Any) -> None:
+        with self._lock:
+            self._db.execute(
+                "INSERT OR IGNORE INTO ledger (message_id, stage, seq, result, recorded_at) VALUES (?, ?, ?, ?, ?)",
+                (key, stage, seq, json.dumps(result), time.time()),
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+def run_once(ledger: Optional[ProcessingLedger], stage: str, operation: Callable[[], T], succeeded: Callable[[T], bool] = lambda result: True) -> T:
+    """`ledger.once(...)` that tolerates a toolkit configured without a ledger."""
+    if ledger is None:
+        return operation()
+    return ledger.once(stage, operation, succeeded)
+
+
+def run_key(message_ids: List[str]) -> str:
+    """Ledger key of an agent run: the Message-ID of a single email, or a digest of the set of emails.
+
+    Order does not matter; a conversation retried with the same emails gets the same key,
+    and one that gained an email gets a new one.
+    """
+    ids = sorted(set(message_ids))
+    if len(ids) == 1:
+        return ids[0]
+    return "run:" + hashlib.sha256("\n".join(ids).encode()).hexdigest()[:32]
+
+
+def _as_list(message_ids: Union[str, Iterable[str]]) -> List[str]:
+    if isinstance(message_ids, str):
+        return [message_ids]
+    return [message_id for message_id in message_ids if message_id]
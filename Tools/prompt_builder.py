@@ -0,0 +1,107 @@
+import hashlib
+import json
+from typing import Any, Dict, List, Optional, Sequence
+
+from Tools.body_normalizer import estimate_tokens
+
+
+class PromptBuilder:
+    """Splits agent prompts into a stable system prefix and a per-email suffix.
+
+    The prefix (instructions, email template, deployment settings such as the user's
+    name, and the tool schemas) is rendered once and is byte-identical for every
+    request, so providers that cache prompt prefixes only process the per-email
+    suffix. Everything that changes between requests (sender, subject, body) goes into
+    the suffix built by `user_prompt`. The instruction list can be swapped, e.g. for a
+    condensed set, without touching the rest.
+    """
+
+    def __init__(
+        self,
+        instructions: Sequence[str],
+        template: str = "",
+        settings: Optional[Dict[str, str]] = None,
+        tools: Optional[List[Dict[str, Any]]] = None,
+    ):
+        """Initialize the builder.
+
+        Args:
+            instructions: Agent instructions, one step or rule per entry
+            template: Email template the replies follow
+            settings: Values fixed for the deployment (e.g. {"Your name": "Taro"}), appended after the template
+            tools: Tool schemas sent with every request (see `Tools.llm_cache.tool_schemas`)
+        """
+        self.instructions = list(instructions)
+        self.template = template.strip()
+        self.settings = dict(settings or {})
+        # Sorted, so the prefix does not depend on the order toolkits were registered in
+        self.tools = sorted(tools or [], key=lambda tool: tool.get("name", ""))
+        self._system_prompt: Optional[str] = None
+
+    def system_prompt(self) -> str:
+        """The shared prefix: instructions, template and settings, identical for every request."""
+        if self._system_prompt is None:
+            sections = ["\n".join(line.rstrip() for line in self.instructions if line.strip())]
+            if self.template:
+                sections.append(f"Email template:\n{self.template}")
+            if self.settings:
+                sections.append("\n".join(f"{name}: {value}" for name, value in sorted(self.settings.items())))
+            self._system_prompt = "\n\n".join(sections)
+        return self._system_prompt
+
+    def tool_prefix(self) -> str:
+        """Canonical rendering of the tool schemas (part of the cached prefix on the provider side)."""
+        return json.dumps(self.tools, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+
+    def prefix_hash(self) -> str:
+        """Fingerprint of the whole prefix; a change means the provider's prefix cache starts cold."""
+        return hashlib.sha256((self.system_prompt() + "\0" + self.tool_prefix()).encode()).hexdigest()[:16]
+
+    def prefix_tokens(self) -> int:
+        """Estimated tokens of the system prompt plus tool schemas."""
+        return estimate_tokens(self.system_prompt()) + estimate_tokens(self.tool_prefix())
+
+    def messages(self, emails: Sequence[Sequence[Any]]) -> List[Dict[str, str]]:
+        """Chat messages for one agent run: the shared system prefix, then the emails."""
+        return [
+            {"role": "system", "content": self.system_prompt()},
+            {"role": "user", "content": self.user_prompt(emails)},
+        ]
+
+    @staticmethod
+    def user_prompt(emails: Sequence[Sequence[Any]]) -> str:
+        """Per-request suffix for one email or the new emails of one conversation (oldest first)."""
+        if len(emails) == 1:
+            email = emails[0]
+            return (
+                f"The following email was received:\n\n"
+                f"**Sender Name:** {email[0]}\n"
+                f"**Sender Email:** {email[1]}\n"
+                f"**Subject:** {email[2]}\n"
+                f"**Body:** {email[3]}\n\n"
+                "Does this email relate to a meeting, scheduling, or a request for an online discussion? "
+                "If so, proceed with the request as per the instructions provided."
+            )
+        messages = "\n\n".join(
+            f"--- Email {index} of {len(emails)} ---\n"
+            f"**Sender Name:** {email[0]}\n"
+            f"**Sender Email:** {email[1]}\n"
+            f"**Subject:** {email[2]}\n"
+            f"**Body:** {email[3]}"
+            for index, email in enumerate(emails, 1)
+        )
+        return (
+            f"The following {len(emails)} emails were received in the same conversation, oldest first:\n\n"
+            f"{messages}\n\n"
+            "Treat them as a single request: take every email into account, answer the latest one, "
+            "and book, reschedule or reply at most once for the whole conversation. "
+            "Does this conversation relate to a meeting, scheduling, or a request for an online discussion? "
+            "If so, proceed with the request as per the instructions provided."
+        )
+
+    def stats(self, emails: Optional[Sequence[Sequence[Any]]] = None) -> Dict[str, Any]:
+        """Prefix size and fingerprint, plus the suffix size for `emails` if given."""
+        result: Dict[str, Any] = {"prefix_tokens": self.prefix_tokens(), "prefix_hash": self.prefix_hash()}
+        if emails:
+            result["suffix_tokens"] = estimate_tokens(self.user_prompt(emails))
+        return result
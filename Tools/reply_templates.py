@@ -0,0 +1,218 @@
+import os
+import re
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from string import Template
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Reply kinds rendered without the model writing the email
+CONFIRMATION = "confirmation"
+DECLINE = "decline"
+
+LANGUAGES = ("en", "ja")
+
+# Hiragana, katakana and CJK ideographs
+_JAPANESE = re.compile(r"[぀-ヿ㐀-䶿一-鿿ｦ-ﾟ]")
+_WEEKDAYS_JA = "月火水木金土日"
+
+# Reasons returned by BusinessRules / CalCom, translated for Japanese replies
+_REASONS_JA = (
+    (re.compile(r"falls on a weekend"), "土日のため"),
+    (re.compile(r"falls on a non-working day"), "休業日のため"),
+    (re.compile(r"falls on a Japan national holiday \((.+)\)"), r"祝日（\1）のため"),
+    (re.compile(r"is outside business hours \((.+)\)"), r"営業時間外（\1）のため"),
+    (re.compile(r"is already booked or not offered"), "すでに予定が入っているため"),
+)
+
+# (subject, body) per kind and language, compiled once. Values are filled in by `render`;
+# [join_url] and [meeting_id] are left for MeetingConfirmationTool to replace.
+TEMPLATES: Dict[Tuple[str, str], Tuple[Template, Template]] = {
+    (CONFIRMATION, "en"): (
+        Template("Meeting confirmed: $topic ($start_time)"),
+        Template(
+            "Dear $attendee_name,\n\n"
+            "Thank you for your email. Our meeting is confirmed.\n\n"
+            "- **Topic:** $topic\n"
+            "- **Date and time:** $start_time ($duration minutes)\n"
+            "- **Zoom link:** [join_url]\n"
+            "- **Meeting ID:** [meeting_id]\n"
+            "$note\n"
+            "I look forward to speaking with you.\n\n"
+            "Best regards,\n"
+            "$sender_name\n"
+        ),
+    ),
+    (CONFIRMATION, "ja"): (
+        Template("【日程確定】$topic（$start_time）"),
+        Template(
+            "$attendee_name 様\n\n"
+            "お世話になっております。$sender_name です。\n\n"
+            "ご連絡いただきありがとうございます。下記の日程で打ち合わせを確定いたしました。\n\n"
+            "- **件名:** $topic\n"
+            "- **日時:** $start_time（$duration分）\n"
+            "- **Zoom URL:** [join_url]\n"
+            "- **ミーティングID:** [meeting_id]\n"
+            "$note\n"
+            "何卒よろしくお願い申し上げます。\n\n"
+            "$sender_name\n"
+        ),
+    ),
+    (DECLINE, "en"): (
+        Template("Re: $subject"),
+        Template(
+            "Dear $attendee_name,\n\n"
+            "Thank you for your meeting request. Unfortunately, I am not available at $requested_time, "
+            "as it $reason. I apologize for the inconvenience.\n\n"
+            "$alternatives\n"
+            "$note\n"
+            "Best regards,\n"
+            "$sender_name\n"
+        ),
+    ),
+    (DECLINE, "ja"): (
+        Template("Re: $subject"),
+        Template(
+            "$attendee_name 様\n\n"
+            "お世話になっております。$sender_name です。\n\n"
+            "打ち合わせのご依頼をいただきありがとうございます。"
+            "大変申し訳ございませんが、ご提案いただいた $requested_time は$reasonお受けすることができません。\n\n"
+            "$alternatives\n"
+            "$note\n"
+            "お手数をおかけいたしますが、ご検討のほど何卒よろしくお願い申し上げます。\n\n"
+            "$sender_name\n"
+        ),
+    ),
+}
+
+_ALTERNATIVES = {
+    "en": ("Would one of the following times work for you instead?\n", "I have no free slots in the coming weeks; I will get back to you with a new proposal.\n"),
+    "ja": ("以下の日程はいかがでしょうか。\n", "直近で空いている日程がございませんので、改めてご連絡させていただきます。\n"),
+}
+
+_active = threading.local()
+
+
+def detect_language(text: str, threshold: float = 0.1) -> str:
+    """"ja" if at least `threshold` of the letters are Japanese, otherwise "en"."""
+    letters = [char for char in text if char.isalpha()]
+    if not letters:
+        return "en"
+    japanese = sum(1 for char in letters if _JAPANESE.match(char))
+    return "ja" if japanese / len(letters) >= threshold else "en"
+
+
+class ReplyRenderer:
+    """Renders the confirmation and decline emails from templates instead of letting the model write them.
+
+    The model only chooses the case (and may add a short note); names, times, the Zoom
+    link and the alternative slots come from the tool results, so the reply costs no
+    output tokens and never contains an unfilled placeholder. The language follows the
+    email being answered (see `activate`), English or Japanese.
+    """
+
+    def __init__(self, sender_name: Optional[str] = None, default_language: Optional[str] = None):
+        """Initialize the renderer.
+
+        Args:
+            sender_name: Name the replies are signed with (UserName)
+            default_language: "en" or "ja", used when there is no email to detect the language from (EMAIL_LANGUAGE)
+        """
+        self.sender_name = sender_name or os.getenv("UserName") or ""
+        language = (default_language or os.getenv("EMAIL_LANGUAGE") or "").lower()[:2]
+        self.default_language = language if language in LANGUAGES else "en"
+
+    @contextmanager
+    def activate(self, emails: Sequence[Sequence[Any]]) -> Iterator[None]:
+        """Make the latest of `emails` the one this thread's replies answer (e.g. one agent run)."""
+        previous = getattr(_active, "email", None)
+        _active.email = emails[-1] if emails else None
+        try:
+            yield
+        finally:
+            _active.email = previous
+
+    @staticmethod
+    def active_email() -> Optional[Sequence[Any]]:
+        """The email this thread is answering (None outside `activate`)."""
+        return getattr(_active, "email", None)
+
+    def language(self, text: Optional[str] = None) -> str:
+        """Reply language for `text`, or for the active email if omitted."""
+        if text is None:
+            return self.language_of(self.active_email())
+        return detect_language(text) if text.strip() else self.default_language
+
+    def language_of(self, email: Optional[Sequence[Any]]) -> str:
+        """Reply language for an email (subject and body)."""
+        return self.language(f"{email[2]}\n{email[3]}" if email else "")
+
+    def render(self, kind: str, language: str, **values: Any) -> Tuple[str, str]:
+        """Fill the (subject, body) template of `kind` in `language`.
+
+        Raises:
+            KeyError: If the kind/language is unknown or a template value is missing
+        """
+        subject, body = TEMPLATES[(kind, language)]
+        values.setdefault("sender_name", self.sender_name)
+        note = str(values.get("note") or "").strip()
+        values["note"] = f"\n{note}\n" if note else ""
+        text = re.sub(r"\n{3,}", "\n\n", body.substitute(values))
+        return subject.substitute(values).strip(), text.strip() + "\n"
+
+    def confirmation(
+        self, attendee_name: str, topic: str, start: datetime, duration: int, note: str = "", language: Optional[str] = None
+    ) -> Tuple[str, str]:
+        """Subject and body of a confirmation; [join_url] and [meeting_id] are filled in after scheduling."""
+        language = language or self.language()
+        return self.render(
+            CONFIRMATION,
+            language,
+            attendee_name=attendee_name,
+            topic=topic,
+            start_time=format_time(start, language),
+            duration=duration,
+            note=note,
+        )
+
+    def decline(
+        self,
+        attendee_name: str,
+        subject: str,
+        requested: datetime,
+        reason: str,
+        alternatives: List[datetime],
+        note: str = "",
+        language: Optional[str] = None,
+    ) -> Tuple[str, str]:
+        """Subject and body of a decline with the reason and the alternative slots."""
+        language = language or self.language()
+        intro, none = _ALTERNATIVES[language]
+        slots = "".join(f"- {format_time(start, language)}\n" for start in alternatives)
+        return self.render(
+            DECLINE,
+            language,
+            attendee_name=attendee_name,
+            subject=re.sub(r"^(re:\s*)+", "", subject.strip(), flags=re.IGNORECASE),
+            requested_time=format_time(requested, language),
+            reason=translate_reason(reason, language),
+            alternatives=intro + slots if alternatives else none,
+            note=note,
+        )
+
+
+def format_time(start: datetime, language: str) -> str:
+    """A local start time as written in a reply, e.g. "Fri, Jan 10, 2025 14:00 JST" or "2025年1月10日(金) 14:00"."""
+    if language == "ja":
+        return f"{start.year}年{start.month}月{start.day}日({_WEEKDAYS_JA[start.weekday()]}) {start:%H:%M}"
+    return start.strftime("%a, %b %d, %Y %H:%M %Z").strip()
+
+
+def translate_reason(reason: str, language: str) -> str:
+    """An availability reason ("falls on a weekend", ...) in the reply language."""
+    if language != "ja":
+        return reason
+    for pattern, replacement in _REASONS_JA:
+        if pattern.fullmatch(reason):
+            return pattern.sub(replacement, reason)
+    return "ご都合がつかないため"
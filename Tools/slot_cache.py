@@ -0,0 +1,134 @@
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+
+def day_range(start: date, end: date) -> List[date]:
+    """Every day from `start` to `end`, inclusive."""
+    return [start + timedelta(days=i) for i in range((end - start).days + 1)]
+
+
+def merge_days(days: Iterable[date]) -> List[Tuple[date, date]]:
+    """Merge days into the fewest contiguous (first, last) ranges."""
+    ranges: List[Tuple[date, date]] = []
+    for day in sorted(set(days)):
+        if ranges and day == ranges[-1][1] + timedelta(days=1):
+            ranges[-1] = (ranges[-1][0], day)
+        else:
+            ranges.append((day, day))
+    return ranges
+
+
+class SlotCache:
+    """In-memory TTL cache of available slots, keyed by (event type, UTC day).
+
+    A lookup for a date range returns the cached days plus the contiguous ranges
+    still missing, so overlapping requests only fetch the days nobody asked for yet.
+    Days touched by a booking change are invalidated immediately; everything else
+    expires after `ttl` seconds so bookings made elsewhere are picked up.
+
+    Each (event type, day) has a generation that `invalidate` bumps. `lookup` returns the
+    generations of the missing days and `store` skips days whose generation changed since,
+    so a fetch still in flight when a booking is made cannot re-cache the booked slot.
+    """
+
+    def __init__(self, ttl: float = 300.0, clock: Callable[[], float] = time.monotonic):
+        """Initialize the cache.
+
+        Args:
+            ttl: Seconds a fetched day stays valid (0 disables caching)
+            clock: Monotonic time source
+        """
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._days: Dict[Tuple[Hashable, date], Tuple[float, List[datetime]]] = {}
+        # Bumped by invalidate: per day, and per event type when every day is dropped
+        self._generations: Dict[Tuple[Hashable, date], int] = {}
+        self._epochs: Dict[Hashable, int] = {}
+        self._lock = threading.Lock()
+
+    def _generation(self, event_type: Hashable, day: date) -> Tuple[int, int]:
+        return self._epochs.get(event_type, 0), self._generations.get((event_type, day), 0)
+
+    def lookup(
+        self, event_type: Hashable, start: date, end: date
+    ) -> Tuple[Dict[date, List[datetime]], List[Tuple[date, date]], Dict[date, Tuple[int, int]]]:
+        """Split a date range into cached days and missing ranges.
+
+        Returns:
+            Tuple: ({day: [slot starts]} for fresh cached days, [(first, last)] ranges to fetch,
+            {day: generation} of the missing days, to pass to `store`)
+        """
+        now = self.clock()
+        cached: Dict[date, List[datetime]] = {}
+        missing: List[date] = []
+        generations: Dict[date, Tuple[int, int]] = {}
+        with self._lock:
+            for day in day_range(start, end):
+                entry = self._days.get((event_type, day))
+                if entry is not None and now - entry[0] < self.ttl:
+                    cached[day] = entry[1]
+                else:
+                    self._days.pop((event_type, day), None)
+                    missing.append(day)
+                    generations[day] = self._generation(event_type, day)
+            self.hits += len(cached)
+            self.misses += len(missing)
+        return cached, merge_days(missing), generations
+
+    def store(
+        self,
+        event_type: Hashable,
+        start: date,
+        end: date,
+        slots: Iterable[datetime],
+        generations: Optional[Dict[date, Tuple[int, int]]] = None,
+    ) -> None:
+        """Cache the (timezone-aware) slot starts fetched for a range; days without slots are cached as empty.
+
+        Days whose generation differs from `generations` (as returned by `lookup` before the
+        fetch) were invalidated while the fetch was in flight and are not cached.
+        """
+        if self.ttl <= 0:
+            return
+        by_day: Dict[date, List[datetime]] = {day: [] for day in day_range(start, end)}
+        for slot in slots:
+            day = slot.astimezone(timezone.utc).date()
+            if day in by_day:
+                by_day[day].append(slot)
+        now = self.clock()
+        with self._lock:
+            for day, times in by_day.items():
+                if generations is not None and generations.get(day) != self._generation(event_type, day):
+                    continue
+                self._days[(event_type, day)] = (now, times)
+
+    def invalidate(self, event_type: Hashable, days: Optional[Iterable[date]] = None) -> None:
+        """Drop the given days (or every day) cached for an event type."""
+        with self._lock:
+            if days is None:
+                self._epochs[event_type] = self._epochs.get(event_type, 0) + 1
+                for key in [key for key in self._days if key[0] == event_type]:
+                    del self._days[key]
+            else:
+                for day in days:
+                    self._generations[(event_type, day)] = self._generations.get((event_type, day), 0) + 1
+                    self._days.pop((event_type, day), None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._days.clear()
+
+    def stats(self) -> Dict[str, float]:
+        """Hit/miss counters (counted per day looked up)."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "cached_days": len(self._days),
+            }
@@ -0,0 +1,178 @@
+import asyncio
+import os
+import ssl
+from dataclasses import dataclass, field
+from email.message import EmailMessage
+from typing import List, Optional, Tuple
+
+import aiosmtplib
+from phi.utils.log import logger
+
+from Tools.async_utils import LoopLocal
+from Tools.telemetry import record_retry
+
+# Implicit TLS ports; everything else upgrades with STARTTLS
+IMPLICIT_TLS_PORTS = {465}
+
+
+def create_tls_context(verify: bool = True, ca_file: Optional[str] = None) -> ssl.SSLContext:
+    """TLS context for SMTP: system trust store (plus `ca_file`), hostname checking on."""
+    context = ssl.create_default_context(cafile=ca_file)
+    if not verify:
+        logger.warning("SMTP certificate verification is disabled")
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+    return context
+
+
+@dataclass
+class _LoopPool:
+    semaphore: asyncio.Semaphore
+    # (connection, loop time it was last used), most recently used last
+    idle: List[Tuple[aiosmtplib.SMTP, float]] = field(default_factory=list)
+
+
+class SMTPPool:
+    """Pool of authenticated SMTP connections kept open between sends.
+
+    Connections are created per event loop (the synchronous toolkit methods all run on
+    the shared tool loop) and reused for later messages, so a burst of replies pays for
+    one TCP connect, TLS handshake and login per pooled connection instead of per email.
+    A connection that sat idle for `noop_after` seconds is checked with NOOP before use;
+    a 421 reply or a dropped connection discards it and the message is retried on a
+    fresh one. Certificates are verified against the system trust store (or `ca_file`).
+    """
+
+    def __init__(
+        self,
+        hostname: str,
+        port: int,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        pool_size: Optional[int] = None,
+        timeout: Optional[float] = None,
+        tls: Optional[str] = None,
+        verify_cert: Optional[bool] = None,
+        ca_file: Optional[str] = None,
+        noop_after: float = 30.0,
+        max_retries: int = 2,
+    ):
+        """Initialize the pool.
+
+        Args:
+            hostname: SMTP server host
+            port: SMTP server port
+            username: Login user (no AUTH when None)
+            password: Login password
+            pool_size: Maximum open connections per event loop (SMTP_POOL_SIZE, default 2)
+            timeout: Socket timeout in seconds (SMTP_TIMEOUT, default 30)
+            tls: "ssl" (implicit TLS), "starttls" or "none" (SMTP_TLS, default "ssl" on port 465, else "starttls")
+            verify_cert: Verify the server certificate and hostname (SMTP_VERIFY_CERT, default true)
+            ca_file: Extra CA bundle to trust, e.g. for a private relay (SMTP_CA_FILE)
+            noop_after: Idle seconds after which a pooled connection is checked with NOOP before reuse
+            max_retries: Reconnect-and-resend attempts after a 421 or a dropped connection
+        """
+        self.hostname = hostname
+        self.port = port
+        self.username = username
+        self.password = password
+        self.pool_size = pool_size or int(os.getenv("SMTP_POOL_SIZE", 2))
+        self.timeout = timeout or float(os.getenv("SMTP_TIMEOUT", 30))
+        self.tls = (tls or os.getenv("SMTP_TLS") or ("ssl" if port in IMPLICIT_TLS_PORTS else "starttls")).lower()
+        if verify_cert is None:
+            verify_cert = os.getenv("SMTP_VERIFY_CERT", "true").lower() not in ("0", "false", "no")
+        self.tls_context = create_tls_context(verify_cert, ca_file or os.getenv("SMTP_CA_FILE"))
+        self.noop_after = noop_after
+        self.max_retries = max_retries
+        self.connections = 0
+        self.reconnects = 0
+        self.sent = 0
+        self._pools: LoopLocal[_LoopPool] = LoopLocal(lambda: _LoopPool(asyncio.Semaphore(self.pool_size)))
+
+    async def send(self, message: EmailMessage) -> None:
+        """Send a message over a pooled connection.
+
+        Raises:
+            aiosmtplib.SMTPException: If the server rejects the message or every attempt fails
+        """
+        pool = self._pools.get()
+        async with pool.semaphore:
+            for attempt in range(self.max_retries + 1):
+                smtp = await self._checkout(pool)
+                try:
+                    await smtp.send_message(message)
+                except (aiosmtplib.SMTPServerDisconnected, aiosmtplib.SMTPResponseException, OSError) as e:
+                    if getattr(e, "code", 421) != 421:
+                        # The message was refused and the envelope reset; the connection is still usable
+                        self._release(pool, smtp)
+                        raise
+                    await self._close(smtp)
+                    if attempt == self.max_retries:
+                        raise
+                    logger.warning(f"SMTP connection lost ({e}), resending on a new connection")
+                    self.reconnects += 1
+                    record_retry()
+                    continue
+                except aiosmtplib.SMTPRecipientsRefused:
+                    self._release(pool, smtp)
+                    raise
+                except BaseException:
+                    # The transaction state is unknown; do not hand this connection out again
+                    await self._close(smtp)
+                    raise
+                self.sent += 1
+                self._release(pool, smtp)
+                return
+
+    async def close(self) -> None:
+        """QUIT every idle connection of the current event loop."""
+        pool = self._pools.get()
+        while pool.idle:
+            smtp, _ = pool.idle.pop()
+            await self._close(smtp, quit=True)
+
+    async def _checkout(self, pool: _LoopPool) -> aiosmtplib.SMTP:
+        now = asyncio.get_running_loop().time()
+        while pool.idle:
+            smtp, last_used = pool.idle.pop()
+            if not smtp.is_connected:
+                continue
+            if now - last_used >= self.noop_after:
+                try:
+                    await smtp.noop()
+                except (aiosmtplib.SMTPException, OSError):
+                    await self._close(smtp)
+                    continue
+            return smtp
+        return await self._connect()
+
+    @staticmethod
+    def _release(pool: _LoopPool, smtp: aiosmtplib.SMTP) -> None:
+        if smtp.is_connected:
+            pool.idle.append((smtp, asyncio.get_running_loop().time()))
+
+    async def _connect(self) -> aiosmtplib.SMTP:
+        smtp = aiosmtplib.SMTP(
+            hostname=self.hostname,
+            port=self.port,
+            username=self.username,
+            password=self.password,
+            timeout=self.timeout,
+            use_tls=self.tls == "ssl",
+            start_tls=self.tls == "starttls",
+            tls_context=self.tls_context,
+        )
+        # connect() also upgrades with STARTTLS and logs in
+        await smtp.connect()
+        self.connections += 1
+        return smtp
+
+    @staticmethod
+    async def _close(smtp: aiosmtplib.SMTP, quit: bool = False) -> None:
+        try:
+            if quit and smtp.is_connected:
+                await smtp.quit()
+            else:
+                smtp.close()
+        except (aiosmtplib.SMTPException, OSError):
+            smtp.close()
@@ -0,0 +1,380 @@
+import bisect
+import functools
+import inspect
+import json
+import os
+import random
+import threading
+import time
+from contextvars import ContextVar
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from phi.utils.log import logger
+
+# Histogram bucket bounds per measurement
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+TOKENS_BUCKETS = (16, 64, 256, 1024, 4096, 16384, 65536)
+HISTOGRAMS = {
+    "duration_seconds": ("Latency of instrumented calls", DURATION_BUCKETS),
+    "bytes": ("Size of the results of instrumented calls", BYTES_BUCKETS),
+    "tokens": ("Model tokens used per call", TOKENS_BUCKETS),
+}
+COUNTERS = {
+    "errors_total": "Instrumented calls that raised",
+    "retries_total": "Retries inside instrumented calls (HTTP, IMAP, SMTP, fetch)",
+}
+# Finished spans are written to the trace file once this many are pending, or this many seconds passed
+EXPORT_BATCH = 512
+EXPORT_INTERVAL = 1.0
+# OTLP status codes
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+_current: ContextVar[Optional["Span"]] = ContextVar("telemetry_span", default=None)
+
+
+class Histogram:
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Span:
+    """One timed operation (a context manager); nested spans share the trace of the outermost one, the root."""
+
+    __slots__ = (
+        "telemetry", "name", "stage", "operation", "trace_id", "span_id", "parent", "root",
+        "start_ns", "end_ns", "attributes", "error", "stage_seconds", "_token",
+    )
+
+    def __init__(self, telemetry: "Telemetry", name: str, stage: str, attributes: Dict[str, Any]):
+        self.telemetry = telemetry
+        self.name = name
+        self.stage = stage
+        self.operation = name.rsplit(".", 1)[-1]
+        self.attributes = attributes
+        self.error: Optional[str] = None
+        self.end_ns = 0
+
+    def __enter__(self) -> "Span":
+        parent = self.parent = _current.get()
+        self.root = parent.root if parent is not None else self
+        # Ids are formatted as hex only when exported
+        self.trace_id = parent.trace_id if parent is not None else random.getrandbits(128)
+        self.span_id = random.getrandbits(64)
+        # Root spans only: inclusive seconds spent per stage within the trace
+        self.stage_seconds: Optional[Dict[str, float]] = {} if parent is None else None
+        self._token = _current.set(self)
+        self.start_ns = time.time_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        self.end_ns = time.time_ns()
+        _current.reset(self._token)
+        if exc_type is not None:
+            self.error = f"{exc_type.__name__}: {exc}"
+        self.telemetry._finish(self)
+
+    @property
+    def duration(self) -> float:
+        return (self.end_ns - self.start_ns) / 1e9
+
+    def set(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def add(self, key: str, amount: float = 1) -> None:
+        self.attributes[key] = self.attributes.get(key, 0) + amount
+
+    def to_otlp(self) -> Dict[str, Any]:
+        span = {
+            "traceId": f"{self.trace_id:032x}",
+            "spanId": f"{self.span_id:016x}",
+            "name": self.name,
+            "kind": 1,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [_otlp_attribute("agent.stage", self.stage)]
+            + [_otlp_attribute(key, value) for key, value in self.attributes.items()],
+            "status": {"code": STATUS_ERROR, "message": self.error} if self.error else {"code": STATUS_OK},
+        }
+        if self.parent is not None:
+            span["parentSpanId"] = f"{self.parent.span_id:016x}"
+        if self.stage_seconds:
+            span["attributes"] += [
+                _otlp_attribute(f"agent.stage_seconds.{stage}", round(seconds, 6)) for stage, seconds in self.stage_seconds.items()
+            ]
+        return span
+
+
+class Telemetry:
+    """Spans and per-stage metrics for the email-to-reply pipeline.
+
+    `instrument` wraps the public methods of a toolkit (sync and async) so every call is a
+    span labelled with a stage ("imap", "calcom", ...). Spans nest through a context
+    variable, which `run_sync` carries to the tool event loop, and an outer `span` (one
+    per handled conversation) ties the calls made for an email into one trace; its
+    attributes include the message ids and the inclusive seconds spent per stage.
+
+    Finished spans are appended to `trace_path` as OTLP/JSON, one export request per line
+    (the format of the OpenTelemetry Collector file exporter). Latency, result size, token
+    and retry histograms/counters are kept per stage and operation, without per-email
+    labels, and are served in the Prometheus text format by `serve`.
+    """
+
+    def __init__(self, trace_path: Optional[str] = None, service_name: str = "ai-agent4email"):
+        """Initialize telemetry.
+
+        Args:
+            trace_path: File spans are appended to (TRACE_PATH; no span export if unset)
+            service_name: `service.name` resource attribute of exported spans
+        """
+        self.trace_path = trace_path or os.getenv("TRACE_PATH")
+        self.service_name = service_name
+        self.spans = 0
+        self._histograms: Dict[Tuple[str, str, str], Histogram] = {}
+        self._counters: Dict[Tuple[str, str, str], float] = {}
+        self._pending: List[Span] = []
+        self._exported_at = time.monotonic()
+        self._lock = threading.Lock()
+        self._export_lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    def span(self, name: str, stage: str, **attributes: Any) -> Span:
+        """A span timing the enclosed `with` block (a child of the current span, if any)."""
+        return Span(self, name, stage, attributes)
+
+    def instrument(self, toolkit: Any, stage: str, exclude: Sequence[str] = ()) -> Any:
+        """Wrap the public methods of `toolkit` (those defined in Tools/) with spans.
+
+        Registered tool functions are rewrapped too, so calls made by the agent are traced,
+        including tools the toolkit inherits from phi.
+
+        Args:
+            toolkit: Toolkit instance (or any object) to instrument in place
+            stage: Stage label of its spans and metrics
+            exclude: Method names to leave alone
+
+        Returns:
+            The toolkit
+        """
+        for name, method in _public_methods(toolkit):
+            if name in exclude:
+                continue
+            wrapped = self.wrap(method, stage, name)
+            setattr(toolkit, name, wrapped)
+            function = getattr(toolkit, "functions", {}).get(name)
+            if function is not None:
+                function.entrypoint = wrapped
+        return toolkit
+
+    def wrap(self, function: Callable, stage: str, name: Optional[str] = None) -> Callable:
+        """Return `function` (sync or async) timed as a span named `stage.name`."""
+        span_name = f"{stage}.{name or function.__name__}"
+        if inspect.iscoroutinefunction(function):
+
+            @functools.wraps(function)
+            async def traced_async(*args, **kwargs):
+                with Span(self, span_name, stage, {}) as span:
+                    result = await function(*args, **kwargs)
+                    _record_size(span, result)
+                    return result
+
+            return traced_async
+
+        @functools.wraps(function)
+        def traced(*args, **kwargs):
+            with Span(self, span_name, stage, {}) as span:
+                result = function(*args, **kwargs)
+                _record_size(span, result)
+                return result
+
+        return traced
+
+    def count(self, metric: str, stage: str, operation: str, amount: float = 1) -> None:
+        with self._lock:
+            key = (metric, stage, operation)
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def prometheus(self) -> str:
+        """Every metric in the Prometheus text exposition format."""
+        with self._lock:
+            histograms = {key: (list(h.counts), h.sum, h.count, h.buckets) for key, h in self._histograms.items()}
+            counters = dict(self._counters)
+        lines = []
+        for metric, (description, _) in HISTOGRAMS.items():
+            lines += [f"# HELP agent_stage_{metric} {description}", f"# TYPE agent_stage_{metric} histogram"]
+            for (name, stage, operation), (counts, total, count, buckets) in sorted(histograms.items()):
+                if name != metric:
+                    continue
+                labels = f'stage="{stage}",operation="{operation}"'
+                cumulative = 0
+                for bound, bucket_count in zip([*buckets, "+Inf"], counts):
+                    cumulative += bucket_count
+                    lines.append(f'agent_stage_{metric}_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f"agent_stage_{metric}_sum{{{labels}}} {total:.6f}")
+                lines.append(f"agent_stage_{metric}_count{{{labels}}} {count}")
+        for metric, description in COUNTERS.items():
+            lines += [f"# HELP agent_stage_{metric} {description}", f"# TYPE agent_stage_{metric} counter"]
+            for (name, stage, operation), value in sorted(counters.items()):
+                if name == metric:
+                    lines.append(f'agent_stage_{metric}{{stage="{stage}",operation="{operation}"}} {value:g}')
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+        """Serve `prometheus()` at http://host:port/metrics from a background thread."""
+        telemetry = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = telemetry.prometheus().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), MetricsHandler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="metrics-server", daemon=True).start()
+        logger.info(f"Serving metrics at http://{host}:{self._server.server_address[1]}/metrics")
+        return self._server
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Per stage and operation: calls, errors and mean/total latency in seconds."""
+        with self._lock:
+            result = {}
+            for (metric, stage, operation), histogram in self._histograms.items():
+                if metric == "duration_seconds":
+                    result[f"{stage}.{operation}"] = {
+                        "calls": histogram.count,
+                        "errors": self._counters.get(("errors_total", stage, operation), 0),
+                        "total_seconds": histogram.sum,
+                        "mean_seconds": histogram.sum / histogram.count,
+                    }
+            return result
+
+    def flush(self) -> None:
+        """Write the finished spans not exported yet."""
+        with self._lock:
+            spans, self._pending = self._pending, []
+            self._exported_at = time.monotonic()
+        if not spans or not self.trace_path:
+            return
+        request = {
+            "resourceSpans": [{
+                "resource": {"attributes": [_otlp_attribute("service.name", self.service_name)]},
+                "scopeSpans": [{"scope": {"name": "Tools.telemetry"}, "spans": [span.to_otlp() for span in spans]}],
+            }]
+        }
+        line = json.dumps(request, ensure_ascii=False, separators=(",", ":")) + "\n"
+        with self._export_lock, open(self.trace_path, "a", encoding="utf-8") as f:
+            f.write(line)
+
+    def close(self) -> None:
+        self.flush()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def _finish(self, span: Span) -> None:
+        duration = span.duration
+        operation = span.operation
+        parent = span.parent
+        if parent is None or parent.stage != span.stage:
+            # Outermost span of its stage (a sync wrapper and its async variant count once)
+            stage_seconds = span.root.stage_seconds
+            stage_seconds[span.stage] = stage_seconds.get(span.stage, 0.0) + duration
+        with self._lock:
+            self.spans += 1
+            self._observe("duration_seconds", span.stage, operation, duration)
+            for metric in ("bytes", "tokens"):
+                if metric in span.attributes:
+                    self._observe(metric, span.stage, operation, span.attributes[metric])
+            if span.error:
+                key = ("errors_total", span.stage, operation)
+                self._counters[key] = self._counters.get(key, 0) + 1
+            if self.trace_path:
+                self._pending.append(span)
+                export = len(self._pending) >= EXPORT_BATCH or (
+                    parent is None and time.monotonic() - self._exported_at >= EXPORT_INTERVAL
+                )
+            else:
+                export = False
+        if export:
+            self.flush()
+
+    def _observe(self, metric: str, stage: str, operation: str, value: float) -> None:
+        # Caller holds the lock
+        key = (metric, stage, operation)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            histogram = self._histograms[key] = Histogram(HISTOGRAMS[metric][1])
+        histogram.observe(value)
+
+
+def current_span() -> Optional[Span]:
+    """The span of the calling code, or None if it is not traced."""
+    return _current.get()
+
+
+def record_retry(stage: Optional[str] = None) -> None:
+    """Count a retry against the current span (no-op outside a span)."""
+    span = _current.get()
+    if span is None:
+        return
+    span.add("retries")
+    span.telemetry.count("retries_total", stage or span.stage, span.operation)
+
+
+def _record_size(span: Span, result: Any) -> None:
+    if isinstance(result, (str, bytes)):
+        span.attributes["bytes"] = len(result)
+
+
+def _public_methods(toolkit: Any) -> Iterator[Tuple[str, Callable]]:
+    """Public methods defined by the toolkit's own classes in Tools/, then its registered tool functions.
+
+    Other methods of phi's classes (Toolkit helpers) are left alone.
+    """
+    seen = set()
+    for cls in type(toolkit).__mro__:
+        if not cls.__module__.startswith("Tools."):
+            continue
+        for name, member in vars(cls).items():
+            if name.startswith("_") or name in seen or not inspect.isfunction(member):
+                continue
+            seen.add(name)
+            yield name, getattr(toolkit, name)
+    for name, function in list(getattr(toolkit, "functions", {}).items()):
+        if name not in seen and function.entrypoint is not None:
+            seen.add(name)
+            yield name, function.entrypoint
+
+
+def _otlp_attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        typed = {"boolValue": value}
+    elif isinstance(value, int):
+        typed = {"intValue": str(value)}
+    elif isinstance(value, float):
+        typed = {"doubleValue": value}
+    elif isinstance(value, (list, tuple)):
+        typed = {"arrayValue": {"values": [_otlp_attribute("", item)["value"] for item in value]}}
+    else:
+        typed = {"stringValue": str(value)}
+    return {"key": key, "value": typed}
@@ -0,0 +1,245 @@
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Callable, Deque, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+from phi.utils.log import logger
+
+# Number of recent dispatches the per-tenant wait percentiles are computed over
+WAIT_WINDOW = 1000
+
+
+class TokenBucket:
+    """Rate limiter allowing `rate` acquisitions per second on average and bursts of `burst`."""
+
+    def __init__(self, rate: float, burst: int = 1, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.clock = clock
+        self._tokens = float(self.burst)
+        self._updated = clock()
+
+    def try_acquire(self) -> float:
+        """Take a token if one is available.
+
+        Returns:
+            float: 0.0 if a token was taken, otherwise the seconds until the next one is
+        """
+        now = self.clock()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        return (1 - self._tokens) / self.rate
+
+
+class _Tenant:
+    def __init__(self, max_concurrency: int, rate_limit: float, burst: int):
+        self.max_concurrency = max(1, max_concurrency)
+        # Emails waiting per conversation, with the time they were submitted
+        self.lanes: "OrderedDict[Hashable, Deque[Tuple[float, Any]]]" = OrderedDict()
+        self.busy: Set[Hashable] = set()
+        self.queued: Set[Hashable] = set()
+        self.running = 0
+        self.limiter = TokenBucket(rate_limit / 60, burst) if rate_limit > 0 else None
+        self.processed = 0
+        self.failed = 0
+        self.waits: Deque[float] = deque(maxlen=WAIT_WINDOW)
+
+    def ready_lane(self) -> Optional[Hashable]:
+        for key, lane in self.lanes.items():
+            if lane and key not in self.busy:
+                return key
+        return None
+
+
+class FairScheduler:
+    """Worker pool shared by many tenants (mailboxes), served round-robin.
+
+    Each tenant has its own queue of conversations (lanes, like `EmailPipeline` with
+    `coalesce`): the new emails of one conversation are handled together and runs for
+    the same conversation never overlap. Workers take the next tenant in turn that has
+    a ready conversation, is below its `max_concurrency` and, if it has a `rate_limit`,
+    has a token left, so a tenant with a large backlog cannot starve the others.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[str, List[Any]], None],
+        workers: int = 4,
+        key: Callable[[Any], Hashable] = lambda email: email[6],
+        item_id: Callable[[Any], Hashable] = lambda email: email[4],
+    ):
+        """Initialize the scheduler and start its workers.
+
+        Args:
+            handler: Called from a worker thread with the tenant name and the emails of one conversation
+            workers: Number of worker threads shared by all tenants
+            key: Returns the conversation of an email (emails with equal keys are handled together, in order)
+            item_id: Returns an id, unique per tenant, used to drop duplicate submissions
+        """
+        self.handler = handler
+        self.key = key
+        self.item_id = item_id
+        self.dispatched = 0
+        self._tenants: Dict[str, _Tenant] = {}
+        # Round-robin order; the tenant served last moves to the end
+        self._order: Deque[str] = deque()
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._closed = False
+        self._workers = [
+            threading.Thread(target=self._work, name=f"tenant-worker-{index}", daemon=True) for index in range(workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def add_tenant(self, name: str, max_concurrency: int = 1, rate_limit: float = 0.0, burst: int = 1) -> None:
+        """Register a tenant.
+
+        Args:
+            name: Tenant name used in `submit_all`
+            max_concurrency: Conversations of this tenant handled at the same time
+            rate_limit: Handler calls per minute (0 for no limit)
+            burst: Calls allowed back to back before the rate limit applies
+        """
+        with self._lock:
+            if name not in self._tenants:
+                self._order.append(name)
+            self._tenants[name] = _Tenant(max_concurrency, rate_limit, burst)
+
+    def submit_all(self, tenant: str, emails: Iterable[Any]) -> int:
+        """Queue emails of a tenant; duplicates of queued or running emails are dropped.
+
+        Returns:
+            int: Number of emails queued
+        """
+        now = time.monotonic()
+        queued = 0
+        with self._lock:
+            if self._closed:
+                return 0
+            state = self._tenants[tenant]
+            for email in emails:
+                item_id = self.item_id(email)
+                if item_id in state.queued:
+                    continue
+                state.queued.add(item_id)
+                state.lanes.setdefault(self.key(email), deque()).append((now, email))
+                queued += 1
+            if queued:
+                self._changed.notify_all()
+        return queued
+
+    def pending(self, tenant: Optional[str] = None) -> int:
+        """Number of emails queued or being processed (for one tenant, or all)."""
+        with self._lock:
+            states = [self._tenants[tenant]] if tenant else self._tenants.values()
+            return sum(len(state.queued) for state in states)
+
+    def drain(self, timeout: Optional[float] = None) -> bool:
+        """Block until every submitted email has been processed."""
+        with self._changed:
+            return self._changed.wait_for(lambda: not any(state.queued for state in self._tenants.values()), timeout)
+
+    def shutdown(self, drain: bool = True, timeout: Optional[float] = None) -> None:
+        """Stop accepting emails and, by default, finish everything already queued."""
+        if drain:
+            self.drain(timeout)
+        with self._lock:
+            self._closed = True
+            for state in self._tenants.values():
+                for lane in state.lanes.values():
+                    for _, email in lane:
+                        state.queued.discard(self.item_id(email))
+                    lane.clear()
+            self._changed.notify_all()
+        for worker in self._workers:
+            worker.join(timeout)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Per tenant: queued/running conversations, processed and failed emails, and queueing delay percentiles (seconds)."""
+        with self._lock:
+            return {
+                name: {
+                    "pending": len(state.queued),
+                    "running": state.running,
+                    "processed": state.processed,
+                    "failed": state.failed,
+                    "wait_p50": _percentile(sorted(state.waits), 0.50),
+                    "wait_p95": _percentile(sorted(state.waits), 0.95),
+                }
+                for name, state in self._tenants.items()
+            }
+
+    def _work(self) -> None:
+        while True:
+            job = self._next()
+            if job is None:
+                return
+            name, key, batch = job
+            succeeded = False
+            try:
+                self.handler(name, [email for _, email in batch])
+                succeeded = True
+            except Exception as e:
+                logger.error(f"Error processing emails of {name} ({', '.join(str(self.item_id(email)) for _, email in batch)}): {e}")
+            with self._lock:
+                state = self._tenants[name]
+                state.running -= 1
+                state.busy.discard(key)
+                if succeeded:
+                    state.processed += len(batch)
+                else:
+                    state.failed += len(batch)
+                for _, email in batch:
+                    state.queued.discard(self.item_id(email))
+                if not state.lanes.get(key, True):
+                    del state.lanes[key]
+                self._changed.notify_all()
+
+    def _next(self) -> Optional[Tuple[str, Hashable, List[Tuple[float, Any]]]]:
+        """Wait for the next conversation to run, or None once closed."""
+        with self._lock:
+            while not self._closed:
+                job, wait = self._pick()
+                if job is not None:
+                    return job
+                self._changed.wait(wait)
+            return None
+
+    def _pick(self) -> Tuple[Optional[Tuple[str, Hashable, List[Tuple[float, Any]]]], Optional[float]]:
+        # Caller holds the lock
+        wait: Optional[float] = None
+        for _ in range(len(self._order)):
+            name = self._order[0]
+            self._order.rotate(-1)
+            state = self._tenants[name]
+            if state.running >= state.max_concurrency:
+                continue
+            key = state.ready_lane()
+            if key is None:
+                continue
+            if state.limiter is not None:
+                delay = state.limiter.try_acquire()
+                if delay > 0:
+                    wait = delay if wait is None else min(wait, delay)
+                    continue
+            # The tenant just served is now last in line; its conversation goes to the back of its own queue
+            batch = list(state.lanes[key])
+            state.lanes[key].clear()
+            state.lanes.move_to_end(key)
+            state.busy.add(key)
+            state.running += 1
+            now = time.monotonic()
+            state.waits.append(now - batch[0][0])
+            self.dispatched += 1
+            return (name, key, batch), None
+        return None, wait
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(fraction * len(values)))]
@@ -0,0 +1,346 @@
+import dataclasses
+import heapq
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from email.message import EmailMessage
+from email.utils import parseaddr
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from phi.utils.log import logger
+
+from Tools.calcom_tool import CalCom
+from Tools.FetchUnreadMail_tool import FetchUnreadEmailTool
+from Tools.http_client import HTTPClient
+from Tools.meeting_tool import MeetingConfirmationTool
+from Tools.processing_ledger import ProcessingLedger
+from Tools.reply_templates import ReplyRenderer
+from Tools.SendEmail_tool import CustomEmailTool
+from Tools.tenant_scheduler import FairScheduler
+from Tools.zoom_tool import CustomZoomTool
+
+# ${VAR} references in tenant files are replaced with environment variables (secrets stay out of the file)
+_ENV_REFERENCE = re.compile(r"\$\{(\w+)\}")
+
+
+@dataclass
+class TenantConfig:
+    """One mailbox (account) served by the multi-tenant runtime; mirrors the single-account env variables."""
+
+    name: str
+    email_address: str
+    email_password: str
+    imap_server: str = "imap.gmail.com"
+    imap_port: int = 993
+    smtp_server: str = "smtp.gmail.com"
+    smtp_port: int = 465
+    user_name: str = ""
+    email_language: Optional[str] = None
+    calcom_api_key: str = ""
+    calcom_event_type_id: int = 0
+    calcom_user_timezone: str = "Asia/Tokyo"
+    zoom_account_id: str = ""
+    zoom_client_id: str = ""
+    zoom_client_secret: str = ""
+    # Conversations of this tenant handled at the same time
+    max_concurrency: int = 1
+    # Agent runs per minute (0 for no limit)
+    rate_limit: float = 0.0
+    # Seconds between checks for new mail
+    poll_interval: float = 30.0
+
+    def __post_init__(self):
+        # Numbers given as strings (e.g. "${IMAP_PORT}") are converted to the declared type
+        for field in dataclasses.fields(self):
+            value = getattr(self, field.name)
+            if field.type in (int, float) and isinstance(value, str):
+                try:
+                    setattr(self, field.name, field.type(value.strip()))
+                except ValueError:
+                    raise ValueError(f"{field.name} must be {field.type.__name__}, got {value!r}")
+
+
+def load_tenant_configs(path: str) -> List[TenantConfig]:
+    """Read tenant configurations from a JSON or YAML file.
+
+    The file holds a list of tenants, or an object with a "tenants" list; every entry has
+    the fields of `TenantConfig`. "${VAR}" in a value is replaced with the environment
+    variable VAR; numeric fields are converted after the substitution.
+
+    Raises:
+        ValueError: For unknown fields, missing required fields, unset variables or duplicate names
+    """
+    with open(path, encoding="utf-8") as f:
+        if path.endswith((".yaml", ".yml")):
+            try:
+                import yaml
+            except ImportError:
+                raise ImportError("PyYAML not installed. Please install using pip install pyyaml")
+            data = yaml.safe_load(f)
+        else:
+            data = json.load(f)
+    entries = data.get("tenants", []) if isinstance(data, dict) else data
+    fields = {field.name for field in dataclasses.fields(TenantConfig)}
+    configs: List[TenantConfig] = []
+    for index, entry in enumerate(entries or []):
+        unknown = set(entry) - fields
+        if unknown:
+            raise ValueError(f"Tenant {index} in {path}: unknown fields {', '.join(sorted(unknown))}")
+        try:
+            configs.append(TenantConfig(**{name: _expand(value) for name, value in entry.items()}))
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"Tenant {index} in {path}: {e}")
+    names = [config.name for config in configs]
+    duplicates = {name for name in names if names.count(name) > 1}
+    if duplicates:
+        raise ValueError(f"Duplicate tenant names in {path}: {', '.join(sorted(duplicates))}")
+    return configs
+
+
+class Tenant:
+    """The toolkits of one account, built from a `TenantConfig`.
+
+    Cal.com and Zoom calls of every tenant go through one shared `HTTPClient` (and its
+    connection pool); IMAP and SMTP connections are per account since they are
+    authenticated. The IMAP session stays logged in between checks, so N tenants hold N
+    IMAP connections (not in IDLE: the runtime polls each mailbox). Sync state and the thread index are kept under `state_dir/<name>`.
+    Message-IDs are prefixed with the tenant name in the shared ledger, so the same email
+    delivered to two tenants is handled by both.
+    """
+
+    def __init__(
+        self,
+        config: TenantConfig,
+        http: HTTPClient,
+        ledger: Optional[ProcessingLedger] = None,
+        spool: Any = None,
+        state_dir: str = ".tenants",
+        imap_session: Any = None,
+    ):
+        """Build the toolkits of a tenant.
+
+        Args:
+            config: Account configuration
+            http: HTTP client shared by all tenants
+            ledger: Processing ledger shared by all tenants
+            spool: Outbound spool shared by all tenants (see `TenantRuntime.send`)
+            state_dir: Directory for per-tenant state files
+            imap_session: IMAP session to use instead of connecting to `config.imap_server` (e.g. for tests)
+        """
+        self.name = config.name
+        self.config = config
+        directory = os.path.join(state_dir, config.name)
+        os.makedirs(directory, exist_ok=True)
+        self.fetcher = FetchUnreadEmailTool(
+            email_address=config.email_address,
+            email_password=config.email_password,
+            imap_server=config.imap_server,
+            imap_port=config.imap_port,
+            session=imap_session,
+            sync_state_path=os.path.join(directory, "imap_sync_state.json"),
+            thread_index_path=os.path.join(directory, "email_threads.json"),
+        )
+        self.mailer = CustomEmailTool(
+            sender_name=config.user_name or config.email_address,
+            sender_email=config.email_address,
+            sender_passkey=config.email_password,
+            smtp_server=config.smtp_server,
+            smtp_port=config.smtp_port,
+            ledger=ledger,
+            pool_size=1,
+            spool=spool,
+        )
+        self.calcom = CalCom(
+            api_key=config.calcom_api_key,
+            event_type_id=config.calcom_event_type_id,
+            user_timezone=config.calcom_user_timezone,
+            ledger=ledger,
+            http=http,
+        )
+        self.zoom = CustomZoomTool(
+            account_id=config.zoom_account_id,
+            client_id=config.zoom_client_id,
+            client_secret=config.zoom_client_secret,
+            ledger=ledger,
+            http=http,
+        )
+        self.renderer = ReplyRenderer(sender_name=config.user_name, default_language=config.email_language)
+        self.meeting_tool = MeetingConfirmationTool(self.zoom, self.calcom, self.mailer, ledger=ledger, renderer=self.renderer)
+
+    @property
+    def toolkits(self) -> List[Any]:
+        """Toolkits an agent of this tenant is given."""
+        return [self.zoom, self.calcom, self.meeting_tool, self.mailer, self.fetcher]
+
+    def message_id(self, email: Sequence[Any]) -> str:
+        """Ledger key of an email of this tenant."""
+        return f"{self.name}/{email[7]}"
+
+    def close(self) -> None:
+        self.fetcher.session.stop()
+        self.zoom.tokens.close()
+
+
+class TenantRuntime:
+    """Runs many accounts in one process.
+
+    Every tenant's mailbox is checked every `poll_interval` seconds (polls are spread
+    over the interval and run on `poll_workers` threads); the emails returned by `route`
+    are handed to a `FairScheduler` whose `workers` are shared by all tenants, within
+    each tenant's concurrency and rate limits. The tool event loop, HTTP pool, ledger,
+    outbound spool and model client are created once instead of once per account.
+    """
+
+    def __init__(
+        self,
+        configs: List[TenantConfig],
+        handler: Callable[[Tenant, List[Any]], None],
+        route: Optional[Callable[["TenantRuntime", Tenant, List[Any]], None]] = None,
+        fetch: Optional[Callable[[Tenant], List[Any]]] = None,
+        workers: Optional[int] = None,
+        poll_workers: Optional[int] = None,
+        http: Optional[HTTPClient] = None,
+        ledger: Optional[ProcessingLedger] = None,
+        spool: Any = None,
+        state_dir: Optional[str] = None,
+        tenant_factory: Callable[..., Tenant] = Tenant,
+    ):
+        """Initialize the runtime and build every tenant.
+
+        Args:
+            configs: Tenants to serve
+            handler: Called from a worker thread with a tenant and the emails of one conversation
+            route: Called with the runtime, a tenant and its fetched emails; submits what needs an agent run
+                (default: submit everything)
+            fetch: Returns a tenant's unread emails (default: `tenant.fetcher.fetch_unread_emails`)
+            workers: Worker threads shared by all tenants (TENANT_WORKERS, default 8)
+            poll_workers: Threads checking mailboxes (TENANT_POLL_WORKERS, default 4)
+            http: HTTP client shared by all tenants (default: a new one)
+            ledger: Processing ledger shared by all tenants
+            spool: Outbound spool shared by all tenants; deliver it with `DeliveryWorker(spool, runtime.send)`
+            state_dir: Directory for per-tenant state files (TENANT_STATE_DIR, default .tenants)
+            tenant_factory: Builds a `Tenant` from (config, http, ledger, spool, state_dir)
+        """
+        self.handler = handler
+        self.route = route or (lambda runtime, tenant, emails: runtime.submit(tenant, emails))
+        self.fetch = fetch or _fetch_unread
+        self.http = http or HTTPClient()
+        self.ledger = ledger
+        self.spool = spool
+        self.state_dir = state_dir or os.getenv("TENANT_STATE_DIR", ".tenants")
+        self.tenants: Dict[str, Tenant] = {}
+        self._by_address: Dict[str, Tenant] = {}
+        self.scheduler = FairScheduler(self._handle, workers=workers or int(os.getenv("TENANT_WORKERS", 8)))
+        for config in configs:
+            self.add_tenant(config, tenant_factory)
+        self._poll_executor = ThreadPoolExecutor(
+            max_workers=poll_workers or int(os.getenv("TENANT_POLL_WORKERS", 4)), thread_name_prefix="tenant-poll"
+        )
+        # (due, name) of every tenant's next mailbox check
+        self._due: List[tuple] = []
+        self._lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+        self._stopping = False
+
+    def add_tenant(self, config: TenantConfig, tenant_factory: Callable[..., Tenant] = Tenant) -> Tenant:
+        tenant = tenant_factory(config, self.http, self.ledger, self.spool, self.state_dir)
+        self.tenants[config.name] = tenant
+        self._by_address[config.email_address.lower()] = tenant
+        self.scheduler.add_tenant(config.name, max_concurrency=config.max_concurrency, rate_limit=config.rate_limit)
+        return tenant
+
+    def submit(self, tenant: Tenant, emails: List[Any]) -> int:
+        """Queue emails of a tenant for the handler; returns how many were queued."""
+        return self.scheduler.submit_all(tenant.name, emails)
+
+    async def send(self, message: EmailMessage) -> None:
+        """Deliver a spooled message through the SMTP pool of the tenant it is from.
+
+        Raises:
+            LookupError: If no tenant sends from the message's From address
+        """
+        tenant = self._by_address.get(parseaddr(message["From"] or "")[1].lower())
+        if tenant is None:
+            raise LookupError(f"No tenant sends from {message['From']}")
+        await tenant.mailer.smtp.send(message)
+
+    def poll(self, tenant: Tenant) -> None:
+        """Check one tenant's mailbox now and route what was found."""
+        try:
+            emails = self.fetch(tenant)
+            if emails:
+                self.route(self, tenant, emails)
+        except Exception as e:
+            logger.error(f"Error checking mail of {tenant.name}: {e}")
+
+    def run_forever(self) -> None:
+        """Check every mailbox on its schedule until `stop` is called."""
+        now = time.monotonic()
+        with self._lock:
+            count = len(self.tenants)
+            # Spread the first checks over the interval instead of polling every mailbox at once
+            self._due = [
+                (now + tenant.config.poll_interval * index / max(count, 1), name)
+                for index, (name, tenant) in enumerate(self.tenants.items())
+            ]
+            heapq.heapify(self._due)
+            while not self._stopping:
+                if not self._due:
+                    self._wake.wait()
+                    continue
+                due, name = self._due[0]
+                delay = due - time.monotonic()
+                if delay > 0:
+                    self._wake.wait(delay)
+                    continue
+                heapq.heappop(self._due)
+                self._poll_executor.submit(self._poll_and_reschedule, self.tenants[name])
+
+    def stop(self, drain: bool = True, timeout: Optional[float] = None) -> None:
+        """Stop checking mailboxes and, by default, finish the queued conversations."""
+        with self._lock:
+            self._stopping = True
+            self._wake.notify_all()
+        self._poll_executor.shutdown(wait=True)
+        self.scheduler.shutdown(drain=drain, timeout=timeout)
+        for tenant in self.tenants.values():
+            tenant.close()
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        return self.scheduler.stats()
+
+    def _poll_and_reschedule(self, tenant: Tenant) -> None:
+        self.poll(tenant)
+        with self._lock:
+            if not self._stopping:
+                heapq.heappush(self._due, (time.monotonic() + tenant.config.poll_interval, tenant.name))
+                self._wake.notify_all()
+
+    def _handle(self, name: str, emails: List[Any]) -> None:
+        self.handler(self.tenants[name], emails)
+
+
+def _fetch_unread(tenant: Tenant) -> List[Any]:
+    emails = tenant.fetcher.fetch_unread_emails()
+    if isinstance(emails, str):
+        if emails != "No unread emails found.":
+            logger.warning(f"Could not fetch mail of {tenant.name}: {emails}")
+        return []
+    return emails
+
+
+def _expand(value: Any) -> Any:
+    if not isinstance(value, str):
+        return value
+
+    def replace(match: "re.Match[str]") -> str:
+        variable = match.group(1)
+        if variable not in os.environ:
+            raise ValueError(f"Environment variable {variable} is not set")
+        return os.environ[variable]
+
+    return _ENV_REFERENCE.sub(replace, value)
@@ -0,0 +1,164 @@
+import json
+import os
+import re
+import threading
+from typing import Dict, List, Optional
+
+from phi.utils.log import logger
+
+_MESSAGE_ID_RE = re.compile(r"<[^<>\s]+>")
+# "Re:", "RE[2]:", "AW:", "Sv:", "返信:" ... (forwards start a new conversation and are not stripped)
+_REPLY_PREFIX_RE = re.compile(r"^\s*((re|aw|sv|antw|回答|返信)(\[\d+\])?\s*[:：]\s*)+", re.IGNORECASE)
+
+
+def parse_message_ids(value: Optional[str]) -> List[str]:
+    """Message-IDs in a Message-ID / In-Reply-To / References header, in order."""
+    return _MESSAGE_ID_RE.findall(value or "")
+
+
+def reply_subject(subject: Optional[str]) -> Optional[str]:
+    """The base subject of a reply ("Re: Re: Meeting" -> "meeting"), or None if it is not a reply."""
+    match = _REPLY_PREFIX_RE.match(subject or "")
+    if not match:
+        return None
+    return " ".join(subject[match.end():].split()).lower() or None
+
+
+class ThreadIndex:
+    """Conversation index over Message-ID / In-Reply-To / References, persisted as JSON.
+
+    Follows the JWZ threading algorithm: every referenced id gets a container, each
+    References chain links consecutive ids parent -> child (never creating a loop), and
+    a message's parent is its last reference. The thread id of a message is the id of
+    its root container, so replies seen before or after their parents (or whose parents
+    were never fetched) still land in one thread. Replies from mailers that drop the
+    References header fall back to the latest message from the same sender with the
+    same base subject. The oldest entries are evicted beyond `max_messages`.
+    """
+
+    def __init__(self, path: str, max_messages: int = 5000):
+        """Initialize the index.
+
+        Args:
+            path: JSON file holding the index
+            max_messages: Number of message ids kept before the oldest are dropped
+        """
+        self.path = path
+        self.max_messages = max_messages
+        self.parents: Dict[str, Optional[str]] = {}
+        self.subjects: Dict[str, str] = {}
+        self._dirty = False
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self) -> None:
+        """Read the index from disk, if present."""
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable thread index {self.path}: {e}")
+            return
+        self.parents = state.get("parents", {})
+        self.subjects = state.get("subjects", {})
+
+    def save(self) -> None:
+        """Atomically write the index back to disk if it changed."""
+        with self._lock:
+            if not self._dirty:
+                return
+            state = {"parents": dict(self.parents), "subjects": dict(self.subjects)}
+            self._dirty = False
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.path)
+
+    def add(
+        self,
+        message_id: str,
+        in_reply_to: Optional[str] = None,
+        references: Optional[str] = None,
+        subject: Optional[str] = None,
+        sender: Optional[str] = None,
+    ) -> str:
+        """Index a message and return its thread id.
+
+        Args:
+            message_id: The message's Message-ID (a synthetic id if it has none)
+            in_reply_to: Raw In-Reply-To header
+            references: Raw References header
+            subject: Decoded subject, used for the reply-subject fallback
+            sender: Sender address, used for the reply-subject fallback
+        """
+        chain = parse_message_ids(references)
+        for parent_id in parse_message_ids(in_reply_to)[:1]:
+            if not chain or chain[-1] != parent_id:
+                chain.append(parent_id)
+        chain = [mid for mid in chain if mid != message_id]
+
+        with self._lock:
+            self._dirty = True
+            for parent_id, child_id in zip(chain, chain[1:]):
+                self._container(parent_id)
+                if self.parents.get(child_id) is None and not self._reachable(parent_id, child_id):
+                    self.parents[child_id] = parent_id
+            self._container(message_id)
+            key = self._subject_key(subject, sender)
+            parent_id = chain[-1] if chain else None
+            if parent_id is None and key and reply_subject(subject):
+                parent_id = self.subjects.get(key)
+            if parent_id and parent_id != message_id:
+                self._container(parent_id)
+                # The message's own references are authoritative over links guessed from other messages
+                if not self._reachable(parent_id, message_id):
+                    self.parents[message_id] = parent_id
+            if key:
+                self.subjects[key] = message_id
+            self._evict()
+            return self._root(message_id)
+
+    def thread_of(self, message_id: str) -> str:
+        """Thread id (root message id) of an indexed message."""
+        with self._lock:
+            return self._root(message_id)
+
+    def _container(self, message_id: str) -> None:
+        if message_id not in self.parents:
+            self.parents[message_id] = None
+
+    def _reachable(self, start: str, target: str) -> bool:
+        # True if `target` is `start` or one of its ancestors (linking would create a loop)
+        seen = set()
+        current: Optional[str] = start
+        while current is not None and current not in seen:
+            if current == target:
+                return True
+            seen.add(current)
+            current = self.parents.get(current)
+        return False
+
+    def _root(self, message_id: str) -> str:
+        seen = {message_id}
+        current = message_id
+        while self.parents.get(current) is not None and self.parents[current] not in seen:
+            current = self.parents[current]
+            seen.add(current)
+        return current
+
+    @staticmethod
+    def _subject_key(subject: Optional[str], sender: Optional[str]) -> Optional[str]:
+        base = subject and " ".join(_REPLY_PREFIX_RE.sub("", subject).split()).lower()
+        if not base or not sender:
+            return None
+        return f"{sender.lower()}\n{base}"
+
+    def _evict(self) -> None:
+        while len(self.parents) > self.max_messages:
+            del self.parents[next(iter(self.parents))]
+        while len(self.subjects) > self.max_messages:
+            del self.subjects[next(iter(self.subjects))]
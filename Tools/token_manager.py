@@ -0,0 +1,252 @@
+import asyncio
+import concurrent.futures
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Awaitable, Callable, Optional, Tuple
+
+from phi.utils.log import logger
+
+from Tools.async_utils import tool_event_loop
+
+# Returns a new access token and its lifetime in seconds
+TokenFetcher = Callable[[], Awaitable[Tuple[str, float]]]
+
+# Tokens are never handed out during their last seconds, to absorb clock skew and request latency
+EXPIRY_SKEW = 30.0
+
+
+class TokenManager:
+    """Caches an OAuth-style access token and refreshes it before it expires.
+
+    `get` returns the cached token while it is fresh. Concurrent callers (threads, event
+    loops or tasks) that need a new one share a single refresh instead of each calling
+    the token endpoint. After the first token is obtained, a background task on the
+    shared tool loop refreshes it `refresh_margin` seconds before expiry (at the latest
+    half-way through its lifetime); a token that is due but still valid is returned
+    while the refresh runs, so requests never wait for the token endpoint.
+
+    With a `cache_path`, tokens are also kept in a SQLite file shared by every process
+    using the same credential: a process first adopts a fresh token written by another
+    one, and a short lease makes sure only one process at a time calls the endpoint.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        fetch: TokenFetcher,
+        cache_path: Optional[str] = None,
+        refresh_margin: Optional[float] = None,
+        lease_seconds: float = 30.0,
+        background: bool = True,
+        expiry_skew: float = EXPIRY_SKEW,
+    ):
+        """Initialize the token manager.
+
+        Args:
+            name: Cache key of the credential (e.g. "zoom:<account_id>:<client_id>"; never the secret)
+            fetch: Coroutine function returning (access_token, expires_in_seconds)
+            cache_path: SQLite file shared between processes (TOKEN_CACHE_PATH; None or "" keeps tokens in memory only)
+            refresh_margin: Seconds before expiry at which the token is refreshed (TOKEN_REFRESH_MARGIN, default 300)
+            lease_seconds: How long one process may hold the refresh lease before others take over
+            background: Refresh proactively in a background task after the first token
+            expiry_skew: Seconds subtracted from the reported lifetime
+        """
+        self.name = name
+        self.fetch = fetch
+        self.cache_path = cache_path if cache_path is not None else os.getenv("TOKEN_CACHE_PATH")
+        self.refresh_margin = refresh_margin if refresh_margin is not None else float(os.getenv("TOKEN_REFRESH_MARGIN", 300))
+        self.lease_seconds = lease_seconds
+        self.background = background
+        self.expiry_skew = expiry_skew
+        self.token: Optional[str] = None
+        self.expires_at = 0.0
+        self.refresh_at = 0.0
+        self.fetches = 0
+        self._owner = uuid.uuid4().hex
+        self._lock = threading.Lock()
+        self._inflight: Optional[concurrent.futures.Future] = None
+        self._refresher: Optional[concurrent.futures.Future] = None
+        self._db: Optional[sqlite3.Connection] = None
+        if self.cache_path:
+            self._db = _open_cache(self.cache_path)
+
+    async def get(self) -> str:
+        """Return a valid access token, refreshing it if needed.
+
+        Raises:
+            Whatever `fetch` raises if no valid token is available and the refresh fails
+        """
+        now = time.time()
+        with self._lock:
+            token, fresh, valid = self.token, self._fresh(now), bool(self.token) and now < self.expires_at
+        if fresh:
+            return str(token)
+        if valid:
+            self._refresh_soon()
+            return str(token)
+        return await self.refresh(force=False)
+
+    def invalidate(self, token: Optional[str] = None) -> None:
+        """Drop the cached token (e.g. after a 401); with `token`, only if it is still the current one."""
+        with self._lock:
+            if token is None or token == self.token:
+                self.token, self.expires_at, self.refresh_at = None, 0.0, 0.0
+        if self._db is not None:
+            with self._lock:
+                self._db.execute(
+                    "DELETE FROM tokens WHERE name = ? AND (? IS NULL OR token = ?)", (self.name, token, token)
+                )
+
+    async def refresh(self, force: bool = True) -> str:
+        """Obtain a new token now; concurrent calls share one request."""
+        with self._lock:
+            if not force and self._fresh(time.time()):
+                return str(self.token)
+            inflight, leader = self._inflight, self._inflight is None
+            if leader:
+                inflight = self._inflight = concurrent.futures.Future()
+        if not leader:
+            return await asyncio.wrap_future(inflight)
+        try:
+            token = await self._obtain(force)
+        except BaseException as e:
+            inflight.set_exception(e)
+            # Nobody else may be waiting; mark the exception as retrieved
+            inflight.exception()
+            raise
+        finally:
+            with self._lock:
+                self._inflight = None
+        inflight.set_result(token)
+        self._start_refresher()
+        return token
+
+    def close(self) -> None:
+        """Stop the background refresh."""
+        if self._refresher is not None:
+            self._refresher.cancel()
+            self._refresher = None
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def _fresh(self, now: float) -> bool:
+        return bool(self.token) and now < self.refresh_at
+
+    def _set(self, token: str, expires_at: float, refresh_at: float) -> bool:
+        """Install a token unless it is already due for refresh; caller holds the lock."""
+        if time.time() >= refresh_at:
+            return False
+        self.token, self.expires_at, self.refresh_at = token, expires_at, refresh_at
+        return True
+
+    def _refresh_soon(self) -> None:
+        with self._lock:
+            if self._inflight is not None:
+                return
+        asyncio.run_coroutine_threadsafe(self.refresh(force=False), tool_event_loop())
+
+    async def _obtain(self, force: bool) -> str:
+        while True:
+            cached = self._read_cache()
+            if cached and (not force or cached[0] != self.token) and self._adopt(*cached):
+                return cached[0]
+            if self._acquire_lease():
+                break
+            # Another process is refreshing; use its token once it is written
+            await asyncio.sleep(0.05)
+        try:
+            token, expires_in = await self.fetch()
+            self.fetches += 1
+            lifetime = float(expires_in) - self.expiry_skew
+            expires_at = time.time() + lifetime
+            refresh_at = expires_at - min(self.refresh_margin, lifetime / 2)
+            with self._lock:
+                self._set(token, expires_at, refresh_at)
+            self._write_cache(token, expires_at, refresh_at)
+            logger.debug(f"Refreshed access token for {self.name}, valid for {expires_in}s")
+            return token
+        finally:
+            self._release_lease()
+
+    def _adopt(self, token: str, expires_at: float, refresh_at: float) -> bool:
+        with self._lock:
+            return self._set(token, expires_at, refresh_at)
+
+    def _start_refresher(self) -> None:
+        if not self.background:
+            return
+        with self._lock:
+            if self._refresher is not None and not self._refresher.done():
+                return
+            self._refresher = asyncio.run_coroutine_threadsafe(self._refresh_forever(), tool_event_loop())
+
+    async def _refresh_forever(self) -> None:
+        failures = 0
+        while True:
+            with self._lock:
+                due = self.refresh_at
+            await asyncio.sleep(max(0.0, due - time.time()) if failures == 0 else min(60.0, 2.0 ** failures))
+            try:
+                await self.refresh(force=False)
+                failures = 0
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                failures += 1
+                logger.warning(f"Background refresh of the {self.name} token failed: {e}")
+
+    def _read_cache(self) -> Optional[Tuple[str, float, float]]:
+        if self._db is None:
+            return None
+        with self._lock:
+            row = self._db.execute("SELECT token, expires_at, refresh_at FROM tokens WHERE name = ?", (self.name,)).fetchone()
+        return (row[0], row[1], row[2]) if row else None
+
+    def _write_cache(self, token: str, expires_at: float, refresh_at: float) -> None:
+        if self._db is None:
+            return
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO tokens (name, token, expires_at, refresh_at) VALUES (?, ?, ?, ?)"
+                " ON CONFLICT(name) DO UPDATE SET"
+                " token = excluded.token, expires_at = excluded.expires_at, refresh_at = excluded.refresh_at",
+                (self.name, token, expires_at, refresh_at),
+            )
+
+    def _acquire_lease(self) -> bool:
+        if self._db is None:
+            return True
+        now = time.time()
+        with self._lock:
+            # Atomic: succeeds if there is no lease, it expired, or it is already ours
+            cursor = self._db.execute(
+                "INSERT INTO leases (name, owner, until) VALUES (?, ?, ?)"
+                " ON CONFLICT(name) DO UPDATE SET owner = excluded.owner, until = excluded.until"
+                " WHERE leases.until < ? OR leases.owner = excluded.owner",
+                (self.name, self._owner, now + self.lease_seconds, now),
+            )
+            return cursor.rowcount == 1
+
+    def _release_lease(self) -> None:
+        if self._db is None:
+            return
+        with self._lock:
+            self._db.execute("DELETE FROM leases WHERE name = ? AND owner = ?", (self.name, self._owner))
+
+
+def _open_cache(path: str) -> sqlite3.Connection:
+    # The cache holds bearer tokens: create it readable by the owner only
+    if not os.path.exists(path):
+        os.close(os.open(path, os.O_CREAT | os.O_WRONLY, 0o600))
+    db = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=10)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute(
+        "CREATE TABLE IF NOT EXISTS tokens"
+        " (name TEXT PRIMARY KEY, token TEXT NOT NULL, expires_at REAL NOT NULL, refresh_at REAL NOT NULL)"
+    )
+    db.execute("CREATE TABLE IF NOT EXISTS leases (name TEXT PRIMARY KEY, owner TEXT NOT NULL, until REAL NOT NULL)")
+    return db
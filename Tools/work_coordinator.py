@@ -0,0 +1,403 @@
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+from phi.utils.log import logger
+
+# States of a queued message
+QUEUED = "queued"
+LEASED = "leased"
+DONE = "done"
+DEAD = "dead"
+
+# Columns of a mailbox sync checkpoint, as used by `SyncCheckpoint`
+CHECKPOINT_FIELDS = ("uidvalidity", "last_uid", "highestmodseq", "uidnext")
+
+
+class WorkCoordinator:
+    """Shared work queue and lease table that lets several processes serve one mailbox (SQLite).
+
+    Every process points at the same database file. The process holding a mailbox lease
+    (`acquire`) fetches new mail and `enqueue`s it; a Message-ID is only ever queued once,
+    so emails seen by two pollers are not duplicated. Workers `claim` whole conversations:
+    a conversation is only handed out while none of its messages is leased, so runs for
+    one conversation never overlap across processes. Leases are renewed by a heartbeat
+    thread (`start`); when a process dies, its mailbox and messages become available to
+    the others once the lease expires. `complete` only succeeds for the current lease
+    holder, so a worker that lost its lease learns that another one took over.
+
+    It also keeps the IMAP sync checkpoint of each mailbox (`read_checkpoint`,
+    `write_checkpoint`), which only the holder of the mailbox lease may advance.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        worker_id: Optional[str] = None,
+        lease_seconds: Optional[float] = None,
+        max_attempts: Optional[int] = None,
+    ):
+        """Initialize the coordinator.
+
+        Args:
+            path: SQLite database shared by all worker processes (COORDINATOR_PATH, default .coordinator.sqlite3)
+            worker_id: Unique name of this process (default host:pid:random)
+            lease_seconds: How long a lease survives without a heartbeat (COORDINATOR_LEASE_SECONDS, default 60)
+            max_attempts: Claims of a message before it is dead-lettered (COORDINATOR_MAX_ATTEMPTS, default 5)
+        """
+        self.path = path or os.getenv("COORDINATOR_PATH", ".coordinator.sqlite3")
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.lease_seconds = lease_seconds or float(os.getenv("COORDINATOR_LEASE_SECONDS", 60))
+        self.max_attempts = max_attempts or int(os.getenv("COORDINATOR_MAX_ATTEMPTS", 5))
+        self.lost_leases = 0
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._heartbeat: Optional[threading.Thread] = None
+        self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS messages ("
+            " message_id TEXT PRIMARY KEY,"
+            " conversation TEXT NOT NULL,"
+            " payload TEXT NOT NULL,"
+            " status TEXT NOT NULL,"
+            " owner TEXT,"
+            " lease_until REAL,"
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " enqueued_at REAL NOT NULL,"
+            " done_at REAL"
+            ")"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS messages_status ON messages (status, enqueued_at)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS messages_conversation ON messages (conversation, status)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS leases (resource TEXT PRIMARY KEY, owner TEXT NOT NULL, lease_until REAL NOT NULL)")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS checkpoints ("
+            " resource TEXT PRIMARY KEY,"
+            " uidvalidity INTEGER,"
+            " last_uid INTEGER NOT NULL,"
+            " highestmodseq INTEGER,"
+            " uidnext INTEGER"
+            ")"
+        )
+
+    def start(self) -> "WorkCoordinator":
+        """Start renewing this worker's leases every third of `lease_seconds`."""
+        self._heartbeat = threading.Thread(target=self._renew_forever, name="coordinator-heartbeat", daemon=True)
+        self._heartbeat.start()
+        return self
+
+    def acquire(self, resource: str) -> bool:
+        """Take (or keep) the lease on a resource such as a mailbox; False while another worker holds it."""
+        now = time.time()
+        with self._lock:
+            cursor = self._db.execute(
+                "INSERT INTO leases (resource, owner, lease_until) VALUES (?, ?, ?)"
+                " ON CONFLICT(resource) DO UPDATE SET owner = excluded.owner, lease_until = excluded.lease_until"
+                " WHERE leases.lease_until < ? OR leases.owner = excluded.owner",
+                (resource, self.worker_id, now + self.lease_seconds, now),
+            )
+            return cursor.rowcount == 1
+
+    def release(self, resource: str) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM leases WHERE resource = ? AND owner = ?", (resource, self.worker_id))
+
+    def enqueue(self, emails: Sequence[Sequence[Any]], conversation: str, message_id: Callable[[Sequence[Any]], str] = lambda email: email[7]) -> int:
+        """Queue the emails of one conversation; Message-IDs already known (in any state) are skipped.
+
+        Returns:
+            int: Number of emails queued
+        """
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                queued = sum(
+                    self._db.execute(
+                        "INSERT OR IGNORE INTO messages (message_id, conversation, payload, status, enqueued_at)"
+                        " VALUES (?, ?, ?, ?, ?)",
+                        (message_id(email), conversation, json.dumps(list(email)), QUEUED, now),
+                    ).rowcount
+                    for email in emails
+                )
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+        return queued
+
+    def known(self, message_ids: Sequence[str]) -> Set[str]:
+        """The Message-IDs among `message_ids` that were already queued (in any state)."""
+        ids = list(message_ids)
+        if not ids:
+            return set()
+        placeholders = ",".join("?" * len(ids))
+        with self._lock:
+            rows = self._db.execute(f"SELECT message_id FROM messages WHERE message_id IN ({placeholders})", ids).fetchall()
+        return {message_id for (message_id,) in rows}
+
+    def claim(self, limit: int = 1) -> List[Tuple[str, List[List[Any]]]]:
+        """Lease up to `limit` conversations with queued messages, oldest first.
+
+        Messages whose lease expired (their worker died) are queued again first. A
+        conversation is skipped while any of its messages is leased by another worker.
+
+        Returns:
+            list: (conversation, emails) per claimed conversation, emails in arrival order
+        """
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._db.execute(
+                    "UPDATE messages SET status = CASE WHEN attempts >= ? THEN ? ELSE ? END, owner = NULL"
+                    " WHERE status = ? AND lease_until < ?",
+                    (self.max_attempts, DEAD, QUEUED, LEASED, now),
+                )
+                conversations = [
+                    row[0]
+                    for row in self._db.execute(
+                        "SELECT conversation FROM messages AS m WHERE status = ? AND NOT EXISTS"
+                        " (SELECT 1 FROM messages AS l WHERE l.conversation = m.conversation AND l.status = ?)"
+                        " GROUP BY conversation ORDER BY MIN(enqueued_at) LIMIT ?",
+                        (QUEUED, LEASED, limit),
+                    )
+                ]
+                claimed = []
+                for conversation in conversations:
+                    rows = self._db.execute(
+                        "SELECT payload FROM messages WHERE conversation = ? AND status = ? ORDER BY enqueued_at, rowid",
+                        (conversation, QUEUED),
+                    ).fetchall()
+                    self._db.execute(
+                        "UPDATE messages SET status = ?, owner = ?, lease_until = ?, attempts = attempts + 1"
+                        " WHERE conversation = ? AND status = ?",
+                        (LEASED, self.worker_id, now + self.lease_seconds, conversation, QUEUED),
+                    )
+                    claimed.append((conversation, [json.loads(payload) for (payload,) in rows]))
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+        return claimed
+
+    def complete(self, message_ids: Sequence[str]) -> bool:
+        """Mark leased messages as done.
+
+        Returns:
+            bool: False if this worker no longer held the lease on all of them (another worker took over)
+        """
+        return self._finish(message_ids, DONE)
+
+    def abandon(self, message_ids: Sequence[str]) -> bool:
+        """Give leased messages back after a failure, to be claimed again (until `max_attempts`)."""
+        return self._finish(message_ids, QUEUED)
+
+    def purge(self, older_than: float = 7 * 86400) -> int:
+        """Delete messages finished more than `older_than` seconds ago; returns how many.
+
+        A purged Message-ID can be queued again, so keep them at least as long as the
+        mailbox may still report the email as unread.
+        """
+        with self._lock:
+            return self._db.execute(
+                "DELETE FROM messages WHERE status = ? AND done_at < ?", (DONE, time.time() - older_than)
+            ).rowcount
+
+    def read_checkpoint(self, resource: str) -> Dict[str, Any]:
+        """Stored sync checkpoint of a mailbox, empty if there is none yet."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT uidvalidity, last_uid, highestmodseq, uidnext FROM checkpoints WHERE resource = ?", (resource,)
+            ).fetchone()
+        return dict(zip(CHECKPOINT_FIELDS, row)) if row else {}
+
+    def write_checkpoint(self, resource: str, state: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Advance the sync checkpoint of a mailbox whose lease this worker holds.
+
+        Within one UIDVALIDITY the stored values only move forward, so a checkpoint
+        computed from older state cannot undo progress already recorded.
+
+        Returns:
+            dict: The stored checkpoint, or None if this worker does not hold the lease on `resource`
+        """
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                holder = self._db.execute(
+                    "SELECT 1 FROM leases WHERE resource = ? AND owner = ? AND lease_until >= ?",
+                    (resource, self.worker_id, time.time()),
+                ).fetchone()
+                row = None
+                if holder:
+                    self._db.execute(
+                        "INSERT INTO checkpoints (resource, uidvalidity, last_uid, highestmodseq, uidnext) VALUES (?, ?, ?, ?, ?)"
+                        " ON CONFLICT(resource) DO UPDATE SET"
+                        "  last_uid = CASE WHEN uidvalidity IS excluded.uidvalidity"
+                        "   THEN MAX(last_uid, excluded.last_uid) ELSE excluded.last_uid END,"
+                        "  highestmodseq = CASE WHEN uidvalidity IS excluded.uidvalidity"
+                        "   THEN COALESCE(MAX(highestmodseq, excluded.highestmodseq), excluded.highestmodseq) ELSE excluded.highestmodseq END,"
+                        "  uidnext = CASE WHEN uidvalidity IS excluded.uidvalidity"
+                        "   THEN COALESCE(MAX(uidnext, excluded.uidnext), excluded.uidnext) ELSE excluded.uidnext END,"
+                        "  uidvalidity = excluded.uidvalidity",
+                        (resource, *(state.get(field) for field in CHECKPOINT_FIELDS)),
+                    )
+                    row = self._db.execute(
+                        "SELECT uidvalidity, last_uid, highestmodseq, uidnext FROM checkpoints WHERE resource = ?", (resource,)
+                    ).fetchone()
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+        return dict(zip(CHECKPOINT_FIELDS, row)) if row else None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = dict(self._db.execute("SELECT status, COUNT(*) FROM messages GROUP BY status").fetchall())
+            leases = dict(self._db.execute("SELECT resource, owner FROM leases WHERE lease_until >= ?", (time.time(),)).fetchall())
+        return {**{state: counts.get(state, 0) for state in (QUEUED, LEASED, DONE, DEAD)}, "leases": leases}
+
+    def close(self) -> None:
+        """Stop the heartbeat and hand this worker's mailbox leases to the others."""
+        self._stopping.set()
+        if self._heartbeat is not None:
+            self._heartbeat.join()
+        with self._lock:
+            self._db.execute("DELETE FROM leases WHERE owner = ?", (self.worker_id,))
+            self._db.close()
+
+    def heartbeat(self) -> None:
+        """Extend every lease this worker holds."""
+        until = time.time() + self.lease_seconds
+        with self._lock:
+            self._db.execute("UPDATE leases SET lease_until = ? WHERE owner = ?", (until, self.worker_id))
+            self._db.execute(
+                "UPDATE messages SET lease_until = ? WHERE owner = ? AND status = ?", (until, self.worker_id, LEASED)
+            )
+
+    def _finish(self, message_ids: Sequence[str], status: str) -> bool:
+        ids = list(message_ids)
+        placeholders = ",".join("?" * len(ids))
+        with self._lock:
+            count = self._db.execute(
+                f"UPDATE messages SET status = ?, owner = NULL, done_at = ? WHERE owner = ? AND status = ? AND message_id IN ({placeholders})",
+                [status, time.time() if status == DONE else None, self.worker_id, LEASED, *ids],
+            ).rowcount
+        if count < len(ids):
+            self.lost_leases += 1
+            logger.warning(f"Lease on {len(ids) - count} of {len(ids)} messages was lost to another worker")
+            return False
+        return True
+
+    def _renew_forever(self) -> None:
+        while not self._stopping.wait(self.lease_seconds / 3):
+            try:
+                self.heartbeat()
+            except sqlite3.Error as e:
+                logger.warning(f"Coordinator heartbeat failed: {e}")
+
+
+class CoordinatedWorker:
+    """Worker loop of one process in distributed mode.
+
+    While it holds the lease on `mailbox`, the process also fetches new mail (`poll`,
+    which should `enqueue` what needs an agent run). In every round it claims as many
+    conversations as it has free threads and runs `handler` on them; conversations
+    whose handler raised are given back for another worker to retry.
+    """
+
+    def __init__(
+        self,
+        coordinator: WorkCoordinator,
+        mailbox: str,
+        poll: Callable[[], None],
+        handler: Callable[[List[List[Any]]], None],
+        workers: int = 1,
+        poll_interval: float = 30.0,
+        claim_interval: float = 1.0,
+        wait_for_mail: Optional[Callable[[float], bool]] = None,
+        message_id: Callable[[Sequence[Any]], str] = lambda email: email[7],
+    ):
+        """Initialize the worker.
+
+        Args:
+            coordinator: Coordinator shared with the other processes
+            mailbox: Lease name of the mailbox (e.g. "mailbox:user@imap.example.com")
+            poll: Fetches new mail and enqueues it; only called while this process holds the mailbox lease
+            handler: Handles the emails of one conversation; raises on failure
+            workers: Conversations handled at the same time by this process
+            poll_interval: Seconds between mailbox checks of the lease holder
+            claim_interval: Seconds between checks for queued conversations
+            wait_for_mail: Blocks until new mail arrived (True) or the timeout passes (e.g. IMAP IDLE)
+            message_id: Returns the Message-ID of an email
+        """
+        self.coordinator = coordinator
+        self.mailbox = mailbox
+        self.poll = poll
+        self.handler = handler
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.claim_interval = claim_interval
+        self.wait_for_mail = wait_for_mail
+        self.message_id = message_id
+        self.handled = 0
+        self.failed = 0
+        self._running = 0
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="coordinated-worker")
+
+    def run_forever(self) -> None:
+        """Poll (as lease holder) and handle claimed conversations until `stop` is called."""
+        next_poll = 0.0
+        while not self._stopping.is_set():
+            polling = self.coordinator.acquire(self.mailbox)
+            if polling and time.monotonic() >= next_poll:
+                try:
+                    self.poll()
+                except Exception as e:
+                    logger.error(f"Error polling {self.mailbox}: {e}")
+                next_poll = time.monotonic() + self.poll_interval
+            with self._lock:
+                free = self.workers - self._running
+            for conversation, emails in self.coordinator.claim(free) if free > 0 else []:
+                with self._lock:
+                    self._running += 1
+                self._executor.submit(self._run, conversation, emails)
+            if polling and self.wait_for_mail is not None:
+                # New mail reported by the server is fetched right away
+                if self.wait_for_mail(min(self.claim_interval, max(0.0, next_poll - time.monotonic()))):
+                    next_poll = 0.0
+            else:
+                self._stopping.wait(self.claim_interval)
+
+    def stop(self, drain: bool = True) -> None:
+        """Stop claiming work; with `drain`, wait for the conversations already claimed."""
+        self._stopping.set()
+        self._executor.shutdown(wait=drain)
+        self.coordinator.release(self.mailbox)
+
+    def _run(self, conversation: str, emails: List[List[Any]]) -> None:
+        ids = [self.message_id(email) for email in emails]
+        try:
+            self.handler(emails)
+        except Exception as e:
+            logger.error(f"Error processing conversation {conversation}: {e}")
+            self.coordinator.abandon(ids)
+            with self._lock:
+                self.failed += len(emails)
+        else:
+            self.coordinator.complete(ids)
+            with self._lock:
+                self.handled += len(emails)
+        finally:
+            with self._lock:
+                self._running -= 1
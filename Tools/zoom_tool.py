@@ -1,13 +1,18 @@
 import os
-import time
-import requests
-from typing import Optional
+import json
+import httpx
+from typing import Optional, Tuple
 from dotenv import load_dotenv
 from phi.utils.log import logger
 from phi.agent import Agent
 from phi.model.groq import Groq
 from phi.tools.zoom import ZoomTool
 
+from Tools.async_utils import run_sync
+from Tools.http_client import HTTPClient
+from Tools.processing_ledger import ZOOM_CREATED, ProcessingLedger, run_once
+from Tools.token_manager import TokenManager
+
 load_dotenv()
 
 # Get environment variables
@@ -23,6 +28,14 @@ class CustomZoomTool(ZoomTool):
         client_id: Optional[str] = None,
         client_secret: Optional[str] = None,
         name: str = "zoom_tool",
+        api_url: Optional[str] = None,
+        token_url: Optional[str] = None,
+        pool_size: Optional[int] = None,
+        timeout: Optional[float] = None,
+        max_retries: Optional[int] = None,
+        ledger: Optional[ProcessingLedger] = None,
+        token_cache_path: Optional[str] = None,
+        http: Optional[HTTPClient] = None,
     ):
         super().__init__(
             account_id=account_id,
@@ -30,9 +43,20 @@ class CustomZoomTool(ZoomTool):
             client_secret=client_secret,
             name=name
         )
-        self.token_url = "https://zoom.us/oauth/token"
+        self.token_url = token_url or os.getenv("ZOOM_TOKEN_URL", "https://zoom.us/oauth/token")
+        self.api_url = (api_url or os.getenv("ZOOM_API_URL", "https://api.zoom.us/v2")).rstrip("/")
         self.access_token = None
         self.token_expires_at = 0
+        # Refreshed in the background before expiry; shared with other processes via TOKEN_CACHE_PATH
+        self.tokens = TokenManager(
+            f"zoom:{self.account_id}:{self.client_id}",
+            self._fetch_access_token,
+            cache_path=token_cache_path,
+        )
+        # Pooled keep-alive client shared by every call (the sync methods run on the shared tool loop)
+        self.http = http or HTTPClient(pool_size=pool_size, timeout=timeout, max_retries=max_retries)
+        # Meetings already created for the email being processed are replayed, not created again
+        self.ledger = ledger
 
     def get_access_token(self) -> str:
         """
@@ -40,31 +64,299 @@ class CustomZoomTool(ZoomTool):
         Returns:
             A string containing the access token or an empty string if token retrieval fails.
         """
-        if self.access_token and time.time() < self.token_expires_at:
-            return str(self.access_token)
+        return run_sync(self.aget_access_token())
+
+    async def aget_access_token(self) -> str:
+        """Async variant of `get_access_token`."""
+        try:
+            self.access_token = await self.tokens.get()
+        except (httpx.HTTPError, KeyError) as e:
+            logger.error(f"Error fetching access token: {e}")
+            return ""
+        self.token_expires_at = self.tokens.expires_at
+        self._set_parent_token(str(self.access_token))
+        return str(self.access_token)
 
+    async def _fetch_access_token(self) -> Tuple[str, float]:
+        """Request a new server-to-server OAuth token; returns (token, expires_in)."""
         headers = {"Content-Type": "application/x-www-form-urlencoded"}
         data = {"grant_type": "account_credentials", "account_id": self.account_id}
+        response = await self.http.post(
+            self.token_url,
+            headers=headers,
+            data=data,
+            auth=(self.client_id, self.client_secret),
+        )
+        response.raise_for_status()
+        token_info = response.json()
+        return token_info["access_token"], token_info["expires_in"]
+
+    def schedule_meeting(self, topic: str, start_time: str, duration: int, timezone: str = "UTC") -> str:
+        """
+        Schedule a new Zoom meeting.
+
+        Args:
+            topic (str): The topic or title of the meeting.
+            start_time (str): The start time of the meeting in ISO 8601 format.
+            duration (int): The duration of the meeting in minutes.
+            timezone (str): The timezone for the meeting (e.g., "America/New_York", "Asia/Tokyo").
+
+        Returns:
+            A JSON-formatted string containing the response from Zoom API with the scheduled meeting details,
+            or an error message if the scheduling fails.
+        """
+        return run_once(
+            self.ledger,
+            ZOOM_CREATED,
+            lambda: run_sync(self.aschedule_meeting(topic, start_time, duration, timezone)),
+            succeeded=lambda result: '"join_url"' in result,
+        )
+
+    async def aschedule_meeting(self, topic: str, start_time: str, duration: int, timezone: str = "UTC") -> str:
+        """Async variant of `schedule_meeting`."""
+        logger.debug(f"Attempting to schedule meeting: {topic} in timezone: {timezone}")
+        token = await self.aget_access_token()
+        if not token:
+            logger.error("Unable to obtain access token.")
+            return json.dumps({"error": "Failed to obtain access token"})
+
+        headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
+        data = {
+            "topic": topic,
+            "type": 2,
+            "start_time": start_time,
+            "duration": duration,
+            "timezone": timezone,
+            "settings": {
+                "host_video": True,
+                "participant_video": True,
+                "join_before_host": False,
+                "mute_upon_entry": False,
+                "watermark": True,
+                "audio": "voip",
+                "auto_recording": "none",
+            },
+        }
 
         try:
-            response = requests.post(
-                self.token_url,
-                headers=headers,
-                data=data,
-                auth=(self.client_id, self.client_secret),
-            )
+            response = await self.http.post(f"{self.api_url}/users/me/meetings", json=data, headers=headers)
             response.raise_for_status()
+            meeting_info = response.json()
 
-            token_info = response.json()
-            self.access_token = token_info["access_token"]
-            expires_in = token_info["expires_in"]
-            self.token_expires_at = time.time() + expires_in - 60
+            result = {
+                "message": "Meeting scheduled successfully!",
+                "meeting_id": meeting_info["id"],
+                "topic": meeting_info["topic"],
+                "start_time": meeting_info["start_time"],
+                "duration": meeting_info["duration"],
+                "join_url": meeting_info["join_url"],
+            }
+            logger.info(f"Meeting scheduled successfully. ID: {meeting_info['id']}")
+            return json.dumps(result, indent=2)
+        except httpx.HTTPError as e:
+            logger.error(f"Error scheduling meeting: {e}")
+            return json.dumps({"error": str(e)})
 
-            self._set_parent_token(str(self.access_token))
-            return str(self.access_token)
-        except requests.RequestException as e:
-            logger.error(f"Error fetching access token: {e}")
-            return ""
+    def delete_meeting(self, meeting_id: str, schedule_for_reminder: bool = True) -> str:
+        """
+        Delete a scheduled Zoom meeting.
+
+        Args:
+            meeting_id (str): The ID of the meeting to delete
+            schedule_for_reminder (bool): Send cancellation email to registrants.
+                                          Defaults to True.
+
+        Returns:
+            A JSON-formatted string containing the response status,
+            or an error message if the deletion fails.
+        """
+        return run_sync(self.adelete_meeting(meeting_id, schedule_for_reminder))
+
+    async def adelete_meeting(self, meeting_id: str, schedule_for_reminder: bool = True) -> str:
+        """Async variant of `delete_meeting`."""
+        logger.debug(f"Attempting to delete meeting: {meeting_id}")
+        token = await self.aget_access_token()
+        if not token:
+            logger.error("Unable to obtain access token.")
+            return json.dumps({"error": "Failed to obtain access token"})
+
+        headers = {"Authorization": f"Bearer {token}"}
+        params = {"schedule_for_reminder": str(schedule_for_reminder).lower()}
+
+        try:
+            response = await self.http.delete(f"{self.api_url}/meetings/{meeting_id}", headers=headers, params=params)
+            response.raise_for_status()
+
+            # Zoom returns 204 No Content for successful deletion
+            if response.status_code == 204:
+                result = {"message": "Meeting deleted successfully!", "meeting_id": meeting_id}
+                logger.info(f"Meeting {meeting_id} deleted successfully")
+            else:
+                result = response.json()
+
+            return json.dumps(result, indent=2)
+        except httpx.HTTPError as e:
+            logger.error(f"Error deleting meeting: {e}")
+            return json.dumps({"error": str(e)})
+
+    def get_upcoming_meetings(self, user_id: str = "me") -> str:
+        """
+        Get a list of upcoming meetings for a specified user.
+
+        Args:
+            user_id (str): The user ID or 'me' for the authenticated user. Defaults to 'me'.
+
+        Returns:
+            A JSON-formatted string containing the upcoming meetings information,
+            or an error message if the request fails.
+        """
+        return run_sync(self.aget_upcoming_meetings(user_id))
+
+    async def aget_upcoming_meetings(self, user_id: str = "me") -> str:
+        """Async variant of `get_upcoming_meetings`."""
+        logger.debug(f"Fetching upcoming meetings for user: {user_id}")
+        try:
+            meetings = await self._aget(f"/users/{user_id}/meetings", {"type": "upcoming", "page_size": 30})
+        except (httpx.HTTPError, ValueError) as e:
+            logger.error(f"Error fetching upcoming meetings: {e}")
+            return json.dumps({"error": str(e)})
+        result = {"message": "Upcoming meetings retrieved successfully", "meetings": meetings.get("meetings", [])}
+        logger.info(f"Retrieved {len(result['meetings'])} upcoming meetings")
+        return json.dumps(result, indent=2)
+
+    def list_meetings(self, user_id: str = "me", type: str = "scheduled") -> str:
+        """
+        List all meetings for a specified user.
+
+        Args:
+            user_id (str): The user ID or 'me' for the authenticated user. Defaults to 'me'.
+            type (str): The type of meetings to return. Options are:
+                       "scheduled" - All valid scheduled meetings
+                       "live" - All live meetings
+                       "upcoming" - All upcoming meetings
+                       "previous" - All previous meetings
+                       Defaults to "scheduled".
+
+        Returns:
+            A JSON-formatted string containing the meetings information,
+            or an error message if the request fails.
+        """
+        return run_sync(self.alist_meetings(user_id, type))
+
+    async def alist_meetings(self, user_id: str = "me", type: str = "scheduled") -> str:
+        """Async variant of `list_meetings`."""
+        logger.debug(f"Fetching meetings for user: {user_id}")
+        try:
+            meetings = await self._aget(f"/users/{user_id}/meetings", {"type": type})
+        except (httpx.HTTPError, ValueError) as e:
+            logger.error(f"Error fetching meetings: {e}")
+            return json.dumps({"error": str(e)})
+        result = {
+            "message": "Meetings retrieved successfully",
+            "page_count": meetings.get("page_count", 0),
+            "page_number": meetings.get("page_number", 1),
+            "page_size": meetings.get("page_size", 30),
+            "total_records": meetings.get("total_records", 0),
+            "meetings": meetings.get("meetings", []),
+        }
+        logger.info(f"Retrieved {len(result['meetings'])} meetings")
+        return json.dumps(result, indent=2)
+
+    def get_meeting_recordings(
+        self, meeting_id: str, include_download_token: bool = False, token_ttl: Optional[int] = None
+    ) -> str:
+        """
+        Get all recordings for a specific meeting.
+
+        Args:
+            meeting_id (str): The meeting ID or UUID to get recordings for.
+            include_download_token (bool): Whether to include download access token in response.
+            token_ttl (int, optional): Time to live for download token in seconds (max 604800).
+
+        Returns:
+            A JSON-formatted string containing the meeting recordings information,
+            or an error message if the request fails.
+        """
+        return run_sync(self.aget_meeting_recordings(meeting_id, include_download_token, token_ttl))
+
+    async def aget_meeting_recordings(
+        self, meeting_id: str, include_download_token: bool = False, token_ttl: Optional[int] = None
+    ) -> str:
+        """Async variant of `get_meeting_recordings`."""
+        logger.debug(f"Fetching recordings for meeting: {meeting_id}")
+        params = {}
+        if include_download_token:
+            params["include_fields"] = "download_access_token"
+            if token_ttl is not None:
+                if 0 <= token_ttl <= 604800:
+                    params["ttl"] = str(token_ttl)
+                else:
+                    logger.warning("Invalid TTL value. Must be between 0 and 604800 seconds.")
+        try:
+            recordings = await self._aget(f"/meetings/{meeting_id}/recordings", params)
+        except (httpx.HTTPError, ValueError) as e:
+            logger.error(f"Error fetching meeting recordings: {e}")
+            return json.dumps({"error": str(e)})
+        result = {
+            "message": "Meeting recordings retrieved successfully",
+            "meeting_id": recordings.get("id", ""),
+            "uuid": recordings.get("uuid", ""),
+            "host_id": recordings.get("host_id", ""),
+            "topic": recordings.get("topic", ""),
+            "start_time": recordings.get("start_time", ""),
+            "duration": recordings.get("duration", 0),
+            "total_size": recordings.get("total_size", 0),
+            "recording_count": recordings.get("recording_count", 0),
+            "recording_files": recordings.get("recording_files", []),
+        }
+        logger.info(f"Retrieved {result['recording_count']} recording files")
+        return json.dumps(result, indent=2)
+
+    def get_meeting(self, meeting_id: str) -> str:
+        """
+        Get the details of a specific Zoom meeting.
+
+        Args:
+            meeting_id (str): The ID of the meeting to retrieve
+
+        Returns:
+            A JSON-formatted string containing the meeting details,
+            or an error message if the request fails.
+        """
+        return run_sync(self.aget_meeting(meeting_id))
+
+    async def aget_meeting(self, meeting_id: str) -> str:
+        """Async variant of `get_meeting`."""
+        logger.debug(f"Fetching details for meeting: {meeting_id}")
+        try:
+            meeting_info = await self._aget(f"/meetings/{meeting_id}")
+        except (httpx.HTTPError, ValueError) as e:
+            logger.error(f"Error fetching meeting details: {e}")
+            return json.dumps({"error": str(e)})
+        result = {
+            "message": "Meeting details retrieved successfully",
+            "meeting_id": meeting_info.get("id", ""),
+            "topic": meeting_info.get("topic", ""),
+            "type": meeting_info.get("type", ""),
+            "start_time": meeting_info.get("start_time", ""),
+            "duration": meeting_info.get("duration", 0),
+            "timezone": meeting_info.get("timezone", ""),
+            "created_at": meeting_info.get("created_at", ""),
+            "join_url": meeting_info.get("join_url", ""),
+            "settings": meeting_info.get("settings", {}),
+        }
+        logger.info(f"Retrieved details for meeting ID: {meeting_id}")
+        return json.dumps(result, indent=2)
+
+    async def _aget(self, path: str, params: Optional[dict] = None) -> dict:
+        """GET a Zoom API resource over the pooled client; raises ValueError without an access token."""
+        token = await self.aget_access_token()
+        if not token:
+            logger.error("Unable to obtain access token.")
+            raise ValueError("Failed to obtain access token")
+        response = await self.http.get(f"{self.api_url}{path}", headers={"Authorization": f"Bearer {token}"}, params=params)
+        response.raise_for_status()
+        return response.json()
 
     def _set_parent_token(self, token: str) -> None:
         """Helper method to set the token in the parent ZoomTool class"""
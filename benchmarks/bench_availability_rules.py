@@ -0,0 +1,99 @@
+"""Benchmark: throughput of the business-hour / Japan-holiday rules engine over months of slots.
+
+Compares `BusinessRules.filter` with a naive per-slot implementation (timezone lookup and
+holiday table rebuilt for every slot), then runs a set of edge-case checks around the
+UTC/JST day boundary, the lunch break and the end of the business day.
+
+    python benchmarks/bench_availability_rules.py [months]
+"""
+import sys
+import time
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import pytz  # noqa: E402
+
+from Tools.availability_rules import BusinessRules, japan_holidays  # noqa: E402
+
+MONTHS = 6
+SLOT_MINUTES = 15
+
+
+def slots(months: int):
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    step = timedelta(minutes=SLOT_MINUTES)
+    return [start + step * i for i in range(months * 30 * 24 * 60 // SLOT_MINUTES)]
+
+
+def naive_allowed(start: datetime) -> bool:
+    local = start.astimezone(pytz.timezone("Asia/Tokyo"))
+    if local.weekday() >= 5:
+        return False
+    japan_holidays.__wrapped__(local.year)  # rebuild the calendar, as a per-call lookup would
+    if local.date() in japan_holidays.__wrapped__(local.year):
+        return False
+    minutes = local.hour * 60 + local.minute
+    return (9 * 60 <= minutes and minutes + 30 <= 13 * 60) or (14 * 60 <= minutes and minutes + 30 <= 18 * 60)
+
+
+def bench(months: int) -> None:
+    starts = slots(months)
+    t0 = time.perf_counter()
+    naive = [s for s in starts if naive_allowed(s)]
+    t_naive = time.perf_counter() - t0
+
+    rules = BusinessRules("Asia/Tokyo")
+    t0 = time.perf_counter()
+    engine = list(rules.filter(starts))
+    t_engine = time.perf_counter() - t0
+
+    print(f"{len(starts)} slots over {months} months, {len(engine)} allowed, results match: {'ok' if engine == naive else 'MISMATCH'}")
+    print(f"naive  {len(starts) / t_naive:10,.0f} slots/s ({t_naive * 1000:7.1f}ms)")
+    print(f"engine {len(starts) / t_engine:10,.0f} slots/s ({t_engine * 1000:7.1f}ms)")
+
+    t0 = time.perf_counter()
+    first = rules.first_valid(starts, 3, after=datetime(2025, 5, 2, 9, tzinfo=timezone.utc))
+    print(f"first_valid(3) across Golden Week: {[rules.to_local(s).strftime('%m-%d %H:%M') for s in first]} "
+          f"({(time.perf_counter() - t0) * 1e6:.0f}us)")
+
+
+EDGE_CASES = [
+    # (start, allowed, description)
+    ("2025-01-10T00:00:00+00:00", True, "Fri 09:00 JST is Thu in UTC"),
+    ("2025-01-09T23:30:00+00:00", False, "Fri 08:30 JST, before opening"),
+    ("2025-01-10T15:00:00+00:00", False, "Fri 15:00 UTC is Sat 00:00 JST"),
+    ("2025-01-12T23:59:00+00:00", False, "Mon 08:59 JST on Coming of Age Day"),
+    ("2024-12-31T15:00:00+00:00", False, "New Year's Day starts at 15:00 UTC"),
+    ("2025-01-10T03:30:00+00:00", True, "12:30 JST ends exactly at the lunch break"),
+    ("2025-01-10T03:45:00+00:00", False, "12:45 JST runs into the lunch break"),
+    ("2025-01-10T05:00:00+00:00", True, "14:00 JST, end of the lunch break"),
+    ("2025-01-10T08:30:00+00:00", True, "17:30 JST ends exactly at 18:00"),
+    ("2025-01-10T08:45:00+00:00", False, "17:45 JST runs past 18:00"),
+    ("2025-01-09T19:00:00-05:00", True, "New York evening is Tokyo morning"),
+    ("2025-01-10T09:00:00", True, "naive time is read as JST"),
+    ("2025-02-24T02:00:00+00:00", False, "substitute holiday for Emperor's Birthday"),
+    ("2026-09-22T02:00:00+00:00", False, "citizens' holiday between two holidays"),
+]
+
+
+def check_edge_cases() -> bool:
+    rules = BusinessRules("Asia/Tokyo")
+    failures = 0
+    for start, expected, description in EDGE_CASES:
+        allowed = rules.is_allowed(datetime.fromisoformat(start))
+        if allowed != expected:
+            failures += 1
+            print(f"  FAIL {start} ({description}): allowed={allowed}, expected {expected}")
+    print(f"edge cases: {len(EDGE_CASES) - failures}/{len(EDGE_CASES)} ok")
+    holidays_2025 = len(japan_holidays(2025))
+    substitute = date(2025, 5, 6) in japan_holidays(2025)
+    print(f"2025 holidays: {holidays_2025} ({'ok' if holidays_2025 == 19 else 'UNEXPECTED'}), "
+          f"Golden Week 2025-05-06 substitute: {'ok' if substitute else 'MISSING'}")
+    return failures == 0 and holidays_2025 == 19 and substitute
+
+
+if __name__ == "__main__":
+    bench(int(sys.argv[1]) if len(sys.argv) > 1 else MONTHS)
+    sys.exit(0 if check_edge_cases() else 1)
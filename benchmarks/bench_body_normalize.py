@@ -0,0 +1,80 @@
+"""Benchmark: prompt token reduction and cost of quoted-reply / signature stripping.
+
+Normalizes the English/Japanese reply corpus in benchmarks/fixtures/reply_corpus.jsonl
+(reply chains with quoted history, Outlook and Japanese header blocks, signature boxes,
+mobile footers, legal disclaimers and an over-long newsletter), reports the average prompt
+token reduction and the time per email, and checks that each email keeps its new text
+and loses its quoted history. Token counts use tiktoken when installed, otherwise the
+normalizer's own estimate.
+
+    python benchmarks/bench_body_normalize.py [token_budget]
+"""
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from Tools.body_normalizer import BodyNormalizer, estimate_tokens  # noqa: E402
+
+try:
+    import tiktoken
+
+    _encoding = tiktoken.get_encoding("cl100k_base")
+
+    def count_tokens(text: str) -> int:
+        return len(_encoding.encode(text))
+
+    TOKENIZER = "cl100k_base"
+except ImportError:
+    count_tokens = estimate_tokens
+    TOKENIZER = "estimate"
+
+CORPUS = Path(__file__).resolve().parent / "fixtures" / "reply_corpus.jsonl"
+TOKEN_BUDGET = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+REPEAT = 200
+# The fixed part of the prompt built in AI-Agent.py around the body
+PROMPT_OVERHEAD = count_tokens(
+    "The following email was received:\n\n**Sender Name:** \n**Sender Email:** \n**Subject:** \n**Body:** \n\n"
+    "Does this email relate to a meeting, scheduling, or a request for an online discussion? "
+    "If so, proceed with the request as per the instructions provided."
+)
+
+
+def load_corpus():
+    with open(CORPUS, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def check(row, normalized: str) -> list:
+    problems = [f"lost {phrase!r}" for phrase in row["keep"] if phrase not in normalized]
+    problems += [f"kept {phrase!r}" for phrase in row["drop"] if phrase in normalized]
+    return problems
+
+
+if __name__ == "__main__":
+    corpus = load_corpus()
+    normalizer = BodyNormalizer(token_budget=TOKEN_BUDGET)
+    before = after = failures = 0
+    print(f"tokenizer: {TOKENIZER}, budget: {TOKEN_BUDGET} tokens")
+    for index, row in enumerate(corpus):
+        normalized = normalizer.normalize(row["body"])
+        raw_tokens, new_tokens = count_tokens(row["body"]), count_tokens(normalized)
+        before += raw_tokens + PROMPT_OVERHEAD
+        after += new_tokens + PROMPT_OVERHEAD
+        problems = check(row, normalized)
+        failures += bool(problems)
+        print(f"{index:>3} {raw_tokens:>6} -> {new_tokens:>5} tokens  {'ok' if not problems else 'FAIL ' + '; '.join(problems)}")
+
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        for row in corpus:
+            normalizer.normalize(row["body"])
+    elapsed = (time.perf_counter() - start) / (REPEAT * len(corpus))
+
+    print(
+        f"average prompt {before / len(corpus):.0f} -> {after / len(corpus):.0f} tokens "
+        f"({(1 - after / before) * 100:.0f}% fewer), {elapsed * 1e6:.0f}us per email, "
+        f"checks: {'all ok' if not failures else f'{failures} FAILED'}"
+    )
@@ -0,0 +1,173 @@
+"""Benchmark: confirming a meeting with `confirm_meeting` vs. one tool call per step.
+
+Against the local HTTP stub (with per-request API latency), compares the tool-call
+sequence of the previous "Case 2" flow (check_availability -> schedule_meeting ->
+create_booking -> send_email, one LLM turn each) with check_availability followed by a
+single confirm_meeting. The measured tool time is reported together with the modelled
+end-to-end time, counting `LLM_TURN` seconds for every tool turn of the model.
+
+Also checks that the Zoom meeting is rolled back when the booking fails or the slot was
+taken in the meantime, and that a retried run replays the recorded steps instead of
+creating a second meeting, booking or email.
+
+    python benchmarks/bench_confirm_meeting.py
+"""
+import json
+import logging
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from phi.utils.log import logger
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.fake_http_server import FakeHTTPServer  # noqa: E402
+from Tools.calcom_tool import CalCom  # noqa: E402
+from Tools.meeting_tool import MeetingConfirmationTool  # noqa: E402
+from Tools.outbound_spool import OutboundSpool  # noqa: E402
+from Tools.processing_ledger import ProcessingLedger  # noqa: E402
+from Tools.SendEmail_tool import CustomEmailTool  # noqa: E402
+from Tools.zoom_tool import CustomZoomTool  # noqa: E402
+
+API_LATENCY = 0.08
+LLM_TURN = 1.5
+MEETINGS = 5
+BODY = "Your meeting is confirmed for [start_time].\nJoin: [join_url] (ID [meeting_id])"
+
+
+def toolkits(server: FakeHTTPServer, tmp: str, ledger=None):
+    zoom = CustomZoomTool("acct", "id", "secret", api_url=f"{server.url}/v2", token_url=f"{server.url}/oauth/token", ledger=ledger)
+    calcom = CalCom(api_key="test", event_type_id=1, base_url=f"{server.url}/v2", slot_cache_ttl=0, ledger=ledger)
+    spool = OutboundSpool(f"{tmp}/spool.sqlite3")
+    mailer = CustomEmailTool(sender_name="Me", sender_email="me@example.com", sender_passkey="x", ledger=ledger, spool=spool)
+    return zoom, calcom, mailer, MeetingConfirmationTool(zoom, calcom, mailer, ledger=ledger)
+
+
+def valid_slots(calcom: CalCom, count: int):
+    """The next `count` bookable local start times (weekdays, business hours, no holidays)."""
+    slots, day = [], datetime.now().date() + timedelta(days=2)
+    while len(slots) < count:
+        for hour in (10, 11, 15, 16):
+            start = calcom.rules.to_local(datetime(day.year, day.month, day.day, hour))
+            if calcom.rules.violation(start) is None and len(slots) < count:
+                slots.append(start.isoformat(timespec="seconds"))
+        day += timedelta(days=1)
+    return slots
+
+
+def step_by_step(zoom, calcom, mailer, start: str, attendee: str) -> int:
+    assert calcom.check_availability(start).startswith("Available")
+    meeting = json.loads(zoom.schedule_meeting("Project sync", start[:19], 30, calcom.user_timezone))
+    booking = calcom.create_booking(start, "Taro", attendee, meeting["join_url"])
+    assert booking.startswith("Booking created"), booking
+    body = BODY.replace("[start_time]", start).replace("[join_url]", meeting["join_url"]).replace("[meeting_id]", str(meeting["meeting_id"]))
+    assert not mailer.send_email(to=[attendee], subject="Meeting confirmed", body=body).startswith("error:")
+    return 4
+
+
+def composite(calcom, meeting_tool, start: str, attendee: str) -> int:
+    assert calcom.check_availability(start).startswith("Available")
+    result = json.loads(meeting_tool.confirm_meeting(start, 30, "Project sync", "Taro", attendee, "Meeting confirmed", BODY))
+    assert result["status"] == "confirmed", result
+    return 2
+
+
+def measure(name: str, run) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        server = FakeHTTPServer(latency=API_LATENCY).start()
+        zoom, calcom, mailer, meeting_tool = toolkits(server, tmp)
+        zoom.get_access_token()  # both flows start with a cached token
+        slots = valid_slots(calcom, MEETINGS)
+        tool_time, turns = 0.0, 0
+        for i, start in enumerate(slots):
+            begin = time.perf_counter()
+            turns += run(zoom, calcom, mailer, meeting_tool, start, f"client{i}@example.jp")
+            tool_time += time.perf_counter() - begin
+        server.stop()
+        mailer.spool.close()
+    per_meeting = tool_time / MEETINGS
+    modelled = per_meeting + turns / MEETINGS * LLM_TURN
+    print(f"{name:<15} tool I/O {per_meeting * 1000:6.0f}ms, {turns // MEETINGS} tool turns -> ~{modelled:4.1f}s per confirmed meeting")
+
+
+def check(name: str, ok: bool) -> bool:
+    print(f"{name:<56} {'ok' if ok else 'FAILED'}")
+    return ok
+
+
+def checks() -> bool:
+    ok = True
+    with tempfile.TemporaryDirectory() as tmp:
+        server = FakeHTTPServer().start()
+        ledger = ProcessingLedger(f"{tmp}/ledger.sqlite3")
+        zoom, calcom, mailer, meeting_tool = toolkits(server, tmp, ledger)
+        first, second, third = valid_slots(calcom, 3)
+
+        def confirm(start, attendee="taro@example.jp"):
+            return json.loads(meeting_tool.confirm_meeting(start, 30, "Project sync", "Taro", attendee, "Meeting confirmed", BODY))
+
+        server.reject_bookings = 1
+        with ledger.activate(["<a@example.jp>"]):
+            result = confirm(first)
+        ok &= check(
+            "Zoom meeting rolled back when booking fails",
+            result["status"] == "failed" and result.get("meeting_rolled_back") and not server.meetings and not server.bookings,
+        )
+
+        calcom.create_booking(second, "Hanako", "hanako@example.jp", "https://zoom.example/j/other")
+        result = confirm(second)
+        ok &= check(
+            "Zoom meeting rolled back when the slot is taken",
+            result["status"] == "not_available" and result.get("meeting_rolled_back") and not server.meetings,
+        )
+
+        with ledger.activate(["<b@example.jp>"]):
+            result = confirm(third)
+        # The same run again, as after a crash before the emails were marked as read
+        with ledger.activate(["<b@example.jp>"]):
+            replay = confirm(third)
+        sent = mailer.spool.stats()["queued"]
+        body_filled = "[join_url]" not in mailer.spool.claim(1)[0][1].get_content()
+        ok &= check("placeholders filled in the confirmation email", body_filled)
+        ok &= check(
+            "retried run replays meeting, booking and email",
+            result["status"] == replay["status"] == "confirmed"
+            and result["join_url"] == replay["join_url"]
+            and len(server.meetings) == 1
+            and len(server.bookings) == 2
+            and sent == 1,
+        )
+
+        # A follow-up coalesced with the answered email is a new run with its own reply
+        with ledger.activate(["<b@example.jp>", "<c@example.jp>"]):
+            booked_again = calcom.create_booking(first, "Taro", "taro@example.jp", "https://zoom.example/j/2")
+            sent_again = mailer.send_email(to=["taro@example.jp"], subject="Re: Project sync", body="Noted.")
+        ok &= check(
+            "follow-up coalesced after completion: own side effects",
+            booked_again != result["booking"] and sent_again != result["email"]
+            and len(server.bookings) == 3 and mailer.spool.stats()["depth"] == 2,
+        )
+        # Two sends in one run are two side effects; a retry of the run replays both
+        sends = []
+        for _ in range(2):
+            with ledger.activate(["<d@example.jp>"]):
+                sends.append([mailer.send_email(to=[f"{n}@example.jp"], subject="Agenda", body=n) for n in ("a", "b")])
+        ok &= check(
+            "two sends in one run both go out, a retry replays both",
+            sends[0][0] != sends[0][1] and sends[1] == sends[0] and mailer.spool.stats()["depth"] == 4,
+        )
+        server.stop()
+        mailer.spool.close()
+        ledger.close()
+    return ok
+
+
+if __name__ == "__main__":
+    # One log line per API call would drown the results
+    logger.setLevel(logging.CRITICAL)
+    measure("step by step", lambda zoom, calcom, mailer, meeting_tool, start, attendee: step_by_step(zoom, calcom, mailer, start, attendee))
+    measure("confirm_meeting", lambda zoom, calcom, mailer, meeting_tool, start, attendee: composite(calcom, meeting_tool, start, attendee))
+    print(f"checks: {'all ok' if checks() else 'FAILED'}")
@@ -0,0 +1,106 @@
+"""Benchmark: Cal.com tool call latency with pooled keep-alive connections vs. a new connection per call.
+
+Runs offline against benchmarks/fake_http_server.py. The stub's `handshake_delay` stands in
+for the TCP + TLS handshake a fresh connection to api.cal.com pays; 0 shows the raw
+loopback cost. Also checks that throttled (429 + Retry-After) calls are retried, and that a
+connection dropped after a POST was sent is only retried with an Idempotency-Key.
+
+    python benchmarks/bench_http_pool.py [handshake_delay_seconds]
+"""
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import httpx  # noqa: E402
+
+from benchmarks.fake_http_server import FakeHTTPServer  # noqa: E402
+from Tools.async_utils import LoopLocal, run_sync  # noqa: E402
+from Tools.calcom_tool import CalCom  # noqa: E402
+from Tools.http_client import HTTPClient  # noqa: E402
+
+CALLS = 100
+THREADS = 8
+HANDSHAKE_DELAY = float(sys.argv[1]) if len(sys.argv) > 1 else 0.02
+
+
+def _calcom(server: FakeHTTPServer, reuse: bool) -> CalCom:
+    # Slot cache off so every call goes over the wire
+    calcom = CalCom(api_key="test", event_type_id=1, base_url=f"{server.url}/v2", slot_cache_ttl=0)
+    if not reuse:
+        # Same client code path, but every connection is closed after its response
+        calcom.http._clients = LoopLocal(lambda: httpx.AsyncClient(limits=httpx.Limits(max_keepalive_connections=0)))
+    return calcom
+
+
+def _timed_call(calcom: CalCom) -> float:
+    start = time.perf_counter()
+    result = calcom.get_available_slots("2025-01-06", "2025-01-10")
+    assert '"days"' in result, result
+    return time.perf_counter() - start
+
+
+def run(server: FakeHTTPServer, reuse: bool, threads: int) -> None:
+    calcom = _calcom(server, reuse)
+    _timed_call(calcom)  # warm up (pool, token-free path, imports)
+    server.reset_counters()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        latencies = sorted(pool.map(lambda _: _timed_call(calcom), range(CALLS)))
+    elapsed = time.perf_counter() - start
+
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(
+        f"{'pooled' if reuse else 'no reuse':<9} threads={threads:<2} "
+        f"p50={statistics.median(latencies) * 1000:6.1f}ms p95={p95 * 1000:6.1f}ms "
+        f"{CALLS / elapsed:7.1f} calls/s connections={server.connections}"
+    )
+
+
+def run_throttled(server: FakeHTTPServer) -> None:
+    calcom = _calcom(server, reuse=True)
+    server.reset_counters()
+    server.throttle(3, retry_after="0")
+    ok = '"days"' in calcom.get_available_slots("2025-01-06", "2025-01-10")
+    print(
+        f"429 x3 with Retry-After: 0 -> {'ok' if ok else 'FAILED'} "
+        f"(client retries={calcom.http.retries}, server requests={server.requests})"
+    )
+
+
+def run_dropped() -> None:
+    """Each request reaches the server, which then drops the connection without answering."""
+    for method, headers in (("GET", {}), ("POST", {}), ("POST", {"Idempotency-Key": "booking-1"})):
+        sent = []
+
+        def drop(request: httpx.Request) -> httpx.Response:
+            sent.append(request)
+            raise httpx.RemoteProtocolError("Server disconnected without sending a response.", request=request)
+
+        client = HTTPClient(max_retries=2, backoff=0, transport_factory=lambda: httpx.MockTransport(drop))
+        try:
+            run_sync(client.request(method, "http://api.example.com/v2/bookings", headers=headers))
+        except httpx.RemoteProtocolError:
+            pass
+        expected = 1 if method == "POST" and not headers else 3
+        print(
+            f"dropped connection, {method + (' + Idempotency-Key' if headers else ''):<22} -> sent {len(sent)}x"
+            f" {'ok' if len(sent) == expected else 'FAILED'}"
+        )
+
+
+if __name__ == "__main__":
+    server = FakeHTTPServer(handshake_delay=HANDSHAKE_DELAY).start()
+    try:
+        print(f"{CALLS} get_available_slots calls, handshake_delay={HANDSHAKE_DELAY * 1000:.0f}ms")
+        for threads in (1, THREADS):
+            run(server, reuse=False, threads=threads)
+            run(server, reuse=True, threads=threads)
+        run_throttled(server)
+        run_dropped()
+    finally:
+        server.stop()
@@ -0,0 +1,70 @@
+"""Benchmark: batched UID FETCH with part selection vs. the per-message RFC822 loop.
+
+Reports bytes sent by the server and wall time for a backlog of unread messages,
+a share of which carry large attachments.
+
+    python benchmarks/bench_imap_fetch.py
+"""
+import email
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.fake_imap_server import FakeIMAPServer, make_message  # noqa: E402
+from Tools.FetchUnreadMail_tool import FetchUnreadEmailTool  # noqa: E402
+from Tools.imap_session import IMAPSession  # noqa: E402
+
+MESSAGES = 300
+ATTACHMENT_EVERY = 3
+ATTACHMENT_SIZE = 256 * 1024
+
+
+def _populate(server: FakeIMAPServer) -> None:
+    for i in range(MESSAGES):
+        size = ATTACHMENT_SIZE if i % ATTACHMENT_EVERY == 0 else 0
+        server.deliver(make_message(i, attachment_size=size))
+    # Parse up front so the fake server's own MIME parsing is not timed
+    for message in server.mailbox.messages:
+        message.parsed
+
+
+def _session(server: FakeIMAPServer) -> IMAPSession:
+    return IMAPSession("127.0.0.1", server.port, "me@example.com", "secret", use_ssl=False)
+
+
+def legacy_fetch(mail) -> int:
+    """The previous implementation: SEARCH UNSEEN, then one RFC822 FETCH per message."""
+    _, messages = mail.search(None, "UNSEEN")
+    count = 0
+    for num in messages[0].split():
+        _, msg_data = mail.fetch(num, "(RFC822)")
+        for response_part in msg_data:
+            if isinstance(response_part, tuple):
+                email.message_from_bytes(response_part[1])
+                count += 1
+    return count
+
+
+def run(name: str, fetch) -> None:
+    server = FakeIMAPServer().start()
+    _populate(server)
+    session = _session(server)
+    session.ensure_connected()
+    server.bytes_sent = 0
+    commands = len(server.commands)
+    start = time.perf_counter()
+    count = fetch(session)
+    elapsed = time.perf_counter() - start
+    print(
+        f"{name:<8} messages={count} commands={len(server.commands) - commands} "
+        f"bytes={server.bytes_sent / 1024:.0f}KiB time={elapsed * 1000:.0f}ms"
+    )
+    session.stop()
+    server.stop()
+
+
+if __name__ == "__main__":
+    run("RFC822", lambda session: session.run(legacy_fetch))
+    run("Batched", lambda session: len(FetchUnreadEmailTool(session=session).fetch_unread_emails()))
@@ -0,0 +1,116 @@
+"""Benchmark: latency from delivery to dispatch with IMAP IDLE vs. fixed-interval polling.
+
+Runs entirely offline against benchmarks/fake_imap_server.py.
+
+    python -m benchmarks.bench_imap_idle
+"""
+import statistics
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.fake_imap_server import FakeIMAPServer, make_message  # noqa: E402
+from Tools.imap_session import IMAPSession  # noqa: E402
+
+MESSAGES = 20
+POLL_INTERVAL = 2.0
+
+
+def _session(server: FakeIMAPServer) -> IMAPSession:
+    return IMAPSession(
+        host="127.0.0.1",
+        port=server.port,
+        email_address="me@example.com",
+        email_password="secret",
+        use_ssl=False,
+        initial_backoff=0.05,
+    )
+
+
+def _fetch_unseen(session: IMAPSession) -> int:
+    def fetch(mail):
+        _, data = mail.search(None, "UNSEEN")
+        nums = data[0].split()
+        for num in nums:
+            mail.fetch(num, "(RFC822)")
+        return len(nums)
+
+    return session.run(fetch)
+
+
+def bench_idle() -> list:
+    server = FakeIMAPServer().start()
+    session = _session(server)
+    _fetch_unseen(session)
+    latencies = []
+    for i in range(MESSAGES):
+        sent = {}
+        timer = threading.Timer(0.05, lambda: sent.setdefault("t", server.deliver(make_message(i))))
+        timer.start()
+        session.wait_for_new_mail(timeout=10)
+        _fetch_unseen(session)
+        latencies.append(time.perf_counter() - sent["t"])
+    session.stop()
+    print(f"IDLE:    logins={server.logins}")
+    server.stop()
+    return latencies
+
+
+def bench_polling() -> list:
+    """Reproduces the old loop: new connection + LOGIN + SELECT every POLL_INTERVAL seconds."""
+    server = FakeIMAPServer(capabilities=["IMAP4rev1"]).start()
+    latencies = []
+    pending = []
+
+    def producer():
+        for i in range(MESSAGES // 4):
+            time.sleep(POLL_INTERVAL * 0.37)
+            pending.append(server.deliver(make_message(i)))
+
+    thread = threading.Thread(target=producer)
+    thread.start()
+    while thread.is_alive() or pending:
+        session = _session(server)
+        if _fetch_unseen(session):
+            now = time.perf_counter()
+            latencies.extend(now - t for t in pending)
+            pending.clear()
+        session.close()
+        if thread.is_alive() or pending:
+            time.sleep(POLL_INTERVAL)
+    print(f"Polling: logins={server.logins} (interval {POLL_INTERVAL}s)")
+    server.stop()
+    return latencies
+
+
+def bench_reconnect() -> float:
+    server = FakeIMAPServer().start()
+    session = _session(server)
+    _fetch_unseen(session)
+    server.drop_connections()
+    time.sleep(0.05)
+    start = time.perf_counter()
+    server.deliver(make_message(0))
+    count = _fetch_unseen(session)
+    elapsed = time.perf_counter() - start
+    assert count == 1, count
+    session.stop()
+    server.stop()
+    return elapsed
+
+
+def _report(name: str, latencies: list) -> None:
+    latencies_ms = [x * 1000 for x in latencies]
+    print(
+        f"{name:<8} n={len(latencies_ms)} mean={statistics.mean(latencies_ms):.1f}ms "
+        f"p50={statistics.median(latencies_ms):.1f}ms max={max(latencies_ms):.1f}ms"
+    )
+
+
+if __name__ == "__main__":
+    _report("IDLE", bench_idle())
+    _report("Polling", bench_polling())
+    print(f"Reconnect after dropped connection: {bench_reconnect() * 1000:.1f}ms")
@@ -0,0 +1,133 @@
+"""Benchmark: processing-ledger write overhead, and crash injection for exactly-once side effects.
+
+Times the ledger writes made for one email (triaged, zoom_created, booked, replied,
+completed plus the lookups before each side effect) in SQLite WAL mode with
+synchronous=NORMAL and FULL.
+
+Then runs the meeting flow (Zoom meeting -> Cal.com booking -> confirmation email)
+against the local HTTP stub in a child process that is killed (os._exit) after each
+step, restarts it, and counts the side effects actually performed. With the ledger
+every crash point must end with exactly one meeting, one booking and one email; the
+run without a ledger shows the duplicates it prevents.
+
+    python benchmarks/bench_ledger.py
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from Tools.processing_ledger import (  # noqa: E402
+    BOOKED,
+    COMPLETED,
+    REPLIED,
+    TRIAGED,
+    ZOOM_CREATED,
+    ProcessingLedger,
+)
+
+MESSAGES = 2000
+STEPS = ("zoom", "booking", "email")
+
+
+def overhead(synchronous: str) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        ledger = ProcessingLedger(f"{tmp}/ledger.sqlite3", synchronous=synchronous)
+        start = time.perf_counter()
+        for i in range(MESSAGES):
+            message_id = f"<m{i}@example.org>"
+            ledger.record(message_id, TRIAGED, {"process": True, "score": 0.9, "reason": "meeting intent"})
+            with ledger.activate([message_id]):
+                ledger.once(ZOOM_CREATED, lambda: '{"join_url": "https://zoom.example/j/1"}')
+                ledger.once(BOOKED, lambda: "Booking created successfully. Booking uid: abc")
+                ledger.once(REPLIED, lambda: "email sent successfully")
+            ledger.record(message_id, COMPLETED)
+        elapsed = (time.perf_counter() - start) / MESSAGES
+        ledger.close()
+    print(f"synchronous={synchronous:<6} {elapsed * 1000:.3f}ms per email (5 writes, 3 lookups)")
+
+
+def child(url: str, db: str, sent_log: str, crash_after: int) -> None:
+    """One attempt at the meeting flow; exits abruptly after step `crash_after`."""
+    from Tools.calcom_tool import CalCom
+    from Tools.SendEmail_tool import CustomEmailTool
+    from Tools.zoom_tool import CustomZoomTool
+
+    class LoggedEmailTool(CustomEmailTool):
+        # Stands in for the SMTP server: every delivered email is one line in the log
+        async def asend_email(self, *, to, subject, body):
+            with open(sent_log, "a") as f:
+                f.write(f"{to} {subject}\n")
+            return "email sent successfully"
+
+    ledger = ProcessingLedger(db) if db != "-" else None
+    zoom = CustomZoomTool("acct", "id", "secret", api_url=f"{url}/v2", token_url=f"{url}/oauth/token", ledger=ledger)
+    calcom = CalCom(api_key="test", event_type_id=1, base_url=f"{url}/v2", ledger=ledger)
+    mailer = LoggedEmailTool(sender_name="Me", sender_email="me@example.com", sender_passkey="x", ledger=ledger)
+    steps = [
+        lambda: zoom.schedule_meeting("Project sync", "2025-01-14T10:00:00", 30, "Asia/Tokyo"),
+        lambda: calcom.create_booking("2025-01-14T10:00:00+09:00", "Taro", "taro@example.jp", "https://zoom.example/j/1"),
+        lambda: mailer.send_email(to=["taro@example.jp"], subject="Meeting confirmed", body="See you on Tuesday."),
+    ]
+    message_ids = ["<request@example.jp>"]
+    with ledger.activate(message_ids) if ledger else nullcontext():
+        for index, step in enumerate(steps):
+            step()
+            if index == crash_after:
+                os._exit(1)
+    if ledger:
+        ledger.record(message_ids, COMPLETED)
+
+
+def crash_and_restart(use_ledger: bool, crash_after: int) -> Tuple[int, int, Tuple[int, int, int]]:
+    """Kill the flow after step `crash_after`, run it again to the end.
+
+    Returns:
+        tuple: Exit codes of the crashed and the restarted process, and the (meetings, bookings, emails) performed
+    """
+    from benchmarks.fake_http_server import FakeHTTPServer
+
+    server = FakeHTTPServer().start()
+    with tempfile.TemporaryDirectory() as tmp:
+        db = f"{tmp}/ledger.sqlite3" if use_ledger else "-"
+        sent_log = f"{tmp}/sent.log"
+        command = [sys.executable, __file__, "--child", server.url, db, sent_log]
+        # The toolkit modules log missing credentials on import; only show output on failure
+        crashed = subprocess.run(command + [str(crash_after)], capture_output=True, text=True)
+        restarted = subprocess.run(command + ["-1"], capture_output=True, text=True)
+        if restarted.returncode != 0:
+            print(restarted.stderr[-2000:])
+        sent = len(open(sent_log).readlines()) if os.path.exists(sent_log) else 0
+    server.stop()
+    return crashed.returncode, restarted.returncode, (len(server.meetings), len(server.bookings), sent)
+
+
+def crash_injection(use_ledger: bool) -> bool:
+    all_ok = True
+    for crash_after in range(len(STEPS)):
+        crashed, restarted, counts = crash_and_restart(use_ledger, crash_after)
+        ok = crashed != 0 and restarted == 0 and counts == (1, 1, 1)
+        all_ok &= ok
+        print(
+            f"{'ledger' if use_ledger else 'no ledger':<9} crash after {STEPS[crash_after]:<7} -> "
+            f"meetings={counts[0]} bookings={counts[1]} emails={counts[2]} {'ok' if ok else 'DUPLICATED'}"
+        )
+    return all_ok
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--child"]:
+        child(sys.argv[2], sys.argv[3], sys.argv[4], int(sys.argv[5]))
+        sys.exit(0)
+    overhead("NORMAL")
+    overhead("FULL")
+    crash_injection(use_ledger=False)
+    ok = crash_injection(use_ledger=True)
+    print(f"crash injection with ledger: {'all ok' if ok else 'FAILED'}")
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,179 @@
+"""Benchmark: model response cache with single-flight coalescing.
+
+A fake model backend (fixed latency, counts upstream calls) answers the prompts of a
+workload where some emails are processed again (a restart after a crash, duplicate
+deliveries) and some duplicates arrive at the same time on different pipeline workers.
+Compares upstream calls and wall time without and with `ResponseCache`.
+
+Also checks persistence across instances, TTL expiry, LRU eviction, that a changed
+tool schema misses, and that a failed call is not cached but reaches every waiter.
+Finally a real phi `Agent` with `CachedOpenAIChat` (against a stub of the OpenAI chat
+completions endpoint) answers the same email twice: the turn asking for tool calls is
+not cached (a replay would book the meeting again), the final answer is.
+
+    python benchmarks/bench_llm_cache.py
+"""
+import random
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import httpx  # noqa: E402
+from phi.agent import Agent  # noqa: E402
+
+from benchmarks.fake_openai import FakeCalendar, FakeOpenAI  # noqa: E402
+from Tools.llm_cache import CachedOpenAIChat, ResponseCache, cache_key  # noqa: E402
+
+MODEL_LATENCY = 0.2
+EMAILS = 60
+REPLAYED = 0.25
+WORKERS = 8
+MODEL = "gpt-4"
+
+
+class FakeModel:
+    def __init__(self, latency: float = MODEL_LATENCY):
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, messages) -> str:
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latency)
+        return f"Handled: {messages[-1]['content'][:40]}"
+
+
+def messages(prompt: str):
+    return [{"role": "system", "content": "You are a meeting assistant."}, {"role": "user", "content": prompt}]
+
+
+def prompt(i: int) -> str:
+    return f"Email from client{i}@example.org: could we meet on Tuesday at {10 + i % 8}:00?"
+
+
+def workload(rng: random.Random):
+    """Prompts in processing order: every email once, replays later, and simultaneous duplicates."""
+    prompts = [prompt(i) for i in range(EMAILS)]
+    rounds = [prompts]
+    rounds.append(rng.sample(prompts, int(EMAILS * REPLAYED)))  # reprocessed after a restart
+    burst = [prompt(EMAILS + i) for i in range(WORKERS // 2)]
+    rounds.append([p for p in burst for _ in range(2)])  # new emails delivered twice, handled in parallel
+    return rounds
+
+
+def run(rounds, cache) -> tuple:
+    model = FakeModel()
+
+    def ask(prompt: str) -> str:
+        request = messages(prompt)
+        if cache is None:
+            return model(request)
+        return cache.get_or_call(cache_key(MODEL, request), lambda: model(request))
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=WORKERS) as pool:
+        for prompts in rounds:
+            list(pool.map(ask, prompts))
+    return model.calls, time.perf_counter() - start
+
+
+def agent_run(cache: ResponseCache, backend: FakeOpenAI, calendar: FakeCalendar) -> str:
+    """One agent run, with a fresh agent as after a restart."""
+    model = CachedOpenAIChat(
+        id=MODEL, api_key="sk-test", cache=cache, http_client=httpx.Client(transport=httpx.MockTransport(backend))
+    )
+    agent = Agent(model=model, tools=[calendar], system_prompt="You are a meeting assistant.")
+    return agent.run(prompt(0)).content
+
+
+def check(name: str, ok: bool) -> bool:
+    print(f"{name:<58} {'ok' if ok else 'FAILED'}")
+    return ok
+
+
+def checks(tmp: str) -> bool:
+    ok = True
+    path = f"{tmp}/persist.sqlite3"
+    key = cache_key(MODEL, messages("hello"))
+    ResponseCache(path).put(key, "cached answer")
+    ok &= check("responses survive a restart", ResponseCache(path).get(key) == "cached answer")
+
+    now = [1000.0]
+    cache = ResponseCache(f"{tmp}/ttl.sqlite3", ttl=60, clock=lambda: now[0])
+    cache.put(key, "answer")
+    now[0] += 61
+    ok &= check("entries expire after the TTL", cache.get(key) is None)
+
+    cache = ResponseCache(f"{tmp}/lru.sqlite3", max_entries=3, clock=lambda: now[0])
+    for i in range(3):
+        now[0] += 1
+        cache.put(f"k{i}", str(i))
+    now[0] += 1
+    cache.get("k0")  # recently used, must survive
+    now[0] += 1
+    cache.put("k3", "3")
+    ok &= check("least recently used entry evicted", cache.get("k1") is None and cache.get("k0") == "0" and cache.stats()["entries"] == 3)
+
+    tools_v1 = [{"name": "confirm_meeting", "signature": "(start_time)"}]
+    tools_v2 = [{"name": "confirm_meeting", "signature": "(start_time, duration)"}]
+    ok &= check("changed tool schema changes the key", cache_key(MODEL, messages("hi"), tools_v1) != cache_key(MODEL, messages("hi"), tools_v2))
+
+    cache = ResponseCache(f"{tmp}/errors.sqlite3")
+    calls = []
+
+    def failing():
+        calls.append(1)
+        time.sleep(0.1)
+        raise RuntimeError("rate limited")
+
+    errors = []
+
+    def ask():
+        try:
+            cache.get_or_call(key, failing)
+        except RuntimeError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=ask) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    ok &= check("failed call shared by waiters, not cached", len(calls) == 1 and len(errors) == 4 and cache.get(key) is None)
+
+    cache, backend, calendar = ResponseCache(f"{tmp}/agent.sqlite3"), FakeOpenAI(), FakeCalendar()
+    first = agent_run(cache, backend, calendar)
+    upstream, after_first = len(backend.requests), cache.stats()
+    second = agent_run(cache, backend, calendar)
+    ok &= check("agent: both turns of the first run reach the model", upstream == 2 and after_first["misses"] == 2)
+    ok &= check("agent: only the turn without tool calls cached", after_first["entries"] == 1)
+    ok &= check(
+        "agent: second run asks again for tool calls, answer cached",
+        second == first and len(backend.requests) == upstream + 1 and cache.stats()["hits"] == 1,
+    )
+    ok &= check("agent: tool calls run once per run", calendar.calls == 2)
+    return ok
+
+
+if __name__ == "__main__":
+    rounds = workload(random.Random(3))
+    requests = sum(len(prompts) for prompts in rounds)
+    with tempfile.TemporaryDirectory() as tmp:
+        calls, elapsed = run(rounds, None)
+        print(f"no cache : {requests} requests -> {calls:>3} model calls, {elapsed:5.2f}s")
+        cache = ResponseCache(f"{tmp}/llm.sqlite3")
+        calls, elapsed = run(rounds, cache)
+        stats = cache.stats()
+        print(
+            f"cache    : {requests} requests -> {calls:>3} model calls, {elapsed:5.2f}s "
+            f"(hits={stats['hits']} coalesced={stats['coalesced']} hit rate={stats['hit_rate']:.0%})"
+        )
+        ok = check("one model call per distinct request", calls == EMAILS + WORKERS // 2)
+        ok &= checks(tmp)
+    print(f"checks: {'all ok' if ok else 'FAILED'}")
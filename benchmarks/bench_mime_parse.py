@@ -0,0 +1,160 @@
+"""Benchmark: streaming text extraction vs. full `email` parsing of large multipart messages.
+
+The "full" column is the previous approach (parse the whole message with
+`email.message_from_bytes`, walk it and decode the text/plain payload as UTF-8). The
+"stream" column feeds the same bytes to `extract_text`, which stops at the first text
+part and never buffers attachments. Peak memory is measured with tracemalloc.
+
+Also checks decoding of Japanese charsets, mislabeled charsets, HTML-only mail and
+truncated bodies, and runs an end-to-end fetch against the fake IMAP server to show the
+bytes saved by capped partial fetches.
+
+    python benchmarks/bench_mime_parse.py
+"""
+import email
+import sys
+import time
+import tracemalloc
+from email.header import Header
+from email.mime.application import MIMEApplication
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.fake_imap_server import FakeIMAPServer  # noqa: E402
+from Tools.FetchUnreadMail_tool import MAX_STREAM_BYTES, FetchUnreadEmailTool  # noqa: E402
+from Tools.imap_session import IMAPSession  # noqa: E402
+from Tools.mime_text import decode_mime_header, extract_text  # noqa: E402
+
+REPEAT = 5
+MAX_BODY_BYTES = 64 * 1024
+JAPANESE_JIS = "来週の火曜日15時から打ち合わせのお時間をいただけますでしょうか。"
+# Circled digits and the full-width tilde exist in cp932 but not in plain Shift_JIS
+JAPANESE = JAPANESE_JIS + "①～③の議題です。"
+ENGLISH = "Could we meet on Tuesday at 3pm to go over the proposal?"
+
+
+def _attachment(size: int) -> MIMEApplication:
+    part = MIMEApplication(b"\x89PDF" * (size // 4), "pdf")
+    part.add_header("Content-Disposition", "attachment", filename="slides.pdf")
+    return part
+
+
+def _multipart(text_part, attachments=(), subject: str = "Meeting request") -> bytes:
+    msg = MIMEMultipart("mixed")
+    msg["From"] = "Taro Yamada <taro@example.jp>"
+    msg["To"] = "me@example.com"
+    msg["Subject"] = subject
+    msg.attach(text_part)
+    for attachment in attachments:
+        msg.attach(attachment)
+    return msg.as_bytes()
+
+
+def corpus():
+    """(name, raw message, expected text prefix) tuples."""
+    iso = MIMEText(JAPANESE_JIS, "plain", "iso-2022-jp")
+    sjis = MIMEText("", "plain")
+    sjis.set_payload(JAPANESE.encode("cp932"))
+    sjis.replace_header("Content-Type", 'text/plain; charset="Shift_JIS"')
+    sjis.replace_header("Content-Transfer-Encoding", "8bit")
+    mislabeled = MIMEText("", "plain")
+    mislabeled.set_payload(JAPANESE.encode("utf-8"))
+    mislabeled.replace_header("Content-Type", 'text/plain; charset="us-ascii"')
+    mislabeled.replace_header("Content-Transfer-Encoding", "8bit")
+    html = MIMEText(f"<html><body><p>{ENGLISH}</p><p>Thanks,<br>Ann</p></body></html>", "html", "utf-8")
+    alternative = MIMEMultipart("alternative")
+    alternative.attach(MIMEText(ENGLISH, "plain", "utf-8"))
+    alternative.attach(MIMEText(f"<p>{ENGLISH}</p>", "html", "utf-8"))
+    return [
+        ("plain + 5MB attachment", _multipart(MIMEText(ENGLISH, "plain", "utf-8"), [_attachment(5 * 1024 * 1024)]), ENGLISH),
+        ("5MB attachment first", _multipart(_attachment(5 * 1024 * 1024), [alternative]), ENGLISH),
+        ("ISO-2022-JP", _multipart(iso, [_attachment(1024 * 1024)], Header("打ち合わせのお願い", "iso-2022-jp").encode()), JAPANESE_JIS),
+        ("Shift_JIS (cp932 chars)", _multipart(sjis), JAPANESE),
+        ("UTF-8 labeled us-ascii", _multipart(mislabeled), JAPANESE),
+        ("HTML only", _multipart(html, [_attachment(1024 * 1024)]), ENGLISH),
+        ("2MB base64 UTF-8 body", _multipart(MIMEText(JAPANESE * 20000, "plain", "utf-8")), JAPANESE),
+    ]
+
+
+def full_parse(raw: bytes):
+    """The previous extraction: parse everything, decode text/plain as UTF-8."""
+    msg = email.message_from_bytes(raw)
+    for part in msg.walk():
+        if part.get_content_type() == "text/plain":
+            try:
+                return part.get_payload(decode=True).decode()
+            except UnicodeDecodeError:
+                return None
+    return None
+
+
+def measure(fn, raw: bytes):
+    fn(raw)
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        result = fn(raw)
+    elapsed = (time.perf_counter() - start) / REPEAT
+    tracemalloc.start()
+    fn(raw)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def bench() -> None:
+    failures = 0
+    for name, raw, expected in corpus():
+        full, t_full, m_full = measure(full_parse, raw)
+        text, t_stream, m_stream = measure(lambda data: extract_text(data, MAX_BODY_BYTES), raw)
+        ok = bool(text) and text.startswith(expected) and len(text.encode("utf-8")) <= MAX_BODY_BYTES
+        failures += not ok
+        print(
+            f"{name:<24} {len(raw) / 1024:7.0f}KiB | full {t_full * 1000:7.2f}ms {m_full / 1024:7.0f}KiB "
+            f"{'ok' if full and full.startswith(expected) else 'wrong':>5} | stream {t_stream * 1000:6.2f}ms "
+            f"{m_stream / 1024:5.0f}KiB {'ok' if ok else 'WRONG':>5}"
+        )
+    subject = decode_mime_header("=?ISO-2022-JP?B?GyRCQkckQTlnJG8kOxsoQg==?= =?UTF-8?B?44Gu44GK6aGY44GE?=")
+    failures += subject != "打ち合わせのお願い"
+    print(f"multi-chunk subject: {subject} {'ok' if subject == '打ち合わせのお願い' else 'WRONG'}")
+    print(f"decoding checks: {'all ok' if not failures else f'{failures} FAILED'}")
+
+
+def end_to_end() -> None:
+    server = FakeIMAPServer().start()
+    for _, raw, _ in corpus():
+        server.deliver(raw)
+    for message in server.mailbox.messages:
+        message.parsed
+    session = IMAPSession("127.0.0.1", server.port, "me@example.com", "secret", use_ssl=False)
+    tool = FetchUnreadEmailTool(session=session, max_body_bytes=MAX_BODY_BYTES)
+    try:
+        server.bytes_sent = 0
+        emails = tool.fetch_unread_emails()
+        capped = server.bytes_sent
+        # Messages without BODYSTRUCTURE are read in windows through the streaming extractor
+        server.bytes_sent = 0
+        streamed = [session.run(lambda mail: tool._stream_text(mail, str(m.uid).encode())) for m in server.mailbox.messages]
+        windowed = server.bytes_sent
+    finally:
+        session.stop()
+        server.stop()
+    total = sum(len(m.raw) for m in server.mailbox.messages)
+    decoded = all(e[3].startswith(expected) for e, (_, _, expected) in zip(emails, corpus()))
+    print(
+        f"IMAP fetch: mailbox {total / 1024:.0f}KiB, capped partial fetch sent {capped / 1024:.0f}KiB "
+        f"({len(emails)} emails, bodies {'ok' if decoded else 'WRONG'}), subject[2]={emails[2][2]}"
+    )
+    # Text placed after MAX_STREAM_BYTES of attachments is given up on rather than downloaded
+    matches = all(
+        tool.normalizer.normalize(s) == e[3] or (not s and len(m.raw) > MAX_STREAM_BYTES)
+        for s, e, m in zip(streamed, emails, server.mailbox.messages)
+    )
+    print(f"windowed stream fallback sent {windowed / 1024:.0f}KiB, same text: {'ok' if matches else 'MISMATCH'}")
+
+
+if __name__ == "__main__":
+    bench()
+    end_to_end()
@@ -0,0 +1,190 @@
+"""Benchmark: outbound spool with background delivery vs. sending inside the tool call.
+
+Compares how long `send_email` blocks the agent run when it talks to the SMTP server
+directly and when it only queues the message in the spool, against the local fake SMTP
+server with slow replies and a share of temporary 451 failures.
+
+Then delivers a burst through `DeliveryWorker` with failure injection and checks that
+every message arrives exactly once, that permanently refused recipients are
+dead-lettered without retries, that messages failing every attempt are dead-lettered
+after `max_attempts`, that messages claimed by a crashed process are delivered
+once the claim expires, and that a second process starting on the same spool leaves
+the claims of a live one alone. Queue depth and delivery latency come from `OutboundSpool.stats()`.
+
+    python benchmarks/bench_outbound_spool.py
+"""
+import logging
+import sys
+import tempfile
+import time
+from email import message_from_bytes, policy
+from pathlib import Path
+
+from phi.utils.log import logger
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.fake_smtp_server import FakeSMTPServer  # noqa: E402
+from Tools.outbound_spool import DeliveryWorker, OutboundSpool  # noqa: E402
+from Tools.SendEmail_tool import CustomEmailTool  # noqa: E402
+
+MESSAGES = 200
+CALLS = 30
+FAIL_RATE = 0.3
+REJECTED = {"client7@example.org", "client42@example.org"}
+
+
+def messages(count: int):
+    return [{"to": [f"client{i}@example.org"], "subject": "Meeting confirmed", "body": f"See you on Tuesday, #{i}."} for i in range(count)]
+
+
+def tool(server: FakeSMTPServer, spool=None) -> CustomEmailTool:
+    return CustomEmailTool(
+        sender_name="Me",
+        sender_email="me@example.com",
+        sender_passkey="secret",
+        smtp_server="127.0.0.1",
+        smtp_port=server.port,
+        tls="none",
+        pool_size=4,
+        spool=spool,
+    )
+
+
+def wait_until_empty(spool: OutboundSpool, timeout: float = 30.0) -> None:
+    deadline = time.time() + timeout
+    while spool.stats()["depth"] and time.time() < deadline:
+        time.sleep(0.02)
+
+
+def delivered_ids(server: FakeSMTPServer):
+    return [message_from_bytes(data, policy=policy.default)["Message-ID"] for _, _, data in server.messages]
+
+
+def check(name: str, ok: bool) -> bool:
+    print(f"{name:<54} {'ok' if ok else 'FAILED'}")
+    return ok
+
+
+def tool_call_latency(tmp: str) -> None:
+    for spooled in (False, True):
+        server = FakeSMTPServer(latency=0.01, handshake_delay=0.05, fail_rate=FAIL_RATE).start()
+        spool = OutboundSpool(f"{tmp}/latency-{spooled}.sqlite3", base_delay=0.05) if spooled else None
+        mailer = tool(server, spool)
+        timings, errors = [], 0
+        for message in messages(CALLS):
+            start = time.perf_counter()
+            result = mailer.send_email(**message)
+            timings.append(time.perf_counter() - start)
+            errors += result.startswith("error:")
+        if spool:
+            worker = DeliveryWorker(spool, mailer.smtp.send).start()
+            wait_until_empty(spool)
+            worker.stop()
+        server.stop()
+        timings.sort()
+        print(
+            f"{'spooled' if spooled else 'direct':<8} send_email p50={timings[len(timings) // 2] * 1000:7.2f}ms "
+            f"max={timings[-1] * 1000:7.2f}ms  errors returned to the agent={errors:<3} delivered={len(server.messages)}/{CALLS}"
+        )
+
+
+def burst(tmp: str) -> bool:
+    server = FakeSMTPServer(latency=0.002, fail_rate=FAIL_RATE, reject=REJECTED).start()
+    spool = OutboundSpool(f"{tmp}/burst.sqlite3", base_delay=0.02, max_delay=0.5)
+    mailer = tool(server, spool)
+    worker = DeliveryWorker(spool, mailer.smtp.send, poll_interval=0.1).start()
+    start = time.perf_counter()
+    queued = [mailer.send_email(**message) for message in messages(MESSAGES)]
+    enqueue_time = time.perf_counter() - start
+    wait_until_empty(spool)
+    elapsed = time.perf_counter() - start
+    worker.stop()
+    server.stop()
+    stats = spool.stats()
+    print(
+        f"{MESSAGES} emails queued in {enqueue_time * 1000:.0f}ms, delivered in {elapsed:.2f}s: "
+        f"sent={stats['sent']} dead={stats['dead']} retries={worker.retried} "
+        f"latency p50={stats['latency_p50'] * 1000:.0f}ms p95={stats['latency_p95'] * 1000:.0f}ms"
+    )
+    ids = delivered_ids(server)
+    ok = check("every accepted email delivered exactly once", len(ids) == len(set(ids)) == MESSAGES - len(REJECTED))
+    ok &= check("transient failures were retried", worker.retried > 0 and server.failures > 0)
+    dead = spool.dead_letters()
+    ok &= check(
+        "refused recipients dead-lettered after one attempt",
+        sorted(r for d in dead for r in d["recipients"]) == sorted(REJECTED) and all(d["attempts"] == 1 for d in dead),
+    )
+    ok &= check("tool calls returned a queued Message-ID", all(result.startswith("email queued for delivery: <") for result in queued))
+    spool.close()
+    return ok
+
+
+def exhausted(tmp: str) -> bool:
+    server = FakeSMTPServer(fail_rate=1.0).start()
+    spool = OutboundSpool(f"{tmp}/exhausted.sqlite3", max_attempts=3, base_delay=0.01)
+    mailer = tool(server, spool)
+    worker = DeliveryWorker(spool, mailer.smtp.send, poll_interval=0.05).start()
+    mailer.send_email(**messages(1)[0])
+    wait_until_empty(spool)
+    worker.stop()
+    server.stop()
+    dead = spool.dead_letters()
+    spool.close()
+    return check("dead-lettered after max_attempts", len(dead) == 1 and dead[0]["attempts"] == 3 and server.failures == 3)
+
+
+def crash_recovery(tmp: str) -> bool:
+    path = f"{tmp}/crash.sqlite3"
+    server = FakeSMTPServer().start()
+    spool = OutboundSpool(path, lease_seconds=0.5)
+    mailer = tool(server, spool)
+    for message in messages(5):
+        mailer.send_email(**message)
+    spool.claim(3)  # a worker took these and the process died before they were sent
+    spool.close()
+    spool = OutboundSpool(path, lease_seconds=0.5)
+    worker = DeliveryWorker(spool, tool(server).smtp.send, poll_interval=0.05).start()
+    wait_until_empty(spool)
+    worker.stop()
+    server.stop()
+    ok = check("claimed emails delivered once the claim expired", len(server.messages) == 5 and spool.stats()["sent"] == 5)
+    spool.close()
+    return ok
+
+
+def shared_spool(tmp: str) -> bool:
+    path = f"{tmp}/shared.sqlite3"
+    server = FakeSMTPServer().start()
+    sending = OutboundSpool(path)
+    mailer = tool(server, sending)
+    for message in messages(5):
+        mailer.send_email(**message)
+    claimed = sending.claim(3)  # a live process is sending these
+    other = OutboundSpool(path)
+    worker = DeliveryWorker(other, tool(server).smtp.send, poll_interval=0.05).start()
+    deadline = time.time() + 5
+    while other.stats()["queued"] and time.time() < deadline:
+        time.sleep(0.02)
+    worker.stop()
+    left_alone = len(server.messages) == 2 and other.stats()["sending"] == 3
+    for message_id, _ in claimed:
+        sending.mark_sent(message_id)
+    server.stop()
+    ok = check("a starting worker leaves a live worker's claims alone", left_alone and sending.stats()["sent"] == 5)
+    sending.close()
+    other.close()
+    return ok
+
+
+if __name__ == "__main__":
+    # One log line per email would drown the results
+    logger.setLevel(logging.CRITICAL)
+    with tempfile.TemporaryDirectory() as tmp:
+        tool_call_latency(tmp)
+        ok = burst(tmp)
+        ok &= exhausted(tmp)
+        ok &= crash_recovery(tmp)
+        ok &= shared_spool(tmp)
+    print(f"checks: {'all ok' if ok else 'FAILED'}")
+    sys.exit(0 if ok else 1)
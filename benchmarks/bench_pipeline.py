@@ -0,0 +1,77 @@
+"""Benchmark: throughput of the email pipeline with a fake model and stubbed tools.
+
+Each simulated agent run makes `LLM_TURNS` model calls of `LLM_LATENCY` seconds and
+`TOOL_CALLS` tool calls of `TOOL_LATENCY` seconds. Also checks that emails from the
+same sender are processed in arrival order.
+
+    python benchmarks/bench_pipeline.py [llm_latency_seconds]
+"""
+import sys
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from Tools.email_pipeline import EmailPipeline  # noqa: E402
+
+EMAILS = 50
+SENDERS = 10
+LLM_TURNS = 3
+LLM_LATENCY = float(sys.argv[1]) if len(sys.argv) > 1 else 0.05
+TOOL_CALLS = 3
+TOOL_LATENCY = 0.01
+
+
+class FakeModel:
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.calls = 0
+        self.concurrent = 0
+        self.peak_concurrent = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, prompt: str) -> str:
+        with self._lock:
+            self.calls += 1
+            self.concurrent += 1
+            self.peak_concurrent = max(self.peak_concurrent, self.concurrent)
+        time.sleep(self.latency)
+        with self._lock:
+            self.concurrent -= 1
+        return "ok"
+
+
+def run(workers: int, max_in_flight: int) -> None:
+    model = FakeModel(LLM_LATENCY)
+    order = defaultdict(list)
+
+    def handler(email):
+        for _ in range(LLM_TURNS):
+            model(email[3])
+        for _ in range(TOOL_CALLS):
+            time.sleep(TOOL_LATENCY)
+        order[email[1]].append(int(email[4]))
+
+    emails = [
+        [f"Sender {i % SENDERS}", f"sender{i % SENDERS}@example.com", f"Subject {i}", "Can we meet?", str(i)]
+        for i in range(EMAILS)
+    ]
+    pipeline = EmailPipeline(handler, workers=workers, max_in_flight=max_in_flight)
+    start = time.perf_counter()
+    for email in emails:
+        pipeline.submit(email)
+    pipeline.shutdown(drain=True)
+    elapsed = time.perf_counter() - start
+
+    in_order = all(uids == sorted(uids) for uids in order.values())
+    print(
+        f"workers={workers:<3} max_in_flight={max_in_flight:<3} {EMAILS / elapsed:7.1f} emails/s "
+        f"total={elapsed:.2f}s peak_llm_concurrency={model.peak_concurrent} per_sender_order={'ok' if in_order else 'BROKEN'}"
+    )
+
+
+if __name__ == "__main__":
+    for workers, max_in_flight in [(1, 1), (4, 4), (8, 8), (16, 16), (16, 4)]:
+        run(workers, max_in_flight)
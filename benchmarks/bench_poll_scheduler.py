@@ -0,0 +1,154 @@
+"""Benchmark: adaptive mailbox polling vs. a fixed interval, replayed on a week of mail.
+
+Simulates a server without IDLE over one week in Asia/Tokyo: 30 emails/hour in
+business hours with a 120/hour burst from 10:00 to 11:00, 4/hour in the evening,
+0.5/hour at night and 1/hour on the weekend (Poisson arrivals, fixed seed). Each check
+takes `CHECK_TIME` plus `FETCH_TIME` per new email; the reply goes out `AGENT_TIME`
+after the check that fetched the email. Strategies:
+
+    fixed 30s : sleep 30 seconds after each cycle (the previous loop)
+    fixed 10s : the same, every 10 seconds
+    adaptive  : AdaptivePollScheduler, checks spaced from cycle start to cycle start
+
+Reports mean and p95 time-to-reply (overall, in business hours and in the burst hour)
+and the number of IMAP checks. The session is long-lived, so a check is one STATUS
+round trip on the open connection; with a connection per check, as the loop had before
+the IMAP session, each check would also be a login.
+
+    python benchmarks/bench_poll_scheduler.py
+"""
+import random
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import pytz
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from Tools.poll_scheduler import AdaptivePollScheduler, backoff_delay  # noqa: E402
+
+TIMEZONE = pytz.timezone("Asia/Tokyo")
+# Monday; no Japanese holiday that week
+START = TIMEZONE.localize(datetime(2026, 11, 9)).timestamp()
+DAYS = 7
+CHECK_TIME = 0.4
+FETCH_TIME = 0.15
+AGENT_TIME = 6.0
+
+
+def hourly_rate(moment: float) -> float:
+    local = datetime.fromtimestamp(moment, TIMEZONE)
+    if local.weekday() >= 5:
+        return 1.0
+    if local.hour == 10:
+        return 120.0
+    if 9 <= local.hour < 18:
+        return 30.0
+    if 18 <= local.hour < 23:
+        return 4.0
+    return 0.5
+
+
+def arrival_trace(seed: int = 42):
+    """Poisson arrival times (epoch seconds), with the rate changing every minute."""
+    rng = random.Random(seed)
+    arrivals = []
+    for minute in range(DAYS * 24 * 60):
+        begin = START + minute * 60
+        rate = hourly_rate(begin) / 3600
+        at = begin + rng.expovariate(rate)
+        while at < begin + 60:
+            arrivals.append(at)
+            at += rng.expovariate(rate)
+    return arrivals
+
+
+class SimClock:
+    def __init__(self, now: float):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def simulate(arrivals, strategy: str):
+    """Replies (arrival, reply time) and number of checks for one strategy."""
+    clock = SimClock(START)
+    scheduler = AdaptivePollScheduler(clock=clock, timezone="Asia/Tokyo", min_interval=5, max_interval=300)
+    end = START + DAYS * 86400
+    replies, checks, next_arrival, spacing = [], 0, 0, []
+    last_start = None
+    while clock.now < end:
+        started = clock.now
+        if last_start is not None:
+            spacing.append(started - last_start)
+        last_start = started
+        checks += 1
+        found = []
+        while next_arrival < len(arrivals) and arrivals[next_arrival] <= started:
+            found.append(arrivals[next_arrival])
+            next_arrival += 1
+        clock.now += CHECK_TIME + FETCH_TIME * len(found)
+        replies.extend((arrival, clock.now + AGENT_TIME) for arrival in found)
+        if strategy == "adaptive":
+            scheduler.observe(len(found), now=started)
+            clock.now += scheduler.timeout(started)
+        else:
+            clock.now += float(strategy.split()[1].rstrip("s"))
+    return replies, checks, spacing
+
+
+def summary(replies, select=lambda arrival: True):
+    delays = sorted(reply - arrival for arrival, reply in replies if select(arrival))
+    return sum(delays) / len(delays), delays[int(0.95 * len(delays))]
+
+
+def in_business_hours(arrival: float) -> bool:
+    local = datetime.fromtimestamp(arrival, TIMEZONE)
+    return local.weekday() < 5 and 9 <= local.hour < 18
+
+
+def in_burst(arrival: float) -> bool:
+    local = datetime.fromtimestamp(arrival, TIMEZONE)
+    return local.weekday() < 5 and local.hour == 10
+
+
+def check(name: str, ok: bool) -> bool:
+    print(f"{name:<58} {'ok' if ok else 'FAILED'}")
+    return ok
+
+
+if __name__ == "__main__":
+    arrivals = arrival_trace()
+    print(f"{len(arrivals)} emails over {DAYS} days")
+    results = {}
+    for strategy in ("fixed 30s", "fixed 10s", "adaptive"):
+        replies, checks, spacing = simulate(arrivals, strategy)
+        overall, business, burst = summary(replies), summary(replies, in_business_hours), summary(replies, in_burst)
+        results[strategy] = (overall, business, burst, checks, spacing, len(replies))
+        print(
+            f"{strategy:<10}: time-to-reply mean {overall[0]:5.1f}s p95 {overall[1]:5.1f}s"
+            f" | business {business[0]:5.1f}s p95 {business[1]:5.1f}s | burst {burst[0]:5.1f}s"
+            f" | {checks:6d} IMAP checks ({checks / DAYS:5.0f}/day)"
+        )
+
+    ok = True
+    fixed30, fixed10, adaptive = results["fixed 30s"], results["fixed 10s"], results["adaptive"]
+    ok &= check("every email replied to", all(result[5] == len(arrivals) for result in results.values()))
+    ok &= check("adaptive: faster replies in business hours than fixed 30s", adaptive[1][0] < fixed30[1][0])
+    ok &= check("adaptive: faster replies in the burst hour than fixed 30s", adaptive[2][0] < fixed30[2][0])
+    ok &= check("adaptive: under two thirds of fixed 30s checks", adaptive[3] < fixed30[3] * 2 / 3)
+    ok &= check("adaptive: under a fifth of fixed 10s checks", adaptive[3] < fixed10[3] / 5)
+    # Fixed sleeps add the cycle time to every interval; adaptive spacing is start to start
+    ok &= check("fixed 30s cycles drift past 30s", min(fixed30[4]) > 30)
+    scheduler = AdaptivePollScheduler(clock=SimClock(START), min_interval=5, max_interval=300)
+    ok &= check("adaptive: no interval outside [5s, 300s]", all(5 <= gap <= 300 for gap in adaptive[4]))
+    ok &= check("quiet mailbox waits max_interval", scheduler.interval() == 300)
+
+    rng = random.Random(1)
+    delays = [backoff_delay(attempt, 5, 60, rng.uniform) for attempt in range(8) for _ in range(50)]
+    first = [backoff_delay(0, 5, 60, rng.uniform) for _ in range(50)]
+    ok &= check("backoff: first retry jittered within [2.5s, 5s]", all(2.5 <= d <= 5 for d in first) and len(set(first)) == 50)
+    ok &= check("backoff: capped at 60s", max(delays) <= 60 and max(delays) > 30)
+    print(f"checks: {'all ok' if ok else 'FAILED'}")
@@ -0,0 +1,139 @@
+"""Benchmark: prefix-stable system prompt and condensed instructions.
+
+Renders the agent prompt for the meeting requests in fixtures/triage_corpus.jsonl in
+three layouts and reports the tokens sent per request and the simulated
+time-to-first-token with a provider-side prompt cache:
+
+    inline    : instructions, template and email in one user message (no shared prefix)
+    full      : PromptBuilder with AGENT_INSTRUCTIONS
+    condensed : PromptBuilder with AGENT_INSTRUCTIONS_CONDENSED
+
+The provider cache is modelled after the common implementations: prefixes of at least
+1024 tokens are cached in 128-token blocks, and a cached token is much cheaper to
+prefill than an uncached one. The instruction sets are read from AI-Agent.py without
+running it. Also checks that the prefix is byte-identical for every email and does not
+depend on the order the toolkits are registered in.
+
+    python benchmarks/bench_prompt_builder.py
+"""
+import ast
+import json
+import logging
+import sys
+import tempfile
+from pathlib import Path
+
+from phi.utils.log import logger
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from Tools.body_normalizer import estimate_tokens  # noqa: E402
+from Tools.calcom_tool import CalCom  # noqa: E402
+from Tools.llm_cache import tool_schemas  # noqa: E402
+from Tools.meeting_tool import MeetingConfirmationTool  # noqa: E402
+from Tools.prompt_builder import PromptBuilder  # noqa: E402
+from Tools.SendEmail_tool import CustomEmailTool  # noqa: E402
+from Tools.zoom_tool import CustomZoomTool  # noqa: E402
+
+CORPUS = Path(__file__).resolve().parent / "fixtures" / "triage_corpus.jsonl"
+
+# Simulated provider: fixed overhead plus prefill time per prompt token
+BASE_LATENCY = 0.15
+UNCACHED_TOKEN = 0.0004
+CACHED_TOKEN = 0.00004
+MIN_CACHED_PREFIX = 1024
+CACHE_BLOCK = 128
+
+
+def agent_constants():
+    """AGENT_INSTRUCTIONS, AGENT_INSTRUCTIONS_CONDENSED and EMAIL_TEMPLATE from AI-Agent.py."""
+    wanted = {"AGENT_INSTRUCTIONS", "AGENT_INSTRUCTIONS_CONDENSED", "EMAIL_TEMPLATE"}
+    values = {}
+    for node in ast.parse((ROOT / "AI-Agent.py").read_text(encoding="utf-8")).body:
+        if isinstance(node, ast.Assign) and isinstance(node.targets[0], ast.Name) and node.targets[0].id in wanted:
+            values[node.targets[0].id] = ast.literal_eval(node.value)
+    return values
+
+
+def toolkits(tmp: str):
+    zoom = CustomZoomTool("acct", "id", "secret", token_cache_path="")
+    calcom = CalCom(api_key="test", event_type_id=1)
+    mailer = CustomEmailTool(sender_name="Me", sender_email="me@example.com", sender_passkey="x")
+    return [zoom, calcom, MeetingConfirmationTool(zoom, calcom, mailer), mailer]
+
+
+def meeting_emails():
+    emails = []
+    with open(CORPUS, encoding="utf-8") as f:
+        for line in f:
+            row = json.loads(line)
+            if row["meeting"]:
+                name = row["from"].split("@")[0].title()
+                emails.append([name, row["from"], row["subject"], row["body"], "1", {}, "t", "<m@x>"])
+    return emails
+
+
+def inline_prompt(builder: PromptBuilder, email) -> str:
+    """Everything in one user message, the email first: no two requests share a prefix."""
+    return builder.user_prompt([email]) + "\n\n" + builder.system_prompt()
+
+
+def ttft(tokens: int, cached: int) -> float:
+    return BASE_LATENCY + (tokens - cached) * UNCACHED_TOKEN + cached * CACHED_TOKEN
+
+
+def cached_tokens(prefix_tokens: int, warm: bool) -> int:
+    """Tokens served from the provider cache for a request whose shared prefix is `prefix_tokens` long."""
+    if not warm or prefix_tokens < MIN_CACHED_PREFIX:
+        return 0
+    return prefix_tokens // CACHE_BLOCK * CACHE_BLOCK
+
+
+def run(label: str, requests) -> float:
+    """`requests` is a list of (total_tokens, shared_prefix_tokens); returns the mean simulated TTFT."""
+    latencies = [ttft(total, cached_tokens(prefix, warm=index > 0)) for index, (total, prefix) in enumerate(requests)]
+    mean_tokens = sum(total for total, _ in requests) / len(requests)
+    mean_cached = sum(cached_tokens(prefix, index > 0) for index, (_, prefix) in enumerate(requests)) / len(requests)
+    mean = sum(latencies) / len(latencies)
+    print(f"{label:<10}: {mean_tokens:6.0f} tokens/request, {mean_cached:6.0f} cached, TTFT {mean * 1000:6.1f} ms")
+    return mean
+
+
+def check(name: str, ok: bool) -> bool:
+    print(f"  {'ok' if ok else 'FAILED':<6} {name}")
+    return ok
+
+
+if __name__ == "__main__":
+    logger.setLevel(logging.CRITICAL)
+    constants = agent_constants()
+    emails = meeting_emails()
+    with tempfile.TemporaryDirectory() as tmp:
+        kits = toolkits(tmp)
+        tools = tool_schemas(kits)
+        settings = {"Your name": "Taro Yamada"}
+        full = PromptBuilder(constants["AGENT_INSTRUCTIONS"], constants["EMAIL_TEMPLATE"], settings, tools)
+        condensed = PromptBuilder(constants["AGENT_INSTRUCTIONS_CONDENSED"], constants["EMAIL_TEMPLATE"], settings, tools)
+        tool_tokens = estimate_tokens(full.tool_prefix())
+
+        print(f"{len(emails)} meeting requests, tool schemas {tool_tokens} tokens")
+        print(f"prefix    : full {full.prefix_tokens()} tokens, condensed {condensed.prefix_tokens()} tokens")
+        # Tool schemas are sent ahead of the messages, so they are the only shared prefix of the inline layout
+        before = run("inline", [(estimate_tokens(inline_prompt(full, email)) + tool_tokens, tool_tokens) for email in emails])
+        after = run("full", [(full.prefix_tokens() + estimate_tokens(full.user_prompt([email])), full.prefix_tokens()) for email in emails])
+        short = run(
+            "condensed",
+            [(condensed.prefix_tokens() + estimate_tokens(condensed.user_prompt([email])), condensed.prefix_tokens()) for email in emails],
+        )
+
+        ok = check("stable prefix lowers simulated TTFT", after < before)
+        ok &= check("condensed instructions lower it further", short < after)
+        ok &= check("condensed prefix is at most 60% of the full instructions", estimate_tokens(condensed.system_prompt()) <= 0.6 * estimate_tokens(full.system_prompt()))
+        prefixes = {builder.messages([email])[0]["content"] for builder in [full] for email in emails}
+        ok &= check("system prompt byte-identical for every email", len(prefixes) == 1)
+        reordered = PromptBuilder(constants["AGENT_INSTRUCTIONS"], constants["EMAIL_TEMPLATE"], settings, tool_schemas(kits[::-1]))
+        ok &= check("prefix independent of toolkit registration order", reordered.prefix_hash() == full.prefix_hash())
+        ok &= check("emails only in the user message", all(email[3] not in full.system_prompt() for email in emails))
+        ok &= check("user name given once, after the instructions", full.system_prompt().endswith("Your name: Taro Yamada"))
+    print(f"checks: {'all ok' if ok else 'FAILED'}")
@@ -0,0 +1,167 @@
+"""Benchmark: template-rendered replies vs. replies written by the model.
+
+For the two common outcomes (confirm with the Zoom link, decline with three
+alternatives) compares the output tokens the model generates in its final tool call
+and the modelled end-to-end time per reply, in English and Japanese:
+
+    free-form : confirm_meeting / send_email with a subject and body written by the model
+    template  : accept_meeting / decline_meeting, the model only passes the slot (and topic)
+
+The free-form body is taken to be as long as the rendered one, which is a lower bound
+for what the model writes. Tool I/O is measured against the local HTTP stub; the model
+is modelled as `TTFT` plus `DECODE` seconds per generated token.
+
+Also checks that rendered replies contain no unfilled placeholder, follow the language
+of the incoming email, and list the alternative slots.
+
+    python benchmarks/bench_reply_templates.py
+"""
+import json
+import logging
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from phi.utils.log import logger
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.fake_http_server import FakeHTTPServer  # noqa: E402
+from Tools.async_utils import run_sync  # noqa: E402
+from Tools.body_normalizer import estimate_tokens  # noqa: E402
+from Tools.calcom_tool import CalCom  # noqa: E402
+from Tools.meeting_tool import MeetingConfirmationTool  # noqa: E402
+from Tools.outbound_spool import OutboundSpool  # noqa: E402
+from Tools.reply_templates import ReplyRenderer, detect_language  # noqa: E402
+from Tools.SendEmail_tool import CustomEmailTool  # noqa: E402
+from Tools.zoom_tool import CustomZoomTool  # noqa: E402
+
+API_LATENCY = 0.05
+TTFT = 0.6
+DECODE = 0.03
+REPLIES = 4
+PLACEHOLDERS = ("[join_url]", "[meeting_id]", "[start_time]", "[相手の名前]", "[私の名前]", "[Your Name]", "$")
+
+EMAILS = {
+    "en": ["Ann Smith", "ann@example.com", "Meeting request", "Hi, could we have a 30 minute Zoom call about the Q3 roadmap?", "1", {}, "t1", "<en@example.com>"],
+    "ja": ["山田 花子", "hanako@example.jp", "打ち合わせのお願い", "お世話になっております。来週、30分ほどZoomでお打ち合わせのお時間をいただけますでしょうか。", "2", {}, "t2", "<ja@example.jp>"],
+}
+
+
+def toolkits(server: FakeHTTPServer, tmp: str):
+    zoom = CustomZoomTool("acct", "id", "secret", api_url=f"{server.url}/v2", token_url=f"{server.url}/oauth/token")
+    calcom = CalCom(api_key="test", event_type_id=1, base_url=f"{server.url}/v2", slot_cache_ttl=0)
+    spool = OutboundSpool(f"{tmp}/spool.sqlite3")
+    mailer = CustomEmailTool(sender_name="Me", sender_email="me@example.com", sender_passkey="x", spool=spool)
+    renderer = ReplyRenderer(sender_name="Taro Yamada")
+    return zoom, calcom, mailer, MeetingConfirmationTool(zoom, calcom, mailer, renderer=renderer)
+
+
+def slots(calcom: CalCom, count: int, valid: bool = True):
+    """The next `count` local start times that are bookable (or fall on a weekend)."""
+    found, day = [], datetime.now().date() + timedelta(days=2)
+    while len(found) < count:
+        for hour in (10, 11, 15, 16):
+            start = calcom.rules.to_local(datetime(day.year, day.month, day.day, hour))
+            bookable = calcom.rules.violation(start) is None
+            if (bookable if valid else day.weekday() >= 5) and len(found) < count:
+                found.append(start.isoformat(timespec="seconds"))
+        day += timedelta(days=1)
+    return found
+
+
+def tool_call_tokens(name: str, arguments: dict) -> int:
+    return estimate_tokens(name + json.dumps(arguments, ensure_ascii=False))
+
+
+def last_email(mailer: CustomEmailTool):
+    """Subject and body of the most recently queued reply."""
+    message = mailer.spool.claim(100)[-1][1]
+    return message["Subject"], message.get_content()
+
+
+def run(language: str, case: str, template: bool):
+    """Mean (output tokens, tool seconds) per reply, and the last reply sent."""
+    email = EMAILS[language]
+    with tempfile.TemporaryDirectory() as tmp:
+        server = FakeHTTPServer(latency=API_LATENCY).start()
+        zoom, calcom, mailer, meeting_tool = toolkits(server, tmp)
+        zoom.get_access_token()
+        renderer = meeting_tool.renderer
+        tokens, tool_time, reply = 0, 0.0, None
+        for start in slots(calcom, REPLIES, valid=case == "confirm"):
+            with renderer.activate([email]):
+                begin = time.perf_counter()
+                if template and case == "confirm":
+                    arguments = {"start_time": start, "duration": 30, "topic": "Project sync"}
+                    result = json.loads(meeting_tool.accept_meeting(**arguments))
+                    assert result["status"] == "confirmed", result
+                    tokens += tool_call_tokens("accept_meeting", arguments)
+                elif template:
+                    arguments = {"start_time": start}
+                    result = json.loads(meeting_tool.decline_meeting(**arguments))
+                    assert result["status"] == "declined", result
+                    tokens += tool_call_tokens("decline_meeting", arguments)
+                elif case == "confirm":
+                    # What the model writes: the same email, with placeholders for the tool to fill
+                    local = calcom.rules.to_local(datetime.fromisoformat(start))
+                    subject, body = renderer.confirmation(email[0], "Project sync", local, 30)
+                    arguments = {
+                        "start_time": start, "duration": 30, "topic": "Project sync", "attendee_name": email[0],
+                        "attendee_email": email[1], "email_subject": subject, "email_body": body,
+                    }
+                    result = json.loads(meeting_tool.confirm_meeting(**arguments))
+                    assert result["status"] == "confirmed", result
+                    tokens += tool_call_tokens("confirm_meeting", arguments)
+                else:
+                    # The reason and alternatives come from the earlier check_availability call
+                    local, reason, options = run_sync(calcom.aassess(start))
+                    subject, body = renderer.decline(email[0], email[2], local, reason, options)
+                    arguments = {"to": [email[1]], "subject": subject, "body": body}
+                    mailer.send_email(**arguments)
+                    tokens += tool_call_tokens("send_email", arguments)
+                tool_time += time.perf_counter() - begin
+        reply = last_email(mailer)
+        server.stop()
+        mailer.spool.close()
+    return tokens / REPLIES, tool_time / REPLIES, reply
+
+
+def check(name: str, ok: bool) -> bool:
+    print(f"{name:<55} {'ok' if ok else 'FAILED'}")
+    return ok
+
+
+if __name__ == "__main__":
+    # One log line per API call would drown the results
+    logger.setLevel(logging.CRITICAL)
+    ok = True
+    replies = {}
+    for case in ("confirm", "decline"):
+        for language in ("en", "ja"):
+            results = {}
+            for template in (False, True):
+                tokens, tool_time, reply = run(language, case, template)
+                results[template] = TTFT + tokens * DECODE + tool_time
+                label = "template" if template else "free-form"
+                print(
+                    f"{case:<8} {language}  {label:<10}: {tokens:5.0f} output tokens, tool I/O {tool_time * 1000:4.0f}ms"
+                    f" -> ~{results[template]:4.1f}s per reply"
+                )
+                if template:
+                    replies[(case, language)] = reply
+            ok &= check(f"  template reply faster ({case}, {language})", results[True] < results[False])
+
+    for (case, language), (subject, body) in replies.items():
+        text = subject + body
+        ok &= check(f"no unfilled placeholder ({case}, {language})", not any(mark in text for mark in PLACEHOLDERS))
+        ok &= check(f"reply language matches the email ({case}, {language})", detect_language(body) == language)
+    confirm_en = replies[("confirm", "en")][1]
+    ok &= check("confirmation contains the Zoom link", "https://" in confirm_en and "Ann Smith" in confirm_en)
+    decline_ja = replies[("decline", "ja")][1]
+    ok &= check("Japanese decline lists three alternatives with a reason", decline_ja.count("\n- ") == 3 and "土日のため" in decline_ja)
+    ok &= check("decline subject answers the original", replies[("decline", "en")][0] == "Re: Meeting request")
+    ok &= check("language detection on mixed text", detect_language("Zoom会議のURLを送ります") == "ja" and detect_language("Re: 件名 - see below, thanks for the update on the roadmap") == "en")
+    print(f"checks: {'all ok' if ok else 'FAILED'}")
@@ -0,0 +1,81 @@
+"""Benchmark: Cal.com API traffic for a batch of availability checks with and without the slot cache.
+
+Simulates a batch of emails that all ask about overlapping ranges of the same two weeks,
+with a booking created in the middle of the batch. Runs offline against
+benchmarks/fake_http_server.py (with a per-request latency standing in for the API).
+Also checks that a fetch still in flight when a booking invalidates its day does not
+put the booked slot back in the cache.
+
+    python benchmarks/bench_slot_cache.py [api_latency_seconds]
+"""
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.fake_http_server import FakeHTTPServer  # noqa: E402
+from Tools.calcom_tool import CalCom  # noqa: E402
+from Tools.slot_cache import SlotCache  # noqa: E402
+
+EMAILS = 50
+WEEK_START = date(2025, 1, 6)
+API_LATENCY = float(sys.argv[1]) if len(sys.argv) > 1 else 0.05
+
+
+def _requests(seed: int = 7):
+    rng = random.Random(seed)
+    for _ in range(EMAILS):
+        first = WEEK_START + timedelta(days=rng.randrange(10))
+        yield first, first + timedelta(days=rng.randrange(1, 5))
+
+
+def run(server: FakeHTTPServer, ttl: float) -> None:
+    server.bookings.clear()
+    server.reset_counters()
+    calcom = CalCom(api_key="test", event_type_id=1, base_url=f"{server.url}/v2", slot_cache_ttl=ttl)
+
+    booked_slot_visible = None
+    start = time.perf_counter()
+    for i, (first, last) in enumerate(_requests()):
+        calcom.get_available_slots(first.isoformat(), last.isoformat())
+        if i == EMAILS // 2:
+            calcom.create_booking("2025-01-08T10:00:00+09:00", "Taro", "taro@example.com", "https://zoom.example/j/1")
+            after = calcom.get_available_slots("2025-01-08", "2025-01-08", compact=False)
+            booked_slot_visible = "2025-01-08 10:00 JST" in after
+    elapsed = time.perf_counter() - start
+
+    stats = calcom.slot_cache.stats()
+    slot_requests = sum(1 for method, path in server.log if path.endswith("/slots/available"))
+    print(
+        f"ttl={ttl:<5g} slot API requests={slot_requests:<3} total={elapsed:.2f}s "
+        f"day hits={stats['hits']} misses={stats['misses']} hit_rate={stats['hit_rate']:.0%} "
+        f"booked slot hidden={'yes' if booked_slot_visible is False else 'NO'}"
+    )
+
+
+def run_in_flight_invalidation() -> None:
+    cache = SlotCache(ttl=300)
+    day, other = date(2025, 1, 8), date(2025, 1, 9)
+    booked = datetime(2025, 1, 8, 1, 0, tzinfo=timezone.utc)
+    free = datetime(2025, 1, 9, 1, 0, tzinfo=timezone.utc)
+    _, missing, generations = cache.lookup(1, day, other)
+    # The booking lands while the fetch is in flight; the fetch then stores what it saw before
+    cache.invalidate(1, [day])
+    cache.store(1, day, other, [booked, free], generations)
+    cached, missing, _ = cache.lookup(1, day, other)
+    ok = day not in cached and missing == [(day, day)] and cached.get(other) == [free]
+    print(f"fetch in flight during a booking: booked day not re-cached, other day cached -> {'ok' if ok else 'FAILED'}")
+
+
+if __name__ == "__main__":
+    server = FakeHTTPServer(latency=API_LATENCY).start()
+    try:
+        print(f"{EMAILS} overlapping availability checks, API latency={API_LATENCY * 1000:.0f}ms")
+        run(server, ttl=0)
+        run(server, ttl=300)
+        run_in_flight_invalidation()
+    finally:
+        server.stop()
@@ -0,0 +1,87 @@
+"""Benchmark: conversion time and LLM token cost of the compact slot output vs. the original string.
+
+The "original" column re-implements the previous `get_available_slots` formatting (timezone
+resolved and ISO string parsed per slot, every slot joined into one string). Slots are
+served from a warm slot cache, which now holds already-converted datetimes, so only
+conversion, rule filtering and formatting are timed. Token counts use
+tiktoken when installed, otherwise a 4-characters-per-token estimate.
+
+    python benchmarks/bench_slot_format.py
+"""
+import sys
+import time
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import pytz  # noqa: E402
+
+from benchmarks.fake_http_server import FakeHTTPServer  # noqa: E402
+from Tools.calcom_tool import CalCom  # noqa: E402
+
+try:
+    import tiktoken
+
+    _encoding = tiktoken.get_encoding("cl100k_base")
+
+    def count_tokens(text: str) -> int:
+        return len(_encoding.encode(text))
+
+    TOKENIZER = "cl100k_base"
+except ImportError:
+
+    def count_tokens(text: str) -> int:
+        return (len(text) + 3) // 4
+
+    TOKENIZER = "~4 chars/token"
+
+REPEAT = 50
+START = date(2025, 1, 6)
+
+
+def original_format(slot_times, user_timezone: str = "Asia/Tokyo") -> str:
+    available_slots = []
+    for slot in slot_times:
+        utc_dt = datetime.fromisoformat(slot.replace("Z", "+00:00"))
+        user_tz = pytz.timezone(user_timezone)
+        available_slots.append(utc_dt.astimezone(user_tz).strftime("%Y-%m-%d %H:%M %Z"))
+    return f"Available slots: {', '.join(available_slots)}"
+
+
+def timed(fn):
+    fn()
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        result = fn()
+    return result, (time.perf_counter() - start) / REPEAT
+
+
+def run(calcom: CalCom, days: int) -> None:
+    end = START + timedelta(days=days - 1)
+    # The raw Cal.com strings the original formatter worked on
+    slot_times = [
+        slot.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+        for slots in calcom.slot_cache.lookup(calcom.event_type_id, START, end)[0].values()
+        for slot in slots
+    ]
+    original, t_original = timed(lambda: original_format(sorted(slot_times)))
+    compact, t_compact = timed(lambda: calcom.get_available_slots(START.isoformat(), end.isoformat()))
+    page, _ = timed(lambda: calcom.get_available_slots(START.isoformat(), end.isoformat(), limit=10))
+    print(
+        f"{days:>3} days {len(slot_times):>5} slots | original {t_original * 1000:6.2f}ms "
+        f"{len(original):>6} chars {count_tokens(original):>5} tokens | compact {t_compact * 1000:6.2f}ms "
+        f"{len(compact):>5} chars {count_tokens(compact):>4} tokens | limit=10 page {count_tokens(page)} tokens"
+    )
+
+
+if __name__ == "__main__":
+    server = FakeHTTPServer().start()
+    try:
+        calcom = CalCom(api_key="test", event_type_id=1, base_url=f"{server.url}/v2", slot_cache_ttl=3600)
+        calcom.get_available_slots(START.isoformat(), (START + timedelta(days=89)).isoformat())  # warm the cache
+        print(f"tokenizer: {TOKENIZER}")
+        for days in (7, 14, 31, 90):
+            run(calcom, days)
+    finally:
+        server.stop()
@@ -0,0 +1,144 @@
+"""Benchmark: pooled SMTP connections vs. one connection per email.
+
+Sends a burst of replies to the local fake SMTP server (STARTTLS with a self-signed
+certificate, a few milliseconds of latency per reply) three ways: the previous
+`aiosmtplib.send` per email (connect, TLS handshake and login every time), the pooled
+`CustomEmailTool.send_email` one after another, and `send_many` over the whole pool.
+
+Also checks that the certificate is verified (rejected without the CA, accepted with
+`ca_file`), that a 421 "too many messages" reply is retried on a new connection, and
+that a connection dropped while idle is detected by the NOOP health check.
+
+    python benchmarks/bench_smtp_pool.py
+"""
+import logging
+import ssl
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import aiosmtplib
+from phi.utils.log import logger
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.fake_smtp_server import FakeSMTPServer, make_self_signed_cert  # noqa: E402
+from Tools.async_utils import run_sync  # noqa: E402
+from Tools.SendEmail_tool import CustomEmailTool  # noqa: E402
+
+MESSAGES = 100
+LATENCY = 0.002
+HANDSHAKE_DELAY = 0.02
+POOL_SIZE = 4
+
+
+def messages(count: int):
+    return [{"to": [f"client{i}@example.org"], "subject": "Meeting confirmed", "body": "See you on Tuesday."} for i in range(count)]
+
+
+def tool(server: FakeSMTPServer, ca_file: str, **kwargs) -> CustomEmailTool:
+    return CustomEmailTool(
+        sender_name="Me",
+        sender_email="me@example.com",
+        sender_passkey="secret",
+        smtp_server="localhost",
+        smtp_port=server.port,
+        tls="starttls",
+        ca_file=ca_file,
+        pool_size=POOL_SIZE,
+        **kwargs,
+    )
+
+
+def legacy(server: FakeSMTPServer) -> None:
+    # The previous implementation: a new connection per email, certificate not verified
+    mailer = tool(server, None, verify_cert=False)
+    context = ssl.create_default_context()
+    context.check_hostname = False
+    context.verify_mode = ssl.CERT_NONE
+    for message in messages(MESSAGES):
+        run_sync(aiosmtplib.send(
+            mailer._build_message(**message),
+            hostname="localhost",
+            port=server.port,
+            username=mailer.sender_email,
+            password=mailer.sender_passkey,
+            start_tls=True,
+            tls_context=context,
+        ))
+
+
+def sequential(server: FakeSMTPServer, ca_file: str) -> None:
+    mailer = tool(server, ca_file)
+    results = [mailer.send_email(**message) for message in messages(MESSAGES)]
+    assert all(result == "email sent successfully" for result in results), results[:3]
+    run_sync(mailer.smtp.close())
+
+
+def batched(server: FakeSMTPServer, ca_file: str) -> None:
+    mailer = tool(server, ca_file)
+    results = mailer.send_many(messages(MESSAGES))
+    assert all(result == "email sent successfully" for result in results), results[:3]
+    run_sync(mailer.smtp.close())
+
+
+def measure(name: str, cert, run) -> None:
+    server = FakeSMTPServer(cert=cert, latency=LATENCY, handshake_delay=HANDSHAKE_DELAY).start()
+    start = time.perf_counter()
+    run(server)
+    elapsed = time.perf_counter() - start
+    server.stop()
+    delivered = len(server.messages)
+    print(
+        f"{name:<22} {delivered / elapsed:7.1f} msgs/s  connections={server.connections:<4} "
+        f"tls={server.tls_handshakes:<4} logins={server.logins:<4} delivered={delivered}/{MESSAGES}"
+    )
+
+
+def check(name: str, ok: bool) -> bool:
+    print(f"{name:<40} {'ok' if ok else 'FAILED'}")
+    return ok
+
+
+def checks(cert, ca_file: str) -> bool:
+    ok = True
+    server = FakeSMTPServer(cert=cert).start()
+    result = tool(server, None).send_email(**messages(1)[0])
+    ok &= check("self-signed certificate rejected", result.startswith("error:") and not server.messages)
+    result = tool(server, ca_file).send_email(**messages(1)[0])
+    ok &= check("certificate accepted with ca_file", result == "email sent successfully")
+    server.stop()
+
+    server = FakeSMTPServer(cert=cert, max_messages_per_connection=7).start()
+    mailer = tool(server, ca_file)
+    results = [mailer.send_email(**message) for message in messages(30)]
+    delivered = all(result == "email sent successfully" for result in results) and len(server.messages) == 30
+    ok &= check("421 retried on a new connection", delivered and mailer.smtp.reconnects > 0)
+    server.stop()
+
+    server = FakeSMTPServer(cert=cert).start()
+    mailer = tool(server, ca_file)
+    mailer.smtp.noop_after = 0
+    first = mailer.send_email(**messages(1)[0])
+    server.drop_connections()
+    time.sleep(0.05)
+    second = mailer.send_email(**messages(1)[0])
+    recovered = first == second == "email sent successfully" and len(server.messages) == 2
+    ok &= check("dropped idle connection replaced", recovered and server.connections == 2)
+    server.stop()
+    return ok
+
+
+if __name__ == "__main__":
+    # One log line per email would drown the results
+    logger.setLevel(logging.CRITICAL)
+    with tempfile.TemporaryDirectory() as tmp:
+        cert = make_self_signed_cert(tmp)
+        ca_file = cert[0]
+        measure("per-email connection", cert, legacy)
+        measure("pooled, sequential", cert, lambda server: sequential(server, ca_file))
+        measure(f"send_many (pool={POOL_SIZE})", cert, lambda server: batched(server, ca_file))
+        ok = checks(cert, ca_file)
+    print(f"checks: {'all ok' if ok else 'FAILED'}")
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,248 @@
+"""Benchmark: overhead of tracing and per-stage metrics.
+
+Measures the cost of one instrumented call on a CPU-only method (business-rule
+check), with and without span export to a file, and the overhead on a real flow:
+`confirm_meeting` (Cal.com check and booking, Zoom meeting, queued email) against the
+local HTTP stub with `API_LATENCY` per request, instrumented vs. not.
+
+Also checks that spans nest across `run_sync` into one trace per email, that the root
+span carries the seconds per stage, that the trace file is OTLP/JSON, that the
+Prometheus endpoint reports latency histograms, retries and errors, that the model
+requests of a real phi `Agent` are traced with their tokens, and that the tool schemas
+the agent sees are unchanged.
+
+    python benchmarks/bench_telemetry.py
+"""
+import json
+import logging
+import sys
+import tempfile
+import time
+import urllib.request
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import httpx
+from phi.agent import Agent
+from phi.utils.log import logger
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.fake_http_server import FakeHTTPServer  # noqa: E402
+from benchmarks.fake_openai import FakeCalendar, FakeOpenAI  # noqa: E402
+from Tools.availability_rules import BusinessRules  # noqa: E402
+from Tools.calcom_tool import CalCom  # noqa: E402
+from Tools.llm_cache import CachedOpenAIChat, ResponseCache, tool_schemas  # noqa: E402
+from Tools.meeting_tool import MeetingConfirmationTool  # noqa: E402
+from Tools.outbound_spool import OutboundSpool  # noqa: E402
+from Tools.SendEmail_tool import CustomEmailTool  # noqa: E402
+from Tools.telemetry import Telemetry  # noqa: E402
+from Tools.zoom_tool import CustomZoomTool  # noqa: E402
+
+CALLS = 100_000
+API_LATENCY = 0.05
+FLOWS = 10
+
+
+def toolkits(server: FakeHTTPServer, tmp: str, name: str):
+    zoom = CustomZoomTool("acct", "id", "secret", api_url=f"{server.url}/v2", token_url=f"{server.url}/oauth/token")
+    calcom = CalCom(api_key="test", event_type_id=1, base_url=f"{server.url}/v2", slot_cache_ttl=0)
+    spool = OutboundSpool(f"{tmp}/{name}.sqlite3")
+    mailer = CustomEmailTool(sender_name="Me", sender_email="me@example.com", sender_passkey="x", spool=spool)
+    return zoom, calcom, mailer, MeetingConfirmationTool(zoom, calcom, mailer)
+
+
+def instrument(telemetry: Telemetry, zoom, calcom, mailer, meeting_tool) -> None:
+    telemetry.instrument(zoom, "zoom")
+    telemetry.instrument(calcom, "calcom")
+    telemetry.instrument(mailer, "smtp")
+    telemetry.instrument(meeting_tool, "meeting")
+
+
+def slots(calcom: CalCom, count: int):
+    found, day = [], datetime.now().date() + timedelta(days=2)
+    while len(found) < count:
+        for hour in (10, 11, 15, 16):
+            start = calcom.rules.to_local(datetime(day.year, day.month, day.day, hour))
+            if calcom.rules.violation(start) is None and len(found) < count:
+                found.append(start.isoformat(timespec="seconds"))
+        day += timedelta(days=1)
+    return found
+
+
+def per_call(function, argument) -> float:
+    begin = time.perf_counter()
+    for _ in range(CALLS):
+        function(argument)
+    return (time.perf_counter() - begin) / CALLS
+
+
+def micro(tmp: str):
+    """Seconds per span: overhead of metrics only, and of metrics with span export."""
+    moment = datetime(2026, 11, 10, 10, 30)
+    plain = per_call(BusinessRules().violation, moment)
+    overheads = []
+    for telemetry in (Telemetry(), Telemetry(trace_path=f"{tmp}/micro.jsonl")):
+        # violation() calls to_local(), so each call is two nested spans
+        rules = telemetry.instrument(BusinessRules(), "rules")
+        traced = per_call(rules.violation, moment)
+        telemetry.close()
+        overheads.append((traced - plain) / (telemetry.spans / CALLS))
+    return plain, overheads
+
+
+def flow(server: FakeHTTPServer, tmp: str, name: str, starts, telemetry=None):
+    """Mean seconds per confirm_meeting call, and the toolkits used."""
+    zoom, calcom, mailer, meeting_tool = toolkits(server, tmp, name)
+    zoom.get_access_token()
+    if telemetry is not None:
+        instrument(telemetry, zoom, calcom, mailer, meeting_tool)
+    elapsed = 0.0
+    for index, start in enumerate(starts):
+        begin = time.perf_counter()
+        if telemetry is not None:
+            with telemetry.span("email.handle", "email", message_ids=[f"<{name}{index}@example.com>"]):
+                result = meeting_tool.confirm_meeting(start, 30, "Sync", "Ann", "ann@example.com", "Re: Sync", "Zoom: [join_url]")
+        else:
+            result = meeting_tool.confirm_meeting(start, 30, "Sync", "Ann", "ann@example.com", "Re: Sync", "Zoom: [join_url]")
+        elapsed += time.perf_counter() - begin
+        assert json.loads(result)["status"] == "confirmed", result
+    mailer.spool.close()
+    return elapsed / FLOWS, (zoom, calcom, mailer, meeting_tool)
+
+
+def spans_of(path: str):
+    spans = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            for resource in json.loads(line)["resourceSpans"]:
+                for scope in resource["scopeSpans"]:
+                    spans.extend(scope["spans"])
+    return spans
+
+
+def attributes(span):
+    return {item["key"]: next(iter(item["value"].values())) for item in span["attributes"]}
+
+
+def check(name: str, ok: bool) -> bool:
+    print(f"{name:<58} {'ok' if ok else 'FAILED'}")
+    return ok
+
+
+if __name__ == "__main__":
+    # One log line per API call would drown the results
+    logger.setLevel(logging.CRITICAL)
+    ok = True
+    with tempfile.TemporaryDirectory() as tmp:
+        plain, (metrics_only, exported) = micro(tmp)
+        print(
+            f"micro: business-rule check {plain * 1e6:5.2f}us/call; per span +{metrics_only * 1e6:4.2f}us (metrics),"
+            f" +{exported * 1e6:4.2f}us (metrics and span export)"
+        )
+
+        server = FakeHTTPServer(latency=API_LATENCY).start()
+        trace_path = f"{tmp}/trace.jsonl"
+        telemetry = Telemetry(trace_path=trace_path)
+        starts = slots(CalCom(api_key="test", event_type_id=1), 2 * FLOWS + 1)
+        base, _ = flow(server, tmp, "plain", starts[:FLOWS])
+        instrumented, (zoom, calcom, mailer, meeting_tool) = flow(server, tmp, "traced", starts[FLOWS:2 * FLOWS], telemetry)
+        telemetry.flush()
+        spans = spans_of(trace_path)
+        spans_per_flow = len(spans) / FLOWS
+        estimated = spans_per_flow * exported / base
+        print(
+            f"confirm_meeting: plain {base * 1000:6.1f}ms, instrumented {instrumented * 1000:6.1f}ms"
+            f" ({(instrumented / base - 1) * 100:+5.1f}% measured, noise included);"
+            f" {spans_per_flow:.0f} spans/email -> {estimated * 100:.3f}% estimated overhead"
+        )
+        ok &= check("a span costs under 25us, under 100us with export", metrics_only < 25e-6 and exported < 100e-6)
+        # The flow has no model call, which alone takes seconds, so this is an upper bound
+        ok &= check("estimated overhead per email under 0.5%", estimated < 0.005)
+
+        roots = [span for span in spans if "parentSpanId" not in span]
+        by_id = {span["spanId"]: span for span in spans}
+        ok &= check("one trace per email", len(roots) == FLOWS and len({span["traceId"] for span in spans}) == FLOWS)
+        ok &= check(
+            "every span's parent is in the same trace",
+            all(by_id[span["parentSpanId"]]["traceId"] == span["traceId"] for span in spans if "parentSpanId" in span),
+        )
+        root = attributes(roots[0])
+        ok &= check(
+            "root span has seconds per stage and the message id",
+            all(f"agent.stage_seconds.{stage}" in root for stage in ("email", "meeting", "calcom", "zoom", "smtp"))
+            and root["message_ids"] and root["agent.stage_seconds.calcom"] < root["agent.stage_seconds.meeting"],
+        )
+        ok &= check(
+            "OTLP/JSON ids and timestamps",
+            all(len(span["traceId"]) == 32 and len(span["spanId"]) == 16 and int(span["endTimeUnixNano"]) >= int(span["startTimeUnixNano"]) for span in spans),
+        )
+
+        # Retries and errors
+        server.throttle(2)
+        with telemetry.span("email.handle", "email"):
+            calcom.check_availability(starts[-1])
+        try:
+            calcom.http.max_retries = 0
+            server.throttle(1)
+            with telemetry.span("email.handle", "email"), telemetry.span("calcom.raise", "calcom"):
+                raise RuntimeError("boom")
+        except RuntimeError:
+            pass
+        # The same email answered twice by the agent: two model requests, then the tool-calling turn again and a cache hit
+        cache, backend = ResponseCache(f"{tmp}/llm.sqlite3"), FakeOpenAI()
+        for _ in range(2):
+            model = CachedOpenAIChat(
+                id="gpt-4", api_key="sk-test", cache=cache, telemetry=telemetry,
+                http_client=httpx.Client(transport=httpx.MockTransport(backend)),
+            )
+            with telemetry.span("email.handle", "email"):
+                Agent(model=model, tools=[FakeCalendar()], system_prompt="You are a meeting assistant.").run("Tuesday 10:00?")
+        cache.close()
+        telemetry.flush()
+        spans = spans_of(trace_path)
+        names = {span["spanId"]: span["name"] for span in spans}
+        # A sync wrapper's coroutine runs on the tool event loop, still inside the caller's span
+        ok &= check(
+            "async tool calls nest under the sync call across run_sync",
+            any(span["name"] == "calcom.acheck_availability" and names[span["parentSpanId"]] == "calcom.check_availability" for span in spans),
+        )
+
+        port = telemetry.serve(0).server_address[1]
+        metrics = urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics").read().decode()
+        lines = dict(line.rsplit(" ", 1) for line in metrics.splitlines() if not line.startswith("#"))
+        stats = telemetry.stats()
+        calls = stats["calcom.check_availability"]["calls"]
+        ok &= check(
+            "histogram count matches calls, buckets cumulative",
+            int(lines['agent_stage_duration_seconds_count{stage="calcom",operation="check_availability"}']) == calls
+            and int(lines['agent_stage_duration_seconds_bucket{stage="calcom",operation="check_availability",le="+Inf"}']) == calls,
+        )
+        # Counted against the innermost span the HTTP request was made in
+        retries = sum(float(value) for key, value in lines.items() if key.startswith('agent_stage_retries_total{stage="calcom"'))
+        ok &= check("retries counted per stage", retries == 2)
+        ok &= check("errors counted per stage", float(lines['agent_stage_errors_total{stage="calcom",operation="raise"}']) == 1)
+        model_spans = [span for span in spans if span["name"] == "llm.chat"]
+        ok &= check(
+            "agent model requests traced inside the email's trace",
+            len(model_spans) == 4 and all(names.get(span.get("parentSpanId")) == "email.handle" for span in model_spans),
+        )
+        sent = [attributes(span) for span in model_spans if not attributes(span)["cached"]]
+        # OTLP/JSON encodes integers as strings
+        ok &= check("tokens recorded for requests sent, not for cache hits", len(sent) == 3 and all(a["tokens"] == "140" for a in sent))
+        ok &= check("token histogram", lines['agent_stage_tokens_count{stage="llm",operation="chat"}'] == "3")
+        ok &= check("result sizes recorded", 'agent_stage_bytes_count{stage="meeting",operation="confirm_meeting"}' in lines)
+
+        fresh_zoom, fresh_calcom, fresh_mailer, fresh_meeting = toolkits(server, tmp, "schemas")
+        before = tool_schemas([fresh_zoom, fresh_calcom, fresh_mailer, fresh_meeting])
+        instrument(Telemetry(), fresh_zoom, fresh_calcom, fresh_mailer, fresh_meeting)
+        ok &= check("tool schemas unchanged by instrumentation", tool_schemas([fresh_zoom, fresh_calcom, fresh_mailer, fresh_meeting]) == before)
+        ok &= check(
+            "agent tool calls go through the spans",
+            fresh_calcom.functions["check_availability"].entrypoint is fresh_calcom.check_availability
+            and hasattr(fresh_calcom.check_availability, "__wrapped__"),
+        )
+        fresh_mailer.spool.close()
+        telemetry.close()
+        server.stop()
+    print(f"checks: {'all ok' if ok else 'FAILED'}")
@@ -0,0 +1,315 @@
+"""Benchmark: many accounts in one process with `TenantRuntime` and `FairScheduler`.
+
+Builds `TENANTS` tenants (real toolkits, sharing one HTTP client, ledger and spool;
+nothing connects until mail is fetched or sent) and reports the memory each additional tenant costs, next to
+the resident size of a separate process serving a single account.
+
+Then one noisy tenant with a large backlog and many quiet tenants with a few
+conversations each are dispatched to `WORKERS` threads, once through a single
+first-come-first-served `EmailPipeline` and once through the fair scheduler; the
+dispatch latency (submitted -> agent run started) of the quiet tenants is compared.
+
+Also checks per-tenant concurrency and rate limits, that the new emails of a
+conversation are handled in one run, that spooled mail is sent through the sender's
+SMTP pool, the polling loop, and loading configurations from JSON and YAML.
+
+    python benchmarks/bench_tenants.py
+"""
+import json
+import logging
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+from email.message import EmailMessage
+from pathlib import Path
+
+from phi.utils.log import logger
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from Tools.async_utils import run_sync  # noqa: E402
+from Tools.email_pipeline import EmailPipeline  # noqa: E402
+from Tools.http_client import HTTPClient  # noqa: E402
+from Tools.outbound_spool import OutboundSpool  # noqa: E402
+from Tools.processing_ledger import ProcessingLedger  # noqa: E402
+from Tools.tenant_scheduler import FairScheduler  # noqa: E402
+from Tools.tenants import TenantConfig, TenantRuntime, load_tenant_configs  # noqa: E402
+
+TENANTS = 100
+WORKERS = 16
+RUN_TIME = 0.02
+NOISY_BACKLOG = 300
+QUIET_CONVERSATIONS = 2
+
+# One account in its own process: import the toolkits and build them once
+SINGLE_PROCESS = """
+import logging, resource, sys, tempfile
+sys.path.insert(0, {root!r})
+from phi.utils.log import logger
+logger.setLevel(logging.CRITICAL)
+from Tools.tenants import Tenant, TenantConfig
+from Tools.http_client import HTTPClient
+with tempfile.TemporaryDirectory() as tmp:
+    Tenant(TenantConfig("solo", "solo@example.com", "x", calcom_event_type_id=1), HTTPClient(), state_dir=tmp)
+    print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+
+def current_rss() -> float:
+    """Resident set size in KiB (peak RSS where /proc is not available)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def config(index: int, **overrides) -> TenantConfig:
+    values = dict(
+        name=f"tenant{index:03d}",
+        email_address=f"user{index}@example.com",
+        email_password="x",
+        user_name=f"User {index}",
+        calcom_api_key="test",
+        calcom_event_type_id=1,
+        zoom_account_id="acct",
+        zoom_client_id=f"client{index}",
+        zoom_client_secret="secret",
+    )
+    values.update(overrides)
+    return TenantConfig(**values)
+
+
+def email(tenant: str, index: int, thread: str = ""):
+    return ["Client", "client@example.org", "Meeting", "Can we meet?", str(index), {}, thread or f"{tenant}-t{index}", f"<{tenant}-{index}@x>"]
+
+
+def measure_memory(tmp: str) -> None:
+    http = HTTPClient()
+    ledger = ProcessingLedger(f"{tmp}/ledger.sqlite3")
+    spool = OutboundSpool(f"{tmp}/spool.sqlite3")
+    rss_before = current_rss()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    runtime = TenantRuntime(
+        [config(i) for i in range(TENANTS)],
+        handler=lambda tenant, emails: None,
+        http=http,
+        ledger=ledger,
+        spool=spool,
+        state_dir=f"{tmp}/state",
+    )
+    per_tenant = (tracemalloc.get_traced_memory()[0] - before) / TENANTS
+    tracemalloc.stop()
+    rss_per_tenant = (current_rss() - rss_before) / TENANTS
+    rss = current_rss()
+    single = int(subprocess.run([sys.executable, "-c", SINGLE_PROCESS.format(root=str(ROOT))], capture_output=True, text=True).stdout.split()[-1])
+    print(
+        f"{TENANTS} tenants in one process: {per_tenant / 1024:4.0f} KiB Python heap / {rss_per_tenant:4.0f} KiB RSS per tenant,"
+        f" {rss / 1024:4.0f} MiB RSS in total"
+    )
+    print(f"one process per account    : {single / 1024:4.0f} MiB RSS each -> ~{single * TENANTS / 1024 / 1024:4.1f} GiB for {TENANTS}")
+    runtime.stop(drain=False)
+    spool.close()
+    ledger.close()
+
+
+def workload():
+    """(tenant, emails) in submission order: the noisy tenant's backlog arrives first."""
+    batches = [("tenant000", [email("tenant000", i) for i in range(NOISY_BACKLOG)])]
+    for t in range(1, TENANTS):
+        name = f"tenant{t:03d}"
+        batches.append((name, [email(name, i) for i in range(QUIET_CONVERSATIONS)]))
+    return batches
+
+
+def dispatch(label: str, submit, wait_idle) -> dict:
+    submitted = {}
+    started = defaultdict(list)
+    lock = threading.Lock()
+
+    def handler(tenant: str, emails) -> None:
+        now = time.perf_counter()
+        with lock:
+            started[tenant].extend(now - submitted[(tenant, e[4])] for e in emails)
+        time.sleep(RUN_TIME)
+
+    begin = time.perf_counter()
+    runner = submit(handler)
+    for tenant, emails in workload():
+        now = time.perf_counter()
+        for e in emails:
+            submitted[(tenant, e[4])] = now
+        runner(tenant, emails)
+    wait_idle()
+    elapsed = time.perf_counter() - begin
+    quiet = sorted(w for tenant, waits in started.items() if tenant != "tenant000" for w in waits)
+    noisy = sorted(started["tenant000"])
+    result = {"quiet_p50": quiet[len(quiet) // 2], "quiet_p95": quiet[int(len(quiet) * 0.95)], "noisy_p95": noisy[int(len(noisy) * 0.95)]}
+    print(
+        f"{label:<14}: quiet tenants p50 {result['quiet_p50'] * 1000:6.1f}ms p95 {result['quiet_p95'] * 1000:6.1f}ms, "
+        f"noisy tenant p95 {result['noisy_p95'] * 1000:6.1f}ms, all done in {elapsed:4.2f}s"
+    )
+    return result
+
+
+def fifo():
+    holder = {}
+
+    def submit(handler):
+        pipeline = EmailPipeline(
+            lambda batch: handler(batch[0][0], [e for _, e in batch]),
+            workers=WORKERS,
+            key=lambda item: (item[0], item[1][6]),
+            item_id=lambda item: (item[0], item[1][4]),
+            coalesce=True,
+        )
+        holder["pipeline"] = pipeline
+        return lambda tenant, emails: pipeline.submit_all([(tenant, e) for e in emails])
+
+    return submit, lambda: holder["pipeline"].shutdown(drain=True)
+
+
+def fair():
+    holder = {}
+
+    def submit(handler):
+        scheduler = FairScheduler(handler, workers=WORKERS)
+        for t in range(TENANTS):
+            scheduler.add_tenant(f"tenant{t:03d}", max_concurrency=4)
+        holder["scheduler"] = scheduler
+        return scheduler.submit_all
+
+    return submit, lambda: holder["scheduler"].shutdown(drain=True)
+
+
+def check(name: str, ok: bool) -> bool:
+    print(f"{name:<55} {'ok' if ok else 'FAILED'}")
+    return ok
+
+
+def checks(tmp: str) -> bool:
+    ok = True
+
+    # Concurrency and rate limits
+    running, peak, starts = defaultdict(int), defaultdict(int), defaultdict(list)
+    lock = threading.Lock()
+
+    def handler(tenant, emails):
+        with lock:
+            running[tenant] += 1
+            peak[tenant] = max(peak[tenant], running[tenant])
+            starts[tenant].append(time.monotonic())
+        time.sleep(0.02)
+        with lock:
+            running[tenant] -= 1
+
+    scheduler = FairScheduler(handler, workers=8)
+    scheduler.add_tenant("capped", max_concurrency=2)
+    scheduler.add_tenant("limited", max_concurrency=8, rate_limit=600)
+    scheduler.submit_all("capped", [email("capped", i) for i in range(10)])
+    scheduler.submit_all("limited", [email("limited", i) for i in range(6)])
+    scheduler.shutdown(drain=True)
+    gaps = [b - a for a, b in zip(starts["limited"], starts["limited"][1:])]
+    ok &= check("max_concurrency respected", peak["capped"] == 2)
+    ok &= check("rate_limit respected (600/min -> 0.1s apart)", len(gaps) == 5 and min(gaps) >= 0.09)
+
+    # Coalescing and per-tenant dedupe
+    calls = []
+    scheduler = FairScheduler(lambda tenant, emails: calls.append((tenant, len(emails))) or time.sleep(0.05), workers=2)
+    scheduler.add_tenant("a")
+    scheduler.add_tenant("b")
+    scheduler.submit_all("a", [email("a", 1, "t"), email("a", 2, "t"), email("a", 2, "t")])
+    scheduler.submit_all("b", [email("b", 1, "t")])
+    scheduler.shutdown(drain=True)
+    ok &= check("conversation handled in one run, duplicates dropped", sorted(calls) == [("a", 2), ("b", 1)])
+
+    # Polling loop and outbound routing
+    mailboxes = {f"tenant{i:03d}": [email(f"tenant{i:03d}", 1)] for i in range(5)}
+    handled = []
+    runtime = TenantRuntime(
+        [config(i, poll_interval=0.1) for i in range(5)],
+        handler=lambda tenant, emails: handled.append(tenant.name),
+        fetch=lambda tenant: [mailboxes[tenant.name].pop()] if mailboxes[tenant.name] else [],
+        workers=2,
+        state_dir=f"{tmp}/poll",
+    )
+    sent = []
+
+    async def fake_send(message):
+        sent.append(message["From"])
+
+    runtime.tenants["tenant003"].mailer.smtp.send = fake_send
+    loop = threading.Thread(target=runtime.run_forever, daemon=True)
+    loop.start()
+    deadline = time.time() + 5
+    while len(handled) < 5 and time.time() < deadline:
+        time.sleep(0.02)
+    message = EmailMessage()
+    message["From"] = "User 3 <USER3@example.com>"
+    run_sync(runtime.send(message))
+    try:
+        message.replace_header("From", "nobody@example.com")
+        run_sync(runtime.send(message))
+        unknown_rejected = False
+    except LookupError:
+        unknown_rejected = True
+    runtime.stop()
+    loop.join(2)
+    ok &= check("every mailbox polled and handled", sorted(handled) == sorted(mailboxes))
+    ok &= check("spooled mail sent through the sender's SMTP pool", sent == ["User 3 <USER3@example.com>"] and unknown_rejected)
+
+    # Configuration files
+    os.environ["BENCH_TENANT_PASSWORD"] = "secret"
+    entry = {"name": "acme", "email_address": "a@acme.com", "email_password": "${BENCH_TENANT_PASSWORD}", "rate_limit": 30}
+    with open(f"{tmp}/tenants.json", "w") as f:
+        json.dump({"tenants": [entry]}, f)
+    with open(f"{tmp}/tenants.yaml", "w") as f:
+        f.write("- name: acme\n  email_address: a@acme.com\n  email_password: ${BENCH_TENANT_PASSWORD}\n  rate_limit: 30\n")
+    loaded = load_tenant_configs(f"{tmp}/tenants.json") + load_tenant_configs(f"{tmp}/tenants.yaml")
+    ok &= check("JSON and YAML configs with ${VAR} secrets", all(c.email_password == "secret" and c.rate_limit == 30 for c in loaded) and len(loaded) == 2)
+    with open(f"{tmp}/bad.json", "w") as f:
+        json.dump([dict(entry, imap_sever="typo")], f)
+    try:
+        load_tenant_configs(f"{tmp}/bad.json")
+        rejected = False
+    except ValueError:
+        rejected = True
+    ok &= check("unknown config field rejected", rejected)
+
+    os.environ.update({"BENCH_IMAP_PORT": "1993", "BENCH_EVENT_TYPE": "42", "BENCH_RATE": "12.5"})
+    numbers = {"imap_port": "${BENCH_IMAP_PORT}", "calcom_event_type_id": "${BENCH_EVENT_TYPE}", "rate_limit": "${BENCH_RATE}"}
+    with open(f"{tmp}/numbers.json", "w") as f:
+        json.dump([dict(entry, **numbers)], f)
+    (coerced,) = load_tenant_configs(f"{tmp}/numbers.json")
+    ok &= check(
+        "${VAR} numbers converted to their field types",
+        (coerced.imap_port, coerced.calcom_event_type_id, coerced.rate_limit) == (1993, 42, 12.5)
+        and isinstance(coerced.imap_port, int),
+    )
+    os.environ["BENCH_IMAP_PORT"] = "imaps"
+    try:
+        load_tenant_configs(f"{tmp}/numbers.json")
+        rejected = False
+    except ValueError as e:
+        rejected = "imap_port" in str(e)
+    ok &= check("non-numeric port rejected", rejected)
+    return ok
+
+
+if __name__ == "__main__":
+    logger.setLevel(logging.CRITICAL)
+    with tempfile.TemporaryDirectory() as tmp:
+        measure_memory(tmp)
+        baseline = dispatch("FIFO pipeline", *fifo())
+        result = dispatch("fair scheduler", *fair())
+        ok = check("quiet tenants not stuck behind the noisy backlog", result["quiet_p95"] < baseline["quiet_p95"] / 2)
+        ok &= checks(tmp)
+    print(f"checks: {'all ok' if ok else 'FAILED'}")
@@ -0,0 +1,125 @@
+"""Benchmark: agent runs per burst with thread-aware coalescing vs. one run per email.
+
+Delivers a burst of scheduling conversations to the fake IMAP server: follow-ups with
+full References chains, replies that only carry In-Reply-To, replies from mailers that
+drop both headers (matched by "Re:" subject and sender), replies whose parent was never
+fetched and replies that arrive before their parent. The emails are fetched with
+`FetchUnreadEmailTool` and pushed through `EmailPipeline` with a fake agent, once per
+email (the previous behaviour) and once coalesced per thread, and the thread grouping is
+checked against the generated conversations.
+
+    python benchmarks/bench_threading.py
+"""
+import random
+import sys
+import tempfile
+import time
+from email.message import EmailMessage
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.fake_imap_server import FakeIMAPServer  # noqa: E402
+from Tools.email_pipeline import EmailPipeline  # noqa: E402
+from Tools.FetchUnreadMail_tool import FetchUnreadEmailTool  # noqa: E402
+from Tools.imap_session import IMAPSession  # noqa: E402
+
+CONVERSATIONS = 40
+MAX_FOLLOW_UPS = 4
+LLM_LATENCY = 0.05
+
+
+def _message(conversation: int, index: int, replies_to, style: str) -> EmailMessage:
+    msg = EmailMessage()
+    msg["From"] = f"Client {conversation} <client{conversation}@example.org>"
+    msg["To"] = "me@example.com"
+    msg["Subject"] = ("Re: " if index else "") + f"Meeting about project {conversation}"
+    msg["Message-ID"] = f"<c{conversation}.m{index}@example.org>"
+    if replies_to and style == "references":
+        msg["In-Reply-To"] = replies_to[-1]
+        msg["References"] = " ".join(replies_to)
+    elif replies_to and style == "in-reply-to":
+        msg["In-Reply-To"] = replies_to[-1]
+    msg.set_content(f"Could we move it to {index + 1}pm on Tuesday?")
+    return msg
+
+
+def burst(rng: random.Random):
+    """Raw messages in delivery order and the conversation each belongs to."""
+    messages = []
+    for conversation in range(CONVERSATIONS):
+        style = ["references", "in-reply-to", "subject-only", "missing-parent", "out-of-order"][conversation % 5]
+        count = rng.randint(1, MAX_FOLLOW_UPS)
+        ids, thread = [], []
+        for index in range(count):
+            msg = _message(conversation, index, ids, "references" if style in ("missing-parent", "out-of-order") else style)
+            ids.append(msg["Message-ID"])
+            thread.append((msg, conversation))
+        if style == "missing-parent" and count > 1:
+            thread = thread[1:]  # the first message was read elsewhere and is never fetched
+        if style == "out-of-order":
+            thread.reverse()
+        messages.extend(thread)
+    return messages
+
+
+def conversation_of(email) -> int:
+    # Each conversation has its own sender, client<N>@example.org
+    return int(email[1][len("client"):email[1].index("@")])
+
+
+def run(emails, coalesce: bool):
+    calls = []
+
+    def agent(batch):
+        time.sleep(LLM_LATENCY)
+        calls.append(batch if coalesce else [batch])
+
+    pipeline = EmailPipeline(
+        agent,
+        workers=8,
+        key=(lambda email: email[6]) if coalesce else (lambda email: email[1]),
+        coalesce=coalesce,
+    )
+    start = time.perf_counter()
+    if coalesce:
+        threads = {}
+        for email in emails:
+            threads.setdefault(email[6], []).append(email)
+        for thread_emails in threads.values():
+            pipeline.submit_all(thread_emails)
+    else:
+        for email in emails:
+            pipeline.submit(email)
+    pipeline.shutdown(drain=True)
+    return calls, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    messages = burst(random.Random(7))
+    server = FakeIMAPServer().start()
+    for msg, _ in messages:
+        server.deliver(msg.as_bytes())
+    session = IMAPSession("127.0.0.1", server.port, "me@example.com", "secret", use_ssl=False)
+    with tempfile.TemporaryDirectory() as tmp:
+        tool = FetchUnreadEmailTool(
+            session=session,
+            sync_state_path=f"{tmp}/sync.json",
+            thread_index_path=f"{tmp}/threads.json",
+        )
+        try:
+            emails = tool.fetch_unread_emails()
+        finally:
+            session.stop()
+            server.stop()
+
+    expected = len({conversation for _, conversation in messages})
+    per_email, t_email = run(emails, coalesce=False)
+    per_thread, t_thread = run(emails, coalesce=True)
+    # Every coalesced call must hold exactly one conversation, and each conversation exactly one call
+    grouped = [{conversation_of(email) for email in batch} for batch in per_thread]
+    correct = all(len(g) == 1 for g in grouped) and len(per_thread) == expected
+
+    print(f"{len(emails)} emails in {expected} conversations")
+    print(f"per email : {len(per_email):>3} agent runs, {t_email * 1000:5.0f}ms")
+    print(f"per thread: {len(per_thread):>3} agent runs, {t_thread * 1000:5.0f}ms, grouping: {'ok' if correct else 'WRONG'}")
@@ -0,0 +1,134 @@
+"""Benchmark: shared, proactively refreshed Zoom OAuth tokens.
+
+Against the local HTTP stub with a slow token endpoint:
+
+- stampede: 50 concurrent meetings on a cold toolkit, from coroutines and threads,
+  must cause a single token request;
+- refresh: after the toolkit was idle for longer than the token lifetime, a meeting
+  waits for the token endpoint when tokens are only refreshed on use, but not with
+  the background refresh;
+- processes: several processes sharing TOKEN_CACHE_PATH start at once and must all end
+  up with the same token from a single request.
+
+    python benchmarks/bench_token_manager.py
+"""
+import asyncio
+import json
+import logging
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from phi.utils.log import logger
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.fake_http_server import FakeHTTPServer  # noqa: E402
+from Tools.async_utils import run_sync  # noqa: E402
+from Tools.zoom_tool import CustomZoomTool  # noqa: E402
+
+TOKEN_DELAY = 0.2
+TOKEN_LIFETIME = 2
+PROCESSES = 4
+
+
+def zoom(server: FakeHTTPServer, cache_path=None, background: bool = True) -> CustomZoomTool:
+    tool = CustomZoomTool("acct", "id", "secret", api_url=f"{server.url}/v2", token_url=f"{server.url}/oauth/token", token_cache_path=cache_path)
+    # Short-lived stub tokens: refresh one second before expiry, no clock-skew allowance
+    tool.tokens.expiry_skew = 0
+    tool.tokens.refresh_margin = 1
+    tool.tokens.background = background
+    return tool
+
+
+def meeting(tool: CustomZoomTool) -> bool:
+    return '"join_url"' in tool.schedule_meeting("Project sync", "2025-01-14T10:00:00", 30, "Asia/Tokyo")
+
+
+def check(name: str, ok: bool) -> bool:
+    print(f"{name:<64} {'ok' if ok else 'FAILED'}")
+    return ok
+
+
+def stampede() -> bool:
+    server = FakeHTTPServer(token_delay=TOKEN_DELAY).start()
+    tool = zoom(server)
+
+    async def burst():
+        return await asyncio.gather(*(tool.aschedule_meeting("Sync", "2025-01-14T10:00:00", 30) for _ in range(40)))
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(meeting(tool))) for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    results += ['"join_url"' in result for result in run_sync(burst())]
+    for thread in threads:
+        thread.join()
+    tool.tokens.close()
+    server.stop()
+    print(f"stampede: {len(results)} concurrent meetings, {server.token_requests} token request(s)")
+    return check("concurrent callers share one token request", all(results) and server.token_requests == 1)
+
+
+def refresh_after_idle(background: bool) -> float:
+    server = FakeHTTPServer(token_delay=TOKEN_DELAY, token_lifetime=TOKEN_LIFETIME).start()
+    tool = zoom(server, background=background)
+    meeting(tool)
+    time.sleep(TOKEN_LIFETIME + 0.5)
+    start = time.perf_counter()
+    ok = meeting(tool)
+    elapsed = time.perf_counter() - start
+    tool.tokens.close()
+    server.stop()
+    mode = "background refresh" if background else "refresh on use"
+    print(f"{mode:<19} first meeting after {TOKEN_LIFETIME + 0.5:.1f}s idle: {elapsed * 1000:6.1f}ms ({server.token_requests} token requests)")
+    assert ok
+    return elapsed
+
+
+def child(url: str, cache_path: str, start_at: float) -> None:
+    server = type("Stub", (), {"url": url})
+    tool = zoom(server, cache_path, background=False)
+    time.sleep(max(0.0, start_at - time.time()))
+    print(json.dumps({"token": tool.get_access_token()}))
+
+
+def processes() -> bool:
+    server = FakeHTTPServer(token_delay=TOKEN_DELAY).start()
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_path = f"{tmp}/tokens.sqlite3"
+        # Every child imports the toolkits first, then asks for the token at the same instant
+        start_at = time.time() + 3
+        children = [
+            subprocess.Popen(
+                [sys.executable, __file__, "--child", server.url, cache_path, str(start_at)],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                text=True,
+            )
+            for _ in range(PROCESSES)
+        ]
+        tokens = set()
+        for process in children:
+            output = process.communicate()[0].strip().splitlines()
+            tokens.add(json.loads(output[-1])["token"] if output else None)
+    server.stop()
+    print(f"processes: {PROCESSES} processes, {server.token_requests} token request(s), {len(tokens)} distinct token(s)")
+    return check("processes share one token through the cache", server.token_requests == 1 and len(tokens) == 1 and None not in tokens)
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--child"]:
+        logger.setLevel(logging.CRITICAL)
+        child(sys.argv[2], sys.argv[3], float(sys.argv[4]))
+        sys.exit(0)
+    logger.setLevel(logging.CRITICAL)
+    ok = stampede()
+    lazy = refresh_after_idle(background=False)
+    proactive = refresh_after_idle(background=True)
+    ok &= check("background refresh keeps the token endpoint off the request path", lazy >= TOKEN_DELAY > proactive)
+    ok &= processes()
+    print(f"checks: {'all ok' if ok else 'FAILED'}")
@@ -0,0 +1,68 @@
+"""Benchmark: precision/recall and throughput of the pre-agent email triage stage.
+
+Scores the labeled English/Japanese corpus in benchmarks/fixtures/triage_corpus.jsonl
+(meeting requests vs. newsletters, notifications, receipts and ordinary mail) at a few
+thresholds, and lists the misclassified emails at the default threshold.
+
+    python benchmarks/bench_triage.py
+"""
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from Tools.email_triage import EmailTriage  # noqa: E402
+
+CORPUS = Path(__file__).resolve().parent / "fixtures" / "triage_corpus.jsonl"
+REPEAT = 200
+
+
+def load_corpus():
+    with open(CORPUS, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def evaluate(corpus, threshold: float, show_errors: bool = False) -> None:
+    triage = EmailTriage(threshold=threshold)
+    tp = fp = fn = tn = 0
+    for row in corpus:
+        decision = triage.classify(row["from"], row["subject"], row["body"], row["headers"])
+        if decision.process and row["meeting"]:
+            tp += 1
+        elif decision.process:
+            fp += 1
+            if show_errors:
+                print(f"  false positive ({decision.score:.2f}): {row['subject']}")
+        elif row["meeting"]:
+            fn += 1
+            if show_errors:
+                print(f"  false negative ({decision.score:.2f}, {decision.reason}): {row['subject']}")
+        else:
+            tn += 1
+    precision = tp / (tp + fp) if tp + fp else 0.0
+    recall = tp / (tp + fn) if tp + fn else 0.0
+    print(
+        f"threshold={threshold:.2f} precision={precision:.2f} recall={recall:.2f} "
+        f"agent runs={tp + fp}/{len(corpus)} (skipped {tn + fn})"
+    )
+
+
+def throughput(corpus) -> None:
+    triage = EmailTriage()
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        for row in corpus:
+            triage.classify(row["from"], row["subject"], row["body"], row["headers"])
+    elapsed = time.perf_counter() - start
+    print(f"{REPEAT * len(corpus) / elapsed:,.0f} emails/s ({elapsed / (REPEAT * len(corpus)) * 1e6:.1f}us per email)")
+
+
+if __name__ == "__main__":
+    corpus = load_corpus()
+    print(f"{len(corpus)} emails, {sum(row['meeting'] for row in corpus)} meeting requests")
+    for threshold in (0.3, 0.4, 0.6, 0.7):
+        evaluate(corpus, threshold)
+    evaluate(corpus, EmailTriage().threshold, show_errors=True)
+    throughput(corpus)
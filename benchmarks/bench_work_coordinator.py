@@ -0,0 +1,277 @@
+"""Benchmark: several worker processes serving one mailbox through the work coordinator.
+
+Each worker is a separate process running `CoordinatedWorker` against a shared
+coordinator database. The mailbox is a local SQLite stand-in (unseen flag per UID);
+the agent run is modelled as `HANDLE_TIME` seconds. Reports messages/second for 1, 2,
+4 and 8 worker processes (each with `THREADS` threads), and checks that:
+
+  * without a coordinator, two processes polling UNSEEN reply to some emails twice
+  * with it, every message is handled exactly once, for every worker count
+  * when a worker dies mid-run, its claimed conversations are handled by the others
+    after the lease expires, and another worker takes over polling the mailbox
+  * the emails of one conversation are handled together, in one run
+  * the shared IMAP sync checkpoint is only advanced by the mailbox lease holder,
+    never moves backwards, and is picked up by the next lease holder
+
+    python benchmarks/bench_work_coordinator.py
+"""
+import logging
+import multiprocessing
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from phi.utils.log import logger
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from Tools.imap_sync import SyncCheckpoint  # noqa: E402
+from Tools.work_coordinator import CoordinatedWorker, WorkCoordinator  # noqa: E402
+
+HANDLE_TIME = 0.1
+THREADS = 2
+MESSAGES = 240
+LEASE_SECONDS = 1.0
+# Every tenth conversation has three emails
+THREAD_EVERY = 10
+
+
+class FakeInbox:
+    """Mailbox stand-in shared by processes: UNSEEN search and \\Seen flag per UID."""
+
+    def __init__(self, path: str):
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS inbox (uid INTEGER PRIMARY KEY, message_id TEXT, thread TEXT, seen INTEGER DEFAULT 0)")
+
+    def deliver(self, start: int, count: int) -> None:
+        rows = []
+        for index in range(start, start + count):
+            thread = f"t{index - index % 3}" if index % (3 * THREAD_EVERY) < 3 else f"t{index}"
+            rows.append((index + 1, f"<{index}@example.com>", thread))
+        self._db.executemany("INSERT INTO inbox (uid, message_id, thread) VALUES (?, ?, ?)", rows)
+
+    def unseen(self):
+        rows = self._db.execute("SELECT uid, message_id, thread FROM inbox WHERE seen = 0 ORDER BY uid").fetchall()
+        return [["Sender", "sender@example.com", "Meeting", "body", str(uid), {}, thread, message_id] for uid, message_id, thread in rows]
+
+    def mark_seen(self, uid: str) -> None:
+        self._db.execute("UPDATE inbox SET seen = 1 WHERE uid = ?", (int(uid),))
+
+
+class Results:
+    """Agent runs started and finished, per message, across processes."""
+
+    def __init__(self, path: str):
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS runs (message_id TEXT, worker INTEGER, run TEXT, stage TEXT, at REAL)")
+
+    def record(self, emails, worker: int, stage: str) -> None:
+        run = ",".join(email[7] for email in emails)
+        self._db.executemany(
+            "INSERT INTO runs VALUES (?, ?, ?, ?, ?)", [(email[7], worker, run, stage, time.time()) for email in emails]
+        )
+
+    def per_message(self, stage: str):
+        return dict(self._db.execute("SELECT message_id, COUNT(*) FROM runs WHERE stage = ? GROUP BY message_id", (stage,)).fetchall())
+
+    def query(self, sql: str, *args):
+        return self._db.execute(sql, args).fetchall()
+
+
+def coordinated_worker(index, tmp, ready, stop, crash_after=0):
+    coordinator = WorkCoordinator(f"{tmp}/coordinator.sqlite3", worker_id=f"w{index}", lease_seconds=LEASE_SECONDS).start()
+    inbox = FakeInbox(f"{tmp}/inbox.sqlite3")
+    results = Results(f"{tmp}/results.sqlite3")
+    runs = []
+
+    def poll():
+        threads = {}
+        for email in inbox.unseen():
+            threads.setdefault(email[6], []).append(email)
+        for thread, emails in threads.items():
+            coordinator.enqueue(emails, thread)
+
+    def handler(emails):
+        results.record(emails, index, "started")
+        time.sleep(HANDLE_TIME)
+        runs.append(emails)
+        if crash_after and len(runs) >= crash_after:
+            # Dies holding its leases, before the emails are marked as read
+            os._exit(1)
+        for email in emails:
+            inbox.mark_seen(email[4])
+        results.record(emails, index, "finished")
+
+    worker = CoordinatedWorker(
+        coordinator, "mailbox:bench", poll, handler, workers=THREADS, poll_interval=0.2, claim_interval=0.02
+    )
+    threading.Thread(target=worker.run_forever, daemon=True).start()
+    ready.put(index)
+    while not os.path.exists(stop):
+        time.sleep(0.05)
+    worker.stop(drain=True)
+    coordinator.close()
+
+
+def naive_worker(index, tmp, ready, stop):
+    """Two copies of the agent before this change: both search UNSEEN and handle what they find."""
+    inbox = FakeInbox(f"{tmp}/inbox.sqlite3")
+    results = Results(f"{tmp}/results.sqlite3")
+    ready.put(index)
+    while not os.path.exists(stop):
+        for email in inbox.unseen():
+            time.sleep(HANDLE_TIME / 10)
+            inbox.mark_seen(email[4])
+            results.record([email], index, "finished")
+        time.sleep(0.02)
+
+
+def start_workers(context, target, tmp, count, stop, crash=None):
+    ready = context.Queue()
+    processes = []
+    for index in range(count):
+        kwargs = {"crash_after": 5} if index == crash else {}
+        process = context.Process(target=target, args=(index, tmp, ready, stop), kwargs=kwargs)
+        process.start()
+        processes.append(process)
+        # The first worker is ready (and holds the mailbox lease) before the others start
+        ready.get(timeout=30)
+    return processes
+
+
+def wait_for(condition, timeout: float = 60.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def run(context, workers: int, crash=None, naive=False):
+    """Handle MESSAGES emails (plus a second batch in the crash run); returns (seconds, results, coordinator stats)."""
+    with tempfile.TemporaryDirectory() as tmp:
+        inbox, results = FakeInbox(f"{tmp}/inbox.sqlite3"), Results(f"{tmp}/results.sqlite3")
+        # A file rather than a multiprocessing.Event: setting an Event waits for every waiter, dead ones included
+        stop = f"{tmp}/stop"
+        processes = start_workers(context, naive_worker if naive else coordinated_worker, tmp, workers, stop, crash)
+        begin = time.perf_counter()
+        inbox.deliver(0, MESSAGES)
+        total = MESSAGES
+        if crash is not None:
+            # Mail arriving after the mailbox lease holder died must still be fetched
+            wait_for(lambda: not processes[crash].is_alive())
+            inbox.deliver(MESSAGES, MESSAGES // 4)
+            total += MESSAGES // 4
+        done = wait_for(lambda: len(results.per_message("finished")) >= total)
+        elapsed = time.perf_counter() - begin
+        Path(stop).touch()
+        for process in processes:
+            process.join(30)
+        stats = None
+        if not naive:
+            coordinator = WorkCoordinator(f"{tmp}/coordinator.sqlite3")
+            stats = coordinator.stats()
+            coordinator.close()
+        return elapsed if done else float("inf"), {
+            "finished": results.per_message("finished"),
+            "started": results.per_message("started"),
+            "runs": results.query("SELECT DISTINCT run, worker FROM runs WHERE stage = 'finished'"),
+            "total": total,
+        }, stats
+
+
+def check(name: str, ok: bool) -> bool:
+    print(f"{name:<58} {'ok' if ok else 'FAILED'}")
+    return ok
+
+
+def exactly_once(outcome) -> bool:
+    finished = outcome["finished"]
+    return len(finished) == outcome["total"] and all(count == 1 for count in finished.values())
+
+
+def shared_checkpoint() -> bool:
+    with tempfile.TemporaryDirectory() as tmp:
+        first = WorkCoordinator(f"{tmp}/coordinator.sqlite3", worker_id="w0", lease_seconds=LEASE_SECONDS)
+        second = WorkCoordinator(f"{tmp}/coordinator.sqlite3", worker_id="w1", lease_seconds=LEASE_SECONDS)
+        status = {"UIDVALIDITY": 7, "UIDNEXT": 11}
+        first.acquire("mailbox:bench")
+        holder = SyncCheckpoint(None, "mailbox:bench", store=first)
+        holder.begin_cycle(status)
+        holder.end_cycle(status, {5, 6})
+        holder.acknowledge(5)
+        # The other process handled UID 6 and saw nothing pending of its own
+        other = SyncCheckpoint(None, "mailbox:bench", store=second)
+        other.begin_cycle(status)
+        other.end_cycle(status, set())
+        ok = check("checkpoint: only the lease holder advances it", first.read_checkpoint("mailbox:bench")["last_uid"] == 5)
+        first.write_checkpoint("mailbox:bench", {"uidvalidity": 7, "last_uid": 2, "uidnext": 9})
+        stored = first.read_checkpoint("mailbox:bench")
+        ok &= check("checkpoint: an older state does not move it back", stored["last_uid"] == 5 and stored["uidnext"] == 11)
+        first.release("mailbox:bench")
+        second.acquire("mailbox:bench")
+        other.refresh()
+        other.begin_cycle(status)
+        other.end_cycle(status, set())
+        ok &= check(
+            "checkpoint: the next lease holder continues from it",
+            other.last_uid == 10 and second.read_checkpoint("mailbox:bench")["last_uid"] == 10,
+        )
+        other.begin_cycle({"UIDVALIDITY": 8, "UIDNEXT": 3})
+        other.end_cycle({"UIDVALIDITY": 8, "UIDNEXT": 3}, {1})
+        stored = second.read_checkpoint("mailbox:bench")
+        ok &= check("checkpoint: reset when UIDVALIDITY changes", stored["uidvalidity"] == 8 and stored["last_uid"] == 0)
+        first.close()
+        second.close()
+    return ok
+
+
+if __name__ == "__main__":
+    # Logs of lost leases would drown the results
+    logger.setLevel(logging.CRITICAL)
+    context = multiprocessing.get_context("fork")
+    ok = True
+
+    _, naive, _ = run(context, 2, naive=True)
+    duplicates = sum(count - 1 for count in naive["finished"].values())
+    print(f"no coordinator, 2 processes: {duplicates} of {MESSAGES} emails answered twice")
+    ok &= check("without a coordinator, emails are answered twice", duplicates > 0)
+
+    baseline = None
+    for workers in (1, 2, 4, 8):
+        elapsed, outcome, stats = run(context, workers)
+        rate = MESSAGES / elapsed
+        baseline = baseline or rate
+        print(
+            f"{workers} worker processes x {THREADS} threads: {rate:6.1f} messages/s"
+            f" ({rate / baseline:3.1f}x, ideal {workers * THREADS / HANDLE_TIME:5.1f})"
+        )
+        ok &= check(f"  every message handled exactly once ({workers} workers)", exactly_once(outcome))
+        ok &= check(f"  nothing left queued or leased ({workers} workers)", stats["queued"] == 0 and stats["leased"] == 0)
+        if workers == 4:
+            ok &= check("  throughput scales with workers (4 vs 1: > 3x)", rate > 3 * baseline)
+        if workers == 1:
+            # Conversations of three emails arrive together and are handled in one run
+            grouped = [run_ids for run_ids, _ in outcome["runs"] if run_ids.count(",") == 2]
+            ok &= check("  emails of one conversation handled in one run", len(grouped) == MESSAGES // (3 * THREAD_EVERY))
+
+    elapsed, outcome, stats = run(context, 3, crash=0)
+    retried = [message_id for message_id, count in outcome["started"].items() if count > 1]
+    after_crash = [message_id for message_id in outcome["finished"] if int(message_id[1:].split("@")[0]) >= MESSAGES]
+    print(
+        f"worker 0 killed after its 5th run: {outcome['total']} messages in {elapsed:4.1f}s,"
+        f" {len(retried)} re-run after lease expiry (lease {LEASE_SECONDS:.0f}s)"
+    )
+    ok &= check("crash: every message handled exactly once", exactly_once(outcome))
+    ok &= check("crash: the dead worker's claimed messages were re-run", len(retried) >= 1)
+    ok &= check("crash: mail after the crash fetched by a new lease holder", len(after_crash) == MESSAGES // 4 and stats["done"] == outcome["total"])
+    ok &= shared_checkpoint()
+    print(f"checks: {'all ok' if ok else 'FAILED'}")
+    sys.exit(0 if ok else 1)
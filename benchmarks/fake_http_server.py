@@ -0,0 +1,245 @@
+"""Minimal in-process Cal.com / Zoom API stub for offline benchmarks.
+
+Speaks HTTP/1.1 with keep-alive so connection reuse is observable, counts accepted
+TCP connections and requests, can add a fixed per-request latency and a per-connection
+setup delay (standing in for the TCP/TLS handshake round trips), and can answer the
+next N requests with 429 + Retry-After to exercise client retries. The OAuth token
+endpoint issues tokens valid for `token_lifetime` seconds after `token_delay` seconds.
+
+Point the toolkits at it with `CalCom(base_url=f"{server.url}/v2")` and
+`CustomZoomTool(api_url=f"{server.url}/v2", token_url=f"{server.url}/oauth/token")`.
+"""
+import json
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+SLOT_MINUTES = 30
+
+
+def _iso(dt: datetime) -> str:
+    return dt.strftime("%Y-%m-%dT%H:%M:%S.000Z")
+
+
+def _parse_time(value: str) -> datetime:
+    return datetime.fromisoformat(value.replace("Z", "+00:00")).astimezone(timezone.utc)
+
+
+def make_slots(start: datetime, end: datetime) -> Dict[str, List[dict]]:
+    """Every half hour from 00:00 to 09:00 UTC (09:00-18:00 JST) on weekdays, grouped by date."""
+    slots: Dict[str, List[dict]] = {}
+    day = start.replace(hour=0, minute=0, second=0, microsecond=0)
+    while day <= end:
+        if day.weekday() < 5:
+            t = day
+            while t < day + timedelta(hours=9):
+                if start <= t <= end:
+                    slots.setdefault(day.strftime("%Y-%m-%d"), []).append({"time": _iso(t)})
+                t += timedelta(minutes=SLOT_MINUTES)
+        day += timedelta(days=1)
+    return slots
+
+
+class FakeHTTPServer:
+    def __init__(self, latency: float = 0.0, handshake_delay: float = 0.0, token_lifetime: int = 3600, token_delay: float = 0.0):
+        self.latency = latency
+        self.handshake_delay = handshake_delay
+        self.token_lifetime = token_lifetime
+        self.token_delay = token_delay
+        self.token_requests = 0
+        # The next N booking requests are answered with 409 (slot taken)
+        self.reject_bookings = 0
+        self.connections = 0
+        self.requests = 0
+        self.throttled = 0
+        self.log: List[Tuple[str, str]] = []
+        self.bookings: Dict[str, dict] = {}
+        self.meetings: Dict[str, dict] = {}
+        self._throttle_remaining = 0
+        self._retry_after: Optional[str] = None
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def start(self) -> "FakeHTTPServer":
+        stub = self
+
+        class Handler(_Handler):
+            server_stub = stub
+
+        class Server(ThreadingHTTPServer):
+            daemon_threads = True
+
+            def get_request(self):
+                request = super().get_request()
+                with stub._lock:
+                    stub.connections += 1
+                return request
+
+        self._server = Server(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self._server.serve_forever, name="fake-http", daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def throttle(self, count: int, retry_after: Optional[str] = "0") -> None:
+        """Answer the next `count` requests with 429 (and the given Retry-After header)."""
+        with self._lock:
+            self._throttle_remaining = count
+            self._retry_after = retry_after
+
+    def reset_counters(self) -> None:
+        with self._lock:
+            self.connections = self.requests = self.throttled = 0
+            self.log.clear()
+
+    def _take_throttle(self) -> Optional[str]:
+        with self._lock:
+            if self._throttle_remaining <= 0:
+                return None
+            self._throttle_remaining -= 1
+            self.throttled += 1
+            return self._retry_after or ""
+
+    def route(self, method: str, path: str, query: Dict[str, str], body: dict) -> Tuple[int, Optional[dict]]:
+        if method == "GET" and path == "/v2/slots/available":
+            slots = make_slots(_parse_time(query["startTime"]), _parse_time(query["endTime"]))
+            booked = {b["start"] for b in self.bookings.values()}
+            slots = {day: [s for s in times if s["time"] not in booked] for day, times in slots.items()}
+            return 200, {"status": "success", "data": {"slots": slots}}
+        if method == "GET" and path == "/v2/bookings":
+            email = query.get("attendeeEmail")
+            bookings = [b for b in self.bookings.values() if email in (None, b["attendees"][0]["email"])]
+            return 200, {"status": "success", "data": bookings}
+        if method == "POST" and path == "/v2/bookings":
+            if self.reject_bookings > 0:
+                self.reject_bookings -= 1
+                return 409, {"status": "error", "error": "This time slot is no longer available"}
+            start = _parse_time(body["start"])
+            uid = uuid.uuid4().hex
+            booking = {
+                "uid": uid,
+                "title": "Meeting",
+                "status": "accepted",
+                "start": _iso(start),
+                "end": _iso(start + timedelta(minutes=SLOT_MINUTES)),
+                "attendees": [body["attendee"]],
+                "location": body.get("location"),
+            }
+            self.bookings[uid] = booking
+            return 201, {"status": "success", "data": booking}
+        if method == "POST" and path.startswith("/v2/bookings/") and path.endswith("/reschedule"):
+            old = self.bookings.pop(path.split("/")[3], None)
+            if old is None:
+                return 404, {"status": "error", "error": "Booking not found"}
+            start = _parse_time(body["start"])
+            booking = dict(old, uid=uuid.uuid4().hex, start=_iso(start), end=_iso(start + timedelta(minutes=SLOT_MINUTES)))
+            self.bookings[booking["uid"]] = booking
+            return 201, {"status": "success", "data": booking}
+        if method == "POST" and path.startswith("/v2/bookings/") and path.endswith("/cancel"):
+            if self.bookings.pop(path.split("/")[3], None) is None:
+                return 404, {"status": "error", "error": "Booking not found"}
+            return 200, {"status": "success", "data": {}}
+        if method == "POST" and path == "/oauth/token":
+            self.token_requests += 1
+            if self.token_delay:
+                time.sleep(self.token_delay)
+            return 200, {"access_token": uuid.uuid4().hex, "token_type": "bearer", "expires_in": self.token_lifetime}
+        if method == "POST" and path == "/v2/users/me/meetings":
+            meeting_id = str(len(self.meetings) + 1000)
+            meeting = {
+                "id": meeting_id,
+                "topic": body["topic"],
+                "start_time": body["start_time"],
+                "duration": body["duration"],
+                "join_url": f"https://zoom.example/j/{meeting_id}",
+            }
+            self.meetings[meeting_id] = meeting
+            return 201, meeting
+        if method == "GET" and path.startswith("/v2/users/") and path.endswith("/meetings"):
+            meetings = list(self.meetings.values())
+            return 200, {"page_count": 1, "page_number": 1, "page_size": 30, "total_records": len(meetings), "meetings": meetings}
+        if method == "GET" and path.startswith("/v2/meetings/") and path.endswith("/recordings"):
+            meeting = self.meetings.get(path.split("/")[3])
+            if meeting is None:
+                return 404, {"code": 3301, "message": "This recording does not exist"}
+            return 200, {"id": meeting["id"], "topic": meeting["topic"], "recording_count": 0, "recording_files": []}
+        if method == "GET" and path.startswith("/v2/meetings/"):
+            meeting = self.meetings.get(path.rsplit("/", 1)[1])
+            if meeting is None:
+                return 404, {"code": 3001, "message": "Meeting does not exist"}
+            return 200, meeting
+        if method == "DELETE" and path.startswith("/v2/meetings/"):
+            if self.meetings.pop(path.rsplit("/", 1)[1], None) is None:
+                return 404, {"code": 3001, "message": "Meeting does not exist"}
+            return 204, None
+        return 404, {"status": "error", "error": f"No route for {method} {path}"}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    server_stub: FakeHTTPServer
+
+    def setup(self):
+        if self.server_stub.handshake_delay:
+            time.sleep(self.server_stub.handshake_delay)
+        super().setup()
+
+    def log_message(self, format, *args):
+        pass
+
+    def _handle(self, method: str) -> None:
+        stub = self.server_stub
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+        parsed = urlparse(self.path)
+        query = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+        with stub._lock:
+            stub.requests += 1
+            stub.log.append((method, parsed.path))
+        if stub.latency:
+            time.sleep(stub.latency)
+
+        retry_after = stub._take_throttle()
+        if retry_after is not None:
+            status, payload = 429, {"status": "error", "error": "Too many requests"}
+        else:
+            body = {}
+            if raw and self.headers.get("Content-Type", "").startswith("application/json"):
+                body = json.loads(raw)
+            with stub._lock:
+                status, payload = stub.route(method, parsed.path, query, body)
+
+        data = json.dumps(payload).encode() if payload is not None else b""
+        self.send_response(status)
+        if retry_after:
+            self.send_header("Retry-After", retry_after)
+        if data:
+            self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def do_DELETE(self):
+        self._handle("DELETE")
@@ -0,0 +1,404 @@
+"""Minimal in-process IMAP4rev1 server for offline benchmarks.
+
+Supports the subset of commands used by the Tools/ IMAP code: CAPABILITY, LOGIN,
+SELECT, STATUS, SEARCH, FETCH, STORE, NOOP, IDLE and LOGOUT (with UID variants and
+CONDSTORE's HIGHESTMODSEQ). Messages are kept in memory;
+`deliver()` appends one and wakes every IDLE-ing client.
+"""
+import email
+import email.policy
+import re
+import socket
+import socketserver
+import threading
+import time
+from email.message import EmailMessage, Message
+from typing import Dict, List, Optional, Set
+
+_FETCH_ITEM_RE = re.compile(r"BODY(?:\.PEEK)?\[[^\]]*\](?:<\d+\.\d+>)?|[A-Z0-9.]+", re.IGNORECASE)
+
+
+class FakeMessage:
+    def __init__(self, uid: int, raw: bytes):
+        self.uid = uid
+        self.raw = raw
+        self.flags: Set[str] = set()
+        self._parsed: Optional[Message] = None
+
+    @property
+    def parsed(self) -> Message:
+        if self._parsed is None:
+            self._parsed = email.message_from_bytes(self.raw, policy=email.policy.compat32)
+        return self._parsed
+
+
+class FakeMailbox:
+    def __init__(self):
+        self.messages: List[FakeMessage] = []
+        self.uidvalidity = 1
+        self.uidnext = 1
+        self.highestmodseq = 1
+        self.lock = threading.Condition()
+
+    def append(self, raw: bytes) -> FakeMessage:
+        with self.lock:
+            message = FakeMessage(self.uidnext, raw)
+            self.uidnext += 1
+            self.highestmodseq += 1
+            self.messages.append(message)
+            self.lock.notify_all()
+            return message
+
+
+def make_message(index: int, body: str = "Can we meet tomorrow at 10:00?", attachment_size: int = 0) -> bytes:
+    msg = EmailMessage()
+    msg["From"] = f"Sender {index} <sender{index}@example.com>"
+    msg["To"] = "me@example.com"
+    msg["Subject"] = f"Meeting request {index}"
+    msg.set_content(body)
+    if attachment_size:
+        msg.add_attachment(b"\0" * attachment_size, maintype="application", subtype="pdf", filename="agenda.pdf")
+    return msg.as_bytes()
+
+
+def _quote(value: Optional[str]) -> str:
+    if value is None:
+        return "NIL"
+    return '"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def _raw_payload(part: Message) -> bytes:
+    # get_payload() re-decodes 8bit payloads; the transfer-encoded bytes are what IMAP serves
+    return part._payload.encode("ascii", "surrogateescape")
+
+
+def bodystructure(part: Message) -> str:
+    """Render the BODYSTRUCTURE (RFC 3501 section 7.4.2) of a parsed message."""
+    if part.is_multipart():
+        children = "".join(bodystructure(child) for child in part.get_payload())
+        return f"({children} {_quote(part.get_content_subtype().upper())})"
+    params = part.get_params() or []
+    param_list = " ".join(f"{_quote(k.upper())} {_quote(v)}" for k, v in params[1:])
+    payload = _raw_payload(part)
+    fields = [
+        _quote(part.get_content_maintype().upper()),
+        _quote(part.get_content_subtype().upper()),
+        f"({param_list})" if param_list else "NIL",
+        "NIL",
+        "NIL",
+        _quote((part.get("Content-Transfer-Encoding") or "7BIT").upper()),
+        str(len(payload)),
+    ]
+    if part.get_content_maintype() == "text":
+        fields.append(str(payload.count(b"\n")))
+    disposition = part.get_content_disposition()
+    if disposition:
+        filename = part.get_filename()
+        disposition_params = f"({_quote('FILENAME')} {_quote(filename)})" if filename else "NIL"
+        fields += ["NIL", f"({_quote(disposition.upper())} {disposition_params})"]
+    return "(" + " ".join(fields) + ")"
+
+
+def body_section(message: FakeMessage, section: str) -> bytes:
+    """Return the bytes of BODY[section] for a message."""
+    raw = message.raw
+    header_end = raw.find(b"\r\n\r\n")
+    separator = 4
+    if header_end < 0:
+        header_end, separator = raw.find(b"\n\n"), 2
+    upper = section.upper()
+    if not section:
+        return raw
+    if upper == "HEADER":
+        return raw[:header_end + separator]
+    if upper == "TEXT":
+        return raw[header_end + separator:]
+    if upper.startswith("HEADER.FIELDS"):
+        wanted = set(re.findall(r"[A-Z0-9-]+", upper[len("HEADER.FIELDS"):]))
+        lines = [f"{k}: {v}" for k, v in message.parsed.items() if k.upper() in wanted]
+        return ("\r\n".join(lines) + "\r\n\r\n").encode("utf-8", "surrogateescape")
+    part = message.parsed
+    for index in section.split("."):
+        if part.is_multipart():
+            part = part.get_payload()[int(index) - 1]
+    return _raw_payload(part)
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    server: "FakeIMAPServer"
+
+    def setup(self):
+        super().setup()
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.server.register(self)
+        self.known_exists = 0
+
+    def finish(self):
+        self.server.unregister(self)
+        try:
+            super().finish()
+        except OSError:
+            pass
+
+    def send(self, data: bytes) -> None:
+        self.wfile.write(data)
+        self.wfile.flush()
+        self.server.bytes_sent += len(data)
+
+    def line(self, text: str) -> None:
+        self.send(text.encode() + b"\r\n")
+
+    def handle(self):
+        try:
+            self._serve()
+        except OSError:
+            pass
+
+    def _serve(self):
+        self.line("* OK fake IMAP4rev1 ready")
+        while True:
+            raw = self.rfile.readline()
+            if not raw:
+                return
+            parts = raw.decode().rstrip("\r\n").split(" ", 2)
+            if len(parts) < 2:
+                continue
+            tag, command = parts[0], parts[1].upper()
+            args = parts[2] if len(parts) > 2 else ""
+            uid_mode = command == "UID"
+            if uid_mode:
+                command, _, args = args.partition(" ")
+                command = command.upper()
+            self.server.commands.append(command)
+            handler = getattr(self, f"cmd_{command.lower()}", None)
+            if handler is None:
+                self.line(f"{tag} BAD unknown command")
+                continue
+            if handler(tag, args, uid_mode) is False:
+                return
+
+    # Commands -----------------------------------------------------------
+
+    def cmd_capability(self, tag, args, uid_mode):
+        self.line(f"* CAPABILITY {' '.join(self.server.capabilities)}")
+        self.line(f"{tag} OK CAPABILITY completed")
+
+    def cmd_login(self, tag, args, uid_mode):
+        self.server.logins += 1
+        self.line(f"{tag} OK LOGIN completed")
+
+    def cmd_select(self, tag, args, uid_mode):
+        mailbox = self.server.mailbox
+        with mailbox.lock:
+            self.known_exists = len(mailbox.messages)
+            self.line(f"* {self.known_exists} EXISTS")
+            self.line(f"* OK [UIDVALIDITY {mailbox.uidvalidity}] UIDs valid")
+            self.line(f"* OK [UIDNEXT {mailbox.uidnext}] Predicted next UID")
+            self.line(f"* OK [HIGHESTMODSEQ {mailbox.highestmodseq}] Highest")
+        self.line(f"{tag} OK [READ-WRITE] SELECT completed")
+
+    cmd_examine = cmd_select
+
+    def cmd_status(self, tag, args, uid_mode):
+        name, _, items = args.partition(" ")
+        mailbox = self.server.mailbox
+        values = {
+            "MESSAGES": len(mailbox.messages),
+            "UIDNEXT": mailbox.uidnext,
+            "UIDVALIDITY": mailbox.uidvalidity,
+            "HIGHESTMODSEQ": mailbox.highestmodseq,
+            "UNSEEN": sum(1 for m in mailbox.messages if "\\Seen" not in m.flags),
+        }
+        requested = re.findall(r"[A-Z]+", items.upper())
+        self.line(f"* STATUS {name} (" + " ".join(f"{k} {values[k]}" for k in requested if k in values) + ")")
+        self.line(f"{tag} OK STATUS completed")
+
+    def cmd_noop(self, tag, args, uid_mode):
+        self._report_exists()
+        self.line(f"{tag} OK NOOP completed")
+
+    def cmd_logout(self, tag, args, uid_mode):
+        self.line("* BYE logging out")
+        self.line(f"{tag} OK LOGOUT completed")
+        return False
+
+    def cmd_idle(self, tag, args, uid_mode):
+        self.line("+ idling")
+        mailbox = self.server.mailbox
+        done = threading.Event()
+
+        def watch():
+            while not done.is_set():
+                with mailbox.lock:
+                    if len(mailbox.messages) == self.known_exists:
+                        mailbox.lock.wait(0.05)
+                    if len(mailbox.messages) != self.known_exists and not done.is_set():
+                        self._report_exists()
+
+        watcher = threading.Thread(target=watch, daemon=True)
+        watcher.start()
+        try:
+            line = self.rfile.readline()
+        finally:
+            done.set()
+            with mailbox.lock:
+                mailbox.lock.notify_all()
+            watcher.join()
+        if not line:
+            return False
+        self.line(f"{tag} OK IDLE terminated")
+
+    def cmd_search(self, tag, args, uid_mode):
+        messages = self._messages()
+        criteria = args.upper()
+        uid_range = re.search(r"UID (\S+)", criteria)
+        in_range = {id(m) for _, m in self._resolve(uid_range.group(1), messages, True)} if uid_range else None
+        hits = []
+        for seq, message in enumerate(messages, 1):
+            if "UNSEEN" in criteria and "\\Seen" in message.flags:
+                continue
+            if in_range is not None and id(message) not in in_range:
+                continue
+            hits.append(message.uid if uid_mode else seq)
+        self.line("* SEARCH" + "".join(f" {n}" for n in hits))
+        self.line(f"{tag} OK SEARCH completed")
+
+    def cmd_fetch(self, tag, args, uid_mode):
+        sequence_set, _, items = args.partition(" ")
+        requested = _FETCH_ITEM_RE.findall(items)
+        if uid_mode and "UID" not in (item.upper() for item in requested):
+            requested.insert(0, "UID")
+        messages = self._messages()
+        for seq, message in self._resolve(sequence_set, messages, uid_mode):
+            out = bytearray(f"* {seq} FETCH (".encode())
+            for index, item in enumerate(requested):
+                if index:
+                    out += b" "
+                upper = item.upper()
+                if upper == "UID":
+                    out += f"UID {message.uid}".encode()
+                elif upper == "FLAGS":
+                    out += f"FLAGS ({' '.join(sorted(message.flags))})".encode()
+                elif upper == "RFC822.SIZE":
+                    out += f"RFC822.SIZE {len(message.raw)}".encode()
+                elif upper == "BODYSTRUCTURE":
+                    out += b"BODYSTRUCTURE " + bodystructure(message.parsed).encode()
+                elif upper in ("RFC822", "RFC822.PEEK") or upper.startswith("BODY"):
+                    if upper == "RFC822":
+                        name, payload = "RFC822", message.raw
+                        self._mark_seen(message)
+                    else:
+                        section = item[item.index("[") + 1:item.index("]")]
+                        name = f"BODY[{section}]"
+                        payload = body_section(message, section)
+                        partial = re.search(r"<(\d+)\.(\d+)>$", item)
+                        if partial:
+                            # Partial fetch: BODY[section]<origin> with at most `length` octets
+                            origin, length = int(partial.group(1)), int(partial.group(2))
+                            name = f"{name}<{origin}>"
+                            payload = payload[origin:origin + length]
+                        if ".PEEK" not in upper:
+                            self._mark_seen(message)
+                    out += f"{name} {{{len(payload)}}}\r\n".encode() + payload
+            self.send(bytes(out) + b")\r\n")
+        self.line(f"{tag} OK FETCH completed")
+
+    def cmd_store(self, tag, args, uid_mode):
+        sequence_set, _, rest = args.partition(" ")
+        messages = self._messages()
+        flags = set(re.findall(r"\\\w+", rest))
+        for seq, message in self._resolve(sequence_set, messages, uid_mode):
+            if rest.upper().startswith("-"):
+                message.flags -= flags
+            else:
+                message.flags |= flags
+            self.server.mailbox.highestmodseq += 1
+        self.line(f"{tag} OK STORE completed")
+
+    # Helpers ------------------------------------------------------------
+
+    def _messages(self) -> List[FakeMessage]:
+        with self.server.mailbox.lock:
+            return list(self.server.mailbox.messages)
+
+    def _mark_seen(self, message: FakeMessage) -> None:
+        if "\\Seen" not in message.flags:
+            message.flags.add("\\Seen")
+            self.server.mailbox.highestmodseq += 1
+
+    def _report_exists(self):
+        count = len(self.server.mailbox.messages)
+        if count != self.known_exists:
+            self.known_exists = count
+            self.line(f"* {count} EXISTS")
+
+    @staticmethod
+    def _resolve(sequence_set: str, messages: List[FakeMessage], uid_mode: bool):
+        if not messages:
+            return []
+        largest = messages[-1].uid if uid_mode else len(messages)
+        result = []
+        for chunk in sequence_set.split(","):
+            low, _, high = chunk.partition(":")
+            start = largest if low == "*" else int(low)
+            end = start if not high else (largest if high == "*" else int(high))
+            for seq, message in enumerate(messages, 1):
+                key = message.uid if uid_mode else seq
+                if min(start, end) <= key <= max(start, end):
+                    result.append((seq, message))
+        return result
+
+
+class FakeIMAPServer(socketserver.ThreadingTCPServer):
+    """Threaded fake IMAP server listening on localhost (plain TCP, no TLS)."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, capabilities: Optional[List[str]] = None):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.capabilities = capabilities or ["IMAP4rev1", "IDLE", "UIDPLUS", "CONDSTORE"]
+        self.mailbox = FakeMailbox()
+        self.logins = 0
+        self.bytes_sent = 0
+        self.commands: List[str] = []
+        self._clients: Dict[int, _Handler] = {}
+        self._clients_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+    def start(self) -> "FakeIMAPServer":
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.drop_connections()
+        self.shutdown()
+        self.server_close()
+
+    def deliver(self, raw: bytes) -> float:
+        """Append a message to the inbox and return the delivery timestamp."""
+        self.mailbox.append(raw)
+        return time.perf_counter()
+
+    def drop_connections(self) -> None:
+        """Abruptly close every client connection (simulates a network failure)."""
+        with self._clients_lock:
+            clients = list(self._clients.values())
+        for client in clients:
+            try:
+                client.connection.shutdown(2)
+            except OSError:
+                pass
+
+    def register(self, handler: _Handler) -> None:
+        with self._clients_lock:
+            self._clients[id(handler)] = handler
+
+    def unregister(self, handler: _Handler) -> None:
+        with self._clients_lock:
+            self._clients.pop(id(handler), None)
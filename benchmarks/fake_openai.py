@@ -0,0 +1,52 @@
+"""Stub of the OpenAI chat completions endpoint for offline benchmarks, as an httpx transport handler.
+
+Asks for `check_availability` on the first turn and answers once the tool result is in,
+counting requests. `FakeCalendar` is the toolkit providing that tool. Use it with
+`OpenAIChat(http_client=httpx.Client(transport=httpx.MockTransport(FakeOpenAI())))`.
+"""
+import json
+import time
+
+import httpx
+from phi.tools import Toolkit
+
+
+class FakeOpenAI:
+    """Chat completions endpoint stub: asks for check_availability, then answers after the tool result."""
+
+    def __init__(self):
+        self.requests = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        body = json.loads(request.content)
+        self.requests.append(body)
+        if body["messages"][-1]["role"] == "tool":
+            message, finish = {"role": "assistant", "content": "Confirmed for Tuesday 10:00."}, "stop"
+        else:
+            arguments = json.dumps({"start_time": "2026-11-10T10:00:00"})
+            call = {"id": "call_1", "type": "function", "function": {"name": "check_availability", "arguments": arguments}}
+            message, finish = {"role": "assistant", "content": None, "tool_calls": [call]}, "tool_calls"
+        return httpx.Response(200, json={
+            "id": f"chatcmpl-{len(self.requests)}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body["model"],
+            "choices": [{"index": 0, "message": message, "finish_reason": finish}],
+            "usage": {"prompt_tokens": 120, "completion_tokens": 20, "total_tokens": 140},
+        })
+
+
+class FakeCalendar(Toolkit):
+    def __init__(self):
+        super().__init__(name="calcom_tool")
+        self.calls = 0
+        self.register(self.check_availability)
+
+    def check_availability(self, start_time: str) -> str:
+        """Check whether a time slot is available.
+
+        Args:
+            start_time: Start time in ISO 8601 format
+        """
+        self.calls += 1
+        return "Available"
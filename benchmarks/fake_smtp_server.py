@@ -0,0 +1,221 @@
+"""Minimal in-process SMTP server for offline benchmarks (in the spirit of aiosmtpd).
+
+Supports EHLO/HELO, STARTTLS (with a certificate from `make_self_signed_cert`),
+AUTH PLAIN/LOGIN, MAIL, RCPT, DATA, RSET, NOOP and QUIT. Delivered messages are kept
+in memory. `latency` delays every reply (a network round trip), `handshake_delay` the
+greeting of each new connection, and after `max_messages_per_connection` messages the
+server answers 421 and closes the connection, as rate-limiting providers do.
+`fail_rate` rejects that share of messages with a temporary 451 after DATA, and
+recipients listed in `reject` are refused with a permanent 550.
+"""
+import base64
+import random
+import socket
+import socketserver
+import ssl
+import subprocess
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+def make_self_signed_cert(directory: str) -> Tuple[str, str]:
+    """Create a certificate for localhost / 127.0.0.1 with the openssl CLI; returns (cert, key) paths."""
+    cert, key = str(Path(directory) / "cert.pem"), str(Path(directory) / "key.pem")
+    subprocess.run(
+        [
+            "openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+            "-keyout", key, "-out", cert, "-subj", "/CN=localhost",
+            "-addext", "subjectAltName=DNS:localhost,IP:127.0.0.1",
+        ],
+        check=True,
+        capture_output=True,
+    )
+    return cert, key
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    server: "FakeSMTPServer"
+
+    def setup(self):
+        super().setup()
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.server.register(self)
+        self.messages_on_connection = 0
+
+    def finish(self):
+        self.server.unregister(self)
+        try:
+            super().finish()
+        except OSError:
+            pass
+
+    def reply(self, text: str) -> None:
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        self.wfile.write(text.encode() + b"\r\n")
+        self.wfile.flush()
+
+    def handle(self):
+        try:
+            self._serve()
+        except (OSError, ssl.SSLError):
+            pass
+
+    def _serve(self):
+        with self.server.lock:
+            self.server.connections += 1
+        if self.server.handshake_delay:
+            time.sleep(self.server.handshake_delay)
+        self.reply("220 fake.smtp ESMTP ready")
+        tls = False
+        sender, recipients = None, []
+        while True:
+            raw = self.rfile.readline()
+            if not raw:
+                return
+            line = raw.decode("utf-8", "replace").rstrip("\r\n")
+            command, _, args = line.partition(" ")
+            command = command.upper()
+            self.server.commands.append(command)
+            if command in ("EHLO", "HELO"):
+                extensions = ["250-fake.smtp", "250-PIPELINING", "250-8BITMIME", "250-AUTH PLAIN LOGIN"]
+                if self.server.tls_context and not tls:
+                    extensions.append("250-STARTTLS")
+                self.reply("\r\n".join(extensions + ["250 SIZE 10240000"]))
+            elif command == "STARTTLS" and self.server.tls_context and not tls:
+                self.reply("220 Ready to start TLS")
+                self.connection = self.server.tls_context.wrap_socket(self.connection, server_side=True)
+                self.rfile = self.connection.makefile("rb")
+                self.wfile = self.connection.makefile("wb")
+                tls = True
+                with self.server.lock:
+                    self.server.tls_handshakes += 1
+            elif command == "AUTH":
+                mechanism, _, initial = args.partition(" ")
+                if mechanism.upper() == "LOGIN":
+                    self.reply("334 " + base64.b64encode(b"Username:").decode())
+                    self.rfile.readline()
+                    self.reply("334 " + base64.b64encode(b"Password:").decode())
+                    self.rfile.readline()
+                elif not initial:
+                    self.reply("334 ")
+                    self.rfile.readline()
+                with self.server.lock:
+                    self.server.logins += 1
+                self.reply("235 Authentication successful")
+            elif command == "MAIL":
+                if self.messages_on_connection >= self.server.max_messages_per_connection:
+                    self.reply("421 Too many messages on this connection, closing")
+                    return
+                sender, recipients = args, []
+                self.reply("250 OK")
+            elif command == "RCPT":
+                if any(address in args for address in self.server.reject):
+                    self.reply("550 5.1.1 No such user")
+                    continue
+                recipients.append(args)
+                self.reply("250 OK")
+            elif command == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                data = bytearray()
+                while True:
+                    chunk = self.rfile.readline()
+                    if not chunk or chunk == b".\r\n":
+                        break
+                    data += chunk[1:] if chunk.startswith(b"..") else chunk
+                with self.server.lock:
+                    failed = self.server.rng.random() < self.server.fail_rate
+                    if failed:
+                        self.server.failures += 1
+                    else:
+                        self.server.messages.append((sender, recipients, bytes(data)))
+                if failed:
+                    self.reply("451 4.3.0 Temporary failure, try again later")
+                    continue
+                self.messages_on_connection += 1
+                self.reply("250 OK queued")
+            elif command == "RSET":
+                sender, recipients = None, []
+                self.reply("250 OK")
+            elif command == "NOOP":
+                with self.server.lock:
+                    self.server.noops += 1
+                self.reply("250 OK")
+            elif command == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+
+class FakeSMTPServer(socketserver.ThreadingTCPServer):
+    """Threaded fake SMTP server listening on localhost (STARTTLS when a certificate is given)."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(
+        self,
+        cert: Optional[Tuple[str, str]] = None,
+        latency: float = 0.0,
+        handshake_delay: float = 0.0,
+        max_messages_per_connection: int = 1000,
+        fail_rate: float = 0.0,
+        reject: Iterable[str] = (),
+        seed: int = 0,
+    ):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.tls_context: Optional[ssl.SSLContext] = None
+        if cert:
+            self.tls_context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+            self.tls_context.load_cert_chain(*cert)
+        self.latency = latency
+        self.handshake_delay = handshake_delay
+        self.max_messages_per_connection = max_messages_per_connection
+        self.fail_rate = fail_rate
+        self.reject = set(reject)
+        self.rng = random.Random(seed)
+        self.failures = 0
+        self.connections = 0
+        self.tls_handshakes = 0
+        self.logins = 0
+        self.noops = 0
+        self.commands: List[str] = []
+        self.messages: List[Tuple[str, List[str], bytes]] = []
+        self.lock = threading.Lock()
+        self._clients: Dict[int, _Handler] = {}
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+    def start(self) -> "FakeSMTPServer":
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.drop_connections()
+        self.shutdown()
+        self.server_close()
+
+    def drop_connections(self) -> None:
+        """Abruptly close every client connection (simulates an idle timeout on the server)."""
+        with self.lock:
+            clients = list(self._clients.values())
+        for client in clients:
+            try:
+                client.connection.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def register(self, handler: _Handler) -> None:
+        with self.lock:
+            self._clients[id(handler)] = handler
+
+    def unregister(self, handler: _Handler) -> None:
+        with self.lock:
+            self._clients.pop(id(handler), None)
@@ -0,0 +1,124 @@
+"""Business-hour and Japan-holiday rules around DST changes, midnight, Golden Week and the new year."""
+from datetime import date, datetime, time, timedelta, timezone
+
+import pytest
+import pytz
+
+from benchmarks.bench_availability_rules import EDGE_CASES
+from Tools.availability_rules import BusinessRules, japan_holiday, japan_holidays, merge_slots
+
+NEW_YORK = pytz.timezone("America/New_York")
+
+
+def utc(text: str) -> datetime:
+    return datetime.fromisoformat(text).replace(tzinfo=timezone.utc)
+
+
+def hourly(first: str, hours: int):
+    return [utc(first) + timedelta(hours=i) for i in range(hours)]
+
+
+@pytest.fixture
+def rules() -> BusinessRules:
+    return BusinessRules("Asia/Tokyo")
+
+
+@pytest.mark.parametrize("start, allowed, description", EDGE_CASES, ids=[case[2] for case in EDGE_CASES])
+def test_edge_cases(rules, start, allowed, description):
+    assert rules.is_allowed(datetime.fromisoformat(start)) is allowed
+
+
+@pytest.mark.parametrize(
+    "local, allowed",
+    [
+        # 19:00 EST is 09:00 JST the next morning
+        (datetime(2025, 3, 6, 19, 0), True),
+        # After the US switch to daylight saving time (March 9), the same wall time is 08:00 JST
+        (datetime(2025, 3, 10, 19, 0), False),
+        (datetime(2025, 3, 10, 20, 0), True),
+        # Back on standard time (November 2)
+        (datetime(2025, 11, 3, 19, 0), True),
+    ],
+)
+def test_requester_dst_change(rules, local, allowed):
+    assert rules.is_allowed(NEW_YORK.localize(local)) is allowed
+
+
+@pytest.mark.parametrize(
+    "start, allowed",
+    [
+        ("2025-03-28T08:00:00", True),  # Fri 09:00 CET
+        ("2025-03-28T07:30:00", False),  # Fri 08:30 CET
+        ("2025-03-31T07:00:00", True),  # Mon 09:00 CEST, after the switch on March 30
+        ("2025-03-31T06:30:00", False),  # Mon 08:30 CEST
+        ("2025-03-31T15:30:00", True),  # Mon 17:30 CEST ends at 18:00
+        ("2025-03-31T16:00:00", False),  # Mon 18:00 CEST
+        ("2025-10-24T07:00:00", True),  # Fri 09:00 CEST
+        ("2025-10-27T08:00:00", True),  # Mon 09:00 CET, after the switch on October 26
+        ("2025-10-27T07:00:00", False),  # Mon 08:00 CET
+    ],
+)
+def test_windows_follow_local_dst(start, allowed):
+    rules = BusinessRules("Europe/Berlin", holiday=lambda day: None)
+    assert rules.is_allowed(utc(start)) is allowed
+
+
+def test_naive_time_in_dst_zone_is_local_wall_time():
+    rules = BusinessRules("Europe/Berlin", holiday=lambda day: None)
+    assert rules.is_allowed(datetime(2025, 3, 31, 9, 0))
+    assert rules.to_local(datetime(2025, 3, 31, 9, 0)).utcoffset() == timedelta(hours=2)
+
+
+def test_midnight_reason_follows_local_day(rules):
+    # Fri 23:59 JST is outside business hours, Sat 00:00 JST is the weekend
+    assert rules.violation(utc("2025-01-10T14:59:00")).startswith("is outside business hours")
+    assert rules.violation(utc("2025-01-10T15:00:00")) == "falls on a weekend"
+
+
+def test_meeting_crossing_midnight_not_allowed():
+    rules = BusinessRules("Asia/Tokyo", windows=((time(22, 0), time(23, 59)),), weekdays=range(7), holiday=lambda day: None)
+    assert rules.is_allowed(datetime(2025, 1, 10, 23, 0))
+    assert not rules.is_allowed(datetime(2025, 1, 10, 23, 45))
+
+
+def test_merge_slots_does_not_cross_midnight():
+    tokyo = pytz.timezone("Asia/Tokyo")
+    starts = [tokyo.localize(datetime(2025, 1, 10, 23, 30)), tokyo.localize(datetime(2025, 1, 11, 0, 0))]
+    assert len(merge_slots(starts, timedelta(minutes=30))) == 2
+
+
+@pytest.mark.parametrize(
+    "day, name",
+    [
+        (date(2025, 4, 29), "Showa Day"),
+        (date(2025, 5, 3), "Constitution Memorial Day"),
+        (date(2025, 5, 5), "Children's Day"),
+        # Greenery Day 2025 (May 4) falls on a Sunday
+        (date(2025, 5, 6), "Substitute Holiday"),
+        # Constitution Memorial Day 2026 falls on a Sunday; May 4 and 5 are holidays already
+        (date(2026, 5, 6), "Substitute Holiday"),
+        (date(2025, 5, 2), None),
+    ],
+)
+def test_golden_week_holidays(day, name):
+    assert japan_holiday(day) == name
+
+
+def test_first_valid_skips_golden_week(rules):
+    # Fri May 2 18:00 JST: the next slots are on Wed May 7
+    first = rules.first_valid(hourly("2025-05-02T00:00:00", 24 * 7), 3, after=utc("2025-05-02T09:00:00"))
+    assert [rules.to_local(start).strftime("%m-%d %H:%M") for start in first] == ["05-07 09:00", "05-07 10:00", "05-07 11:00"]
+
+
+def test_year_boundary(rules):
+    assert rules.violation(utc("2025-12-31T14:30:00")).startswith("is outside business hours")
+    # 15:00 UTC on New Year's Eve is already January 1 in Tokyo, a holiday of the next year's calendar
+    assert rules.violation(utc("2025-12-31T15:00:00")) == "falls on a Japan national holiday (New Year's Day)"
+    assert rules.is_allowed(utc("2026-01-02T00:00:00"))
+    assert not rules.is_allowed(utc("2026-01-12T00:00:00"))  # Coming of Age Day 2026
+    first = rules.first_valid(hourly("2025-12-31T00:00:00", 24 * 3), 1, after=utc("2025-12-31T09:00:00"))
+    assert rules.to_local(first[0]).strftime("%Y-%m-%d %H:%M") == "2026-01-02 09:00"
+
+
+def test_holiday_count():
+    assert len(japan_holidays(2025)) == 19
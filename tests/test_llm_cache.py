@@ -0,0 +1,44 @@
+"""The model response cache never replays tool calls."""
+import httpx
+import pytest
+from phi.agent import Agent
+
+from benchmarks.fake_openai import FakeCalendar, FakeOpenAI
+from Tools.llm_cache import CachedOpenAIChat, ResponseCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ResponseCache(str(tmp_path / "llm.sqlite3"))
+    yield cache
+    cache.close()
+
+
+def run_agent(cache: ResponseCache, backend: FakeOpenAI, calendar: FakeCalendar) -> str:
+    model = CachedOpenAIChat(id="gpt-4", api_key="sk-test", cache=cache, http_client=httpx.Client(transport=httpx.MockTransport(backend)))
+    agent = Agent(model=model, tools=[calendar], system_prompt="You are a meeting assistant.")
+    return agent.run("Can we meet on Tuesday at 10:00?").content
+
+
+def test_tool_calling_turn_not_cached(cache):
+    backend, calendar = FakeOpenAI(), FakeCalendar()
+    run_agent(cache, backend, calendar)
+    assert len(backend.requests) == 2
+    assert cache.stats()["entries"] == 1
+
+
+def test_same_text_again_asks_the_model_for_tool_calls(cache):
+    backend, calendar = FakeOpenAI(), FakeCalendar()
+    first = run_agent(cache, backend, calendar)
+    # The same email text arrives again under a new Message-ID
+    second = run_agent(cache, backend, calendar)
+    assert second == first
+    assert len(backend.requests) == 3
+    assert cache.stats()["hits"] == 1
+
+
+def test_rejected_response_returned_but_not_stored(cache):
+    assert cache.get_or_call("key", lambda: "tool call", cacheable=lambda response: False) == "tool call"
+    assert cache.get("key") is None
+    assert cache.get_or_call("key", lambda: "answer") == "answer"
+    assert cache.get("key") == "answer"
@@ -0,0 +1,147 @@
+"""Outbound delivery against the failure-injecting SMTP stub: nothing lost, nothing sent twice."""
+import time
+
+import pytest
+
+from benchmarks.bench_outbound_spool import delivered_ids, messages, tool, wait_until_empty
+from benchmarks.fake_smtp_server import FakeSMTPServer
+from Tools.async_utils import run_sync
+from Tools.outbound_spool import DeliveryWorker, OutboundSpool
+
+REJECTED = {"client7@example.org", "client13@example.org"}
+
+
+@pytest.fixture
+def server():
+    servers = []
+
+    def start(**kwargs) -> FakeSMTPServer:
+        servers.append(FakeSMTPServer(**kwargs).start())
+        return servers[-1]
+
+    yield start
+    for running in servers:
+        running.stop()
+
+
+def deliver(spool: OutboundSpool, mailer, poll_interval: float = 0.05) -> DeliveryWorker:
+    worker = DeliveryWorker(spool, mailer.smtp.send, poll_interval=poll_interval).start()
+    wait_until_empty(spool)
+    worker.stop()
+    return worker
+
+
+def test_every_accepted_email_delivered_exactly_once(tmp_path, server):
+    smtp = server(latency=0.002, fail_rate=0.3, reject=REJECTED)
+    spool = OutboundSpool(str(tmp_path / "spool.sqlite3"), base_delay=0.02, max_delay=0.5)
+    mailer = tool(smtp, spool)
+    queued = [mailer.send_email(**message) for message in messages(60)]
+    worker = deliver(spool, mailer)
+
+    assert all(result.startswith("email queued for delivery: <") for result in queued)
+    ids = delivered_ids(smtp)
+    assert len(ids) == len(set(ids)) == 60 - len(REJECTED)
+    assert smtp.failures > 0 and worker.retried > 0
+    stats = spool.stats()
+    assert stats["sent"] == 60 - len(REJECTED) and stats["depth"] == 0
+    spool.close()
+
+
+def test_refused_recipients_dead_lettered_without_retry(tmp_path, server):
+    smtp = server(reject=REJECTED)
+    spool = OutboundSpool(str(tmp_path / "spool.sqlite3"), base_delay=0.01)
+    mailer = tool(smtp, spool)
+    for message in messages(20):
+        mailer.send_email(**message)
+    deliver(spool, mailer)
+
+    dead = spool.dead_letters()
+    assert sorted(recipient for letter in dead for recipient in letter["recipients"]) == sorted(REJECTED)
+    assert all(letter["attempts"] == 1 for letter in dead)
+    assert len(smtp.messages) == 20 - len(REJECTED)
+    spool.close()
+
+
+def test_dead_lettered_after_max_attempts_and_sent_once_when_retried(tmp_path, server):
+    smtp = server(fail_rate=1.0)
+    spool = OutboundSpool(str(tmp_path / "spool.sqlite3"), max_attempts=3, base_delay=0.01)
+    mailer = tool(smtp, spool)
+    mailer.send_email(**messages(1)[0])
+    deliver(spool, mailer)
+
+    dead = spool.dead_letters()
+    assert len(dead) == 1 and dead[0]["attempts"] == 3
+    assert smtp.failures == 3 and not smtp.messages
+
+    smtp.fail_rate = 0.0
+    assert spool.retry_dead(dead[0]["message_id"])
+    deliver(spool, mailer)
+    assert len(smtp.messages) == 1 and not spool.dead_letters()
+    spool.close()
+
+
+def test_claims_of_a_crashed_process_delivered_once_after_lease(tmp_path, server):
+    smtp = server()
+    path = str(tmp_path / "spool.sqlite3")
+    crashed = OutboundSpool(path, lease_seconds=0.3)
+    mailer = tool(smtp, crashed)
+    for message in messages(5):
+        mailer.send_email(**message)
+    crashed.claim(3)  # the process died before these were sent
+    crashed.close()
+
+    restarted = OutboundSpool(path, lease_seconds=0.3)
+    deliver(restarted, tool(smtp))
+    ids = delivered_ids(smtp)
+    assert len(ids) == len(set(ids)) == 5
+    restarted.close()
+
+
+def test_live_claims_not_taken_over_by_another_process(tmp_path, server):
+    smtp = server()
+    path = str(tmp_path / "spool.sqlite3")
+    sending = OutboundSpool(path)
+    mailer = tool(smtp, sending)
+    for message in messages(5):
+        mailer.send_email(**message)
+    claimed = sending.claim(3)
+
+    other = OutboundSpool(path)
+    assert other.recover() == 0
+    worker = DeliveryWorker(other, tool(smtp).smtp.send, poll_interval=0.05).start()
+    deadline = time.time() + 5
+    while other.stats()["queued"] and time.time() < deadline:
+        time.sleep(0.02)
+    worker.stop()
+    assert len(smtp.messages) == 2 and other.stats()["sending"] == 3
+
+    # A failure reported for a claim the process no longer holds is ignored
+    assert not other.mark_failed(claimed[0][0], "451 try later")
+    for message_id, _ in claimed:
+        sending.mark_sent(message_id)
+    assert sending.stats()["sent"] == 5
+    sending.close()
+    other.close()
+
+
+def test_421_resent_on_a_new_connection(server):
+    smtp = server(max_messages_per_connection=7)
+    mailer = tool(smtp)
+    results = [mailer.send_email(**message) for message in messages(30)]
+    assert all(result == "email sent successfully" for result in results)
+    recipients = [rcpt for _, rcpts, _ in smtp.messages for rcpt in rcpts]
+    assert len(recipients) == len(set(recipients)) == 30
+    assert mailer.smtp.reconnects > 0
+    run_sync(mailer.smtp.close())
+
+
+def test_dropped_idle_connection_replaced(server):
+    smtp = server()
+    mailer = tool(smtp)
+    mailer.smtp.noop_after = 0
+    assert mailer.send_email(**messages(1)[0]) == "email sent successfully"
+    smtp.drop_connections()
+    time.sleep(0.05)
+    assert mailer.send_email(**messages(1)[0]) == "email sent successfully"
+    assert len(smtp.messages) == 2 and smtp.connections == 2
+    run_sync(mailer.smtp.close())
@@ -0,0 +1,56 @@
+"""Side effects of the meeting flow happen exactly once, however often the process is killed.
+
+The flow (Zoom meeting -> Cal.com booking -> confirmation email) runs in a child process
+of benchmarks/bench_ledger.py against the local HTTP stub.
+"""
+import pytest
+
+from benchmarks import bench_ledger
+from Tools.processing_ledger import BOOKED, COMPLETED, REPLIED, ProcessingLedger
+
+
+@pytest.mark.parametrize("crash_after", range(len(bench_ledger.STEPS)), ids=bench_ledger.STEPS)
+def test_crash_after_each_step_performs_side_effects_once(crash_after):
+    crashed, restarted, (meetings, bookings, emails) = bench_ledger.crash_and_restart(True, crash_after)
+    assert crashed != 0, "the first attempt was not killed"
+    assert restarted == 0
+    assert (meetings, bookings, emails) == (1, 1, 1)
+
+
+def test_without_ledger_a_restart_repeats_side_effects():
+    # Shows that the crash injection detects duplicates
+    _, _, counts = bench_ledger.crash_and_restart(False, len(bench_ledger.STEPS) - 1)
+    assert counts == (2, 2, 2)
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    ledger = ProcessingLedger(str(tmp_path / "ledger.sqlite3"))
+    yield ledger
+    ledger.close()
+
+
+def test_retry_of_a_run_replays_results_in_order(ledger):
+    calls = []
+
+    def send(text):
+        calls.append(text)
+        return text
+
+    for _ in range(2):
+        with ledger.activate(["<a@example.jp>"]):
+            results = [ledger.once(REPLIED, lambda: send("first")), ledger.once(REPLIED, lambda: send("second"))]
+        assert results == ["first", "second"]
+    assert calls == ["first", "second"]
+
+
+def test_follow_up_coalesced_after_completion_performs_its_own_side_effects(ledger):
+    calls = []
+    with ledger.activate(["<a@example.jp>"]):
+        ledger.once(BOOKED, lambda: calls.append("a") or "booked a")
+    ledger.record(["<a@example.jp>"], COMPLETED)
+    # The follow-up is answered together with the first email, which is still unread
+    with ledger.activate(["<a@example.jp>", "<b@example.jp>"]):
+        result = ledger.once(BOOKED, lambda: calls.append("a+b") or "booked a+b")
+    assert calls == ["a", "a+b"]
+    assert result == "booked a+b"
@@ -0,0 +1,29 @@
+"""Telemetry.instrument traces every tool the agent can call."""
+from phi.tools.zoom import ZoomTool
+
+from Tools.telemetry import Telemetry
+
+
+def test_inherited_registered_tools_traced():
+    telemetry = Telemetry()
+    # Every tool of phi's ZoomTool is inherited; without credentials the calls fail fast, without network
+    zoom = telemetry.instrument(ZoomTool("account", "client", "secret"), "zoom")
+
+    for name, function in zoom.functions.items():
+        args = () if name in ("get_upcoming_meetings", "list_meetings") else ("1000",)
+        if name == "schedule_meeting":
+            args = ("Project sync", "2025-01-14T10:00:00", 30)
+        function.entrypoint(*args)
+
+    metrics = telemetry.prometheus()
+    assert telemetry.spans == len(zoom.functions)
+    for name in zoom.functions:
+        assert f'agent_stage_duration_seconds_count{{stage="zoom",operation="{name}"}} 1' in metrics
+
+
+def test_toolkit_helpers_not_traced():
+    telemetry = Telemetry()
+    zoom = telemetry.instrument(ZoomTool("account", "client", "secret"), "zoom")
+    zoom.instructions()
+    zoom.get_access_token()
+    assert telemetry.spans == 0
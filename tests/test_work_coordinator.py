@@ -0,0 +1,102 @@
+"""Several worker processes serving one mailbox: every email is answered exactly once.
+
+The worker processes, the shared SQLite mailbox stand-in and the run log come from
+benchmarks/bench_work_coordinator.py; these tests use a smaller mailbox.
+"""
+import multiprocessing
+
+import pytest
+
+from benchmarks import bench_work_coordinator as harness
+from Tools.imap_sync import SyncCheckpoint
+from Tools.work_coordinator import WorkCoordinator
+
+MAILBOX = "mailbox:test"
+STATUS = {"UIDVALIDITY": 7, "UIDNEXT": 11}
+
+
+@pytest.fixture
+def context(monkeypatch):
+    monkeypatch.setattr(harness, "MESSAGES", 60)
+    return multiprocessing.get_context("fork")
+
+
+def test_without_coordinator_emails_are_answered_twice(context):
+    _, outcome, _ = harness.run(context, 2, naive=True)
+    assert any(count > 1 for count in outcome["finished"].values())
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_every_message_handled_exactly_once(context, workers):
+    elapsed, outcome, stats = harness.run(context, workers)
+    assert elapsed != float("inf"), "not every message was handled"
+    assert harness.exactly_once(outcome)
+    assert stats["queued"] == 0 and stats["leased"] == 0
+    assert stats["done"] == outcome["total"]
+
+
+def test_conversation_handled_in_one_run(context):
+    _, outcome, _ = harness.run(context, 1)
+    grouped = [run for run, _ in outcome["runs"] if run.count(",") == 2]
+    assert len(grouped) == harness.MESSAGES // (3 * harness.THREAD_EVERY)
+
+
+def test_crashed_worker_claims_handled_once_by_the_others(context):
+    # Worker 0 holds the mailbox lease and dies after its 5th run, before marking the emails as read
+    _, outcome, stats = harness.run(context, 3, crash=0)
+    assert harness.exactly_once(outcome)
+    assert any(count > 1 for count in outcome["started"].values()), "the dead worker's claims were not re-run"
+    after_crash = [message_id for message_id in outcome["finished"] if int(message_id[1:].split("@")[0]) >= harness.MESSAGES]
+    assert len(after_crash) == harness.MESSAGES // 4, "mail after the crash was not fetched by a new lease holder"
+    assert stats["done"] == outcome["total"]
+
+
+@pytest.fixture
+def coordinators(tmp_path):
+    first = WorkCoordinator(str(tmp_path / "coordinator.sqlite3"), worker_id="w0", lease_seconds=5)
+    second = WorkCoordinator(str(tmp_path / "coordinator.sqlite3"), worker_id="w1", lease_seconds=5)
+    first.acquire(MAILBOX)
+    yield first, second
+    first.close()
+    second.close()
+
+
+def test_checkpoint_only_advanced_by_lease_holder(coordinators):
+    first, second = coordinators
+    holder = SyncCheckpoint(None, MAILBOX, store=first)
+    holder.begin_cycle(STATUS)
+    holder.end_cycle(STATUS, {5, 6})
+    holder.acknowledge(5)
+    # The other process handled UID 6 and has nothing pending of its own
+    other = SyncCheckpoint(None, MAILBOX, store=second)
+    other.begin_cycle(STATUS)
+    other.end_cycle(STATUS, set())
+    assert first.read_checkpoint(MAILBOX)["last_uid"] == 5
+    assert second.write_checkpoint(MAILBOX, {"uidvalidity": 7, "last_uid": 10}) is None
+
+
+def test_checkpoint_never_moves_back(coordinators):
+    first, _ = coordinators
+    first.write_checkpoint(MAILBOX, {"uidvalidity": 7, "last_uid": 5, "uidnext": 11})
+    stored = first.write_checkpoint(MAILBOX, {"uidvalidity": 7, "last_uid": 2, "uidnext": 9})
+    assert stored["last_uid"] == 5 and stored["uidnext"] == 11
+
+
+def test_checkpoint_continued_by_next_lease_holder(coordinators):
+    first, second = coordinators
+    first.write_checkpoint(MAILBOX, {"uidvalidity": 7, "last_uid": 5, "uidnext": 11})
+    other = SyncCheckpoint(None, MAILBOX, store=second)
+    first.release(MAILBOX)
+    assert second.acquire(MAILBOX)
+    other.refresh()
+    assert other.last_uid == 5
+    other.begin_cycle(STATUS)
+    other.end_cycle(STATUS, set())
+    assert second.read_checkpoint(MAILBOX)["last_uid"] == 10
+
+
+def test_checkpoint_reset_when_uidvalidity_changes(coordinators):
+    first, _ = coordinators
+    first.write_checkpoint(MAILBOX, {"uidvalidity": 7, "last_uid": 10, "uidnext": 11})
+    stored = first.write_checkpoint(MAILBOX, {"uidvalidity": 8, "last_uid": 0, "uidnext": 3})
+    assert stored["uidvalidity"] == 8 and stored["last_uid"] == 0
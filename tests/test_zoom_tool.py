@@ -0,0 +1,86 @@
+"""Every Zoom tool registered for the agent talks to the configured API over the pooled async client."""
+import json
+import time
+
+import pytest
+import requests
+
+from benchmarks.fake_http_server import FakeHTTPServer
+from Tools.async_utils import run_sync
+from Tools.zoom_tool import CustomZoomTool
+
+READ_TOOLS = ("get_upcoming_meetings", "list_meetings", "get_meeting_recordings", "get_meeting")
+
+
+@pytest.fixture
+def server():
+    server = FakeHTTPServer().start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def zoom(server, monkeypatch):
+    def blocked(*args, **kwargs):
+        raise AssertionError("blocking requests call")
+
+    for method in ("get", "post", "delete"):
+        monkeypatch.setattr(requests, method, blocked)
+    return CustomZoomTool("acct", "id", "secret", api_url=f"{server.url}/v2", token_url=f"{server.url}/oauth/token", max_retries=2)
+
+
+def test_registered_tools_are_overridden(zoom):
+    for name in READ_TOOLS + ("schedule_meeting", "delete_meeting"):
+        assert zoom.functions[name].entrypoint.__func__ is getattr(CustomZoomTool, name)
+
+
+def test_read_tools_use_configured_api(server, zoom):
+    meeting_id = json.loads(zoom.schedule_meeting("Project sync", "2025-01-14T10:00:00", 30, "Asia/Tokyo"))["meeting_id"]
+
+    assert [m["id"] for m in json.loads(zoom.get_upcoming_meetings())["meetings"]] == [meeting_id]
+    assert json.loads(zoom.list_meetings())["total_records"] == 1
+    assert json.loads(zoom.get_meeting(meeting_id))["topic"] == "Project sync"
+    assert json.loads(zoom.get_meeting_recordings(meeting_id))["recording_count"] == 0
+    assert ("GET", f"/v2/meetings/{meeting_id}/recordings") in server.log
+
+
+def test_read_tool_errors_are_returned(zoom):
+    assert "error" in json.loads(zoom.get_meeting("404"))
+
+
+def test_async_variants(server, zoom):
+    run_sync(zoom.aschedule_meeting("Project sync", "2025-01-14T10:00:00", 30))
+    assert len(json.loads(run_sync(zoom.alist_meetings()))["meetings"]) == 1
+
+
+def call(zoom, name: str) -> dict:
+    args = () if name in ("get_upcoming_meetings", "list_meetings") else ("1000",)
+    return json.loads(getattr(zoom, name)(*args))
+
+
+@pytest.mark.parametrize("name", READ_TOOLS)
+def test_read_tools_retry_throttled_requests(server, zoom, name):
+    zoom.schedule_meeting("Project sync", "2025-01-14T10:00:00", 30)
+    server.throttle(2, retry_after="0")
+    assert "error" not in call(zoom, name)
+    assert server.throttled == 2 and zoom.http.retries == 2
+
+
+def test_read_tools_share_pooled_connection(server, zoom):
+    zoom.schedule_meeting("Project sync", "2025-01-14T10:00:00", 30)
+    server.reset_counters()
+    for name in READ_TOOLS:
+        assert "error" not in call(zoom, name)
+    assert server.requests == len(READ_TOOLS) and server.connections == 0
+
+
+def test_read_tools_time_out(server):
+    zoom = CustomZoomTool(
+        "acct", "id", "secret", api_url=f"{server.url}/v2", token_url=f"{server.url}/oauth/token", timeout=0.1, max_retries=0
+    )
+    assert zoom.get_access_token()
+    server.latency = 0.5
+    for name in READ_TOOLS:
+        start = time.monotonic()
+        assert "error" in call(zoom, name)
+        assert time.monotonic() - start < 0.4